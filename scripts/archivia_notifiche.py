@@ -0,0 +1,31 @@
+"""
+Job di conservazione delle notifiche.
+Sposta in 'notifiche_archivio' le notifiche già lette più vecchie della soglia configurata,
+mantenendo piccola la tabella 'notifiche' interrogata a ogni caricamento della sidebar.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Aggiunge la cartella src al path per importare i moduli interni
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR / "src"))
+
+from core.logging import get_logger
+from modules.notifications import GIORNI_CONSERVAZIONE_LETTE, archivia_notifiche_lette
+
+logger = get_logger(__name__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archivia le notifiche lette più vecchie.")
+    parser.add_argument(
+        "--giorni",
+        type=int,
+        default=GIORNI_CONSERVAZIONE_LETTE,
+        help="Età minima (in giorni) delle notifiche lette da archiviare.",
+    )
+    args = parser.parse_args()
+    logger.info("Avvio archiviazione notifiche lette...")
+    archivia_notifiche_lette(args.giorni)
@@ -13,6 +13,12 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent.parent
 sys.path.append(str(BASE_DIR / "src"))
 from core.logging import get_logger
+from modules.archive_manager import estrai_tag_archivio
+from modules.database.db_search import (
+    FTS_INDEXES,
+    fts_schema_statements,
+    rebuild_fts_index,
+)
 
 logger = get_logger(__name__)
 
@@ -56,7 +62,8 @@ def crea_tabelle_se_non_esistono():
                 Ruolo TEXT,
                 PasswordHash TEXT,
                 "Link Attività" TEXT,
-                "2FA_Secret" TEXT
+                "2FA_Secret" TEXT,
+                Stato TEXT DEFAULT 'Attivo'
             )""",
             "esclusioni_assegnamenti": """(
                 id_esclusione INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -110,6 +117,15 @@ def crea_tabelle_se_non_esistono():
                 FOREIGN KEY (Destinatario_Matricola)
                     REFERENCES contatti(Matricola) ON DELETE CASCADE
             )""",
+            "notifiche_archivio": """(
+                ID_Notifica TEXT PRIMARY KEY NOT NULL,
+                Timestamp TEXT,
+                Destinatario_Matricola TEXT NOT NULL,
+                Messaggio TEXT,
+                Stato TEXT,
+                Link_Azione TEXT,
+                Timestamp_Archiviazione TEXT
+            )""",
             "bacheca": """(
                 ID_Bacheca TEXT PRIMARY KEY NOT NULL,
                 ID_Turno TEXT NOT NULL,
@@ -225,6 +241,81 @@ def crea_tabelle_se_non_esistono():
                 UtenteSubentrante TEXT,
                 EseguitoDa TEXT
             )""",
+            "email_outbox": """(
+                id TEXT PRIMARY KEY NOT NULL,
+                oggetto TEXT NOT NULL,
+                corpo_html TEXT NOT NULL,
+                destinatari TEXT,
+                stato TEXT NOT NULL DEFAULT 'in_coda',
+                tentativi INTEGER NOT NULL DEFAULT 0,
+                prossimo_tentativo TEXT,
+                ultimo_errore TEXT,
+                timestamp_creazione TEXT,
+                timestamp_invio TEXT
+            )""",
+            "ai_cache": """(
+                chiave TEXT PRIMARY KEY NOT NULL,
+                modello TEXT NOT NULL,
+                risposta TEXT NOT NULL,
+                timestamp_creazione TEXT NOT NULL,
+                ultimo_accesso TEXT NOT NULL,
+                utilizzi INTEGER NOT NULL DEFAULT 0
+            )""",
+            "ai_review_jobs": """(
+                id TEXT PRIMARY KEY NOT NULL,
+                testo TEXT NOT NULL,
+                richiedente TEXT,
+                riferimento TEXT,
+                stato TEXT NOT NULL DEFAULT 'in_coda',
+                parziale TEXT,
+                risultato TEXT,
+                errore TEXT,
+                da_cache INTEGER NOT NULL DEFAULT 0,
+                timestamp_creazione TEXT NOT NULL,
+                timestamp_inizio TEXT,
+                timestamp_fine TEXT,
+                proprietario TEXT,
+                heartbeat TEXT
+            )""",
+            "tag_occurrences": """(
+                tag TEXT NOT NULL,
+                loop TEXT NOT NULL,
+                tabella_origine TEXT NOT NULL,
+                id_origine TEXT NOT NULL,
+                data_riferimento TEXT,
+                occorrenze INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (tabella_origine, id_origine, tag)
+            )""",
+            # Indice delle schede dell'archivio storico (popolato da scripts/index_archive.py)
+            "maintenance_archive": """(
+                filename TEXT NOT NULL,
+                full_path TEXT NOT NULL,
+                year TEXT,
+                month TEXT,
+                last_modified TEXT,
+                tag TEXT,
+                size INTEGER,
+                deleted_at TEXT
+            )""",
+            # Log applicativi importati dai file logs/app*.json (scripts/ingest_logs.py)
+            "app_logs": """(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                level TEXT,
+                logger TEXT,
+                func TEXT,
+                trace_id TEXT,
+                duration_sec REAL,
+                message TEXT,
+                extra TEXT
+            )""",
+            # Posizione di lettura del file di log (inode e byte già importati)
+            "app_logs_ingest": """(
+                file TEXT PRIMARY KEY NOT NULL,
+                inode INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                aggiornato TEXT
+            )""",
             "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot": """(
                 pdl TEXT NOT NULL,
                 data_intervento TEXT NOT NULL,
@@ -246,9 +337,94 @@ def crea_tabelle_se_non_esistono():
             )
             if cursor.fetchone() is None:
                 logger.info(f"Tabella '{nome_tabella}' non trovata. Creazione in corso...")
-                cursor.execute(f"CREATE TABLE {nome_tabella} {schema}")
+                # Nome tra virgolette: la tabella di SyncroJob contiene un punto
+                cursor.execute(f'CREATE TABLE "{nome_tabella}" {schema}')
                 logger.info(f"Tabella '{nome_tabella}' creata.")
 
+        # Migrazioni: colonne aggiunte dopo la creazione dei database esistenti
+        colonne_aggiunte = {
+            # Disattivazione utenti
+            ("contatti", "Stato"): "TEXT DEFAULT 'Attivo'",
+            # Tag normalizzato estratto dal nome della scheda (ricerca in archivio)
+            ("maintenance_archive", "tag"): "TEXT",
+            # Indicizzazione incrementale dell'archivio (rilevamento modifiche e file rimossi)
+            ("maintenance_archive", "size"): "INTEGER",
+            ("maintenance_archive", "deleted_at"): "TEXT",
+            # Lavori IA condivisi tra processi: dispatcher proprietario e ultima conferma
+            ("ai_review_jobs", "proprietario"): "TEXT",
+            ("ai_review_jobs", "heartbeat"): "TEXT",
+        }
+        for (nome_tabella, colonna), tipo in colonne_aggiunte.items():
+            colonne = {row[1] for row in cursor.execute(f"PRAGMA table_info({nome_tabella})")}
+            if colonna not in colonne:
+                logger.info(f"Colonna '{colonna}' mancante in '{nome_tabella}'. Aggiunta in corso...")
+                cursor.execute(f"ALTER TABLE {nome_tabella} ADD COLUMN {colonna} {tipo}")
+
+        # Tag delle schede indicizzate prima dell'introduzione della colonna
+        schede_senza_tag = cursor.execute(
+            "SELECT rowid, filename FROM maintenance_archive WHERE tag IS NULL"
+        ).fetchall()
+        if schede_senza_tag:
+            cursor.executemany(
+                "UPDATE maintenance_archive SET tag = ? WHERE rowid = ?",
+                [(estrai_tag_archivio(nome), rowid) for rowid, nome in schede_senza_tag],
+            )
+
+        # Un file per percorso: rimuove i duplicati delle vecchie indicizzazioni complete
+        if not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'idx_maintenance_archive_full_path'"
+        ).fetchone():
+            cursor.execute(
+                "DELETE FROM maintenance_archive WHERE rowid NOT IN "
+                "(SELECT MIN(rowid) FROM maintenance_archive GROUP BY full_path)"
+            )
+            cursor.execute(
+                "CREATE UNIQUE INDEX idx_maintenance_archive_full_path "
+                "ON maintenance_archive (full_path)"
+            )
+
+        indici = {
+            # Aggregazione dell'occupazione turni (GROUP BY ID_Turno, conteggio per ruolo)
+            "idx_prenotazioni_turno_ruolo": "prenotazioni (ID_Turno, RuoloOccupato)",
+            "idx_turni_tipo_data": "turni (Tipo, Data)",
+            # Contatore non lette e paginazione del centro notifiche
+            "idx_notifiche_destinatario_stato": "notifiche (Destinatario_Matricola, Stato)",
+            "idx_notifiche_destinatario_ts": "notifiche (Destinatario_Matricola, Timestamp)",
+            # Prelievo dei messaggi pronti da parte del worker email
+            "idx_email_outbox_stato": "email_outbox (stato, prossimo_tentativo)",
+            # Scadenza (TTL) ed espulsione LRU della cache delle risposte IA
+            "idx_ai_cache_creazione": "ai_cache (timestamp_creazione)",
+            "idx_ai_cache_accesso": "ai_cache (ultimo_accesso)",
+            # Prelievo dei lavori di revisione IA e deduplica della pre-revisione notturna
+            "idx_ai_review_jobs_stato": "ai_review_jobs (stato, timestamp_creazione)",
+            "idx_ai_review_jobs_riferimento": "ai_review_jobs (riferimento)",
+            # Limite di avvii al minuto condiviso tra i processi
+            "idx_ai_review_jobs_inizio": "ai_review_jobs (timestamp_inizio)",
+            # Storico interventi per TAG di strumentazione, dal più recente
+            "idx_tag_occurrences_tag_data": "tag_occurrences (tag, data_riferimento)",
+            # Corrispondenza esatta e per prefisso sul tag delle schede d'archivio
+            "idx_maintenance_archive_tag": "maintenance_archive (tag)",
+            # Filtri della consultazione dei log applicativi e conservazione per data
+            "idx_app_logs_timestamp": "app_logs (timestamp)",
+            "idx_app_logs_level_ts": "app_logs (level, timestamp)",
+            "idx_app_logs_logger_ts": "app_logs (logger, timestamp)",
+            "idx_app_logs_trace_id": "app_logs (trace_id)",
+        }
+        for nome_indice, definizione in indici.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nome_indice} ON {definizione}")
+
+        # Indici full-text (FTS5) a contenuto esterno, allineati da trigger
+        for tabella_origine, spec in FTS_INDEXES.items():
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (spec["fts"],)
+            )
+            if cursor.fetchone() is None:
+                logger.info(f"Indice full-text '{spec['fts']}' non trovato. Creazione in corso...")
+                for istruzione in fts_schema_statements(tabella_origine):
+                    cursor.execute(istruzione)
+                # Indicizza i documenti già presenti
+                rebuild_fts_index(conn, tabella_origine)
+
         conn.commit()
         logger.info("Verifica e creazione tabelle completata.")
 
@@ -1,99 +1,282 @@
 """
 Script per l'indicizzazione dello storico schede di manutenzione.
-Scansiona ricorsivamente la cartella dell'archivio e salva i metadati nel database.
+Scansiona la cartella dell'archivio in parallelo (una attività per cartella di primo livello,
+tipicamente l'anno) e aggiorna i metadati nel database in modo incrementale:
+- i file nuovi o modificati (data o dimensione diverse) vengono inseriti o aggiornati;
+- i file invariati non vengono riscritti;
+- i file non più presenti vengono marcati come rimossi (deleted_at) e esclusi dalle ricerche.
+Richiede lo schema aggiornato da scripts/crea_database.py.
 """
 
+import argparse
 import os
+import re
 import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
+# Aggiunge la cartella src al path per importare i moduli interni
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+from core.logging import get_logger
+from modules.archive_manager import estrai_tag_archivio
+
+logger = get_logger(__name__)
+
 # Configurazione percorsi
 ARCHIVE_ROOT = r"D:\PC ALLEGRETTI COEMI\STORICO SCHEDE\Archivio Schede Elaborate"
 DB_PATH = Path(__file__).parent.parent / "report-attivita.db"
 
+ARCHIVE_EXTENSIONS = (".xls", ".xlsx", ".xlsm")
+# La scansione è limitata dalla latenza della share di rete, non dalla CPU
+DEFAULT_WORKERS = 8
+# Ogni quanti file scansionati viene riportato l'avanzamento
+PROGRESS_EVERY = 5000
+
+# Struttura attesa: ...\2024\01 - GENNAIO\file.xls
+_YEAR_RE = re.compile(r"\d{4}")
+_MONTH_NAME_RE = re.compile(
+    "GENNAIO|FEBBRAIO|MARZO|APRILE|MAGGIO|GIUGNO|LUGLIO|AGOSTO|SETTEMBRE|OTTOBRE|NOVEMBRE|DICEMBRE",
+    re.IGNORECASE,
+)
+
+_UPSERT_SQL = """
+    INSERT INTO maintenance_archive
+        (filename, full_path, year, month, last_modified, size, tag, deleted_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+    ON CONFLICT (full_path) DO UPDATE SET
+        filename = excluded.filename,
+        year = excluded.year,
+        month = excluded.month,
+        last_modified = excluded.last_modified,
+        size = excluded.size,
+        tag = excluded.tag,
+        deleted_at = NULL
+"""
+
+
+@dataclass(frozen=True)
+class ArchiveFile:
+    """Metadati di una scheda trovata durante la scansione."""
+
+    filename: str
+    full_path: str
+    year: str
+    month: str
+    last_modified: str
+    size: int
+
+
+class _Progress:
+    """Contatore condiviso tra i thread di scansione, con report periodico del throughput."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.count = 0
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            previous = self.count
+            self.count += n
+            if self.count // PROGRESS_EVERY > previous // PROGRESS_EVERY:
+                logger.info(f"Scansionati {self.count} file ({self.rate():.0f} file/s)...")
+
+    def rate(self) -> float:
+        return self.count / max(time.perf_counter() - self._start, 1e-9)
+
+
+def _parse_dir(name: str, year: str, month: str) -> tuple[str, str]:
+    """Anno e mese aggiornati entrando nella cartella `name` (vuoti se non ancora trovati)."""
+    if _YEAR_RE.fullmatch(name):
+        year = name
+    if " - " in name and _MONTH_NAME_RE.search(name):
+        month = name
+    return year, month
+
+
+def _is_archive_file(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_EXTENSIONS) and not name.startswith("~$")
+
 
-def index_archive():
-    """Scansiona la cartella e popola il database con i metadati dei file."""
-    archive_path = Path(ARCHIVE_ROOT)
-    if not archive_path.exists():
-        print(f"ERRORE: Il percorso {ARCHIVE_ROOT} non esiste.")
-        return
-
-    print(f"Inizio scansione di: {ARCHIVE_ROOT}...")
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Pulizia tabella esistente per re-indicizzazione completa (opzionale, ma sicuro per la prima volta)
-    # cursor.execute("DELETE FROM maintenance_archive")
-
-    count = 0
-    batch_size = 1000
-    entries = []
-
-    for root, _, files in os.walk(ARCHIVE_ROOT):
-        for file in files:
-            if file.endswith((".xls", ".xlsx", ".xlsm")) and not file.startswith("~$"):
-                full_path = os.path.join(root, file)
-                try:
-                    stats = Path(full_path).stat()
-                    last_mod = datetime.fromtimestamp(stats.st_mtime).isoformat()
-
-                    # Tentativo di estrarre anno e mese dal percorso
-                    # Struttura attesa: ...\2024\01 - GENNAIO\file.xls
-                    parts = Path(full_path).parts
-                    year = ""
-                    month = ""
-
-                    # Cerca una parte che somigli a un anno (4 cifre)
-                    for part in parts:
-                        if part.isdigit() and len(part) == 4:
-                            year = part
-                        if " - " in part and any(
-                            m in part.upper()
-                            for m in (
-                                "GENNAIO",
-                                "FEBBRAIO",
-                                "MARZO",
-                                "APRILE",
-                                "MAGGIO",
-                                "GIUGNO",
-                                "LUGLIO",
-                                "AGOSTO",
-                                "SETTEMBRE",
-                                "OTTOBRE",
-                                "NOVEMBRE",
-                                "DICEMBRE",
-                            )
-                        ):
-                            month = part
-
-                    entries.append((file, full_path, year, month, last_mod))
-                    count += 1
-
-                    if len(entries) >= batch_size:
-                        cursor.executemany(
-                            "INSERT INTO maintenance_archive (filename, full_path, year, month, last_modified) VALUES (?, ?, ?, ?, ?)",
-                            entries,
-                        )
-                        conn.commit()
-                        entries = []
-                        print(f"Indicizzati {count} file...")
-                except Exception as e:
-                    print(f"Errore con il file {full_path}: {e}")
-
-    # Inserisce gli ultimi rimasti
-    if entries:
-        cursor.executemany(
-            "INSERT INTO maintenance_archive (filename, full_path, year, month, last_modified) VALUES (?, ?, ?, ?, ?)",
-            entries,
+def _archive_file(entry: os.DirEntry, year: str, month: str) -> ArchiveFile:
+    stats = entry.stat()
+    return ArchiveFile(
+        entry.name,
+        entry.path,
+        year,
+        month,
+        datetime.fromtimestamp(stats.st_mtime).isoformat(),
+        stats.st_size,
+    )
+
+
+def _scan_tree(
+    top: str, year: str, month: str, progress: _Progress
+) -> tuple[list[ArchiveFile], list[str]]:
+    """
+    Visita iterativa di una cartella con os.scandir: i metadati di stat arrivano (su Windows)
+    già con l'elenco della cartella, senza una chiamata aggiuntiva per file.
+    Restituisce le schede trovate e le cartelle non leggibili.
+    """
+    files: list[ArchiveFile] = []
+    failed: list[str] = []
+    stack = [(top, year, month)]
+    while stack:
+        path, year, month = stack.pop()
+        found = 0
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, *_parse_dir(entry.name, year, month)))
+                    elif _is_archive_file(entry.name):
+                        files.append(_archive_file(entry, year, month))
+                        found += 1
+        except OSError as e:
+            logger.warning(f"Cartella non leggibile {path}: {e}")
+            failed.append(path)
+        progress.add(found)
+    return files, failed
+
+
+def scan_archive(
+    root: str, workers: int = DEFAULT_WORKERS
+) -> tuple[list[ArchiveFile], list[str], float]:
+    """
+    Scansiona l'archivio con una attività per cartella di primo livello.
+    Restituisce schede trovate, cartelle non leggibili e throughput (file/s).
+    """
+    year, month = "", ""
+    for part in Path(root).parts:
+        year, month = _parse_dir(part, year, month)
+
+    progress = _Progress()
+    files: list[ArchiveFile] = []
+    failed: list[str] = []
+    subdirs = []
+    # I file direttamente nella radice sono pochi: li raccoglie il thread principale
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append((entry.path, *_parse_dir(entry.name, year, month)))
+            elif _is_archive_file(entry.name):
+                files.append(_archive_file(entry, year, month))
+    progress.add(len(files))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(_scan_tree, path, y, m, progress) for path, y, m in subdirs]
+        for future in futures:
+            sub_files, sub_failed = future.result()
+            files.extend(sub_files)
+            failed.extend(sub_failed)
+    return files, failed, progress.rate()
+
+
+def sync_archive(
+    conn: sqlite3.Connection, root: str, files: list[ArchiveFile], failed_dirs: list[str]
+) -> dict[str, int]:
+    """
+    Allinea 'maintenance_archive' ai file scansionati, in un'unica transazione.
+    I file sotto cartelle non leggibili non vengono marcati come rimossi.
+    Restituisce i conteggi per nuovi, aggiornati, invariati e rimossi.
+    """
+    prefix = os.path.join(root, "")
+    failed_prefixes = tuple(os.path.join(d, "") for d in failed_dirs)
+    existing = {
+        full_path: (last_modified, size, deleted_at)
+        for full_path, last_modified, size, deleted_at in conn.execute(
+            "SELECT full_path, last_modified, size, deleted_at FROM maintenance_archive"
         )
-        conn.commit()
+    }
+
+    stats = {"nuovi": 0, "aggiornati": 0, "invariati": 0, "rimossi": 0}
+    upserts = []
+    for f in files:
+        previous = existing.get(f.full_path)
+        if previous == (f.last_modified, f.size, None):
+            stats["invariati"] += 1
+            continue
+        stats["nuovi" if previous is None else "aggiornati"] += 1
+        upserts.append(
+            (
+                f.filename,
+                f.full_path,
+                f.year,
+                f.month,
+                f.last_modified,
+                f.size,
+                estrai_tag_archivio(f.filename),
+            )
+        )
+
+    seen = {f.full_path for f in files}
+    removed = [
+        (path,)
+        for path, (_, _, deleted_at) in existing.items()
+        if deleted_at is None
+        and path not in seen
+        and path.startswith(prefix)
+        and not path.startswith(failed_prefixes)
+    ]
+    stats["rimossi"] = len(removed)
+
+    with conn:
+        conn.executemany(_UPSERT_SQL, upserts)
+        conn.executemany(
+            "UPDATE maintenance_archive SET deleted_at = ? WHERE full_path = ?",
+            [(datetime.now().isoformat(), path) for (path,) in removed],
+        )
+    return stats
+
+
+def index_archive(
+    root: str = ARCHIVE_ROOT, db_path: Path = DB_PATH, workers: int = DEFAULT_WORKERS
+) -> dict[str, int] | None:
+    """Scansiona l'archivio e aggiorna l'indice. None se l'archivio o il database non sono pronti."""
+    if not Path(root).is_dir():
+        logger.error(f"Il percorso {root} non esiste.")
+        return None
+
+    logger.info(f"Inizio scansione di: {root} ({workers} thread)...")
+    start = time.perf_counter()
+    files, failed, rate = scan_archive(root, workers)
+    logger.info(
+        f"Scansione completata: {len(files)} file in {time.perf_counter() - start:.1f}s "
+        f"({rate:.0f} file/s)."
+    )
+
+    conn = sqlite3.connect(db_path)
+    try:
+        stats = sync_archive(conn, root, files, failed)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Schema dell'archivio non aggiornato, eseguire crea_database.py: {e}")
+        return None
+    finally:
+        conn.close()
 
-    conn.close()
-    print(f"Scansione completata. Totale file indicizzati: {count}")
+    logger.info(
+        f"Indicizzazione completata in {time.perf_counter() - start:.1f}s: "
+        f"{stats['nuovi']} nuovi, {stats['aggiornati']} aggiornati, "
+        f"{stats['invariati']} invariati, {stats['rimossi']} rimossi"
+        + (f", {len(failed)} cartelle non leggibili." if failed else ".")
+    )
+    return stats
 
 
 if __name__ == "__main__":
-    index_archive()
+    parser = argparse.ArgumentParser(description="Indicizza l'archivio storico delle schede.")
+    parser.add_argument("--root", default=ARCHIVE_ROOT, help="Cartella radice dell'archivio.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Numero di cartelle scansionate in parallelo.",
+    )
+    args = parser.parse_args()
+    if index_archive(args.root, workers=args.workers) is None:
+        sys.exit(1)
@@ -0,0 +1,26 @@
+"""
+Job di indicizzazione dei TAG di strumentazione.
+Ricostruisce 'tag_occurrences' analizzando tutti i report di intervento e le relazioni:
+serve a popolare l'indice sui database esistenti e a riallinearlo dopo modifiche manuali.
+I nuovi documenti vengono indicizzati automaticamente al salvataggio.
+Non fa parte dell'avvio dell'app: va eseguito a mano quando serve, ad esempio
+`docker compose run --rm app python scripts/indicizza_tag.py`.
+"""
+
+import sys
+from pathlib import Path
+
+# Aggiunge la cartella src al path per importare i moduli interni
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR / "src"))
+
+from core.logging import get_logger
+from modules.db_manager import reindex_all_tags
+
+logger = get_logger(__name__)
+
+
+if __name__ == "__main__":
+    logger.info("Avvio indicizzazione TAG di strumentazione...")
+    if reindex_all_tags() < 0:
+        sys.exit(1)
@@ -0,0 +1,226 @@
+"""
+Job di importazione dei log applicativi.
+Legge in coda i file JSON-lines dei servizi (logs/app.json dell'app e logs/app.<servizio>.json
+degli altri processi, con i rispettivi file ruotati .N non ancora letti) e inserisce le nuove
+righe nella tabella indicizzata 'app_logs', consultabile dalla vista amministrativa. La posizione di lettura (inode e byte) è salvata nella stessa transazione
+delle righe: un'interruzione non perde né duplica record. Le righe più vecchie del periodo
+di conservazione vengono eliminate.
+Richiede lo schema aggiornato da scripts/crea_database.py.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+# Aggiunge la cartella src al path per importare i moduli interni
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR / "src"))
+
+from core.database import DatabaseEngine
+from core.logging import LOG_DIR, get_logger
+
+logger = get_logger(__name__)
+
+LOG_RETENTION_DAYS = int(os.environ.get("LOG_RETENTION_DAYS", "30"))
+# Intervallo tra due letture in modalità continua (secondi)
+DEFAULT_INTERVAL_SEC = 30
+# Byte letti e importati per transazione
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Campi del record JSON salvati in colonne dedicate; gli altri finiscono in 'extra'
+_COLUMNS = ("timestamp", "level", "logger", "func", "trace_id", "duration_sec", "message")
+
+_INSERT_SQL = """
+    INSERT INTO app_logs
+        (timestamp, level, logger, func, trace_id, duration_sec, message, extra)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SAVE_STATE_SQL = """
+    INSERT INTO app_logs_ingest (file, inode, offset, aggiornato) VALUES (?, ?, ?, ?)
+    ON CONFLICT (file) DO UPDATE SET
+        inode = excluded.inode, offset = excluded.offset, aggiornato = excluded.aggiornato
+"""
+
+
+def parse_log_line(line: bytes | str) -> tuple[Any, ...] | None:
+    """Valori della riga di log per 'app_logs'; None se la riga non è un record JSON valido."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not data.get("timestamp"):
+        return None
+    duration = data.get("duration_sec")
+    extra = {k: v for k, v in data.items() if k not in _COLUMNS}
+    return (
+        str(data["timestamp"]),
+        data.get("level"),
+        data.get("logger"),
+        data.get("func"),
+        data.get("trace_id"),
+        float(duration) if isinstance(duration, int | float) else None,
+        str(data.get("message", "")),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def log_files(log_dir: Path = LOG_DIR) -> list[Path]:
+    """File di log correnti dei servizi (uno per LOG_SERVICE), esclusi i file ruotati."""
+    return sorted(p for p in (log_dir / "app.json", *log_dir.glob("app.*.json")) if p.is_file())
+
+
+def rotated_files(log_file: Path) -> list[Path]:
+    """File ruotati dal RotatingFileHandler (app.json.1 è il più recente), dal più vecchio."""
+    backups = [p for p in log_file.parent.glob(f"{log_file.name}.*") if p.suffix[1:].isdigit()]
+    return sorted(backups, key=lambda p: int(p.suffix[1:]), reverse=True)
+
+
+def _inode(path: Path) -> int | None:
+    try:
+        return path.stat().st_ino
+    except OSError:
+        return None
+
+
+def _files_to_read(
+    log_file: Path, state: tuple[int, int] | None
+) -> list[tuple[Path, int | None, int]]:
+    """
+    File da leggere, in ordine cronologico, con inode e posizione da cui riprendere.
+    Se il file corrente non è quello letto l'ultima volta c'è stata una rotazione: si completa
+    il file letto (ritrovato tra i ruotati per inode) e si leggono per intero i successivi.
+    """
+    current = _inode(log_file)
+    backups = [(p, _inode(p)) for p in rotated_files(log_file)]
+    if state is None:
+        sources = [(p, inode, 0) for p, inode in backups]
+        start = 0
+    elif current == state[0]:
+        sources = []
+        # Dimensione inferiore alla posizione salvata: il file è stato troncato
+        start = state[1] if log_file.stat().st_size >= state[1] else 0
+    else:
+        inodes = [inode for _, inode in backups]
+        if state[0] in inodes:
+            i = inodes.index(state[0])
+            sources = [(*backups[i], state[1])] + [(p, inode, 0) for p, inode in backups[i + 1 :]]
+        else:
+            # Il file letto è già uscito dalla rotazione: tutti i ruotati presenti sono nuovi
+            sources = [(p, inode, 0) for p, inode in backups]
+        start = 0
+    if current is not None:
+        sources.append((log_file, current, start))
+    return sources
+
+
+def _ingest_file(
+    conn: sqlite3.Connection, key: str, path: Path, inode: int | None, offset: int
+) -> int | None:
+    """
+    Importa le righe complete di `path` a partire da `offset`; restituisce le righe inserite.
+    None se nel frattempo il percorso è passato a un altro file (rotazione in corso).
+    """
+    inserted = 0
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_ino != inode:
+            return None
+        f.seek(offset)
+        pending = b""
+        while chunk := f.read(READ_CHUNK_BYTES):
+            data = pending + chunk
+            # Una riga non ancora terminata viene letta alla prossima esecuzione
+            end = data.rfind(b"\n") + 1
+            pending = data[end:]
+            rows = [row for line in data[:end].splitlines() if (row := parse_log_line(line))]
+            offset += end
+            with conn:
+                conn.executemany(_INSERT_SQL, rows)
+                conn.execute(_SAVE_STATE_SQL, (key, inode, offset, datetime.now().isoformat()))
+            inserted += len(rows)
+    return inserted
+
+
+def ingest_app_logs(conn: sqlite3.Connection, log_file: Path) -> int:
+    """
+    Importa le righe non ancora lette del file di log di un servizio (e dei suoi file ruotati);
+    restituisce il numero di righe inserite.
+    """
+    key = log_file.name
+    row = conn.execute(
+        "SELECT inode, offset FROM app_logs_ingest WHERE file = ?", (key,)
+    ).fetchone()
+    state = (row[0], row[1]) if row else None
+    inserted = 0
+    for path, inode, offset in _files_to_read(log_file, state):
+        try:
+            count = _ingest_file(conn, key, path, inode, offset)
+        except FileNotFoundError:
+            count = None
+        if count is None:
+            # Rotazione tra l'elenco dei file e la lettura: si riprende alla prossima esecuzione
+            break
+        inserted += count
+    return inserted
+
+
+def purge_app_logs(conn: sqlite3.Connection, giorni: int = LOG_RETENTION_DAYS) -> int:
+    """Elimina i log più vecchi di `giorni` giorni; restituisce le righe eliminate."""
+    limite = (datetime.now() - timedelta(days=giorni)).isoformat()
+    with conn:
+        return conn.execute("DELETE FROM app_logs WHERE timestamp < ?", (limite,)).rowcount
+
+
+def esegui_importazione(log_dir: Path = LOG_DIR, giorni: int = LOG_RETENTION_DAYS) -> int | None:
+    """Importazione e conservazione in un'unica esecuzione. None se lo schema non è aggiornato."""
+    conn = DatabaseEngine.get_connection()
+    try:
+        inserted = sum(ingest_app_logs(conn, log_file) for log_file in log_files(log_dir))
+        removed = purge_app_logs(conn, giorni)
+    except sqlite3.OperationalError as e:
+        logger.error(f"Schema dei log non aggiornato, eseguire crea_database.py: {e}")
+        return None
+    finally:
+        conn.close()
+    # A livello DEBUG: il job importa anche i propri log e ne genererebbe uno a ogni ciclo
+    if inserted or removed:
+        logger.debug(f"Log importati: {inserted} nuove righe, {removed} eliminate per scadenza.")
+    return inserted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa i log applicativi nel database.")
+    parser.add_argument(
+        "--continuo",
+        action="store_true",
+        help="Resta in esecuzione e importa le nuove righe a intervalli regolari.",
+    )
+    parser.add_argument(
+        "--intervallo",
+        type=int,
+        default=DEFAULT_INTERVAL_SEC,
+        help="Secondi tra due importazioni in modalità continua.",
+    )
+    parser.add_argument(
+        "--giorni",
+        type=int,
+        default=LOG_RETENTION_DAYS,
+        help="Giorni di conservazione dei log importati.",
+    )
+    args = parser.parse_args()
+
+    if not args.continuo:
+        sys.exit(0 if esegui_importazione(giorni=args.giorni) is not None else 1)
+
+    while True:
+        try:
+            esegui_importazione(giorni=args.giorni)
+        except Exception:
+            logger.exception("Errore durante l'importazione dei log applicativi")
+        time.sleep(args.intervallo)
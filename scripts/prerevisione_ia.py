@@ -0,0 +1,61 @@
+"""
+Job notturno di pre-revisione IA.
+Accoda tutte le relazioni in attesa di validazione ed esegue le revisioni rispettando
+i limiti di concorrenza e di richieste al minuto: i risultati restano nella coda dei lavori
+e nella cache IA, così il validatore li ritrova senza attese.
+"""
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+# Aggiunge la cartella src al path per importare i moduli interni
+BASE_DIR = Path(__file__).parent.parent
+sys.path.append(str(BASE_DIR / "src"))
+
+from core.logging import get_logger
+from modules.ai_review_queue import AIReviewQueue, accoda_prerevisione_relazioni
+
+logger = get_logger(__name__)
+
+
+def esegui_prerevisione() -> int:
+    """Accoda le relazioni in attesa ed esegue tutti i lavori in coda."""
+    logger.info("Avvio pre-revisione IA delle relazioni in attesa di validazione...")
+    accoda_prerevisione_relazioni()
+    elaborati = AIReviewQueue().drain()
+    logger.info(f"Pre-revisione IA completata: {elaborati} lavori elaborati.")
+    return elaborati
+
+
+def secondi_alla_prossima_esecuzione(ora: int, now: datetime.datetime | None = None) -> float:
+    """Secondi mancanti alla prossima occorrenza dell'ora indicata."""
+    now = now or datetime.datetime.now()
+    prossima = now.replace(hour=ora, minute=0, second=0, microsecond=0)
+    if prossima <= now:
+        prossima += datetime.timedelta(days=1)
+    return (prossima - now).total_seconds()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-revisione IA delle relazioni.")
+    parser.add_argument(
+        "--notturno",
+        action="store_true",
+        help="Resta in esecuzione e ripete la pre-revisione ogni notte all'ora indicata.",
+    )
+    parser.add_argument("--ora", type=int, default=2, help="Ora di esecuzione notturna (0-23).")
+    args = parser.parse_args()
+
+    if not args.notturno:
+        esegui_prerevisione()
+        sys.exit(0)
+
+    while True:
+        time.sleep(secondi_alla_prossima_esecuzione(args.ora))
+        try:
+            esegui_prerevisione()
+        except Exception:
+            logger.exception("Errore durante la pre-revisione IA notturna")
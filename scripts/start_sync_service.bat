@@ -7,6 +7,8 @@ set PYTHONUTF8=1
 :: Percorso assoluto allo script di sincronizzazione
 set SCRIPT_PATH=%~dp0\sync_data.py
 set LOG_FILE=%~dp0\..\logs\sync_service.log
+:: Log JSON in logs\app.sync.json: il file logs\app.json e' scritto e ruotato solo dall'app
+set LOG_SERVICE=sync
 
 echo ========================================================
 echo   HORIZON DATA SYNC SERVICE (H24)
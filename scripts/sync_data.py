@@ -7,6 +7,7 @@ import datetime
 import shutil
 import sqlite3
 import sys
+import time
 from pathlib import Path
 
 # Aggiunge la cartella src al path per importare i moduli interni
@@ -16,6 +17,7 @@ sys.path.append(str(BASE_DIR / "src"))
 import config
 from modules.importers.excel_giornaliera import estrai_tutte_le_attivita_giorno
 from core.logging import get_logger
+from modules.monitoring import record_job_run
 
 logger = get_logger(__name__)
 
@@ -26,9 +28,15 @@ LOCAL_SYNC_DIR = Path(__file__).parent.parent / "data_sync"
 DB_NAME = BASE_DIR / "report-attivita.db"
 CURRENT_YEAR = datetime.date.today().year
 
+# Esito dell'esecuzione corrente, pubblicato per l'exporter delle metriche
+_esito = {"righe_modificate": 0}
 
-def update_db_pdl_programmazione(attivita: list[dict], data_rif: datetime.date):
-    """Aggiorna la tabella pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot nel database."""
+
+def update_db_pdl_programmazione(attivita: list[dict], data_rif: datetime.date) -> int:
+    """
+    Aggiorna la tabella pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot nel database.
+    Restituisce il numero di PDL inseriti o rimossi.
+    """
     conn = None
     try:
         conn = sqlite3.connect(DB_NAME)
@@ -81,8 +89,10 @@ def update_db_pdl_programmazione(attivita: list[dict], data_rif: datetime.date):
                 
         conn.commit()
         logger.info(f"Tabella programmazione aggiornata: {count_new} nuovi PDL, {count_rimossi} PDL rimossi/corretti per il {data_str}.")
+        return count_new + count_rimossi
     except Exception as e:
         logger.error(f"Errore durante l'aggiornamento della tabella programmazione: {e}")
+        return 0
     finally:
         if conn:
             conn.close()
@@ -173,11 +183,22 @@ def sync():
         d = today - datetime.timedelta(days=i)
         attivita = estrai_tutte_le_attivita_giorno(d.day, d.month, d.year)
         if attivita:
-            update_db_pdl_programmazione(attivita, d)
+            _esito["righe_modificate"] += update_db_pdl_programmazione(attivita, d)
 
     logger.info("--- FINE SINCRONIZZAZIONE ---")
     return True
 
 
 if __name__ == "__main__":
-    sync()
+    inizio = time.perf_counter()
+    successo = False
+    try:
+        successo = sync()
+    except SystemExit as e:
+        # Codice 2: nessun file aggiornato sulla rete, esecuzione comunque riuscita
+        successo = e.code == 2
+        raise
+    finally:
+        record_job_run(
+            "sync_data", time.perf_counter() - inizio, _esito["righe_modificate"], successo
+        )
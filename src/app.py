@@ -17,6 +17,8 @@ from components.ui_components import (
     render_sidebar,
 )
 from constants import ICONS
+from core.logging import with_context
+from core.tracing import span, start_trace
 
 # Re-export per backward compatibility (usato dai test e da __main__)
 from login_handler import handle_login_and_navigation
@@ -86,7 +88,19 @@ def main_app(matricola_utente: str, ruolo: str) -> None:
     """
     Gestisce l'interfaccia utente principale dopo l'autenticazione.
     Include sidebar, notifiche, navigazione tra i tab e rendering dei moduli.
+    Ogni rerun è una traccia (core.tracing) e i log emessi durante il rerun ne riportano
+    il trace_id, l'utente e il tab.
     """
+    tab = st.session_state.get("main_tab", "Attività Assegnate")
+    with (
+        start_trace("main_app", user=matricola_utente, ruolo=ruolo, tab=tab) as trace,
+        with_context(trace_id=trace.trace_id, user=matricola_utente, tab=tab),
+    ):
+        _render_main_app(matricola_utente, ruolo)
+
+
+def _render_main_app(matricola_utente: str, ruolo: str) -> None:
+    """Rendering di un rerun dell'interfaccia principale, con uno span per sezione."""
     # Avvio sincronizzazione elastica (non bloccante)
     from modules.data_manager import trigger_smart_sync
 
@@ -114,7 +128,8 @@ def main_app(matricola_utente: str, ruolo: str) -> None:
     today = datetime.date.today()
     start_sync = today - datetime.timedelta(days=180)
     end_sync = today + datetime.timedelta(days=180)
-    sync_oncall_shifts(start_date=start_sync, end_date=end_sync)
+    with span("sync_turni_reperibilita"):
+        sync_oncall_shifts(start_date=start_sync, end_date=end_sync)
 
     if st.session_state.get("editing_turno_id"):
         render_edit_shift_form()
@@ -125,12 +140,14 @@ def main_app(matricola_utente: str, ruolo: str) -> None:
             data_rif = task_info.get("data_attivita", datetime.date.today())
             render_debriefing_ui(knowledge_core, matricola_utente, data_rif)
     else:
-        render_sidebar(matricola_utente, nome_utente_autenticato, ruolo)
+        with span("sidebar"):
+            render_sidebar(matricola_utente, nome_utente_autenticato, ruolo)
 
         # Controllo connettività dati
         from config import check_data_connectivity
 
-        status = check_data_connectivity()
+        with span("verifica_connettivita"):
+            status = check_data_connectivity()
         if not all(status.values()):
             with st.sidebar:
                 st.error(f"{ICONS['WARNING']} Errore Connessione Dati")
@@ -151,80 +168,85 @@ def main_app(matricola_utente: str, ruolo: str) -> None:
         selected_tab = st.session_state.get("main_tab", "Attività Assegnate")
         df_contatti = get_all_users()
 
-        if ruolo == "Amministratore":
-            if selected_tab == "Caposquadra":
-                render_caposquadra_view(matricola_utente)
-                st.stop()
-            elif selected_tab == "Sistema":
-                render_sistema_view()
-                st.stop()
-
-        if selected_tab == "Attività Assegnate":
-            if ruolo in ("Tecnico", "Aiutante", "Amministratore"):
-                sub_labels = [
-                    "Attività di Oggi",
-                    "Recupero Attività",
-                    "Attività Validate",
-                    "Compila Relazione",
-                ]
-            else:
-                sub_labels = [
-                    "Attività di Oggi",
-                    "Recupero Attività",
-                    "Attività Validate",
-                ]
-            sub_tabs = st.tabs(sub_labels)
-
-            with sub_tabs[0]:
-                st.subheader(f"Attività del {today.strftime('%d/%m/%Y')}")
-                lista = trova_attivita(
-                    matricola_utente, today.day, today.month, today.year, df_contatti
-                )
-                for t in lista:
-                    t["data_attivita"] = today
-                disegna_sezione_attivita(lista, "today", ruolo)
-
-            with sub_tabs[1]:
-                st.subheader("Recupero Attività")
-                attivita = recupera_attivita_non_rendicontate(matricola_utente, df_contatti)
-                disegna_sezione_attivita(attivita, "yesterday", ruolo)
-
-            with sub_tabs[2]:
-                st.subheader("Attività Validate")
-                reports_df = get_validated_intervention_reports(matricola_tecnico=matricola_utente)
-                if reports_df.empty:
-                    st.info("Nessun report validato.")
+        with span(f"pagina: {selected_tab}"):
+            if ruolo == "Amministratore":
+                if selected_tab == "Caposquadra":
+                    render_caposquadra_view(matricola_utente)
+                    st.stop()
+                elif selected_tab == "Sistema":
+                    render_sistema_view()
+                    st.stop()
+
+            if selected_tab == "Attività Assegnate":
+                if ruolo in ("Tecnico", "Aiutante", "Amministratore"):
+                    sub_labels = [
+                        "Attività di Oggi",
+                        "Recupero Attività",
+                        "Attività Validate",
+                        "Compila Relazione",
+                    ]
                 else:
-                    for _, r in reports_df.iterrows():
-                        d_rif = pd.to_datetime(r["data_riferimento_attivita"]).strftime("%d/%m/%Y")
-                        with st.expander(f"PdL `{r['pdl']}` - Intervento del {d_rif}"):
-                            st.markdown(f"**Descrizione:** {r['descrizione_attivita']}")
-                            st.info(f"**Report:**\n\n{r['testo_report']}")
-
-            if ruolo in ("Tecnico", "Aiutante", "Amministratore") and len(sub_tabs) > 3:
-                with sub_tabs[3]:
-                    from components.form_handlers import (
-                        render_relazione_reperibilita_ui,
+                    sub_labels = [
+                        "Attività di Oggi",
+                        "Recupero Attività",
+                        "Attività Validate",
+                    ]
+                sub_tabs = st.tabs(sub_labels)
+
+                with sub_tabs[0]:
+                    st.subheader(f"Attività del {today.strftime('%d/%m/%Y')}")
+                    lista = trova_attivita(
+                        matricola_utente, today.day, today.month, today.year, df_contatti
                     )
-
-                    render_relazione_reperibilita_ui(matricola_utente, nome_utente_autenticato)
-
-        elif selected_tab == "Gestione Turni":
-            render_gestione_turni_tab(matricola_utente, ruolo)
-        elif selected_tab == "Programmazione PDL":
-            render_programmazione_pdl_page()
-        elif selected_tab == "Richieste":
-            render_richieste_tab(matricola_utente, ruolo, nome_utente_autenticato)
-        elif selected_tab == "Storico":
-            from pages.storico import render_storico_tab
-
-            render_storico_tab()
-        elif selected_tab == "Impostazioni":
-            from pages.impostazioni import render_impostazioni_page
-
-            render_impostazioni_page(matricola_utente)
-        elif selected_tab == "Guida":
-            render_guida_tab(ruolo)
+                    for t in lista:
+                        t["data_attivita"] = today
+                    disegna_sezione_attivita(lista, "today", ruolo)
+
+                with sub_tabs[1]:
+                    st.subheader("Recupero Attività")
+                    attivita = recupera_attivita_non_rendicontate(matricola_utente, df_contatti)
+                    disegna_sezione_attivita(attivita, "yesterday", ruolo)
+
+                with sub_tabs[2]:
+                    st.subheader("Attività Validate")
+                    reports_df = get_validated_intervention_reports(
+                        matricola_tecnico=matricola_utente
+                    )
+                    if reports_df.empty:
+                        st.info("Nessun report validato.")
+                    else:
+                        for _, r in reports_df.iterrows():
+                            d_rif = pd.to_datetime(r["data_riferimento_attivita"]).strftime(
+                                "%d/%m/%Y"
+                            )
+                            with st.expander(f"PdL `{r['pdl']}` - Intervento del {d_rif}"):
+                                st.markdown(f"**Descrizione:** {r['descrizione_attivita']}")
+                                st.info(f"**Report:**\n\n{r['testo_report']}")
+
+                if ruolo in ("Tecnico", "Aiutante", "Amministratore") and len(sub_tabs) > 3:
+                    with sub_tabs[3]:
+                        from components.form_handlers import (
+                            render_relazione_reperibilita_ui,
+                        )
+
+                        render_relazione_reperibilita_ui(matricola_utente, nome_utente_autenticato)
+
+            elif selected_tab == "Gestione Turni":
+                render_gestione_turni_tab(matricola_utente, ruolo)
+            elif selected_tab == "Programmazione PDL":
+                render_programmazione_pdl_page()
+            elif selected_tab == "Richieste":
+                render_richieste_tab(matricola_utente, ruolo, nome_utente_autenticato)
+            elif selected_tab == "Storico":
+                from pages.storico import render_storico_tab
+
+                render_storico_tab()
+            elif selected_tab == "Impostazioni":
+                from pages.impostazioni import render_impostazioni_page
+
+                render_impostazioni_page(matricola_utente)
+            elif selected_tab == "Guida":
+                render_guida_tab(ruolo)
 
         st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -240,4 +262,13 @@ def main_app(matricola_utente: str, ruolo: str) -> None:
 
 
 if __name__ == "__main__":
+    # Worker unico di consegna email (uno per processo): riprende anche la outbox
+    # rimasta in coda dopo un riavvio. Avviato qui e non in main_app, così i test
+    # che renderizzano l'app non avviano thread reali.
+    from modules.email_sender import avvia_worker_email
+    from modules.monitoring import avvia_exporter_metriche
+
+    avvia_worker_email()
+    # Endpoint /metrics in formato Prometheus su porta interna (METRICS_PORT)
+    avvia_exporter_metriche()
     handle_login_and_navigation()
@@ -8,15 +8,18 @@ from typing import Any
 import streamlit as st
 
 from constants import ICONS
+from core.ids import genera_id
 from learning_module import get_report_knowledge_base_count
-from modules.ai_engine import revisiona_con_ia
+from modules.ai_review_queue import invia_revisione_ia, stato_revisione_ia
 from modules.db_manager import (
     get_all_users,
     salva_relazione,
 )
-from modules.email_sender import invia_email_con_outlook_async
+from modules.email_sender import accoda_email
 from modules.instrumentation_logic import get_technical_suggestions
 
+AI_JOB_POLL_INTERVAL_SEC = 1.0
+
 
 def render_relazione_reperibilita_ui(matricola_utente: str, nome_utente_autenticato: str) -> None:
     """Renderizza l'interfaccia per la compilazione della relazione di reperibilità settimanale."""
@@ -53,26 +56,49 @@ def render_relazione_reperibilita_ui(matricola_utente: str, nome_utente_autentic
         do_save = b3.form_submit_button("Invia", type="primary", icon=ICONS["CHECK"])
 
     if do_ai:
-        _handle_ai_correction(text)
+        _handle_ai_correction(text, matricola_utente)
     if do_sugg:
         _handle_suggestions(text)
     if do_save:
         _handle_submission(dt, text, nome_utente_autenticato, partner, t_start, t_end, pdl)
 
+    if st.session_state.get("ai_job_id"):
+        _render_ai_job_progress()
+    _render_ai_results_ui()
+
 
-def _handle_ai_correction(text: str) -> None:
-    """Richiede la correzione semantica del testo all'IA Gemini."""
+def _handle_ai_correction(text: str, richiedente: str | None = None) -> None:
+    """Accoda la correzione semantica del testo; il risultato arriva tramite polling."""
     if not text.strip():
         st.warning("Scrivi il testo.")
         return
 
-    with st.spinner("L'IA sta analizzando..."):
-        res = revisiona_con_ia(text)
-        if res.get("success"):
-            st.session_state.relazione_revisionata = res["text"]
-            st.success("Fatto!")
-        else:
-            st.error(res.get("error", "Errore IA."))
+    job_id = invia_revisione_ia(text, richiedente)
+    if job_id is None:
+        st.error("Impossibile avviare la revisione IA.")
+        return
+    st.session_state.ai_job_id = job_id
+    st.session_state.relazione_revisionata = ""
+
+
+@st.fragment(run_every=AI_JOB_POLL_INTERVAL_SEC)
+def _render_ai_job_progress() -> None:
+    """Interroga il lavoro IA in corso mostrando il testo parziale; a fine lavoro ricarica."""
+    job = stato_revisione_ia(st.session_state.ai_job_id)
+    if job is not None and job["stato"] in ("in_coda", "in_corso"):
+        st.caption(f"{ICONS['IA']} L'IA sta analizzando...")
+        if job["parziale"]:
+            st.info(job["parziale"])
+        return
+
+    st.session_state.ai_job_id = None
+    if job is None:
+        st.error("Revisione IA non trovata.")
+    elif job["stato"] == "completato":
+        st.session_state.relazione_revisionata = job["risultato"]
+    else:
+        st.session_state.relazione_ai_errore = job["errore"] or "Errore IA."
+    st.rerun()
 
 
 def _handle_suggestions(text: str) -> None:
@@ -114,7 +140,7 @@ def _handle_submission(
     except Exception:
         ore_effettive = 2.0  # Fallback standard reperibilità
 
-    pid = f"REL_{int(datetime.datetime.now().timestamp())}"
+    pid = genera_id("REL")
     data = {
         "id_relazione": pid,
         "pdl": pdl.strip().upper(),
@@ -140,16 +166,19 @@ def _handle_submission(
 
 
 def _send_relazione_email(dt: Any, user: str, partner: str, text: str, pdl: str) -> None:
-    """Invia la notifica email automatica della nuova relazione via Outlook."""
+    """Accoda la notifica email automatica della nuova relazione."""
     p_txt = f" con {partner}" if partner != "Nessuno" else ""
     d_str = dt.strftime("%d/%m/%Y")
     subj = f"Relazione Reperibilità {d_str} - PdL {pdl} - {user}"
     body = f"<html><body><h3>Relazione di Reperibilità</h3><p><b>Data:</b> {d_str}</p><p><b>PdL:</b> {pdl}</p><p><b>Tecnico:</b> {user}{p_txt}</p><hr><p>{text.replace(chr(10), '<br>')}</p></body></html>"
-    invia_email_con_outlook_async(subj, body)
+    accoda_email(subj, body)
 
 
 def _render_ai_results_ui() -> None:
     """Visualizza i risultati opzionali (IA o suggerimenti) sotto il form principale."""
+    if errore := st.session_state.pop("relazione_ai_errore", None):
+        st.error(errore)
+
     if st.session_state.get("relazione_revisionata"):
         st.subheader("Testo IA")
         st.info(st.session_state.relazione_revisionata)
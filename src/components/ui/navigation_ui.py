@@ -9,7 +9,6 @@ import streamlit as st
 from components.ui.notifications_ui import render_notification_center
 from constants import ICONS
 from modules.importers.excel_giornaliera import _carica_giornaliera_mese
-from modules.notifications import leggi_notifiche
 from modules.oncall_logic import get_next_on_call_week
 from modules.session_manager import delete_session
 
@@ -30,8 +29,7 @@ def render_sidebar(matricola_utente: str, nome_utente_autenticato: str, ruolo: s
             unsafe_allow_html=True,
         )
 
-        notifications = leggi_notifiche(matricola_utente)
-        render_notification_center(notifications, matricola_utente)
+        render_notification_center(matricola_utente)
 
         st.divider()
         _render_nav_buttons()
@@ -140,6 +140,27 @@ EMAIL_DESTINATARIO = secrets.get("email_destinatario", "gianky.allegretti@gmail.
 email_cc_string = secrets.get("email_cc", "")
 EMAIL_CC = [e.strip() for e in email_cc_string.split(",") if e.strip()]
 
+# --- CONSEGNA EMAIL (OUTBOX) ---
+# Backend: "smtp" (default, funziona anche in Docker) oppure "outlook" (solo Windows/COM)
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", secrets.get("email_backend", "smtp")).lower()
+SMTP_HOST = os.environ.get("SMTP_HOST", secrets.get("smtp_host", "localhost"))
+SMTP_PORT = int(os.environ.get("SMTP_PORT", secrets.get("smtp_port", 25)))
+SMTP_USER = os.environ.get("SMTP_USER", secrets.get("smtp_user", ""))
+SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD", secrets.get("smtp_password", ""))
+_smtp_starttls = os.environ.get("SMTP_STARTTLS", secrets.get("smtp_starttls", False))
+SMTP_STARTTLS = str(_smtp_starttls).lower() in ("1", "true", "yes")
+EMAIL_MITTENTE = os.environ.get("EMAIL_MITTENTE", secrets.get("email_mittente", SMTP_USER))
+
+# --- REVISIONE IA ---
+# Backend: "gemini" (default) oppure "fake" (risposte deterministiche, per sviluppo offline)
+AI_BACKEND = os.environ.get("AI_BACKEND", secrets.get("ai_backend", "gemini")).lower()
+AI_MODEL_NAME = secrets.get("ai_model_name", "models/gemini-flash-latest")
+AI_CACHE_TTL_SEC = int(secrets.get("ai_cache_ttl_sec", 7 * 24 * 3600))
+AI_CACHE_MAX_ENTRIES = int(secrets.get("ai_cache_max_entries", 2000))
+# Coda delle revisioni: richieste contemporanee e avvii al minuto verso il modello
+AI_MAX_CONCURRENCY = int(secrets.get("ai_max_concurrency", 2))
+AI_RATE_LIMIT_PER_MIN = int(secrets.get("ai_rate_limit_per_min", 15))
+
 # --- THREADING LOCKS ---
 EXCEL_LOCK = threading.Lock()
 OUTLOOK_LOCK = threading.Lock()
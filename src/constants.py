@@ -12,6 +12,9 @@ DB_NAME = "report-attivita.db"
 VALID_REPORT_TABLES = {"report_da_validare", "report_interventi"}
 VALID_HISTORY_TABLES = {"relazioni", "report_interventi"}
 
+# Programmazione PdL sincronizzata da SyncroJob (il nome contiene un punto: va quotato)
+PROGRAMMAZIONE_TABLE = "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot"
+
 # Colonne valide per la tabella contatti (Security)
 VALID_USER_COLUMNS = {
     "Matricola",
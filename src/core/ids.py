@@ -0,0 +1,58 @@
+"""
+Generatore centralizzato di identificativi ordinati nel tempo.
+Produce ULID monotoni (48 bit di millisecondi + 80 bit casuali, Crockford Base32):
+chiavi univoche anche se generate nello stesso istante e ordinabili per creazione,
+così le insert sugli indici B-tree avvengono sempre in coda.
+"""
+
+import os
+import threading
+import time
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_rand = 0
+
+
+def _encode(value: int, length: int) -> str:
+    """Codifica un intero in Crockford Base32 a lunghezza fissa."""
+    chars = []
+    for _ in range(length):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """
+    Restituisce un ULID di 26 caratteri, strettamente crescente nel processo.
+    Nello stesso millisecondo la parte casuale viene incrementata invece di
+    essere rigenerata, garantendo l'ordinamento anche sotto carico.
+    """
+    global _last_ms, _last_rand
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _last_rand = int.from_bytes(os.urandom(10), "big")
+        elif _last_rand < _RANDOM_MAX:
+            _last_rand += 1
+        else:
+            # Overflow della parte casuale: avanza artificialmente il timestamp.
+            _last_ms += 1
+            _last_rand = int.from_bytes(os.urandom(10), "big")
+        value = (_last_ms << _RANDOM_BITS) | _last_rand
+    return _encode(value, 26)
+
+
+def genera_id(prefisso: str = "") -> str:
+    """
+    Genera un identificativo con prefisso di dominio (es. 'P' -> 'P_01J...').
+    Senza prefisso restituisce il solo ULID.
+    """
+    ulid = new_ulid()
+    return f"{prefisso}_{ulid}" if prefisso else ulid
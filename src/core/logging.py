@@ -1,30 +1,61 @@
 """
 Sistema di logging strutturato enterprise per l'applicazione.
 Supporta output JSON, tracciamento performance e propagazione del contesto.
+
+Tutti i logger condividono un unico QueueHandler: il thread chiamante accoda il record e un
+QueueListener in background si occupa di serializzazione JSON, console e file a rotazione.
+Ogni servizio (LOG_SERVICE) scrive e ruota il proprio file: il RotatingFileHandler non è
+sicuro tra processi e due processi sullo stesso file si sovrascriverebbero i file ruotati.
 """
 
+import atexit
+import copy
 import functools
 import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 import threading
 import time
 import typing
 import uuid
+import warnings
 from collections.abc import Callable, Generator
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Any, ParamSpec, TypeVar
 
+from core import metrics, tracing
+
 # --- CONFIGURAZIONE ---
 LOG_DIR = Path("logs")
-LOG_FILE = LOG_DIR / "app.json"
+# Servizio che scrive i log: l'app usa logs/app.json, gli altri processi logs/app.<servizio>.json
+LOG_SERVICE = os.environ.get("LOG_SERVICE", "app").strip() or "app"
+LOG_FILE = LOG_DIR / ("app.json" if LOG_SERVICE == "app" else f"app.{LOG_SERVICE}.json")
 LOG_DIR.mkdir(exist_ok=True)
 
+# Rotazione del file di log: dimensione massima e numero di file precedenti conservati
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+# Chiamate misurate da measure_time oltre questa durata: registrate nel log a campione
+SLOW_CALL_THRESHOLD_SEC = float(os.environ.get("LOG_SLOW_CALL_SEC", "1.0"))
+SLOW_CALL_LOG_EVERY = 10
+# Livello predefinito e livelli per logger, es. LOG_LEVELS="modules.database=WARNING,core=DEBUG"
+FALLBACK_LOG_LEVEL = "INFO"
+
 # Contesto globale thread-local per trace_id e metadati aggiuntivi
 _context = threading.local()
 
+_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+_queue_handler: logging.Handler | None = None
+_listener: logging.handlers.QueueListener | None = None
+_setup_lock = threading.Lock()
+# Logger configurati da get_logger, per applicare le modifiche di livello a runtime
+_managed_loggers: set[str] = set()
+
 P = ParamSpec("P")
 R = TypeVar("R")
 
@@ -73,42 +104,151 @@ class JsonFormatter(logging.Formatter):
         if "password" in msg_str or "secret" in msg_str:
             log_data["message"] = "[REDACTED] Messaggio contenente dati potenzialmente sensibili"
 
+        # Contesto catturato dal thread chiamante (QueueHandler) o, in sua assenza, quello corrente
+        trace_id, extra = getattr(record, "log_context", None) or _capture_context()
+
         # Aggiungi trace_id se presente nel contesto
-        if hasattr(_context, "trace_id"):
-            log_data["trace_id"] = _context.trace_id
+        if trace_id:
+            log_data["trace_id"] = trace_id
 
         # Aggiungi metadati extra dal contesto (sanitizzati)
-        if hasattr(_context, "extra") and isinstance(_context.extra, dict):
-            log_data.update(self._sanitize(_context.extra))
+        if extra:
+            log_data.update(self._sanitize(extra))
 
         # Aggiungi attributi extra passati direttamente nella chiamata log (sanitizzati)
         if hasattr(record, "extra_data") and isinstance(record.extra_data, dict):
             log_data.update(self._sanitize(record.extra_data))
 
-        # Gestione eccezioni
+        # Gestione eccezioni (già convertite in testo se il record è passato dalla coda)
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
+        elif getattr(record, "exc_text", None):
+            log_data["exception"] = record.exc_text
 
         return json.dumps(log_data)
 
 
+def _capture_context() -> tuple[str | None, dict[str, Any] | None]:
+    """trace_id e metadati del contesto del thread corrente."""
+    extra = getattr(_context, "extra", None)
+    return getattr(_context, "trace_id", None), dict(extra) if isinstance(extra, dict) else None
+
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler che non serializza nel thread chiamante: fissa solo il messaggio, il contesto
+    thread-local e il testo dell'eventuale eccezione, lasciando il JSON al QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        record.log_context = _capture_context()
+        if record.exc_info:
+            record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _build_output_handlers() -> list[logging.Handler]:
+    """Handler eseguiti dal QueueListener: console e file JSON a rotazione per dimensione."""
+    console_handler = logging.StreamHandler(sys.stdout)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    for handler in (console_handler, file_handler):
+        handler.setFormatter(JsonFormatter())
+    return [console_handler, file_handler]
+
+
+def _get_queue_handler() -> logging.Handler:
+    """Avvia una sola volta il QueueListener e restituisce l'handler condiviso."""
+    global _queue_handler, _listener
+    with _setup_lock:
+        if _queue_handler is None:
+            _listener = logging.handlers.QueueListener(
+                _queue, *_build_output_handlers(), respect_handler_level=True
+            )
+            _listener.start()
+            atexit.register(shutdown_logging)
+            _queue_handler = ContextQueueHandler(_queue)
+        return _queue_handler
+
+
+def shutdown_logging() -> None:
+    """Svuota la coda e chiude i file di log (eseguito anche all'uscita del processo)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            _listener = None
+
+
+def _check_level(level: str, origine: str) -> str | None:
+    """
+    Nome del livello in maiuscolo se riconosciuto da logging; altrimenti None e un avviso,
+    così un valore errato nella configurazione non blocca l'import del modulo.
+    """
+    name = level.strip().upper()
+    if isinstance(logging.getLevelName(name), int):
+        return name
+    warnings.warn(f"Livello di log non valido in {origine}: {level!r}, ignorato", stacklevel=3)
+    return None
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    """
+    Converte "a.b=DEBUG,c=WARNING" in {"a.b": "DEBUG", "c": "WARNING"}; le voci con un
+    livello non valido vengono saltate.
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and (valid := _check_level(level, f"LOG_LEVELS ({name.strip()})")):
+            levels[name.strip()] = valid
+    return levels
+
+
+DEFAULT_LOG_LEVEL = (
+    _check_level(os.environ.get("LOG_LEVEL", FALLBACK_LOG_LEVEL), "LOG_LEVEL") or FALLBACK_LOG_LEVEL
+)
+_logger_levels: dict[str, str] = _parse_levels(os.environ.get("LOG_LEVELS", ""))
+
+
+def _level_for(name: str) -> str:
+    """Livello del logger: la voce di LOG_LEVELS più specifica tra i suoi antenati."""
+    parts = name.split(".")
+    for i in range(len(parts), 0, -1):
+        level = _logger_levels.get(".".join(parts[:i]))
+        if level:
+            return level
+    return DEFAULT_LOG_LEVEL
+
+
+def set_logger_levels(levels: dict[str, str]) -> None:
+    """Imposta a runtime i livelli per logger (e per i relativi figli), es. {"modules": "DEBUG"}."""
+    for name, level in levels.items():
+        if valid := _check_level(level, f"livello di {name}"):
+            _logger_levels[name] = valid
+    for name in _managed_loggers:
+        logging.getLogger(name).setLevel(_level_for(name))
+
+
 def get_logger(name: str) -> logging.Logger:
     """
     Restituisce un logger configurato per il logging strutturato.
     """
     logger = logging.getLogger(name)
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-
-        # Console Handler
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setFormatter(JsonFormatter())
-        logger.addHandler(console_handler)
-
-        # File Handler
-        file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
-        file_handler.setFormatter(JsonFormatter())
-        logger.addHandler(file_handler)
+        logger.setLevel(_level_for(name))
+        logger.addHandler(_get_queue_handler())
+        _managed_loggers.add(name)
 
     return logger
 
@@ -135,28 +275,29 @@ def with_context(trace_id: str | None = None, **kwargs: Any) -> Generator[str, N
 
 def measure_time(func: Callable[P, R]) -> Callable[P, R]:
     """
-    Decoratore per misurare il tempo di esecuzione di una funzione e loggarlo.
+    Decoratore per misurare il tempo di esecuzione di una funzione.
+    Ogni chiamata aggiorna le metriche in memoria (core.metrics) e, durante un rerun tracciato,
+    diventa uno span (core.tracing); nel log finiscono solo gli errori e, a campione, le
+    chiamate più lente di SLOW_CALL_THRESHOLD_SEC.
     """
     logger = get_logger(func.__module__)
+    name = f"{func.__module__}.{func.__qualname__}"
+    duration_hist = metrics.REGISTRY.histogram(metrics.FUNCTION_DURATION, function=name)
+    errors = metrics.REGISTRY.counter(metrics.FUNCTION_ERRORS, function=name)
+    slow_calls = metrics.REGISTRY.counter(metrics.FUNCTION_SLOW_CALLS, function=name)
+    in_progress = metrics.REGISTRY.gauge(metrics.FUNCTION_IN_PROGRESS, function=name)
 
     @functools.wraps(func)
     def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        in_progress.inc()
         start_time = time.perf_counter()
         try:
-            result = func(*args, **kwargs)
-            duration = time.perf_counter() - start_time
-            logger.info(
-                f"Esecuzione completata: {func.__name__}",
-                extra={
-                    "extra_data": {
-                        "duration_sec": round(duration, 4),
-                        "status": "success",
-                    }
-                },
-            )
-            return result
+            with tracing.span(name):
+                result = func(*args, **kwargs)
         except Exception as e:
             duration = time.perf_counter() - start_time
+            duration_hist.observe(duration)
+            errors.inc()
             logger.error(
                 f"Errore durante l'esecuzione di {func.__name__}: {e}",
                 extra={
@@ -168,5 +309,24 @@ def measure_time(func: Callable[P, R]) -> Callable[P, R]:
                 exc_info=True,
             )
             raise
+        finally:
+            in_progress.dec()
+        duration = time.perf_counter() - start_time
+        duration_hist.observe(duration)
+        if duration >= SLOW_CALL_THRESHOLD_SEC:
+            # Prima chiamata lenta e poi una ogni SLOW_CALL_LOG_EVERY
+            n_slow = int(slow_calls.inc())
+            if (n_slow - 1) % SLOW_CALL_LOG_EVERY == 0:
+                logger.warning(
+                    f"Esecuzione lenta: {func.__name__}",
+                    extra={
+                        "extra_data": {
+                            "duration_sec": round(duration, 4),
+                            "status": "slow",
+                            "slow_calls": n_slow,
+                        }
+                    },
+                )
+        return result
 
     return wrapper
@@ -0,0 +1,323 @@
+"""
+Registro in memoria delle metriche applicative (contatori, gauge, istogrammi a bucket fissi).
+Aggiornato da `core.logging.measure_time` a ogni chiamata delle funzioni decorate, al posto di
+una riga di log per invocazione. Le metriche valgono per il processo corrente (dall'avvio).
+"""
+
+import bisect
+import threading
+from collections.abc import Callable
+from typing import Any
+
+# Bucket (secondi) per le durate delle chiamate: da 1 ms a 10 s
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Counter:
+    """Valore monotono crescente (es. numero di chiamate)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> float:
+        """Incrementa il contatore e restituisce il nuovo valore."""
+        with self._lock:
+            self.value += amount
+            return self.value
+
+    def set_total(self, value: float) -> None:
+        """Allinea il contatore a un totale tenuto altrove (es. statistiche di lru_cache)."""
+        with self._lock:
+            self.value = value
+
+    def reset(self) -> None:
+        with self._lock:
+            self.value = 0.0
+
+
+class Gauge:
+    """Valore che può salire e scendere (es. chiamate in corso)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def reset(self) -> None:
+        # Un gauge riflette uno stato corrente (es. chiamate in corso): non viene azzerato
+        pass
+
+
+class Histogram:
+    """Distribuzione di osservazioni su bucket fissi, con somma, conteggio e massimo."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        # Un contatore per bucket più l'overflow (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+            self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Stima del quantile q (0-1) per interpolazione lineare nel bucket che lo contiene,
+        come histogram_quantile di Prometheus. Oltre l'ultimo bucket restituisce il massimo.
+        """
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = q * self.count
+            cumulative = 0
+            for i, n in enumerate(self.counts):
+                if n and cumulative + n >= rank:
+                    if i == len(self.buckets):
+                        return self.max
+                    lower = self.buckets[i - 1] if i else 0.0
+                    upper = min(self.buckets[i], self.max)
+                    return lower + (upper - lower) * max(rank - cumulative, 0) / n
+                cumulative += n
+            return self.max
+
+    def cumulative_buckets(self) -> list[tuple[float, int]]:
+        """Coppie (limite superiore, osservazioni <= limite), ultimo limite +Inf."""
+        with self._lock:
+            result = []
+            total = 0
+            for bound, n in zip((*self.buckets, float("inf")), self.counts, strict=True):
+                total += n
+                result.append((bound, total))
+            return result
+
+
+class MetricsRegistry:
+    """Metriche identificate da nome ed etichette, create al primo utilizzo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, Labels], Counter] = {}
+        self._gauges: dict[tuple[str, Labels], Gauge] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._collectors: list[Callable[[MetricsRegistry], None]] = []
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, str]) -> tuple[str, Labels]:
+        return name, tuple(sorted(labels.items()))
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        key = self._key(name, labels)
+        metric = self._counters.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._counters.setdefault(key, Counter())
+        return metric
+
+    def gauge(self, name: str, **labels: str) -> Gauge:
+        key = self._key(name, labels)
+        metric = self._gauges.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._gauges.setdefault(key, Gauge())
+        return metric
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = self._key(name, labels)
+        metric = self._histograms.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._histograms.setdefault(key, Histogram())
+        return metric
+
+    def register_collector(self, collector: Callable[["MetricsRegistry"], None]) -> None:
+        """
+        Registra una funzione che aggiorna metriche lette da fonti esterne (database, runtime)
+        solo quando vengono richieste, tramite `collect`.
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def collect(self) -> dict[str, list[dict[str, Any]]]:
+        """Esegue i collector registrati e restituisce lo snapshot aggiornato."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector(self)
+            except Exception:  # noqa: BLE001
+                # Una fonte non disponibile non blocca le altre metriche
+                self.counter(COLLECTOR_ERRORS, collector=collector.__name__).inc()
+        return self.snapshot()
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        """Copia dei valori correnti, serializzabile in JSON (tranne il limite +Inf)."""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = list(self._histograms.items())
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": m.value}
+                for (name, labels), m in counters
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": m.value}
+                for (name, labels), m in gauges
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": m.count,
+                    "sum": m.sum,
+                    "max": m.max,
+                    "p50": m.quantile(0.5),
+                    "p95": m.quantile(0.95),
+                    "buckets": m.cumulative_buckets(),
+                }
+                for (name, labels), m in histograms
+            ],
+        }
+
+    def reset(self) -> None:
+        """
+        Azzera contatori e istogrammi mantenendo gli oggetti, già referenziati dalle
+        funzioni decorate con measure_time.
+        """
+        with self._lock:
+            metrics = [*self._counters.values(), *self._gauges.values(), *self._histograms.values()]
+        for metric in metrics:
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+# Nomi delle metriche aggiornate da measure_time (etichetta "function": modulo.funzione);
+# il numero di chiamate è il conteggio dell'istogramma delle durate
+FUNCTION_ERRORS = "function_errors_total"
+FUNCTION_DURATION = "function_duration_seconds"
+FUNCTION_IN_PROGRESS = "function_calls_in_progress"
+FUNCTION_SLOW_CALLS = "function_slow_calls_total"
+COLLECTOR_ERRORS = "metrics_collector_errors_total"
+# Esiti delle cache applicative (etichette "cache" e "result": hit | miss)
+CACHE_REQUESTS = "cache_requests_total"
+CACHE_HIT_RATIO = "cache_hit_ratio"
+# Durata delle chiamate al modello IA (etichette "model" e "status": success | error)
+AI_CALL_DURATION = "ai_call_duration_seconds"
+
+
+def record_cache_access(cache: str, hit: bool, registry: MetricsRegistry | None = None) -> None:
+    """Conta un accesso a una cache applicativa."""
+    registry = registry or REGISTRY
+    registry.counter(CACHE_REQUESTS, cache=cache, result="hit" if hit else "miss").inc()
+
+
+def update_cache_hit_ratios(registry: MetricsRegistry) -> None:
+    """Collector: rapporto hit / accessi di ogni cache con almeno un accesso."""
+    totals: dict[str, dict[str, float]] = {}
+    for c in registry.snapshot()["counters"]:
+        if c["name"] == CACHE_REQUESTS:
+            totals.setdefault(c["labels"]["cache"], {})[c["labels"]["result"]] = c["value"]
+    for cache, results in totals.items():
+        accessi = results.get("hit", 0.0) + results.get("miss", 0.0)
+        if accessi:
+            registry.gauge(CACHE_HIT_RATIO, cache=cache).set(results.get("hit", 0.0) / accessi)
+
+
+def _histogram_since(current: dict[str, Any], previous: dict[str, Any] | None) -> Histogram:
+    """
+    Osservazioni di un istogramma dello snapshot `current` successive allo snapshot `previous`.
+    Il massimo dell'intervallo non è noto: si usa il limite del bucket più alto occupato.
+    """
+    bounds = tuple(bound for bound, _ in current["buckets"][:-1])
+    totals = [n for _, n in current["buckets"]]
+    if previous:
+        totals = [n - p for n, (_, p) in zip(totals, previous["buckets"], strict=True)]
+    hist = Histogram(bounds)
+    hist.counts = [n - (totals[i - 1] if i else 0) for i, n in enumerate(totals)]
+    hist.count = totals[-1]
+    hist.sum = current["sum"] - (previous["sum"] if previous else 0.0)
+    top = max((i for i, n in enumerate(hist.counts) if n), default=len(bounds))
+    hist.max = current["max"] if top == len(bounds) else min(bounds[top], current["max"])
+    return hist
+
+
+def function_timings(
+    registry: MetricsRegistry = REGISTRY, since: dict[str, list[dict[str, Any]]] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Riepilogo per funzione: chiamate, errori e latenze p50/p95/max in millisecondi.
+    Con `since` (uno snapshot precedente) conta solo le chiamate successive, senza azzerare
+    il registro condiviso, che resta monotono per l'endpoint /metrics.
+    """
+    snapshot = registry.snapshot()
+
+    def by_function(metrics: list[dict[str, Any]], name: str) -> dict[str, dict[str, Any]]:
+        return {m["labels"].get("function", ""): m for m in metrics if m["name"] == name}
+
+    errors = {f: c["value"] for f, c in by_function(snapshot["counters"], FUNCTION_ERRORS).items()}
+    base_hist = by_function(since["histograms"], FUNCTION_DURATION) if since else {}
+    base_errors = (
+        {f: c["value"] for f, c in by_function(since["counters"], FUNCTION_ERRORS).items()}
+        if since
+        else {}
+    )
+    rows = []
+    for function, h in by_function(snapshot["histograms"], FUNCTION_DURATION).items():
+        hist = _histogram_since(h, base_hist.get(function))
+        if since and not hist.count:
+            continue
+        rows.append(
+            {
+                "function": function,
+                "calls": hist.count,
+                "errors": int(errors.get(function, 0) - base_errors.get(function, 0)),
+                "p50_ms": round(hist.quantile(0.5) * 1000, 2),
+                "p95_ms": round(hist.quantile(0.95) * 1000, 2),
+                "max_ms": round(hist.max * 1000, 2),
+            }
+        )
+    return sorted(rows, key=lambda r: r["calls"], reverse=True)
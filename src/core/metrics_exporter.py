@@ -0,0 +1,118 @@
+"""
+Esportazione delle metriche in formato testo Prometheus su una porta HTTP separata.
+Il server (http.server della libreria standard) gira in un thread daemon del processo
+Streamlit e risponde solo a GET /metrics; nginx non lo espone all'esterno.
+"""
+
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.logging import get_logger
+from core.metrics import REGISTRY, MetricsRegistry
+
+logger = get_logger(__name__)
+
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))
+# Prefisso comune dei nomi delle metriche esportate
+METRICS_NAMESPACE = "report_attivita"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str], extra: dict[str, str] | None = None) -> str:
+    items = {**labels, **(extra or {})}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(registry: MetricsRegistry = REGISTRY) -> str:
+    """Metriche correnti (collector inclusi) nel formato di esposizione testuale Prometheus."""
+    snapshot = registry.collect()
+    lines: list[str] = []
+    for kind in ("counters", "gauges"):
+        metric_type = "counter" if kind == "counters" else "gauge"
+        declared: set[str] = set()
+        for m in sorted(snapshot[kind], key=lambda m: m["name"]):
+            name = f"{METRICS_NAMESPACE}_{m['name']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} {metric_type}")
+                declared.add(name)
+            lines.append(f"{name}{_labels(m['labels'])} {_number(m['value'])}")
+
+    declared = set()
+    for h in sorted(snapshot["histograms"], key=lambda h: h["name"]):
+        name = f"{METRICS_NAMESPACE}_{h['name']}"
+        if name not in declared:
+            lines.append(f"# TYPE {name} histogram")
+            declared.add(name)
+        for bound, count in h["buckets"]:
+            lines.append(f"{name}_bucket{_labels(h['labels'], {'le': _number(bound)})} {count}")
+        lines.append(f"{name}_sum{_labels(h['labels'])} {_number(h['sum'])}")
+        lines.append(f"{name}_count{_labels(h['labels'])} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # Nessuna riga di log per ogni scrape
+        pass
+
+
+def start_metrics_server(
+    port: int = METRICS_PORT,
+    host: str = "0.0.0.0",  # nosec B104 — porta interna al container
+) -> ThreadingHTTPServer | None:
+    """
+    Avvia (una sola volta per processo) il server /metrics in un thread daemon.
+    Restituisce None se la porta non è disponibile: l'applicazione continua senza exporter.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Exporter metriche non avviato sulla porta {port}: {e}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+        logger.info(f"Exporter metriche attivo su {host}:{server.server_port}/metrics")
+        _server = server
+        return server
+
+
+def stop_metrics_server() -> None:
+    """Arresta il server /metrics, se avviato."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
@@ -0,0 +1,159 @@
+"""
+Tracciamento dei rerun di Streamlit: ogni esecuzione di `main_app` apre uno span radice
+(con trace_id, utente e tab) e le chiamate misurate durante il rerun (funzioni decorate con
+`core.logging.measure_time`, come le query di DatabaseEngine e i caricamenti Excel) e le
+sezioni di pagina diventano span annidati. Gli alberi degli ultimi TRACE_HISTORY rerun
+restano in memoria nel processo corrente per la vista a cascata dello Stato Sistema.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+# Numero di rerun conservati (i più vecchi vengono scartati)
+TRACE_HISTORY = int(os.environ.get("TRACE_HISTORY", "50"))
+# Span figli registrati al massimo per ogni span (es. query in un ciclo); gli altri sono contati
+MAX_CHILDREN = 200
+
+# Span attivi del thread corrente (ogni rerun di Streamlit gira nel proprio thread)
+_active = threading.local()
+_traces: deque["Trace"] = deque(maxlen=TRACE_HISTORY)
+_traces_lock = threading.Lock()
+
+
+@dataclass
+class Span:
+    """Intervallo di tempo di un'operazione, con gli span delle operazioni annidate."""
+
+    name: str
+    start: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    children: list["Span"] = field(default_factory=list)
+    end: float | None = None
+    error: str | None = None
+    dropped_children: int = 0
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+@dataclass
+class Trace:
+    """Albero degli span di un rerun."""
+
+    trace_id: str
+    root: Span
+    started_at: str
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+
+def _stack() -> list[Span]:
+    stack = getattr(_active, "stack", None)
+    if stack is None:
+        stack = _active.stack = []
+    return stack
+
+
+@contextmanager
+def _open_span(span: Span) -> Generator[Span, None, None]:
+    stack = _stack()
+    stack.append(span)
+    try:
+        yield span
+    except Exception as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        # Anche st.stop() e st.rerun() (eccezioni di controllo) chiudono lo span
+        span.end = time.perf_counter()
+        stack.pop()
+
+
+@contextmanager
+def start_trace(
+    name: str, trace_id: str | None = None, **attributes: Any
+) -> Generator[Trace, None, None]:
+    """Apre lo span radice di un rerun e, alla chiusura, ne conserva l'albero."""
+    trace = Trace(
+        trace_id=trace_id or str(uuid.uuid4()),
+        root=Span(name, time.perf_counter(), attributes),
+        started_at=datetime.now().isoformat(timespec="seconds"),
+    )
+    # Una traccia per thread: uno span radice annidato sostituisce temporaneamente quello esterno
+    previous = getattr(_active, "stack", None)
+    _active.stack = []
+    try:
+        with _open_span(trace.root):
+            yield trace
+    finally:
+        _active.stack = previous
+        with _traces_lock:
+            _traces.append(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Generator[Span | None, None, None]:
+    """Span annidato nello span corrente; senza una traccia attiva non registra nulla."""
+    stack = getattr(_active, "stack", None)
+    if not stack:
+        yield None
+        return
+    parent = stack[-1]
+    if len(parent.children) >= MAX_CHILDREN:
+        parent.dropped_children += 1
+        yield None
+        return
+    child = Span(name, time.perf_counter(), attributes)
+    parent.children.append(child)
+    with _open_span(child):
+        yield child
+
+
+def recent_traces() -> list[Trace]:
+    """Tracce conservate, dalla più recente."""
+    with _traces_lock:
+        return list(reversed(_traces))
+
+
+def clear_traces() -> None:
+    with _traces_lock:
+        _traces.clear()
+
+
+def waterfall(trace: Trace) -> list[dict[str, Any]]:
+    """
+    Span della traccia in ordine di esecuzione (visita in profondità), con inizio e fine in
+    millisecondi dall'avvio del rerun: le righe della vista a cascata.
+    """
+    origin = trace.root.start
+    rows: list[dict[str, Any]] = []
+
+    def visit(s: Span, depth: int) -> None:
+        rows.append(
+            {
+                "span": s.name,
+                "depth": depth,
+                "start_ms": round((s.start - origin) * 1000, 2),
+                "end_ms": round((s.start + s.duration - origin) * 1000, 2),
+                "duration_ms": round(s.duration * 1000, 2),
+                "error": s.error,
+                "dropped_children": s.dropped_children,
+                "attributes": s.attributes,
+            }
+        )
+        for child in s.children:
+            visit(child, depth + 1)
+
+    visit(trace.root, 0)
+    return rows
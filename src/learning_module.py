@@ -4,21 +4,31 @@ Gestisce l'integrazione di nuove conoscenze e la creazione di indici vettoriali
 """
 
 import json
-import pickle  # nosec B403 — required for scikit-learn TF-IDF serialization
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import suppress
 from pathlib import Path
 from typing import Any
 
 import nltk
 from docx import Document
+from docx.opc.exceptions import PackageNotFoundError
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from core.logging import get_logger, measure_time
+from modules.knowledge_index import KNOWLEDGE_INDEX_PATH, write_knowledge_index
 
 logger = get_logger(__name__)
 
 UNREVIEWED_KNOWLEDGE_PATH = Path("unreviewed_knowledge.json")
 KNOWLEDGE_CORE_PATH = Path("knowledge_core.json")
+KNOWLEDGE_DOCS_PATH = Path("knowledge_base_docs")
+RELAZIONI_INVIATE_PATH = Path("relazioni_inviate")
+EXTRACTION_CACHE_PATH = Path("knowledge_base_cache.json")
+MIN_SENTENCE_WORDS = 5
+
+_DOCUMENT_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile, PackageNotFoundError)
 
 
 def load_unreviewed_knowledge() -> list[dict[str, Any]]:
@@ -82,67 +92,155 @@ def integrate_knowledge(entry_id: str, integration_details: dict[str, Any]) -> d
         return {"success": False, "error": str(e)}
 
 
-def load_report_knowledge_base() -> str:
-    """Carica la base di conoscenza leggendo i file .docx e .txt locali."""
-    knowledge_base_text: list[str] = []
+def _read_document_paragraphs(path: Path) -> list[str]:
+    """Estrae i paragrafi non vuoti da un file .docx o .txt della base di conoscenza."""
+    if path.suffix.lower() == ".docx":
+        doc = Document(str(path))
+        return [text for para in doc.paragraphs if (text := para.text.strip())]
+    return [path.read_text(encoding="utf-8")]
 
-    # Percorso 1: Documenti Storici
-    local_base_path = Path("knowledge_base_docs")
-    if local_base_path.is_dir():
-        for filepath in local_base_path.rglob("*.docx"):
-            with suppress(Exception):
-                doc = Document(str(filepath))
-                knowledge_base_text.extend(
-                    text for para in doc.paragraphs if (text := para.text.strip())
-                )
-    else:
-        logger.warning(f"Cartella '{local_base_path}' non trovata.")
 
-    # Percorso 2: Relazioni Inviate
-    local_path = Path("relazioni_inviate")
-    if local_path.is_dir():
-        for filepath in local_path.glob("*.txt"):
-            with suppress(Exception):
-                knowledge_base_text.append(filepath.read_text(encoding="utf-8"))
+def _list_knowledge_sources() -> list[Path]:
+    """Documenti storici (.docx) e relazioni inviate (.txt) da indicizzare."""
+    sources: list[Path] = []
+    if KNOWLEDGE_DOCS_PATH.is_dir():
+        sources.extend(sorted(KNOWLEDGE_DOCS_PATH.rglob("*.docx")))
+    if RELAZIONI_INVIATE_PATH.is_dir():
+        sources.extend(sorted(RELAZIONI_INVIATE_PATH.glob("*.txt")))
+    return sources
+
 
+def load_report_knowledge_base() -> str:
+    """Carica la base di conoscenza leggendo i file .docx e .txt locali."""
+    if not KNOWLEDGE_DOCS_PATH.is_dir():
+        logger.warning(f"Cartella '{KNOWLEDGE_DOCS_PATH}' non trovata.")
+
+    knowledge_base_text: list[str] = []
+    for filepath in _list_knowledge_sources():
+        with suppress(Exception):
+            knowledge_base_text.extend(_read_document_paragraphs(filepath))
     return "\n".join(knowledge_base_text)
 
 
 def get_report_knowledge_base_count() -> int:
     """Conta il numero di file nella base di conoscenza."""
-    count = 0
-    kb_path = Path("knowledge_base_docs")
-    if kb_path.exists():
-        count += sum(1 for _ in kb_path.rglob("*.docx"))
-    rel_path = Path("relazioni_inviate")
-    if rel_path.exists():
-        count += sum(1 for _ in rel_path.glob("*.txt"))
-    return count
+    return len(_list_knowledge_sources())
+
+
+def _extract_sentences(path_str: str) -> list[str]:
+    """
+    Estrae e segmenta in frasi un singolo documento.
+    Eseguita nei processi worker: deve restare una funzione di modulo serializzabile.
+    """
+    try:
+        text = "\n".join(_read_document_paragraphs(Path(path_str)))
+    except _DOCUMENT_ERRORS as e:
+        logger.warning(f"Documento illeggibile ignorato ({path_str}): {e}")
+        return []
+    sentences = nltk.sent_tokenize(text, language="italian")
+    return [s for s in sentences if len(s.split()) > MIN_SENTENCE_WORDS]
+
+
+def _load_extraction_cache() -> dict[str, dict[str, Any]]:
+    """Cache delle frasi estratte per documento: {percorso: {mtime_ns, size, sentences}}."""
+    if not EXTRACTION_CACHE_PATH.exists():
+        return {}
+    with suppress(json.JSONDecodeError, OSError):
+        cache: dict[str, dict[str, Any]] = json.loads(
+            EXTRACTION_CACHE_PATH.read_text(encoding="utf-8")
+        )
+        return cache
+    logger.warning("Cache di estrazione della knowledge base illeggibile, verrà ricreata.")
+    return {}
+
+
+def _save_extraction_cache(cache: dict[str, dict[str, Any]]) -> None:
+    """Scrittura atomica della cache di estrazione."""
+    tmp_path = EXTRACTION_CACHE_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    tmp_path.replace(EXTRACTION_CACHE_PATH)
+
+
+def _extract_changed_documents(paths: list[Path], max_workers: int | None) -> dict[str, list[str]]:
+    """Estrae i documenti modificati; i .docx vengono elaborati in parallelo."""
+    docx = [str(p) for p in paths if p.suffix.lower() == ".docx"]
+    others = [str(p) for p in paths if p.suffix.lower() != ".docx"]
+    workers = min(max_workers or os.cpu_count() or 1, len(docx))
+
+    extracted = {path: _extract_sentences(path) for path in others}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, len(docx) // (workers * 4))
+            extracted.update(
+                zip(docx, executor.map(_extract_sentences, docx, chunksize=chunksize), strict=True)
+            )
+    else:
+        extracted.update((path, _extract_sentences(path)) for path in docx)
+    return extracted
+
+
+def _ensure_nltk_resources() -> None:
+    """Scarica le risorse NLTK necessarie se non già presenti."""
+    for res in ("punkt", "stopwords"):
+        with suppress(LookupError):
+            nltk.data.find(f"tokenizers/{res}" if res == "punkt" else f"corpora/{res}")
+            continue
+        nltk.download(res, quiet=True)
+
+
+def load_knowledge_sentences(max_workers: int | None = None) -> tuple[list[str], int]:
+    """
+    Restituisce le frasi di tutti i documenti della base di conoscenza, rielaborando
+    solo i file nuovi o modificati (chiave: percorso, mtime, dimensione).
+    Restituisce anche il numero di documenti rielaborati.
+    """
+    cache = _load_extraction_cache()
+    sources = _list_knowledge_sources()
+
+    fingerprints: dict[str, tuple[int, int]] = {}
+    changed: list[Path] = []
+    for path in sources:
+        stat = path.stat()
+        fingerprints[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        entry = cache.get(str(path))
+        if not entry or (entry["mtime_ns"], entry["size"]) != fingerprints[str(path)]:
+            changed.append(path)
+
+    extracted = _extract_changed_documents(changed, max_workers) if changed else {}
+
+    new_cache = {
+        key: (
+            {"mtime_ns": mtime_ns, "size": size, "sentences": extracted[key]}
+            if key in extracted
+            else cache[key]
+        )
+        for key, (mtime_ns, size) in fingerprints.items()
+    }
+    if changed or new_cache.keys() != cache.keys():
+        _save_extraction_cache(new_cache)
+
+    sentences = [s for entry in new_cache.values() for s in entry["sentences"]]
+    return sentences, len(changed)
 
 
 @measure_time
-def build_knowledge_base() -> dict[str, Any]:
-    """Crea e salva un indice TF-IDF dalla base di conoscenza."""
+def build_knowledge_base(max_workers: int | None = None) -> dict[str, Any]:
+    """
+    Crea e salva un indice TF-IDF dalla base di conoscenza.
+    L'estrazione è incrementale: vengono riletti solo i documenti nuovi o modificati.
+    """
     try:
         # 1. Download risorse NLTK
-        for res in ("punkt", "stopwords"):
-            with suppress(LookupError):
-                nltk.data.find(f"tokenizers/{res}" if res == "punkt" else f"corpora/{res}")
-                continue
-            nltk.download(res, quiet=True)
-
-        # 2. Caricamento testo
-        full_text = load_report_knowledge_base()
-        if not full_text:
-            return {"success": False, "message": "Nessun documento trovato."}
+        _ensure_nltk_resources()
 
-        # 3. Segmentazione
-        sentences = nltk.sent_tokenize(full_text, language="italian")
-        sentences = [s for s in sentences if len(s.split()) > 5]
+        # 2. Estrazione frasi (cache per documento + elaborazione parallela)
+        if not _list_knowledge_sources():
+            return {"success": False, "message": "Nessun documento trovato."}
+        sentences, rielaborati = load_knowledge_sentences(max_workers)
         if not sentences:
             return {"success": False, "message": "Nessun contenuto valido."}
 
-        # 4. Vettorizzazione
+        # 3. Vettorizzazione
         stop_words = []
         try:
             stop_words = nltk.corpus.stopwords.words("italian")
@@ -152,17 +250,15 @@ def build_knowledge_base() -> dict[str, Any]:
         vectorizer = TfidfVectorizer(stop_words=stop_words, ngram_range=(1, 2))
         tfidf_matrix = vectorizer.fit_transform(sentences)
 
-        # 5. Salvataggio
-        index_data = {
-            "vectorizer": vectorizer,
-            "matrix": tfidf_matrix,
-            "sentences": sentences,
-        }
-        Path("knowledge_base_index.pkl").write_bytes(pickle.dumps(index_data))  # nosec B301
+        # 4. Salvataggio (formato a cartella mappabile in memoria, senza pickle)
+        write_knowledge_index(KNOWLEDGE_INDEX_PATH, vectorizer, tfidf_matrix, sentences)
 
         return {
             "success": True,
-            "message": f"Indice creato con successo con {len(sentences)} voci.",
+            "message": (
+                f"Indice creato con successo con {len(sentences)} voci "
+                f"({rielaborati} documenti rielaborati)."
+            ),
         }
 
     except Exception as e:
@@ -3,21 +3,42 @@ Modulo per l'interfaccia con l'Intelligenza Artificiale (Google Gemini).
 Centralizza la gestione dei prompt e la logica di revisione tecnica.
 """
 
-from typing import Any
+import hashlib
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, Protocol
 
 import streamlit as st
 
+import config
 from core.logging import get_logger
+from core.metrics import AI_CALL_DURATION, REGISTRY, record_cache_access
+from modules.db_manager import get_cached_ai_response, store_ai_response
 from modules.instrumentation_logic import (
     analyze_domain_terminology,
     find_and_analyze_tags,
 )
+from modules.knowledge_index import knowledge_index_version
+from modules.knowledge_retrieval import cerca_frasi_simili
 
 logger = get_logger(__name__)
 
+# Da incrementare a ogni modifica dei prompt: invalida le risposte in cache
+PROMPT_TEMPLATE_VERSION = 2
 
-def generate_technical_prompt(testo_originale: str, technical_summary: str) -> str:
+
+def generate_technical_prompt(
+    testo_originale: str, technical_summary: str, context_sentences: list[str] | None = None
+) -> str:
     """Costruisce il prompt strutturato per la revisione tecnica."""
+    storico = ""
+    if context_sentences:
+        estratti = "\n    ".join(f"- {frase}" for frase in context_sentences)
+        storico = f"""
+    **ESTRATTI DA RELAZIONI STORICHE SIMILI (stile e terminologia di riferimento):**
+    ---
+    {estratti}
+    ---"""
     return f"""
     Sei un Direttore Tecnico di Manutenzione esperto in strumentazione.
     Il tuo compito è riformulare la seguente relazione tecnica,
@@ -25,7 +46,7 @@ def generate_technical_prompt(testo_originale: str, technical_summary: str) -> s
     **INFORMAZIONI TECNICHE DA USARE (Know-How):**
     ---
     {technical_summary}
-    ---
+    ---{storico}
     Usa queste informazioni per interpretare correttamente le sigle
     (es. CTG, FCV301) e le relazioni tra i componenti.
     Riformula il testo per riflettere questa comprensione approfondita.
@@ -52,55 +73,184 @@ def generate_standard_prompt(testo_originale: str) -> str:
     """
 
 
-def revisiona_con_ia(testo: str) -> dict[str, Any]:
-    """
-    Esegue la revisione del testo tramite Gemini, applicando analisi semantica ISA.
-    """
-    try:
+class AIServiceError(Exception):
+    """Servizio IA non utilizzabile (dipendenze o configurazione mancanti)."""
+
+
+class AIBackend(Protocol):
+    """Modello generativo usato per la revisione dei testi."""
+
+    model_name: str
+
+    def generate(self, prompt: str) -> str: ...
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Frammenti successivi della risposta, man mano che vengono generati."""
+        ...
+
+
+class GeminiBackend:
+    """Client Gemini configurato una sola volta e riutilizzato tra le richieste."""
+
+    def __init__(self, api_key: str, model_name: str) -> None:
         import google.generativeai as genai
-    except ImportError:
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return str(self._model.generate_content(prompt).text)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self._model.generate_content(prompt, stream=True):
+            yield str(chunk.text)
+
+
+class FakeAIBackend:
+    """Backend deterministico senza rete, per sviluppo offline e test."""
+
+    def __init__(self, model_name: str = "fake", reply: str | None = None) -> None:
+        self.model_name = model_name
+        self.reply = reply
+        self.prompts: list[str] = []
+
+    def generate(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if self.reply is not None:
+            return self.reply
+        return prompt.rsplit("---", 2)[-2].strip()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        words = self.generate(prompt).split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else f"{word} "
+
+
+@st.cache_resource(show_spinner=False)
+def _get_gemini_backend(api_key: str, model_name: str) -> GeminiBackend:
+    return GeminiBackend(api_key, model_name)
+
+
+def get_ai_backend() -> AIBackend:
+    """Restituisce il backend configurato; il client Gemini è condiviso dal processo."""
+    if config.AI_BACKEND == "fake":
+        return FakeAIBackend()
+    try:
+        import google.generativeai  # noqa: F401
+    except ImportError as e:
         logger.error("Libreria google-generativeai non importabile. Verificare installazione.")
-        return {"success": False, "error": "Servizio IA non disponibile (errore dipendenze)."}
+        raise AIServiceError("Servizio IA non disponibile (errore dipendenze).") from e
 
     api_key = st.secrets.get("GEMINI_API_KEY")
     if not api_key:
         logger.error("API Key Gemini mancante nei secrets.")
-        return {"success": False, "error": "Configurazione IA incompleta."}
+        raise AIServiceError("Configurazione IA incompleta.")
+    return _get_gemini_backend(api_key, config.AI_MODEL_NAME)
+
+
+def normalizza_testo(testo: str) -> str:
+    """Normalizza gli spazi, così modifiche solo di formattazione riusano la cache."""
+    return " ".join(testo.split())
+
+
+def chiave_cache_ia(testo: str, model_name: str) -> str:
+    """
+    Hash del contenuto: versione dei prompt, modello, build dell'indice di conoscenza
+    (gli estratti storici finiscono nel prompt) e testo normalizzato.
+    """
+    payload = "\x00".join(
+        (
+            str(PROMPT_TEMPLATE_VERSION),
+            model_name,
+            knowledge_index_version(),
+            normalizza_testo(testo),
+        )
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _build_technical_summary(testo: str) -> str:
+    """Riassunto dei loop strumentali e della terminologia rilevati nel testo."""
+    loops, _ = find_and_analyze_tags(testo)
+    terms = analyze_domain_terminology(testo)
+
+    technical_summary = ""
+    if loops:
+        technical_summary += "Analisi Strumentale:\n"
+        for loop_id, components in loops.items():
+            technical_summary += f"- Loop {loop_id}:\n"
+            for c in components:
+                technical_summary += f"  - {c['tag']}: {c['description']}\n"
+
+    if terms:
+        technical_summary += "\nTerminologia:\n"
+        for t, d in terms.items():
+            technical_summary += f"- {t}: {d}\n"
+    return technical_summary
+
+
+def revisiona_con_ia(
+    testo: str,
+    backend: AIBackend | None = None,
+    on_partial: Callable[[str], None] | None = None,
+) -> dict[str, Any]:
+    """
+    Esegue la revisione del testo tramite Gemini, applicando analisi semantica ISA.
+    Le risposte sono memorizzate in cache: lo stesso testo non viene rigenerato.
+    Con `on_partial` la risposta viene generata in streaming e il testo accumulato
+    è passato alla callback a ogni frammento.
+    """
+    try:
+        backend = backend or get_ai_backend()
+    except AIServiceError as e:
+        return {"success": False, "error": str(e)}
 
     if not testo.strip():
         return {"success": False, "info": "Testo vuoto."}
 
+    chiave = chiave_cache_ia(testo, backend.model_name)
+    cached = get_cached_ai_response(chiave, config.AI_CACHE_TTL_SEC)
+    record_cache_access("ai_review", cached is not None)
+    if cached is not None:
+        logger.debug("Revisione IA servita dalla cache.")
+        return {"success": True, "text": cached, "cached": True}
+
     try:
         # Analisi del contesto strumentale
-        loops, _ = find_and_analyze_tags(testo)
-        terms = analyze_domain_terminology(testo)
-
-        technical_summary = ""
-        if loops:
-            technical_summary += "Analisi Strumentale:\n"
-            for loop_id, components in loops.items():
-                technical_summary += f"- Loop {loop_id}:\n"
-                for c in components:
-                    technical_summary += f"  - {c['tag']}: {c['description']}\n"
-
-        if terms:
-            technical_summary += "\nTerminologia:\n"
-            for t, d in terms.items():
-                technical_summary += f"- {t}: {d}\n"
-
-        # Configurazione Modello
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("models/gemini-flash-latest")
+        technical_summary = _build_technical_summary(testo)
+
+        # Frasi pertinenti dalle relazioni storiche (indice TF-IDF locale)
+        context_sentences = cerca_frasi_simili(testo)
 
         prompt = (
-            generate_technical_prompt(testo, technical_summary)
-            if technical_summary
+            generate_technical_prompt(testo, technical_summary, context_sentences)
+            if technical_summary or context_sentences
             else generate_standard_prompt(testo)
         )
 
-        response = model.generate_content(prompt)
-        return {"success": True, "text": response.text}
+        start = time.perf_counter()
+        status = "error"
+        try:
+            if on_partial is None:
+                text = backend.generate(prompt)
+            else:
+                text = ""
+                for chunk in backend.stream(prompt):
+                    text += chunk
+                    on_partial(text)
+            status = "success"
+        finally:
+            # Anche le chiamate fallite (timeout, quota) occupano il modello: si misurano tutte
+            REGISTRY.histogram(AI_CALL_DURATION, model=backend.model_name, status=status).observe(
+                time.perf_counter() - start
+            )
 
     except Exception as e:
         logger.error(f"Errore durante la chiamata IA: {e}", exc_info=True)
         return {"success": False, "error": f"L'IA ha riscontrato un problema: {e!s}"}
+
+    store_ai_response(
+        chiave, backend.model_name, text, config.AI_CACHE_TTL_SEC, config.AI_CACHE_MAX_ENTRIES
+    )
+    return {"success": True, "text": text}
@@ -0,0 +1,235 @@
+"""
+Coda in background delle revisioni IA.
+La UI accoda un lavoro e ne interroga lo stato; un unico dispatcher per processo esegue
+i lavori su un pool di thread con concorrenza massima e limite di richieste al minuto,
+salvando nel database il testo parziale (streaming) e il risultato finale.
+La coda è condivisa tra processi (app Streamlit e job di pre-revisione): i limiti sono
+verificati anche sul database al prelievo e ogni dispatcher mantiene un heartbeat sui
+propri lavori, così un avvio rimette in coda solo quelli di un dispatcher non più attivo.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from collections.abc import Callable, Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+import config
+from core.ids import genera_id
+from core.logging import get_logger
+from modules.ai_engine import AIBackend, revisiona_con_ia
+from modules.db_manager import (
+    claim_ai_jobs,
+    complete_ai_job,
+    count_queued_ai_jobs,
+    enqueue_ai_job,
+    enqueue_relazioni_prereview,
+    fail_ai_job,
+    get_ai_job,
+    release_stale_ai_jobs,
+    touch_ai_jobs,
+    update_ai_job_partial,
+)
+
+logger = get_logger(__name__)
+
+AI_QUEUE_POLL_INTERVAL_SEC = 5.0
+PARTIAL_FLUSH_INTERVAL_SEC = 0.5
+# Ogni quanto un dispatcher conferma i propri lavori in corso e dopo quanto, senza conferme,
+# i lavori di un dispatcher terminato tornano in coda
+AI_JOB_HEARTBEAT_SEC = 30.0
+AI_JOB_STALE_AFTER_SEC = 120.0
+
+
+class RateLimiter:
+    """Distanzia gli avvii delle richieste per restare entro `per_minute` al minuto."""
+
+    def __init__(self, per_minute: int) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Attende il prossimo slot disponibile."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class AIReviewQueue(threading.Thread):
+    """
+    Dispatcher dei lavori di revisione IA. Preleva un lavoro solo quando c'è uno slot
+    libero nel pool, così i lavori non ancora avviati restano 'in_coda' nel database.
+    """
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], AIBackend] | None = None,
+        max_concurrency: int = config.AI_MAX_CONCURRENCY,
+        rate_per_minute: int = config.AI_RATE_LIMIT_PER_MIN,
+        poll_interval: float = AI_QUEUE_POLL_INTERVAL_SEC,
+    ) -> None:
+        super().__init__(name="ai-review-dispatcher", daemon=True)
+        self.backend_factory = backend_factory
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_per_minute = rate_per_minute
+        # Identifica il dispatcher tra i processi che condividono la coda
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self._limiter = RateLimiter(rate_per_minute)
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self) -> None:
+        """Segnala la presenza di nuovi lavori."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Richiede l'arresto del dispatcher; i lavori avviati vengono completati."""
+        self._stop_event.set()
+        self._wake.set()
+
+    def _claim(self, limit: int) -> list[dict[str, Any]]:
+        return claim_ai_jobs(limit, self.owner, self.max_concurrency, self.rate_per_minute)
+
+    @contextmanager
+    def _heartbeat(self) -> Generator[None, None, None]:
+        """
+        Thread che conferma periodicamente i lavori in corso del dispatcher e rimette in coda
+        quelli rimasti senza heartbeat (dispatcher di un altro processo terminato).
+        """
+        done = threading.Event()
+
+        def beat() -> None:
+            while not done.wait(AI_JOB_HEARTBEAT_SEC):
+                try:
+                    touch_ai_jobs(self.owner)
+                    release_stale_ai_jobs(AI_JOB_STALE_AFTER_SEC)
+                except Exception:
+                    logger.exception("Errore nell'heartbeat dei lavori IA")
+
+        thread = threading.Thread(target=beat, name="ai-review-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def run(self) -> None:
+        release_stale_ai_jobs(AI_JOB_STALE_AFTER_SEC)
+        with (
+            self._heartbeat(),
+            ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="ai-review") as pool,
+        ):
+            while not self._stop_event.is_set():
+                if not self._slots.acquire(timeout=self.poll_interval):
+                    continue
+                try:
+                    jobs = self._claim(1)
+                except Exception:
+                    logger.exception("Errore nel prelievo dei lavori IA")
+                    jobs = []
+                if not jobs:
+                    self._slots.release()
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+                pool.submit(self._run_in_slot, jobs[0])
+
+    def _run_in_slot(self, job: dict[str, Any]) -> None:
+        try:
+            self._process_safely(job)
+        finally:
+            self._slots.release()
+
+    def _process_safely(self, job: dict[str, Any]) -> None:
+        try:
+            self.process_job(job)
+        except Exception:
+            logger.exception(f"Errore nel lavoro IA {job['id']}")
+            fail_ai_job(job["id"], "Errore interno durante la revisione.")
+
+    def drain(self) -> int:
+        """Esegue in modo sincrono tutti i lavori in coda (uso batch). Restituisce il totale."""
+        processed = 0
+        with (
+            self._heartbeat(),
+            ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="ai-review") as pool,
+        ):
+            while True:
+                jobs = self._claim(self.max_concurrency)
+                if not jobs:
+                    if not count_queued_ai_jobs():
+                        break
+                    # Limiti raggiunti, anche per i lavori di altri processi: si attende
+                    time.sleep(self.poll_interval)
+                    continue
+                list(pool.map(self._process_safely, jobs))
+                processed += len(jobs)
+        return processed
+
+    def process_job(self, job: dict[str, Any]) -> None:
+        """Esegue un singolo lavoro già prelevato, pubblicando il testo parziale."""
+        self._limiter.acquire()
+        backend = self.backend_factory() if self.backend_factory else None
+        last_flush = 0.0
+
+        def on_partial(testo: str) -> None:
+            nonlocal last_flush
+            now = time.monotonic()
+            if now - last_flush >= PARTIAL_FLUSH_INTERVAL_SEC:
+                update_ai_job_partial(job["id"], testo)
+                last_flush = now
+
+        res = revisiona_con_ia(job["testo"], backend=backend, on_partial=on_partial)
+        if res.get("success"):
+            complete_ai_job(job["id"], res["text"], bool(res.get("cached")))
+        else:
+            fail_ai_job(job["id"], res.get("error") or res.get("info") or "Errore IA.")
+
+
+_queue: AIReviewQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def avvia_coda_ia() -> AIReviewQueue:
+    """Avvia (una sola volta per processo) il dispatcher delle revisioni IA."""
+    global _queue
+    with _queue_lock:
+        if _queue is None or not _queue.is_alive():
+            _queue = AIReviewQueue()
+            _queue.start()
+        return _queue
+
+
+def invia_revisione_ia(
+    testo: str, richiedente: str | None = None, riferimento: str | None = None
+) -> str | None:
+    """Accoda una revisione IA e restituisce l'id del lavoro (None se non accodabile)."""
+    job_id = genera_id("IAJ")
+    if not enqueue_ai_job(job_id, testo, richiedente, riferimento):
+        logger.error("Impossibile accodare la revisione IA.")
+        return None
+    avvia_coda_ia().wake()
+    return job_id
+
+
+def stato_revisione_ia(job_id: str) -> dict[str, Any] | None:
+    """Stato corrente di un lavoro di revisione."""
+    return get_ai_job(job_id)
+
+
+def accoda_prerevisione_relazioni() -> int:
+    """Accoda la pre-revisione di tutte le relazioni in attesa di validazione."""
+    accodati = enqueue_relazioni_prereview()
+    logger.info(f"Pre-revisione IA: {accodati} relazioni accodate.")
+    return accodati
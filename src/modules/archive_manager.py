@@ -2,20 +2,85 @@
 Logica per la gestione dell'archivio storico delle schede di manutenzione.
 """
 
+import re
 import sqlite3
 from pathlib import Path
 from typing import Any
 
 import pandas as pd
 
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
 DB_PATH = Path(__file__).parent.parent.parent / "report-attivita.db"
 
+# Lunghezza minima di una sottostringa cercabile con l'indice a trigrammi
+TRIGRAM_MIN_CHARS = 3
+
+_ARCHIVE_COLUMNS = "m.filename, m.year, m.month, m.last_modified, m.full_path, m.tag"
+# Prima la scheda del tag cercato, poi le più recenti
+_ARCHIVE_ORDER = "ORDER BY (m.tag = ?) DESC, m.year DESC, m.month DESC, m.filename ASC LIMIT ?"
+
+
+def normalizza_tag(testo: str) -> str:
+    """Forma canonica di un tag: maiuscolo e senza separatori ("pt-101" -> "PT101")."""
+    return re.sub(r"[^0-9A-Z]", "", testo.upper())
+
+
+def estrai_tag_archivio(filename: str) -> str:
+    """
+    Tag normalizzato di una scheda, ricavato dal nome del file: la prima parola prima di
+    spazi, parentesi o estensione (es. "01F015 (2).xls" -> "01F015").
+    """
+    tag = filename.split(" ")[0].split("(")[0]
+    tag = re.sub(r"\.(xls|xlsx|xlsm)$", "", tag, flags=re.IGNORECASE)
+    return normalizza_tag(tag)
+
+
+def _trigram_phrase(testo: str) -> str:
+    """Sottostringa letterale per MATCH (le virgolette dell'utente vengono raddoppiate)."""
+    return '"' + testo.replace('"', '""') + '"'
+
 
 def search_archive(query: str, limit: int = 50) -> pd.DataFrame:
-    """Cerca file nell'archivio per nome (case-insensitive)."""
+    """
+    Cerca schede nell'archivio per nome o tag (case-insensitive).
+    Usa l'indice FTS5 a trigrammi su nome e tag normalizzato; le ricerche più corte di tre
+    caratteri usano l'indice sul tag per prefisso. Ordina per corrispondenza esatta del tag,
+    poi per anno e mese più recenti.
+    """
+    query = query.strip()
+    tag = normalizza_tag(query)
     conn = sqlite3.connect(DB_PATH)
     try:
-        # LOWER() rende la ricerca insensibile alle maiuscole/minuscole
+        if len(query) >= TRIGRAM_MIN_CHARS:
+            match = f"filename : {_trigram_phrase(query)}"
+            if len(tag) >= TRIGRAM_MIN_CHARS:
+                match += f" OR tag : {_trigram_phrase(tag)}"
+            sql = f"""
+                SELECT {_ARCHIVE_COLUMNS}
+                FROM maintenance_archive_fts f
+                JOIN maintenance_archive m ON m.rowid = f.rowid
+                WHERE maintenance_archive_fts MATCH ? AND m.deleted_at IS NULL
+                {_ARCHIVE_ORDER}
+            """  # nosec B608
+            params: tuple[Any, ...] = (match, tag, limit)
+        elif not tag:
+            return pd.DataFrame(columns=_ARCHIVE_COLUMNS.replace("m.", "").split(", "))
+        else:
+            # Range sul tag normalizzato: sfrutta l'indice idx_maintenance_archive_tag
+            sql = f"""
+                SELECT {_ARCHIVE_COLUMNS}
+                FROM maintenance_archive m
+                WHERE m.tag >= ? AND m.tag < ? AND m.deleted_at IS NULL
+                {_ARCHIVE_ORDER}
+            """  # nosec B608
+            params = (tag, tag + "\uffff", tag, limit)
+        return pd.read_sql_query(sql, conn, params=params)
+    except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+        # Database non ancora aggiornato con crea_database.py (indice o colonna tag mancanti)
+        logger.warning(f"Indice archivio non disponibile, ricerca sequenziale: {e}")
         sql = """
             SELECT filename, year, month, last_modified, full_path
             FROM maintenance_archive
@@ -29,11 +94,14 @@ def search_archive(query: str, limit: int = 50) -> pd.DataFrame:
 
 
 def get_archive_stats() -> dict[str, Any]:
-    """Ritorna statistiche rapide sull'archivio."""
+    """Ritorna statistiche rapide sull'archivio (schede ancora presenti su disco)."""
     conn = sqlite3.connect(DB_PATH)
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*), MIN(year), MAX(year) FROM maintenance_archive")
+        cursor.execute(
+            "SELECT COUNT(*), MIN(year), MAX(year) FROM maintenance_archive "
+            "WHERE deleted_at IS NULL"
+        )
         count, min_y, max_y = cursor.fetchone()
         return {
             "total_files": count,
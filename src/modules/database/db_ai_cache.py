@@ -0,0 +1,65 @@
+"""
+Funzioni database per la cache delle risposte dell'IA.
+Le risposte sono indicizzate da un hash del contenuto (versione prompt, modello, testo).
+"""
+
+import datetime
+import sqlite3
+
+from core.database import DatabaseEngine
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def get_cached_ai_response(chiave: str, ttl_sec: int) -> str | None:
+    """Restituisce la risposta in cache se presente e non scaduta, aggiornandone l'accesso."""
+    now = datetime.datetime.now()
+    scadenza = (now - datetime.timedelta(seconds=ttl_sec)).isoformat()
+    row = DatabaseEngine.fetch_one(
+        "SELECT risposta FROM ai_cache WHERE chiave = ? AND timestamp_creazione >= ?",
+        (chiave, scadenza),
+    )
+    if row is None:
+        return None
+    DatabaseEngine.execute(
+        "UPDATE ai_cache SET ultimo_accesso = ?, utilizzi = utilizzi + 1 WHERE chiave = ?",
+        (now.isoformat(), chiave),
+    )
+    return str(row["risposta"])
+
+
+def store_ai_response(
+    chiave: str, modello: str, risposta: str, ttl_sec: int, max_entries: int
+) -> bool:
+    """
+    Salva (o sostituisce) una risposta in cache, poi elimina le voci scadute
+    e quelle meno usate di recente oltre il limite `max_entries`.
+    """
+    now = datetime.datetime.now()
+    scadenza = (now - datetime.timedelta(seconds=ttl_sec)).isoformat()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (chiave, modello, risposta, "
+                "timestamp_creazione, ultimo_accesso, utilizzi) VALUES (?, ?, ?, ?, ?, 0)",
+                (chiave, modello, risposta, now.isoformat(), now.isoformat()),
+            )
+            conn.execute("DELETE FROM ai_cache WHERE timestamp_creazione < ?", (scadenza,))
+            conn.execute(
+                "DELETE FROM ai_cache WHERE chiave IN (SELECT chiave FROM ai_cache "
+                "ORDER BY ultimo_accesso DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            )
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Errore salvataggio cache IA: {e}")
+        return False
+    finally:
+        conn.close()
@@ -0,0 +1,218 @@
+"""
+Funzioni database per la coda dei lavori di revisione IA.
+Ogni lavoro passa per gli stati 'in_coda' → 'in_corso' → 'completato' | 'errore'.
+I lavori in corso registrano il dispatcher che li esegue (proprietario) e un heartbeat:
+più processi condividono la coda e solo i lavori senza heartbeat recente tornano in coda.
+"""
+
+import datetime
+import sqlite3
+from typing import Any
+
+from core.database import DatabaseEngine, retry_on_lock
+from core.ids import genera_id
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_INSERT_JOB_SQL = (
+    "INSERT INTO ai_review_jobs (id, testo, richiedente, riferimento, stato, "
+    "timestamp_creazione) VALUES (?, ?, ?, ?, 'in_coda', ?)"
+)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def enqueue_ai_job(
+    job_id: str, testo: str, richiedente: str | None = None, riferimento: str | None = None
+) -> bool:
+    """Accoda un lavoro di revisione IA."""
+    now = datetime.datetime.now().isoformat()
+    return DatabaseEngine.execute(_INSERT_JOB_SQL, (job_id, testo, richiedente, riferimento, now))
+
+
+def enqueue_relazioni_prereview(richiedente: str = "prerevisione") -> int:
+    """
+    Accoda la pre-revisione di tutte le relazioni in attesa di validazione che non hanno
+    già un lavoro in coda, in corso o completato. Restituisce il numero di lavori accodati.
+    """
+    now = datetime.datetime.now().isoformat()
+    conn = get_db_connection()
+    try:
+        with conn:
+            rows = conn.execute(
+                "SELECT id_relazione, corpo_relazione FROM relazioni r "
+                "WHERE stato = 'Inviata' AND TRIM(COALESCE(corpo_relazione, '')) != '' "
+                "AND NOT EXISTS (SELECT 1 FROM ai_review_jobs j "
+                "WHERE j.riferimento = r.id_relazione AND j.stato != 'errore')"
+            ).fetchall()
+            conn.executemany(
+                _INSERT_JOB_SQL,
+                [
+                    (
+                        genera_id("IAJ"),
+                        row["corpo_relazione"],
+                        richiedente,
+                        row["id_relazione"],
+                        now,
+                    )
+                    for row in rows
+                ],
+            )
+            return len(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Errore accodamento pre-revisione relazioni: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+@retry_on_lock()
+def claim_ai_jobs(
+    limit: int,
+    proprietario: str | None = None,
+    max_in_corso: int | None = None,
+    max_per_minuto: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Preleva in modo esclusivo fino a `limit` lavori in coda marcandoli 'in_corso' per
+    `proprietario`. `max_in_corso` e `max_per_minuto` (0 = nessun limite) valgono per tutti
+    i processi che condividono la coda: lavori in esecuzione e avvii nell'ultimo minuto.
+    """
+    now = datetime.datetime.now()
+    conn = get_db_connection()
+    conn.isolation_level = None  # Gestione esplicita della transazione
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if max_in_corso is not None:
+            in_corso = conn.execute(
+                "SELECT COUNT(*) FROM ai_review_jobs WHERE stato = 'in_corso'"
+            ).fetchone()[0]
+            limit = min(limit, max_in_corso - in_corso)
+        if max_per_minuto:
+            avviati = conn.execute(
+                "SELECT COUNT(*) FROM ai_review_jobs WHERE timestamp_inizio >= ?",
+                ((now - datetime.timedelta(minutes=1)).isoformat(),),
+            ).fetchone()[0]
+            limit = min(limit, max_per_minuto - avviati)
+        if limit <= 0:
+            conn.execute("ROLLBACK")
+            return []
+        rows = conn.execute(
+            "SELECT id, testo, richiedente, riferimento FROM ai_review_jobs "
+            "WHERE stato = 'in_coda' ORDER BY timestamp_creazione LIMIT ?",
+            (limit,),
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE ai_review_jobs SET stato = 'in_corso', timestamp_inizio = ?, "
+                "proprietario = ?, heartbeat = ? WHERE id = ?",
+                [(now.isoformat(), proprietario, now.isoformat(), row["id"]) for row in rows],
+            )
+        conn.execute("COMMIT")
+        return [dict(row) for row in rows]
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def update_ai_job_partial(job_id: str, parziale: str) -> bool:
+    """Aggiorna il testo parziale di un lavoro in corso (risposta in streaming)."""
+    return DatabaseEngine.execute(
+        "UPDATE ai_review_jobs SET parziale = ?, heartbeat = ? WHERE id = ? AND stato = 'in_corso'",
+        (parziale, datetime.datetime.now().isoformat(), job_id),
+    )
+
+
+def complete_ai_job(job_id: str, risultato: str, da_cache: bool = False) -> bool:
+    """Registra il risultato finale di un lavoro."""
+    return DatabaseEngine.execute(
+        "UPDATE ai_review_jobs SET stato = 'completato', risultato = ?, parziale = NULL, "
+        "da_cache = ?, timestamp_fine = ? WHERE id = ?",
+        (risultato, int(da_cache), datetime.datetime.now().isoformat(), job_id),
+    )
+
+
+def fail_ai_job(job_id: str, errore: str) -> bool:
+    """Marca un lavoro come fallito."""
+    return DatabaseEngine.execute(
+        "UPDATE ai_review_jobs SET stato = 'errore', errore = ?, timestamp_fine = ? WHERE id = ?",
+        (errore[:500], datetime.datetime.now().isoformat(), job_id),
+    )
+
+
+def get_ai_job(job_id: str) -> dict[str, Any] | None:
+    """Stato, testo parziale e risultato di un lavoro."""
+    return DatabaseEngine.fetch_one(
+        "SELECT id, stato, parziale, risultato, errore, da_cache, riferimento "
+        "FROM ai_review_jobs WHERE id = ?",
+        (job_id,),
+    )
+
+
+def touch_ai_jobs(proprietario: str) -> int:
+    """Aggiorna l'heartbeat dei lavori in corso di un dispatcher."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            return conn.execute(
+                "UPDATE ai_review_jobs SET heartbeat = ? "
+                "WHERE stato = 'in_corso' AND proprietario = ?",
+                (datetime.datetime.now().isoformat(), proprietario),
+            ).rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore aggiornamento heartbeat lavori IA: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def count_queued_ai_jobs() -> int:
+    """Numero di lavori in attesa di essere prelevati."""
+    row = DatabaseEngine.fetch_one(
+        "SELECT COUNT(*) AS n FROM ai_review_jobs WHERE stato = 'in_coda'"
+    )
+    return int(row["n"]) if row else 0
+
+
+def get_ai_prereviews(riferimenti: list[str]) -> dict[str, str]:
+    """Ultima revisione IA completata per ciascun riferimento (es. id_relazione)."""
+    if not riferimenti:
+        return {}
+    placeholders = ", ".join("?" for _ in riferimenti)
+    rows = DatabaseEngine.fetch_all(
+        "SELECT riferimento, risultato FROM ai_review_jobs "  # nosec B608
+        f"WHERE stato = 'completato' AND riferimento IN ({placeholders}) "
+        "ORDER BY timestamp_fine, rowid",
+        tuple(riferimenti),
+    )
+    return {row["riferimento"]: row["risultato"] for row in rows}
+
+
+def release_stale_ai_jobs(stale_after_sec: float) -> int:
+    """
+    Rimette in coda i lavori 'in_corso' senza heartbeat da più di `stale_after_sec` secondi
+    (dispatcher terminato o bloccato); i lavori degli altri processi attivi non vengono toccati.
+    """
+    limite = (datetime.datetime.now() - datetime.timedelta(seconds=stale_after_sec)).isoformat()
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE ai_review_jobs SET stato = 'in_coda', parziale = NULL, "
+                "proprietario = NULL, heartbeat = NULL "
+                "WHERE stato = 'in_corso' AND (heartbeat IS NULL OR heartbeat < ?)",
+                (limite,),
+            )
+            return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore ripristino lavori IA in corso: {e}")
+        return 0
+    finally:
+        conn.close()
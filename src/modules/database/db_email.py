@@ -0,0 +1,116 @@
+"""
+Funzioni database per la coda persistente delle email in uscita (outbox).
+Le email vengono accodate dalla UI e consegnate in blocco dal worker di invio.
+"""
+
+import datetime
+import sqlite3
+from typing import Any
+
+from core.database import DatabaseEngine, retry_on_lock
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def enqueue_email(email_id: str, oggetto: str, corpo_html: str, destinatari: str = "") -> bool:
+    """Inserisce un'email nella coda di uscita, pronta per l'invio immediato."""
+    now = datetime.datetime.now().isoformat()
+    sql = (
+        "INSERT INTO email_outbox (id, oggetto, corpo_html, destinatari, stato, tentativi, "
+        "prossimo_tentativo, timestamp_creazione) VALUES (?, ?, ?, ?, 'in_coda', 0, ?, ?)"
+    )
+    return DatabaseEngine.execute(sql, (email_id, oggetto, corpo_html, destinatari, now, now))
+
+
+@retry_on_lock()
+def claim_email_batch(limit: int) -> list[dict[str, Any]]:
+    """
+    Preleva in modo esclusivo fino a `limit` email pronte (in coda e con tentativo scaduto)
+    marcandole 'in_invio', così che nessun altro worker le consegni due volte.
+    """
+    now = datetime.datetime.now().isoformat()
+    conn = get_db_connection()
+    conn.isolation_level = None  # Gestione esplicita della transazione
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            "SELECT id, oggetto, corpo_html, destinatari, tentativi FROM email_outbox "
+            "WHERE stato = 'in_coda' AND prossimo_tentativo <= ? "
+            "ORDER BY prossimo_tentativo LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE email_outbox SET stato = 'in_invio' WHERE id = ?",
+                [(row["id"],) for row in rows],
+            )
+        conn.execute("COMMIT")
+        return [dict(row) for row in rows]
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def mark_emails_sent(email_ids: list[str]) -> int:
+    """Segna come consegnate le email indicate."""
+    if not email_ids:
+        return 0
+    now = datetime.datetime.now().isoformat()
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.executemany(
+                "UPDATE email_outbox SET stato = 'inviata', timestamp_invio = ?, "
+                "ultimo_errore = NULL WHERE id = ?",
+                [(now, email_id) for email_id in email_ids],
+            )
+            return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore aggiornamento stato email inviate: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def reschedule_email(email_id: str, errore: str, prossimo_tentativo: str | None) -> bool:
+    """
+    Registra un tentativo fallito. Con `prossimo_tentativo` l'email torna in coda,
+    altrimenti viene marcata definitivamente in errore.
+    """
+    stato = "in_coda" if prossimo_tentativo else "errore"
+    sql = (
+        "UPDATE email_outbox SET stato = ?, tentativi = tentativi + 1, "
+        "prossimo_tentativo = COALESCE(?, prossimo_tentativo), ultimo_errore = ? WHERE id = ?"
+    )
+    return DatabaseEngine.execute(sql, (stato, prossimo_tentativo, errore[:500], email_id))
+
+
+def release_stale_emails() -> int:
+    """Rimette in coda le email rimaste 'in_invio' dopo un riavvio inatteso del worker."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE email_outbox SET stato = 'in_coda' WHERE stato = 'in_invio'"
+            )
+            return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore ripristino email in invio: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_outbox_status() -> dict[str, int]:
+    """Conteggio delle email per stato di consegna."""
+    rows = DatabaseEngine.fetch_all("SELECT stato, COUNT(*) AS n FROM email_outbox GROUP BY stato")
+    return {row["stato"]: row["n"] for row in rows}
@@ -0,0 +1,92 @@
+"""
+Consultazione dei log applicativi importati dai file dei servizi (logs/app*.json) nella
+tabella 'app_logs' (importazione e conservazione in scripts/ingest_logs.py).
+"""
+
+import sqlite3
+from typing import Any
+
+import pandas as pd
+
+from core.database import DatabaseEngine
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+APP_LOGS_PAGE_SIZE = 100
+APP_LOGS_COLUMNS = [
+    "timestamp",
+    "level",
+    "logger",
+    "func",
+    "trace_id",
+    "duration_sec",
+    "message",
+    "extra",
+]
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_app_logs(
+    data_inizio: str | None = None,
+    data_fine: str | None = None,
+    livelli: list[str] | None = None,
+    modulo: str | None = None,
+    trace_id: str | None = None,
+    limit: int = APP_LOGS_PAGE_SIZE,
+    offset: int = 0,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Pagina dei log applicativi, dal più recente, e numero totale di righe filtrate.
+    `data_inizio`/`data_fine` sono date o istanti ISO (la fine è esclusiva); `modulo` è il
+    nome di un logger o di un suo package ("modules.database" include i sottomoduli).
+    """
+    conditions: list[str] = []
+    params: list[Any] = []
+    if data_inizio:
+        conditions.append("timestamp >= ?")
+        params.append(data_inizio)
+    if data_fine:
+        conditions.append("timestamp < ?")
+        params.append(data_fine)
+    if livelli:
+        conditions.append(f"level IN ({', '.join('?' * len(livelli))})")
+        params.extend(livelli)
+    if modulo:
+        conditions.append("(logger = ? OR logger LIKE ? ESCAPE '\\')")
+        params.extend([modulo, f"{_escape_like(modulo)}.%"])
+    if trace_id:
+        conditions.append("trace_id = ?")
+        params.append(trace_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_db_connection()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM app_logs {where}", params).fetchone()[0]  # nosec B608
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(APP_LOGS_COLUMNS)} FROM app_logs {where} "  # nosec B608
+            "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            conn,
+            params=(*params, limit, offset),
+        )
+        return df, total
+    except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+        # Tabella non ancora creata (database non aggiornato con crea_database.py)
+        logger.error(f"Errore lettura dei log applicativi: {e}")
+        return pd.DataFrame(columns=APP_LOGS_COLUMNS), 0
+    finally:
+        conn.close()
+
+
+def get_app_log_loggers() -> list[str]:
+    """Nomi dei logger presenti nei log importati, in ordine alfabetico."""
+    rows = DatabaseEngine.fetch_all("SELECT DISTINCT logger FROM app_logs ORDER BY logger")
+    return [row["logger"] for row in rows if row["logger"]]
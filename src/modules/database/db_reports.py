@@ -5,14 +5,15 @@ Gestisce il flusso di validazione e la persistenza dei report finali.
 
 import datetime
 import sqlite3
-import uuid
-from typing import Any
+from typing import Any, Literal
 
 import pandas as pd
 
 from constants import VALID_HISTORY_TABLES, VALID_REPORT_TABLES
-from core.database import DatabaseEngine
+from core.database import DatabaseEngine, retry_on_lock
+from core.ids import genera_id
 from core.logging import get_logger, measure_time
+from modules.database.db_tags import index_document_tags
 
 logger = get_logger(__name__)
 
@@ -41,61 +42,143 @@ def delete_reports_by_ids(report_ids: list[str]) -> bool:
     return DatabaseEngine.execute(sql, tuple(report_ids))
 
 
-def process_and_commit_validated_reports(reports: list[dict[str, Any]]) -> bool:
-    """Sposta i report validati dalla coda alla tabella definitiva in modo transazionale."""
+ReportOutcome = Literal["validated", "not_found", "already_validated", "error"]
+
+# Esito per ogni report in staging, calcolato prima di spostare i dati
+_VALIDATION_OUTCOME_SQL = """
+SELECT s.id_report,
+       CASE
+           WHEN q.id_report IS NULL THEN 'not_found'
+           WHEN ri.id_report IS NOT NULL THEN 'already_validated'
+           ELSE 'validated'
+       END AS esito
+FROM temp.validazione_report s
+LEFT JOIN report_da_validare q ON q.id_report = s.id_report
+LEFT JOIN report_interventi ri ON ri.id_report = s.id_report
+"""
+
+_VALIDATION_NOTIFY_SQL = """
+INSERT INTO notifiche
+    (ID_Notifica, Timestamp, Destinatario_Matricola, Messaggio, Stato, Link_Azione)
+SELECT s._id_notifica, ?, s.matricola_tecnico,
+       '✅ Il tuo report per il PdL ' || COALESCE(s.pdl, 'N/D') || ' del ' ||
+       CASE
+           WHEN date(s.data_riferimento_attivita) IS NOT NULL
+               THEN strftime('%d/%m/%Y', s.data_riferimento_attivita)
+           ELSE COALESCE(s.data_riferimento_attivita, '')
+       END || ' è stato validato.',
+       'non letta', '/?tab=Storico'
+FROM temp.validazione_report s
+WHERE s.matricola_tecnico IS NOT NULL
+"""
+
+_VALIDATION_PDL_SQL = """
+UPDATE "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot" AS p
+SET stato = 'VALIDATO', timestamp_validazione = ?
+FROM temp.validazione_report s
+WHERE p.pdl = s.pdl AND p.data_intervento = s.data_riferimento_attivita
+"""
+
+
+@retry_on_lock()
+@measure_time
+def validate_reports_batch(reports: list[dict[str, Any]]) -> dict[str, ReportOutcome]:
+    """
+    Valida un blocco di report con operazioni set-based in un'unica transazione:
+    staging con executemany, INSERT ... SELECT nella tabella definitiva, DELETE dalla
+    coda, notifiche in blocco e UPDATE in join sulla programmazione PdL.
+    Restituisce l'esito per ogni id_report ricevuto.
+    """
+    ids = [r["id_report"] for r in reports]
+    if not ids:
+        return {}
+
     conn = get_db_connection()
+    conn.isolation_level = None  # Gestione esplicita della transazione
     now = datetime.datetime.now().isoformat()
     try:
-        with conn:
-            for r in reports:
-                r["timestamp_validazione"] = now
-                cols = ", ".join(f'"{k}"' for k in r)
-                placeholders = ", ".join("?" for _ in r)
-                sql_ins = f"INSERT INTO report_interventi ({cols}) VALUES ({placeholders})"  # nosec B608
-                conn.execute(sql_ins, tuple(r.values()))
-                conn.execute(
-                    "DELETE FROM report_da_validare WHERE id_report = ?",
-                    (r["id_report"],),
-                )
-
-                # --- AGGIUNTA NOTIFICA PER IL TECNICO ---
-                pdl = r.get("pdl", "N/D")
-                data_rif_raw = r.get("data_riferimento_attivita", "")
-                try:
-                    data_rif = datetime.datetime.fromisoformat(data_rif_raw).strftime("%d/%m/%Y")
-                except Exception:
-                    data_rif = data_rif_raw
-
-                notifica = {
-                    "ID_Notifica": str(uuid.uuid4()),
-                    "Timestamp": now,
-                    "Destinatario_Matricola": r.get("matricola_tecnico"),
-                    "Messaggio": f"✅ Il tuo report per il PdL {pdl} del {data_rif} è stato validato.",
-                    "Stato": "non letta",
-                    "Link_Azione": "/?tab=Storico",  # Porta l'utente allo storico per vedere il report validato
-                }
-                cols_n = ", ".join(f'"{k}"' for k in notifica)
-                placeholders_n = ", ".join("?" for _ in notifica)
-                conn.execute(
-                    f"INSERT INTO notifiche ({cols_n}) VALUES ({placeholders_n})",  # nosec B608
-                    tuple(notifica.values()),
+        # Le colonne presenti solo nell'editor (es. nome/cognome) vengono ignorate
+        cols = [
+            row[1]
+            for row in conn.execute("PRAGMA table_info(report_interventi)").fetchall()
+            if row[1] != "timestamp_validazione"
+        ]
+        col_list = ", ".join(f'"{c}"' for c in cols)
+        # Solo le colonne presenti nei dati ricevuti: le altre restano quelle del report in coda
+        present = [c for c in cols if c == "id_report" or any(c in r for r in reports)]
+        queued = {row[1] for row in conn.execute("PRAGMA table_info(report_da_validare)")}
+        missing = [c for c in cols if c not in present and c in queued]
+        staging_cols = ", ".join([*(f'"{c}"' for c in present), "_id_notifica"])
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DROP TABLE IF EXISTS temp.validazione_report")
+        conn.execute(
+            "CREATE TEMP TABLE validazione_report AS "  # nosec B608
+            f"SELECT {col_list}, '' AS _id_notifica FROM report_interventi WHERE 0"
+        )
+        conn.executemany(
+            f"INSERT INTO temp.validazione_report ({staging_cols}) "  # nosec B608
+            f"VALUES ({', '.join('?' for _ in range(len(present) + 1))})",
+            [(*(r.get(c) for c in present), genera_id("N")) for r in reports],
+        )
+        if missing:
+            conn.execute(
+                "UPDATE temp.validazione_report SET "  # nosec B608
+                + ", ".join(
+                    f'"{c}" = (SELECT q."{c}" FROM report_da_validare q '
+                    "WHERE q.id_report = validazione_report.id_report)"
+                    for c in missing
                 )
+            )
 
-                # --- AGGIORNAMENTO STATO PDL_PROGRAMMAZIONE ---
-                sql_pdl = (
-                    "UPDATE \"pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot\" SET stato = 'VALIDATO', "
-                    "timestamp_validazione = ? WHERE pdl = ? AND data_intervento = ?"
-                )
-                conn.execute(sql_pdl, (now, pdl, r.get("data_riferimento_attivita")))
+        outcomes: dict[str, ReportOutcome] = dict.fromkeys(ids, "not_found")
+        for row in conn.execute(_VALIDATION_OUTCOME_SQL).fetchall():
+            outcomes[row[0]] = row[1]
 
-        return True
+        # Solo i report ancora in coda e non già validati proseguono nella pipeline
+        conn.execute(
+            "DELETE FROM temp.validazione_report WHERE id_report NOT IN "
+            "(SELECT id_report FROM report_da_validare) "
+            "OR id_report IN (SELECT id_report FROM report_interventi)"
+        )
+        conn.execute(
+            f"INSERT INTO report_interventi ({col_list}, timestamp_validazione) "  # nosec B608
+            f"SELECT {col_list}, ? FROM temp.validazione_report",
+            (now,),
+        )
+        index_document_tags(
+            conn, "report_interventi", [i for i, esito in outcomes.items() if esito == "validated"]
+        )
+        conn.execute(
+            "DELETE FROM report_da_validare WHERE id_report IN "
+            "(SELECT id_report FROM temp.validazione_report)"
+        )
+        conn.execute(_VALIDATION_NOTIFY_SQL, (now,))
+        conn.execute(_VALIDATION_PDL_SQL, (now,))
+        conn.execute("COMMIT")
+        return outcomes
+    except sqlite3.OperationalError as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if "locked" in str(e).lower():
+            raise  # Gestito da retry_on_lock
+        logger.error(f"Errore validazione report: {e}")
+        return dict.fromkeys(ids, "error")
     except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
         logger.error(f"Errore validazione report: {e}")
-        return False
+        return dict.fromkeys(ids, "error")
     finally:
         conn.close()
 
 
+def process_and_commit_validated_reports(reports: list[dict[str, Any]]) -> bool:
+    """Sposta i report validati dalla coda alla tabella definitiva in modo transazionale."""
+    outcomes = validate_reports_batch(reports)
+    return all(esito == "validated" for esito in outcomes.values())
+
+
 def get_unvalidated_relazioni() -> pd.DataFrame:
     """Recupera le relazioni di reperibilità inviate ma non ancora validate."""
     conn = get_db_connection()
@@ -105,18 +188,57 @@ def get_unvalidated_relazioni() -> pd.DataFrame:
         conn.close()
 
 
-def process_and_commit_validated_relazioni(df: pd.DataFrame, admin_id: str) -> bool:
-    """Aggiorna lo stato delle relazioni validate memorizzando il validatore."""
-    conn = get_db_connection()
+# Campi della relazione correggibili dal validatore prima dell'approvazione
+RELAZIONE_EDITABLE_COLUMNS = ("pdl", "partner", "ora_inizio", "ora_fine", "corpo_relazione")
+
+
+def _validate_relazione_sql(columns: tuple[str, ...]) -> str:
+    """UPDATE di validazione che scrive esattamente le colonne corrette (anche se svuotate)."""
+    assignments = "".join(f", {c} = ?" for c in columns)
+    return (
+        "UPDATE relazioni SET stato = 'Validata', id_validatore = ?, timestamp_validazione = ?"
+        + assignments  # nosec B608
+        + " WHERE id_relazione = ? AND stato = 'Inviata'"
+    )
+
+
+def process_and_commit_validated_relazioni(
+    df: pd.DataFrame, admin_id: str, original_df: pd.DataFrame | None = None
+) -> bool:
+    """
+    Valida le relazioni selezionate con un executemany per ogni insieme di colonne corrette.
+    Se il DataFrame ha la colonna 'valida' vengono elaborate solo le righe spuntate;
+    confrontando con `original_df` si scrivono solo i campi effettivamente corretti,
+    compresi quelli svuotati volontariamente (scritti come NULL).
+    """
+    selected = df[df["valida"].fillna(False).astype(bool)] if "valida" in df.columns else df
+    if selected.empty:
+        return True
+
+    originals: dict[str, dict[str, Any]] = {}
+    if original_df is not None and not original_df.empty:
+        originals = original_df.set_index("id_relazione").to_dict("index")
+
     now = datetime.datetime.now().isoformat()
+    batches: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+    for row in selected.to_dict("records"):
+        before = originals.get(row["id_relazione"], {})
+        changed = tuple(
+            c
+            for c in RELAZIONE_EDITABLE_COLUMNS
+            if c in row and before and not _same_value(row[c], before.get(c))
+        )
+        values = [None if pd.isna(row[c]) else row[c] for c in changed]
+        batches.setdefault(changed, []).append((admin_id, now, *values, row["id_relazione"]))
+
+    conn = get_db_connection()
     try:
         with conn:
-            for _, row in df.iterrows():
-                sql_upd = (
-                    "UPDATE relazioni SET stato = 'Validata', id_validatore = ?, "
-                    "timestamp_validazione = ? WHERE id_relazione = ?"
-                )
-                conn.execute(sql_upd, (admin_id, now, row["id_relazione"]))
+            for columns, params in batches.items():
+                conn.executemany(_validate_relazione_sql(columns), params)
+            # Il validatore può aver corretto il testo: si aggiornano i TAG indicizzati
+            edited = [p[-1] for cols, params in batches.items() if cols for p in params]
+            index_document_tags(conn, "relazioni", edited)
         return True
     except sqlite3.Error as e:
         logger.error(f"Errore validazione relazioni: {e}")
@@ -125,20 +247,78 @@ def process_and_commit_validated_relazioni(df: pd.DataFrame, admin_id: str) -> b
         conn.close()
 
 
-def salva_report_intervento(dati: dict[str, Any]) -> bool:
-    """Inserisce un report di intervento direttamente nella tabella definitiva."""
+def _same_value(a: Any, b: Any) -> bool:
+    """Confronto tra celle dell'editor che tratta NaN/None come equivalenti."""
+    if pd.isna(a) and pd.isna(b):
+        return True
+    return bool(a == b)
+
+
+def validate_relazioni_bulk(
+    admin_id: str,
+    tecnico: str | None = None,
+    data_da: str | None = None,
+    data_a: str | None = None,
+) -> int:
+    """
+    Valida in un'unica istruzione tutte le relazioni inviate che rispettano i filtri
+    (tecnico compilatore e intervallo di date ISO).
+    Restituisce il numero di relazioni validate, -1 in caso di errore.
+    """
+    conditions = ["stato = 'Inviata'"]
+    params: list[Any] = [admin_id, datetime.datetime.now().isoformat()]
+    if tecnico:
+        conditions.append("tecnico_compilatore = ?")
+        params.append(tecnico)
+    if data_da:
+        conditions.append("date(data_intervento) >= date(?)")
+        params.append(data_da)
+    if data_a:
+        conditions.append("date(data_intervento) <= date(?)")
+        params.append(data_a)
+
+    sql = (
+        "UPDATE relazioni SET stato = 'Validata', id_validatore = ?, timestamp_validazione = ? "
+        f"WHERE {' AND '.join(conditions)}"  # nosec B608
+    )
+    conn = get_db_connection()
+    try:
+        with conn:
+            return conn.execute(sql, tuple(params)).rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore validazione massiva relazioni: {e}")
+        return -1
+    finally:
+        conn.close()
+
+
+def _insert_and_index(table_name: str, id_col: str, dati: dict[str, Any]) -> bool:
+    """Inserisce un documento e ne indicizza i TAG nella stessa transazione."""
     cols = ", ".join(f'"{k}"' for k in dati)
     placeholders = ", ".join("?" for _ in dati)
-    sql = f"INSERT INTO report_interventi ({cols}) VALUES ({placeholders})"  # nosec B608
-    return DatabaseEngine.execute(sql, tuple(dati.values()))
+    sql = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"  # nosec B608
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute(sql, tuple(dati.values()))
+            if dati.get(id_col):
+                index_document_tags(conn, table_name, [dati[id_col]])
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Errore inserimento in {table_name}: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def salva_report_intervento(dati: dict[str, Any]) -> bool:
+    """Inserisce un report di intervento direttamente nella tabella definitiva."""
+    return _insert_and_index("report_interventi", "id_report", dati)
 
 
 def salva_relazione(dati: dict[str, Any]) -> bool:
     """Inserisce una nuova relazione di reperibilità nel database."""
-    cols = ", ".join(f'"{k}"' for k in dati)
-    placeholders = ", ".join("?" for _ in dati)
-    sql = f"INSERT INTO relazioni ({cols}) VALUES ({placeholders})"  # nosec B608
-    return DatabaseEngine.execute(sql, tuple(dati.values()))
+    return _insert_and_index("relazioni", "id_relazione", dati)
 
 
 def get_validated_reports(table_name: str) -> pd.DataFrame:
@@ -239,6 +419,8 @@ def insert_report(report_data: dict[str, Any], table_name: str) -> bool:
                         "timestamp_invio_report = ? WHERE (pdl = ? OR pdl = ?) AND data_intervento = ?"
                     )
                     conn.execute(sql_pdl, (now, pdl_clean, f"PdL {pdl_clean}", data_rif))
+            elif report_id:
+                index_document_tags(conn, table_name, [report_id])
         return True
     except sqlite3.Error as e:
         logger.error(f"Errore inserimento report in {table_name}: {e}")
@@ -265,6 +447,9 @@ def move_report_atomically(report_id: str, source_table: str, dest_table: str) -
             conn.execute(sql_ins, tuple(report.values()))
             sql_del = f"DELETE FROM {source_table} WHERE id_report = ?"  # nosec B608
             conn.execute(sql_del, (report_id,))
+            # Solo report_interventi è indicizzata: i TAG seguono il report
+            for table in (source_table, dest_table):
+                index_document_tags(conn, table, [report_id])
         return True
     except sqlite3.Error as e:
         logger.error(f"Errore spostamento atomico report {report_id}: {e}")
@@ -0,0 +1,218 @@
+"""
+Ricerca full-text (SQLite FTS5) su report di intervento, relazioni e programmazione PdL.
+Gli indici sono tabelle FTS5 a contenuto esterno, mantenute allineate da trigger:
+il testo non viene duplicato e la ricerca non carica mai l'intero storico in memoria.
+"""
+
+import re
+import sqlite3
+from typing import Any
+
+import pandas as pd
+
+from constants import PROGRAMMAZIONE_TABLE
+from core.database import DatabaseEngine
+from core.logging import get_logger, measure_time
+
+logger = get_logger(__name__)
+
+# Tokenizzazione adatta all'italiano: lettere accentate equivalenti alle non accentate
+# ("attività" = "attivita") e apostrofo come separatore ("dell'aria" -> "dell", "aria").
+# FTS5 non ha uno stemmer italiano: le varianti delle parole sono coperte dalla ricerca per prefisso.
+FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+# Indici dei prefissi da 2 a 4 caratteri: le ricerche mentre si digita non scansionano l'indice
+FTS_PREFIX = "2 3 4"
+
+# Tabella di origine -> indice FTS, colonne indicizzate (con peso bm25), colonna data,
+# condizione che identifica i documenti validati ed eventuale tokenizer specifico
+FTS_INDEXES: dict[str, dict[str, Any]] = {
+    "report_interventi": {
+        "fts": "report_interventi_fts",
+        "columns": {
+            "pdl": 3.0,
+            "descrizione_attivita": 2.0,
+            "nome_tecnico": 1.0,
+            "testo_report": 1.0,
+        },
+        "date_column": "data_riferimento_attivita",
+        "validated": "d.timestamp_validazione IS NOT NULL",
+    },
+    "relazioni": {
+        "fts": "relazioni_fts",
+        "columns": {"pdl": 3.0, "tecnico_compilatore": 1.0, "partner": 1.0, "corpo_relazione": 1.0},
+        "date_column": "data_intervento",
+        "validated": "(d.stato = 'Validata' OR d.timestamp_validazione IS NOT NULL)",
+    },
+    PROGRAMMAZIONE_TABLE: {
+        "fts": "programmazione_fts",
+        "columns": {"pdl": 3.0, "team": 2.0, "descrizione": 1.0, "tecnico_assegnato": 1.0},
+        "date_column": "data_intervento",
+        "validated": "d.stato = 'VALIDATO'",
+    },
+    # Nomi delle schede d'archivio: trigrammi per la ricerca di sottostringhe (es. "F015"),
+    # interrogato da modules.archive_manager.search_archive
+    "maintenance_archive": {
+        "fts": "maintenance_archive_fts",
+        "columns": {"filename": 1.0, "tag": 2.0},
+        "date_column": "last_modified",
+        "tokenize": "trigram case_sensitive 0",
+    },
+}
+
+DEFAULT_PAGE_SIZE = 50
+# Numero di token attorno alle corrispondenze nell'estratto
+SNIPPET_TOKENS = 16
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def fts_schema_statements(source: str) -> list[str]:
+    """
+    DDL dell'indice FTS di una tabella: tabella virtuale a contenuto esterno e trigger di
+    allineamento su INSERT, DELETE e UPDATE delle sole colonne indicizzate.
+    """
+    spec = FTS_INDEXES[source]
+    fts = spec["fts"]
+    cols = list(spec["columns"])
+    # Il tokenizer trigram indicizza già tutte le sottostringhe: niente indici dei prefissi
+    options = (
+        f"tokenize='{spec['tokenize']}'"
+        if "tokenize" in spec
+        else f"tokenize='{FTS_TOKENIZER}', prefix='{FTS_PREFIX}'"
+    )
+    col_list = ", ".join(cols)
+    new_values = ", ".join(f"new.{c}" for c in cols)
+    old_values = ", ".join(f"old.{c}" for c in cols)
+    delete_old = (
+        f"INSERT INTO {fts} ({fts}, rowid, {col_list}) VALUES ('delete', old.rowid, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts} (rowid, {col_list}) VALUES (new.rowid, {new_values});"
+    create_table = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({col_list}, "
+        f"content='{source}', content_rowid='rowid', {options})"
+    )
+    trigger = f"CREATE TRIGGER IF NOT EXISTS {fts}"
+    return [
+        create_table,
+        f'{trigger}_ai AFTER INSERT ON "{source}" BEGIN {insert_new} END',
+        f'{trigger}_ad AFTER DELETE ON "{source}" BEGIN {delete_old} END',
+        f'{trigger}_au AFTER UPDATE OF {col_list} ON "{source}" BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def rebuild_fts_index(conn: sqlite3.Connection, source: str) -> None:
+    """Ricostruisce l'indice FTS dal contenuto della tabella di origine."""
+    fts = FTS_INDEXES[source]["fts"]
+    conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")  # nosec B608
+
+
+def build_match_query(testo: str) -> str | None:
+    """
+    Converte il testo digitato in una query FTS5: ogni parola diventa un prefisso e tutte
+    devono comparire ("valv bloc" trova "valvola bloccata"). Virgolette e operatori FTS
+    dell'utente non vengono interpretati. None se il testo non contiene parole.
+    """
+    tokens = _TOKEN_RE.findall(testo)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+@measure_time
+def search_full_text(
+    source: str,
+    testo: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+    data_inizio: str | None = None,
+    data_fine: str | None = None,
+    solo_validati: bool = False,
+    ordina_per_data: bool = False,
+) -> tuple[pd.DataFrame, int]:
+    """
+    Cerca nei documenti di `source` e restituisce una pagina di risultati e il totale.
+    I risultati sono ordinati per rilevanza bm25 (o per data, dalla più recente) e includono
+    la colonna `snippet` con le corrispondenze evidenziate in grassetto Markdown.
+    `data_inizio`/`data_fine` (ISO, inclusivi) filtrano sulla colonna data della tabella.
+    """
+    if source not in FTS_INDEXES:
+        raise ValueError(f"Tabella non indicizzata: {source}")
+    query = build_match_query(testo)
+    if query is None:
+        return pd.DataFrame(), 0
+
+    spec = FTS_INDEXES[source]
+    fts = spec["fts"]
+    weights = ", ".join(str(w) for w in spec["columns"].values())
+    conditions = [f"{fts} MATCH ?"]
+    params: list[Any] = [query]
+    if data_inizio:
+        conditions.append(f"date(d.{spec['date_column']}) >= date(?)")
+        params.append(data_inizio)
+    if data_fine:
+        conditions.append(f"date(d.{spec['date_column']}) <= date(?)")
+        params.append(data_fine)
+    if solo_validati and "validated" in spec:
+        conditions.append(spec["validated"])
+    from_where = (
+        f'FROM {fts} JOIN "{source}" d ON d.rowid = {fts}.rowid '  # nosec B608
+        f"WHERE {' AND '.join(conditions)}"
+    )
+    order_by = f"d.{spec['date_column']} DESC, punteggio" if ordina_per_data else "punteggio"
+
+    conn = get_db_connection()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) {from_where}", params).fetchone()[0]  # nosec B608
+        df = pd.read_sql_query(
+            f"SELECT d.*, bm25({fts}, {weights}) AS punteggio, "  # nosec B608
+            f"snippet({fts}, -1, '**', '**', '…', {SNIPPET_TOKENS}) AS snippet "
+            f"{from_where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+            conn,
+            params=(*params, limit, offset),
+        )
+        return df, total
+    except sqlite3.OperationalError as e:
+        # Indice non ancora creato (database non aggiornato con crea_database.py)
+        logger.error(f"Errore ricerca full-text su {source}: {e}")
+        return pd.DataFrame(), 0
+    finally:
+        conn.close()
+
+
+# Colonne della programmazione mostrate nelle viste (come in get_pdl_programmazione)
+PROGRAMMAZIONE_COLUMNS = [
+    "pdl",
+    "data_intervento",
+    "tecnico_assegnato",
+    "descrizione",
+    "team",
+    "stato",
+    "tipo",
+    "timestamp_pianificazione",
+    "timestamp_invio_report",
+    "timestamp_validazione",
+]
+PROGRAMMAZIONE_SEARCH_LIMIT = 1000
+
+
+def search_pdl_programmazione(testo: str, data_inizio: str, data_fine: str) -> pd.DataFrame:
+    """
+    Ricerca full-text nella programmazione PdL di un intervallo di date, con le stesse
+    colonne e lo stesso ordinamento (data decrescente) di `get_pdl_programmazione`.
+    """
+    df, _ = search_full_text(
+        PROGRAMMAZIONE_TABLE,
+        testo,
+        limit=PROGRAMMAZIONE_SEARCH_LIMIT,
+        data_inizio=data_inizio,
+        data_fine=data_fine,
+        ordina_per_data=True,
+    )
+    if df.empty:
+        return pd.DataFrame(columns=PROGRAMMAZIONE_COLUMNS)
+    return df[PROGRAMMAZIONE_COLUMNS]
@@ -3,12 +3,14 @@ Funzioni database per la gestione di turni, prenotazioni e bacheca scambi.
 Gestisce l'allocazione del personale e la cronologia delle modifiche ai turni.
 """
 
+import datetime
 import sqlite3
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Literal
 
 import pandas as pd
 
-from core.database import DatabaseEngine
+from core.database import DatabaseEngine, retry_on_lock
 from core.logging import get_logger, measure_time
 
 logger = get_logger(__name__)
@@ -33,6 +35,77 @@ def get_shifts_by_type(shift_type: str) -> pd.DataFrame:
         conn.close()
 
 
+# Occupazione pre-aggregata: una sola scansione di prenotazioni raggruppata per turno,
+# invece di filtrare l'intero DataFrame delle prenotazioni per ogni card.
+SHIFT_OCCUPANCY_SQL = """
+    WITH occupazione AS (
+        SELECT p.ID_Turno,
+               SUM(p.RuoloOccupato = 'Tecnico') AS booked_tecnico,
+               SUM(p.RuoloOccupato = 'Aiutante') AS booked_aiutante,
+               MAX(p.Matricola = ?) AS user_booked,
+               GROUP_CONCAT(
+                   COALESCE(c."Nome Cognome", 'N/D') || ' (' || p.RuoloOccupato || ')', ', '
+               ) AS booked_names
+        FROM prenotazioni p
+        JOIN turni tt ON tt.ID_Turno = p.ID_Turno AND tt.Tipo = ?
+        LEFT JOIN contatti c ON c.Matricola = p.Matricola
+        GROUP BY p.ID_Turno
+    )
+    SELECT t.*,
+           COALESCE(o.booked_tecnico, 0) AS booked_tecnico,
+           COALESCE(o.booked_aiutante, 0) AS booked_aiutante,
+           COALESCE(o.user_booked, 0) AS user_booked,
+           COALESCE(o.booked_names, '') AS booked_names,
+           COUNT(*) OVER () AS total_count
+    FROM turni t
+    LEFT JOIN occupazione o ON o.ID_Turno = t.ID_Turno
+    WHERE {where}
+    ORDER BY t.Data DESC
+    LIMIT ? OFFSET ?
+"""
+
+
+@measure_time
+def get_shifts_occupancy(
+    shift_type: str,
+    matricola: str,
+    only_available: bool = False,
+    from_date: str | None = None,
+    search: str | None = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> pd.DataFrame:
+    """
+    Carica una pagina di turni con l'occupazione già calcolata in SQL.
+    Ogni riga include booked_tecnico, booked_aiutante, booked_names, user_booked
+    e total_count (numero totale di turni che soddisfano i filtri, per la paginazione).
+    """
+    conditions = ["t.Tipo = ?"]
+    filter_params: list[Any] = [shift_type]
+    if from_date:
+        conditions.append("date(t.Data) >= date(?)")
+        filter_params.append(from_date)
+    if search:
+        conditions.append("t.Descrizione LIKE ?")
+        filter_params.append(f"%{search}%")
+    if only_available:
+        conditions.append(
+            "(COALESCE(o.booked_tecnico, 0) < t.PostiTecnico "
+            "OR COALESCE(o.booked_aiutante, 0) < t.PostiAiutante)"
+        )
+
+    query = SHIFT_OCCUPANCY_SQL.format(where=" AND ".join(conditions))  # nosec B608
+    params = (str(matricola), shift_type, *filter_params, limit, offset)
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    except sqlite3.Error as e:
+        logger.error(f"Errore nel caricare l'occupazione dei turni '{shift_type}': {e}")
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+
 def create_shift(data: dict[str, Any]) -> bool:
     """Crea un nuovo turno operativo nel sistema."""
     cols = ", ".join(f'"{k}"' for k in data)
@@ -91,6 +164,112 @@ def add_booking(data: dict[str, Any]) -> bool:
     return DatabaseEngine.execute(sql, tuple(data.values()))
 
 
+BookingStatus = Literal["booked", "not_found", "oncall_conflict", "already_booked", "full", "error"]
+
+
+@dataclass(frozen=True)
+class BookingResult:
+    """Esito tipizzato di un tentativo di prenotazione atomica."""
+
+    status: BookingStatus
+    booking_id: str | None = None
+    data_turno: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Indica se la prenotazione è stata effettivamente registrata."""
+        return self.status == "booked"
+
+
+_BOOKING_PRECHECK_SQL = """
+    SELECT t.Data,
+           EXISTS(
+               SELECT 1 FROM prenotazioni rp
+               JOIN turni rt ON rt.ID_Turno = rp.ID_Turno
+               WHERE rp.Matricola = ? AND rt.Data = t.Data AND rt.Tipo = 'Reperibilità'
+           ) AS oncall_conflict,
+           EXISTS(
+               SELECT 1 FROM prenotazioni bp
+               WHERE bp.ID_Turno = t.ID_Turno AND bp.Matricola = ?
+           ) AS already_booked
+    FROM turni t
+    WHERE t.ID_Turno = ?
+"""
+
+# L'inserimento avviene solo se i posti occupati per il ruolo sono inferiori a quelli previsti:
+# il controllo e la scrittura sono un'unica istruzione, quindi non esiste una finestra di race.
+_BOOKING_INSERT_SQL = """
+    INSERT INTO prenotazioni (ID_Prenotazione, ID_Turno, Matricola, RuoloOccupato, Timestamp)
+    SELECT ?, t.ID_Turno, ?, ?, ?
+    FROM turni t
+    WHERE t.ID_Turno = ?
+      AND (
+          SELECT COUNT(*) FROM prenotazioni p
+          WHERE p.ID_Turno = t.ID_Turno AND p.RuoloOccupato = ?
+      ) < CASE ? WHEN 'Tecnico' THEN t.PostiTecnico ELSE t.PostiAiutante END
+"""
+
+
+@retry_on_lock()
+@measure_time
+def book_shift_atomically(
+    booking_id: str, turno_id: str, matricola: str, ruolo: str
+) -> BookingResult:
+    """
+    Prenota un posto in un'unica transazione BEGIN IMMEDIATE: verifica del turno,
+    conflitto con la reperibilità, prenotazione duplicata e posti residui.
+    """
+    conn = get_db_connection()
+    conn.isolation_level = None  # Gestione esplicita della transazione
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(_BOOKING_PRECHECK_SQL, (matricola, matricola, turno_id)).fetchone()
+        if row is None:
+            conn.execute("ROLLBACK")
+            return BookingResult("not_found")
+
+        data_turno = row["Data"]
+        if row["oncall_conflict"]:
+            conn.execute("ROLLBACK")
+            return BookingResult("oncall_conflict", data_turno=data_turno)
+        if row["already_booked"]:
+            conn.execute("ROLLBACK")
+            return BookingResult("already_booked", data_turno=data_turno)
+
+        cursor = conn.execute(
+            _BOOKING_INSERT_SQL,
+            (
+                booking_id,
+                matricola,
+                ruolo,
+                datetime.datetime.now().isoformat(),
+                turno_id,
+                ruolo,
+                ruolo,
+            ),
+        )
+        if cursor.rowcount == 0:
+            conn.execute("ROLLBACK")
+            return BookingResult("full", data_turno=data_turno)
+
+        conn.execute("COMMIT")
+        return BookingResult("booked", booking_id=booking_id, data_turno=data_turno)
+    except sqlite3.OperationalError as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if "locked" in str(e).lower():
+            raise  # Gestito da retry_on_lock
+        logger.error(f"Errore prenotazione atomica turno {turno_id}: {e}")
+        return BookingResult("error")
+    except sqlite3.Error as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.error(f"Errore prenotazione atomica turno {turno_id}: {e}")
+        return BookingResult("error")
+    finally:
+        conn.close()
+
+
 def delete_booking(booking_id: str, shift_id: str) -> bool:
     """Elimina una specifica prenotazione da un turno."""
     sql = "DELETE FROM prenotazioni WHERE ID_Prenotazione = ? AND ID_Turno = ?"
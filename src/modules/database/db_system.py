@@ -73,6 +73,55 @@ def add_notification(n: dict[str, Any]) -> bool:
     return DatabaseEngine.execute(sql, tuple(n.values()))
 
 
+# Destinatari idonei calcolati in SQL: account attivo, ruolo compatibile con il posto offerto,
+# nessuna reperibilità (o prenotazione sullo stesso turno) nella data, escluso chi pubblica.
+_SHIFT_FANOUT_SQL = """
+    INSERT INTO notifiche
+        (ID_Notifica, Timestamp, Destinatario_Matricola, Messaggio, Stato, Link_Azione)
+    SELECT ? || '_' || c.Matricola, ?, c.Matricola, ?, 'non letta', ?
+    FROM contatti c
+    JOIN turni t ON t.ID_Turno = ?
+    WHERE c.Matricola <> COALESCE(?, '')
+      AND COALESCE(c.Stato, 'Attivo') <> 'Disabilitato'
+      AND NOT (COALESCE(?, '') = 'Tecnico' AND c.Ruolo = 'Aiutante')
+      AND NOT EXISTS (
+          SELECT 1 FROM prenotazioni p
+          JOIN turni r ON r.ID_Turno = p.ID_Turno
+          WHERE p.Matricola = c.Matricola
+            AND (r.ID_Turno = t.ID_Turno OR (r.Data = t.Data AND r.Tipo = 'Reperibilità'))
+      )
+"""
+
+
+def fan_out_shift_notification(
+    conn: sqlite3.Connection,
+    event_id: str,
+    turno_id: str,
+    messaggio: str,
+    ruolo_richiesto: str | None = None,
+    escludi_matricola: str | None = None,
+    link_azione: str = "",
+) -> int:
+    """
+    Inserisce con un'unica istruzione una notifica per ogni utente idoneo al turno.
+    Gli ID sono derivati da event_id e dalla matricola, quindi non collidono tra loro.
+    Restituisce il numero di notifiche create. La transazione è gestita dal chiamante.
+    """
+    cursor = conn.execute(
+        _SHIFT_FANOUT_SQL,
+        (
+            event_id,
+            datetime.datetime.now().isoformat(),
+            messaggio,
+            link_azione,
+            turno_id,
+            escludi_matricola,
+            ruolo_richiesto,
+        ),
+    )
+    return max(cursor.rowcount, 0)
+
+
 def count_unread_notifications(matricola: str) -> int:
     """Restituisce il numero di notifiche pendenti (non lette) per l'utente."""
     query = "SELECT COUNT(*) as count FROM notifiche WHERE Destinatario_Matricola = ? AND Stato = 'non letta'"
@@ -80,14 +129,155 @@ def count_unread_notifications(matricola: str) -> int:
     return res["count"] if res else 0
 
 
-def save_table_data(df: pd.DataFrame, table_name: str) -> bool:
-    """Sincronizza integralmente una tabella del DB partendo da un DataFrame Pandas."""
+def get_latest_notifications(
+    matricola: str, limit: int = 20, offset: int = 0
+) -> list[dict[str, Any]]:
+    """Recupera una pagina delle notifiche più recenti di un utente."""
+    query = (
+        "SELECT ID_Notifica, Timestamp, Messaggio, Stato, Link_Azione FROM notifiche "
+        "WHERE Destinatario_Matricola = ? ORDER BY Timestamp DESC LIMIT ? OFFSET ?"
+    )
+    return DatabaseEngine.fetch_all(query, (matricola, limit, offset))
+
+
+def mark_notifications_read(matricola: str, notification_ids: list[str]) -> int:
+    """Segna come lette, con una sola istruzione, le notifiche indicate dell'utente."""
+    if not notification_ids:
+        return 0
+    placeholders = ", ".join("?" for _ in notification_ids)
+    sql = (
+        "UPDATE notifiche SET Stato = 'letta' "  # nosec B608
+        f"WHERE Destinatario_Matricola = ? AND Stato = 'non letta' AND ID_Notifica IN ({placeholders})"
+    )
     conn = get_db_connection()
     try:
-        df.to_sql(table_name, conn, if_exists="replace", index=False)
+        with conn:
+            return conn.execute(sql, (matricola, *notification_ids)).rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore aggiornamento notifiche per {matricola}: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def archive_read_notifications(older_than: str) -> int:
+    """
+    Sposta in notifiche_archivio le notifiche lette più vecchie della data indicata (ISO).
+    Copia e cancellazione avvengono nella stessa transazione.
+    """
+    where = "Stato = 'letta' AND Timestamp < ?"
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO notifiche_archivio "  # nosec B608
+                "(ID_Notifica, Timestamp, Destinatario_Matricola, Messaggio, Stato, "
+                "Link_Azione, Timestamp_Archiviazione) "
+                "SELECT ID_Notifica, Timestamp, Destinatario_Matricola, Messaggio, Stato, "
+                f"Link_Azione, ? FROM notifiche WHERE {where}",
+                (datetime.datetime.now().isoformat(), older_than),
+            )
+            cursor = conn.execute(f"DELETE FROM notifiche WHERE {where}", (older_than,))  # nosec B608
+            return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Errore archiviazione notifiche: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def get_table_key_columns(table_name: str) -> list[str]:
+    """
+    Restituisce le colonne di chiave primaria di una tabella, nell'ordine della chiave.
+    Per le tabelle senza chiave esplicita si usa il rowid implicito di SQLite.
+    """
+    rows = DatabaseEngine.fetch_all(f'PRAGMA table_info("{table_name}")')
+    pk = sorted((row["pk"], row["name"]) for row in rows if row["pk"])
+    return [name for _, name in pk] or ["rowid"]
+
+
+def get_table_page(table_name: str, limit: int, offset: int = 0) -> tuple[pd.DataFrame, int]:
+    """
+    Legge una pagina di una tabella ordinata per chiave primaria e il numero totale di righe.
+    Se la tabella non ha chiave esplicita il rowid viene incluso come prima colonna.
+    """
+    if table_name not in get_table_names():
+        raise ValueError(f"Tabella non valida: {table_name}")
+    keys = get_table_key_columns(table_name)
+    order_by = ", ".join(f'"{k}"' for k in keys)
+    select = "rowid, *" if keys == ["rowid"] else "*"
+    conn = get_db_connection()
+    try:
+        total = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]  # nosec B608
+        df = pd.read_sql_query(
+            f'SELECT {select} FROM "{table_name}" ORDER BY {order_by} LIMIT ? OFFSET ?',  # nosec B608
+            conn,
+            params=(limit, offset),
+        )
+        return df, total
+    finally:
+        conn.close()
+
+
+def apply_table_changes(
+    table_name: str,
+    updates: list[tuple[dict[str, Any], dict[str, Any]]],
+    inserts: list[dict[str, Any]],
+    deletes: list[dict[str, Any]],
+) -> bool:
+    """
+    Applica un change-set alla tabella in un'unica transazione: UPDATE delle sole celle
+    modificate, INSERT delle nuove righe e DELETE per chiave primaria.
+    `updates` contiene coppie (chiave, colonne modificate); `deletes` le chiavi da rimuovere.
+    """
+    if table_name not in get_table_names():
+        logger.error(f"Salvataggio rifiutato: tabella non valida {table_name}")
+        return False
+
+    keys = get_table_key_columns(table_name)
+    columns = {
+        row["name"] for row in DatabaseEngine.fetch_all(f'PRAGMA table_info("{table_name}")')
+    }
+    columns.update(keys)
+    touched = {c for _, changes in updates for c in changes} | {c for row in inserts for c in row}
+    if not touched <= columns:
+        logger.error(f"Colonne sconosciute per {table_name}: {sorted(touched - columns)}")
+        return False
+
+    where = " AND ".join(f'"{k}" IS ?' for k in keys)
+    conn = get_db_connection()
+    try:
+        with conn:
+            if deletes:
+                conn.executemany(
+                    f'DELETE FROM "{table_name}" WHERE {where}',  # nosec B608
+                    [tuple(key[k] for k in keys) for key in deletes],
+                )
+            for key, changes in updates:
+                if not changes:
+                    continue
+                assignments = ", ".join(f'"{c}" = ?' for c in changes)
+                conn.execute(
+                    f'UPDATE "{table_name}" SET {assignments} WHERE {where}',  # nosec B608
+                    (*changes.values(), *(key[k] for k in keys)),
+                )
+            # Le righe nuove vengono raggruppate per insieme di colonne valorizzate
+            grouped: dict[tuple[str, ...], list[tuple[Any, ...]]] = {}
+            for row in inserts:
+                values = {c: v for c, v in row.items() if c != "rowid" and v is not None}
+                grouped.setdefault(tuple(values), []).append(tuple(values.values()))
+            for cols, rows in grouped.items():
+                if not cols:
+                    continue
+                col_list = ", ".join(f'"{c}"' for c in cols)
+                placeholders = ", ".join("?" for _ in cols)
+                conn.executemany(
+                    f'INSERT INTO "{table_name}" ({col_list}) VALUES ({placeholders})',  # nosec B608
+                    rows,
+                )
         return True
     except sqlite3.Error as e:
-        logger.error(f"Errore sovrascrittura tabella {table_name}: {e}")
+        logger.error(f"Errore salvataggio modifiche tabella {table_name}: {e}")
         return False
     finally:
         conn.close()
@@ -103,10 +293,21 @@ def get_table_data(table_name: str) -> pd.DataFrame:
 
 
 def get_table_names() -> list[str]:
-    """Interroga lo schema SQLite per ottenere l'elenco delle tabelle non di sistema."""
-    query = "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+    """
+    Interroga lo schema SQLite per ottenere l'elenco delle tabelle non di sistema.
+    Sono escluse le tabelle virtuali (indici full-text) e le relative tabelle ombra.
+    """
+    query = "SELECT name, sql FROM sqlite_master WHERE type='table' ORDER BY name"
     rows = DatabaseEngine.fetch_all(query)
-    return [row["name"] for row in rows if not row["name"].startswith("sqlite_")]
+    virtual = [
+        row["name"] for row in rows if (row.get("sql") or "").upper().startswith("CREATE VIRTUAL")
+    ]
+    return [
+        row["name"]
+        for row in rows
+        if not row["name"].startswith("sqlite_")
+        and not any(row["name"] == v or row["name"].startswith(f"{v}_") for v in virtual)
+    ]
 
 
 def get_pdl_programmazione(data_inizio: str, data_fine: str) -> pd.DataFrame:
@@ -0,0 +1,141 @@
+"""
+Funzioni database per l'indice inverso dei TAG di strumentazione.
+Ogni TAG ISA citato nei report di intervento e nelle relazioni è registrato in
+'tag_occurrences', così lo storico di uno strumento si ottiene con una query indicizzata.
+"""
+
+import re
+import sqlite3
+from collections import Counter
+from collections.abc import Iterable
+
+import pandas as pd
+
+from core.database import DatabaseEngine
+from core.logging import get_logger, measure_time
+from modules.instrumentation_logic import find_and_analyze_tags
+
+logger = get_logger(__name__)
+
+# Tabella di origine -> (chiave primaria, colonna di testo, colonna data)
+TAG_SOURCES = {
+    "report_interventi": ("id_report", "testo_report", "data_riferimento_attivita"),
+    "relazioni": ("id_relazione", "corpo_relazione", "data_intervento"),
+}
+
+# Documenti elaborati per blocco (lettura dello storico e liste di id nelle IN)
+REINDEX_BATCH_SIZE = 500
+
+_INSERT_OCCURRENCE_SQL = (
+    "INSERT INTO tag_occurrences "
+    "(tag, loop, tabella_origine, id_origine, data_riferimento, occorrenze) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+_TIMELINE_SQL = """
+SELECT t.data_riferimento, t.tabella_origine, t.id_origine, t.tag, t.loop, t.occorrenze,
+       COALESCE(ri.pdl, r.pdl) AS pdl,
+       COALESCE(ri.nome_tecnico, r.tecnico_compilatore) AS tecnico,
+       COALESCE(ri.testo_report, r.corpo_relazione) AS testo
+FROM tag_occurrences t
+LEFT JOIN report_interventi ri
+    ON t.tabella_origine = 'report_interventi' AND ri.id_report = t.id_origine
+LEFT JOIN relazioni r
+    ON t.tabella_origine = 'relazioni' AND r.id_relazione = t.id_origine
+WHERE t.tag = ?
+  -- Documenti eliminati dopo l'ultima indicizzazione non compaiono nello storico
+  AND (ri.id_report IS NOT NULL OR r.id_relazione IS NOT NULL)
+ORDER BY t.data_riferimento DESC
+LIMIT ?
+"""
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Restituisce una connessione al database core."""
+    return DatabaseEngine.get_connection()
+
+
+def _occurrence_rows(
+    source: str, rows: Iterable[tuple[str, str | None, str | None]]
+) -> list[tuple[str, str, str, str, str | None, int]]:
+    """Righe di 'tag_occurrences' per i documenti (id, testo, data) di una tabella."""
+    params = []
+    for doc_id, testo, data in rows:
+        _, tags = find_and_analyze_tags(testo or "")
+        counts = Counter(t["tag"] for t in tags)
+        loops = {t["tag"]: t["loop"] for t in tags}
+        params.extend((tag, loops[tag], source, doc_id, data, n) for tag, n in counts.items())
+    return params
+
+
+def index_document_tags(conn: sqlite3.Connection, source: str, ids: list[str]) -> int:
+    """
+    Reindicizza i TAG dei documenti indicati usando la connessione del chiamante, così
+    l'indice viene aggiornato nella stessa transazione della scrittura del documento.
+    I documenti non più presenti nella tabella di origine vengono rimossi dall'indice.
+    Restituisce il numero di occorrenze scritte.
+    """
+    if source not in TAG_SOURCES or not ids:
+        return 0
+    id_col, text_col, date_col = TAG_SOURCES[source]
+    written = 0
+    for start in range(0, len(ids), REINDEX_BATCH_SIZE):
+        chunk = ids[start : start + REINDEX_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in chunk)
+        conn.execute(
+            f"DELETE FROM tag_occurrences WHERE tabella_origine = ? "  # nosec B608
+            f"AND id_origine IN ({placeholders})",
+            (source, *chunk),
+        )
+        rows = conn.execute(
+            f"SELECT {id_col}, {text_col}, {date_col} FROM {source} "  # nosec B608
+            f"WHERE {id_col} IN ({placeholders})",
+            tuple(chunk),
+        ).fetchall()
+        params = _occurrence_rows(source, (tuple(r) for r in rows))
+        conn.executemany(_INSERT_OCCURRENCE_SQL, params)
+        written += len(params)
+    return written
+
+
+@measure_time
+def reindex_all_tags(batch_size: int = REINDEX_BATCH_SIZE) -> int:
+    """
+    Ricostruisce da zero l'indice dei TAG su tutti i report e le relazioni, in un'unica
+    transazione (i lettori vedono il vecchio indice fino al commit).
+    Restituisce il numero di occorrenze indicizzate, -1 in caso di errore.
+    """
+    conn = get_db_connection()
+    total = 0
+    try:
+        with conn:
+            conn.execute("DELETE FROM tag_occurrences")
+            for source, (id_col, text_col, date_col) in TAG_SOURCES.items():
+                cursor = conn.execute(
+                    f"SELECT {id_col}, {text_col}, {date_col} FROM {source}"  # nosec B608
+                )
+                while batch := cursor.fetchmany(batch_size):
+                    params = _occurrence_rows(source, (tuple(r) for r in batch))
+                    conn.executemany(_INSERT_OCCURRENCE_SQL, params)
+                    total += len(params)
+        logger.info(f"Indice TAG ricostruito: {total} occorrenze.")
+        return total
+    except sqlite3.Error as e:
+        logger.error(f"Errore ricostruzione indice TAG: {e}")
+        return -1
+    finally:
+        conn.close()
+
+
+def get_tag_timeline(tag: str, limit: int = 500) -> pd.DataFrame:
+    """
+    Storico degli interventi che citano un TAG (report e relazioni), dal più recente.
+    Il TAG viene normalizzato come nel testo indicizzato: maiuscolo, senza separatori
+    (es. "pt-101" -> "PT101").
+    """
+    tag = re.sub(r"[^A-Z0-9]", "", tag.upper())
+    conn = get_db_connection()
+    try:
+        return pd.read_sql_query(_TIMELINE_SQL, conn, params=(tag, limit))
+    finally:
+        conn.close()
@@ -3,6 +3,29 @@ Interfaccia di gestione del database SQLite (Facade).
 Riesporta le funzioni dai moduli specializzati per mantenere la compatibilità.
 """
 
+from modules.database.db_ai_cache import get_cached_ai_response, store_ai_response
+from modules.database.db_ai_jobs import (
+    claim_ai_jobs,
+    complete_ai_job,
+    count_queued_ai_jobs,
+    enqueue_ai_job,
+    enqueue_relazioni_prereview,
+    fail_ai_job,
+    get_ai_job,
+    get_ai_prereviews,
+    release_stale_ai_jobs,
+    touch_ai_jobs,
+    update_ai_job_partial,
+)
+from modules.database.db_email import (
+    claim_email_batch,
+    enqueue_email,
+    get_outbox_status,
+    mark_emails_sent,
+    release_stale_emails,
+    reschedule_email,
+)
+from modules.database.db_logs import get_app_log_loggers, get_app_logs
 from modules.database.db_reports import (
     annulla_invio_report,
     delete_report_by_id,
@@ -19,6 +42,8 @@ from modules.database.db_reports import (
     process_and_commit_validated_reports,
     salva_relazione,
     salva_report_intervento,
+    validate_relazioni_bulk,
+    validate_reports_batch,
 )
 from modules.database.db_requests import (
     add_material_request,
@@ -26,10 +51,13 @@ from modules.database.db_requests import (
     get_storico_richieste_materiali,
     salva_storico_materiali,
 )
+from modules.database.db_search import search_full_text, search_pdl_programmazione
 from modules.database.db_shifts import (
+    BookingResult,
     add_bacheca_item,
     add_booking,
     add_shift_log,
+    book_shift_atomically,
     check_user_oncall_conflict,
     create_shift,
     delete_booking,
@@ -42,6 +70,7 @@ from modules.database.db_shifts import (
     get_bookings_for_shift,
     get_shift_by_id,
     get_shifts_by_type,
+    get_shifts_occupancy,
     update_bacheca_item,
     update_booking_user,
     update_shift,
@@ -49,16 +78,23 @@ from modules.database.db_shifts import (
 from modules.database.db_system import (
     add_assignment_exclusion,
     add_notification,
+    apply_table_changes,
+    archive_read_notifications,
     count_unread_notifications,
+    fan_out_shift_notification,
     get_all_exclusions,
     get_excluded_activities_for_user,
     get_globally_excluded_activities,
+    get_latest_notifications,
     get_notifications_for_user,
     get_pdl_programmazione,
     get_table_data,
+    get_table_key_columns,
     get_table_names,
-    save_table_data,
+    get_table_page,
+    mark_notifications_read,
 )
+from modules.database.db_tags import get_tag_timeline, reindex_all_tags
 from modules.database.db_users import (
     add_substitution_request,
     delete_substitution_request,
@@ -72,6 +108,7 @@ from modules.database.db_users import (
 )
 
 __all__ = [
+    "BookingResult",
     "add_assignment_exclusion",
     "add_bacheca_item",
     "add_booking",
@@ -80,7 +117,14 @@ __all__ = [
     "add_shift_log",
     "add_substitution_request",
     "annulla_invio_report",
+    "apply_table_changes",
+    "archive_read_notifications",
+    "book_shift_atomically",
     "check_user_oncall_conflict",
+    "claim_ai_jobs",
+    "claim_email_batch",
+    "complete_ai_job",
+    "count_queued_ai_jobs",
     "count_unread_notifications",
     "create_shift",
     "delete_booking",
@@ -88,45 +132,73 @@ __all__ = [
     "delete_report_by_id",
     "delete_reports_by_ids",
     "delete_substitution_request",
+    "enqueue_ai_job",
+    "enqueue_email",
+    "enqueue_relazioni_prereview",
+    "fail_ai_job",
+    "fan_out_shift_notification",
     "get_access_logs",
+    "get_ai_job",
+    "get_ai_prereviews",
     "get_all_bacheca_items",
     "get_all_bookings",
     "get_all_exclusions",
     "get_all_shift_logs",
     "get_all_substitutions",
     "get_all_users",
+    "get_app_log_loggers",
+    "get_app_logs",
     "get_bacheca_item_by_id",
     "get_booking_by_user_and_shift",
     "get_bookings_for_shift",
+    "get_cached_ai_response",
     "get_db_connection",
     "get_excluded_activities_for_user",
     "get_globally_excluded_activities",
     "get_last_login",
+    "get_latest_notifications",
     "get_material_requests",
     "get_notifications_for_user",
+    "get_outbox_status",
     "get_pdl_programmazione",
     "get_report_by_id",
     "get_reports_to_validate",
     "get_shift_by_id",
     "get_shifts_by_type",
+    "get_shifts_occupancy",
     "get_storico_richieste_materiali",
     "get_substitution_request_by_id",
     "get_table_data",
+    "get_table_key_columns",
     "get_table_names",
+    "get_table_page",
+    "get_tag_timeline",
     "get_unvalidated_relazioni",
     "get_unvalidated_reports_by_technician",
     "get_validated_intervention_reports",
     "get_validated_reports",
     "insert_report",
+    "mark_emails_sent",
+    "mark_notifications_read",
     "move_report_atomically",
     "process_and_commit_validated_relazioni",
     "process_and_commit_validated_reports",
+    "reindex_all_tags",
+    "release_stale_ai_jobs",
+    "release_stale_emails",
+    "reschedule_email",
     "salva_relazione",
     "salva_report_intervento",
     "salva_storico_materiali",
-    "save_table_data",
+    "search_full_text",
+    "search_pdl_programmazione",
+    "store_ai_response",
+    "touch_ai_jobs",
+    "update_ai_job_partial",
     "update_bacheca_item",
     "update_booking_user",
     "update_shift",
     "update_user_status",
+    "validate_relazioni_bulk",
+    "validate_reports_batch",
 ]
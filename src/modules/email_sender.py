@@ -1,21 +1,133 @@
 """
-Modulo per l'invio asincrono di email tramite Outlook.
-Utilizza un subprocess per interfacciarsi con le API COM di Windows senza bloccare Streamlit.
+Modulo per la consegna asincrona delle email tramite outbox persistente.
+Le email vengono accodate nel database e inviate in blocco da un unico worker in background,
+via SMTP (connessione riutilizzata per l'intero blocco) oppure tramite Outlook COM su Windows.
 """
 
+import datetime
+import smtplib
 import subprocess  # nosec B404 — needed for COM-isolated email sending
 import sys
 import threading
+from collections.abc import Callable
+from email.message import EmailMessage
 from pathlib import Path
+from types import TracebackType
+from typing import Any, Protocol, Self
 
+import config
+from core.ids import genera_id
 from core.logging import get_logger
+from modules.db_manager import (
+    claim_email_batch,
+    enqueue_email,
+    mark_emails_sent,
+    release_stale_emails,
+    reschedule_email,
+)
 
 logger = get_logger(__name__)
 
+EMAIL_BATCH_SIZE = 20
+EMAIL_MAX_TENTATIVI = 5
+EMAIL_BACKOFF_BASE_SEC = 30
+EMAIL_POLL_INTERVAL_SEC = 30.0
 
-def _send_email_subprocess(subject: str, html_body: str) -> None:
+_SEND_ERRORS = (smtplib.SMTPException, OSError, RuntimeError, ValueError)
+
+
+class EmailBackend(Protocol):
+    """Backend di consegna utilizzato dal worker per un singolo blocco di email."""
+
+    def __enter__(self) -> Self: ...
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None: ...
+
+    def send(self, oggetto: str, corpo_html: str, destinatari: list[str]) -> None: ...
+
+
+class SmtpBackend:
+    """Consegna via SMTP aprendo una sola connessione per tutto il blocco."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str = "",
+        password: str = "",
+        starttls: bool = False,
+        mittente: str = "",
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.mittente = mittente or user or "report-attivita@localhost"
+        self._smtp: smtplib.SMTP | None = None
+
+    def __enter__(self) -> Self:
+        self._smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            self._smtp.starttls()
+        if self.user:
+            self._smtp.login(self.user, self.password)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except _SEND_ERRORS:
+                self._smtp.close()
+            self._smtp = None
+
+    def send(self, oggetto: str, corpo_html: str, destinatari: list[str]) -> None:
+        """Invia un messaggio HTML sulla connessione aperta."""
+        if self._smtp is None:
+            raise RuntimeError("Connessione SMTP non aperta.")
+        msg = EmailMessage()
+        msg["Subject"] = oggetto
+        msg["From"] = self.mittente
+        msg["To"] = ", ".join(destinatari)
+        msg.set_content("Questo messaggio richiede un client con supporto HTML.")
+        msg.add_alternative(corpo_html, subtype="html")
+        self._smtp.send_message(msg)
+
+
+class OutlookBackend:
+    """Backend opzionale Windows: delega l'invio allo script COM in un processo separato."""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        return None
+
+    def send(self, oggetto: str, corpo_html: str, destinatari: list[str]) -> None:
+        """I destinatari sono gestiti dallo script Outlook."""
+        if not _send_email_subprocess(oggetto, corpo_html):
+            raise RuntimeError("Invio tramite Outlook non riuscito.")
+
+
+def _send_email_subprocess(subject: str, html_body: str) -> bool:
     """
-    Esegue lo script di invio email in un processo separato.
+    Esegue lo script di invio email Outlook in un processo separato.
     """
     try:
         python_exe = sys.executable
@@ -24,7 +136,7 @@ def _send_email_subprocess(subject: str, html_body: str) -> None:
 
         if not script_path.exists():
             logger.error(f"Script di invio email non trovato: {script_path}")
-            return
+            return False
 
         command = [python_exe, str(script_path), subject, html_body]
 
@@ -37,24 +149,141 @@ def _send_email_subprocess(subject: str, html_body: str) -> None:
 
         if result.returncode == 0:
             logger.info(f"Processo email completato per: {subject}")
-        else:
-            logger.error(f"Fallimento subprocess email ({result.returncode}): {result.stderr}")
+            return True
+        logger.error(f"Fallimento subprocess email ({result.returncode}): {result.stderr}")
+        return False
 
     except Exception as e:
         logger.error(
             f"Errore imprevisto durante il lancio del subprocess email: {e}",
             exc_info=True,
         )
+        return False
 
 
-def invia_email_con_outlook_async(subject: str, html_body: str) -> None:
+def get_email_backend() -> EmailBackend:
+    """Costruisce il backend configurato (SMTP di default, Outlook su richiesta)."""
+    if config.EMAIL_BACKEND == "outlook":
+        return OutlookBackend()
+    return SmtpBackend(
+        config.SMTP_HOST,
+        config.SMTP_PORT,
+        config.SMTP_USER,
+        config.SMTP_PASSWORD,
+        config.SMTP_STARTTLS,
+        config.EMAIL_MITTENTE,
+    )
+
+
+class EmailOutboxWorker(threading.Thread):
     """
-    Avvia l'invio dell'email in un thread separato per garantire la reattività della UI.
+    Worker unico che svuota la outbox a blocchi. Ogni blocco usa una sola connessione
+    del backend; gli invii falliti vengono ripianificati con backoff esponenziale.
     """
-    thread = threading.Thread(
-        target=_send_email_subprocess,
-        args=(subject, html_body),
-        daemon=True,  # Il thread non blocca la chiusura dell'app
-    )
-    thread.start()
-    logger.debug(f"Thread di invio email avviato per: {subject}")
+
+    def __init__(
+        self,
+        backend_factory: Callable[[], EmailBackend] = get_email_backend,
+        batch_size: int = EMAIL_BATCH_SIZE,
+        poll_interval: float = EMAIL_POLL_INTERVAL_SEC,
+    ) -> None:
+        super().__init__(name="email-outbox-worker", daemon=True)
+        self.backend_factory = backend_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self) -> None:
+        """Segnala la presenza di nuove email da consegnare."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Richiede l'arresto del worker al termine del blocco corrente."""
+        self._stop_event.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        release_stale_emails()
+        while not self._stop_event.is_set():
+            try:
+                processed = self.drain_once()
+            except Exception:
+                logger.exception("Errore nel worker email")
+                processed = 0
+            if processed >= self.batch_size:
+                continue  # Probabilmente ci sono altre email pronte
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def drain_once(self) -> int:
+        """Consegna un blocco di email pronte. Restituisce il numero di email elaborate."""
+        batch = claim_email_batch(self.batch_size)
+        if not batch:
+            return 0
+
+        sent: list[str] = []
+        pending = list(batch)
+        try:
+            with self.backend_factory() as backend:
+                while pending:
+                    email = pending.pop(0)
+                    destinatari = [d.strip() for d in (email["destinatari"] or "").split(",")]
+                    try:
+                        backend.send(
+                            email["oggetto"], email["corpo_html"], [d for d in destinatari if d]
+                        )
+                        sent.append(email["id"])
+                    except _SEND_ERRORS as e:
+                        self._schedule_retry(email, e)
+        except _SEND_ERRORS as e:
+            # Connessione al backend non disponibile: l'intero blocco residuo va ripianificato
+            logger.warning(f"Backend email non disponibile: {e}")
+            for email in pending:
+                self._schedule_retry(email, e)
+        finally:
+            mark_emails_sent(sent)
+
+        logger.info(
+            f"Blocco email elaborato: {len(sent)} inviate, {len(batch) - len(sent)} ripianificate"
+        )
+        return len(batch)
+
+    @staticmethod
+    def _schedule_retry(email: dict[str, Any], error: Exception) -> None:
+        tentativi = int(email.get("tentativi") or 0) + 1
+        if tentativi >= EMAIL_MAX_TENTATIVI:
+            logger.error(f"Email {email['id']} scartata dopo {tentativi} tentativi: {error}")
+            reschedule_email(email["id"], str(error), None)
+            return
+        ritardo = EMAIL_BACKOFF_BASE_SEC * 2 ** (tentativi - 1)
+        prossimo = (datetime.datetime.now() + datetime.timedelta(seconds=ritardo)).isoformat()
+        reschedule_email(email["id"], str(error), prossimo)
+
+
+_worker: EmailOutboxWorker | None = None
+_worker_lock = threading.Lock()
+
+
+def avvia_worker_email() -> EmailOutboxWorker:
+    """Avvia (una sola volta per processo) il worker di consegna della outbox."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = EmailOutboxWorker()
+            _worker.start()
+        return _worker
+
+
+def accoda_email(subject: str, html_body: str, destinatari: list[str] | None = None) -> bool:
+    """
+    Accoda un'email nella outbox e risveglia il worker; la UI non attende la consegna.
+    Senza destinatari espliciti usa quelli configurati (destinatario + CC).
+    """
+    dest = destinatari or [config.EMAIL_DESTINATARIO, *config.EMAIL_CC]
+    if not enqueue_email(genera_id("EML"), subject, html_body, ", ".join(dest)):
+        logger.error(f"Impossibile accodare l'email: {subject}")
+        return False
+    avvia_worker_email().wake()
+    logger.debug(f"Email accodata: {subject}")
+    return True
@@ -11,6 +11,7 @@ import pandas as pd
 import streamlit as st
 
 import config
+from core.logging import measure_time
 from modules.db_manager import get_excluded_activities_for_user
 
 
@@ -31,6 +32,7 @@ def _match_partial_name(partial_name: str, full_name: str) -> bool:
 
 
 @st.cache_data(ttl=3600)
+@measure_time  # Dentro la cache: misura solo le letture effettive del file Excel
 def _carica_giornaliera_mese(path: Path) -> dict[str, pd.DataFrame] | None:
     """Carica tutte le schede di un file Excel giornaliero con caching."""
     try:
@@ -4,6 +4,9 @@ Fornisce strumenti per il parsing dei TAG e suggerimenti tecnici basati sul cont
 """
 
 import re
+from collections import Counter
+from collections.abc import Iterable
+from functools import lru_cache
 from typing import Any
 
 from core.logging import get_logger
@@ -41,18 +44,33 @@ MEASURED_VARIABLE_KB = {
     "Q": "Quantità",
 }
 
+# Pattern precompilati: il modulo viene usato anche sull'intero storico delle relazioni
+# Pattern 1: FCV301, TT301, PSV100A
+_PREFIX_TAG_RE = re.compile(r"([A-Z]+)(\d+)([A-Z]*)")
+# Pattern 2: F301RC, T301C
+_SUFFIX_TAG_RE = re.compile(r"([A-Z])(\d+)([A-Z]+)")
+# Candidati TAG nel testo (già convertito in maiuscolo)
+_TAG_CANDIDATE_RE = re.compile(r"\b[A-Z]{1,4}\d{2,4}[A-Z]{0,2}\b")
+
+# Dimensione della cache dei TAG analizzati: lo storico contiene poche migliaia di TAG distinti
+TAG_CACHE_SIZE = 4096
+
 
 def parse_instrument_tag(tag: str) -> dict[str, Any] | None:
     """
     Analizza un tag di strumentazione per estrarre le sue parti (es. FCV301).
     Ritorna informazioni strutturate o None se non valido.
     """
-    tag = tag.strip().upper()
+    parsed = _parse_normalized_tag(tag.strip().upper())
+    # Copia: il risultato in cache non deve essere modificato dal chiamante
+    return dict(parsed) if parsed else None
 
-    # Pattern 1: FCV301, TT301, PSV100A
-    match1 = re.fullmatch(r"([A-Z]+)(\d+)([A-Z]*)", tag)
-    # Pattern 2: F301RC, T301C
-    match2 = re.fullmatch(r"([A-Z])(\d+)([A-Z]+)", tag)
+
+@lru_cache(maxsize=TAG_CACHE_SIZE)
+def _parse_normalized_tag(tag: str) -> dict[str, Any] | None:
+    """Analisi di un TAG già normalizzato, memorizzata per TAG."""
+    match1 = _PREFIX_TAG_RE.fullmatch(tag)
+    match2 = _SUFFIX_TAG_RE.fullmatch(tag)
 
     if match2:
         prefix, loop_num, suffix = match2.groups()
@@ -107,7 +125,7 @@ def find_and_analyze_tags(
     """
     Trova e analizza tutti i TAG ISA nel testo fornito.
     """
-    potential_tags = re.findall(r"\b[A-Z]{1,4}\d{2,4}[A-Z]{0,2}\b", text.upper())
+    potential_tags = _TAG_CANDIDATE_RE.findall(text.upper())
     loops: dict[str, list[dict[str, Any]]] = {}
     analyzed_tags: list[dict[str, Any]] = []
 
@@ -152,8 +170,11 @@ TROUBLESHOOTING_KB = {
 }
 
 
-def get_technical_suggestions(text: str) -> list[str]:
-    """Restituisce suggerimenti tecnici basati sulle parole chiave e i TAG rilevati."""
+def get_technical_suggestions(text: str, tags: list[dict[str, Any]] | None = None) -> list[str]:
+    """
+    Restituisce suggerimenti tecnici basati sulle parole chiave e i TAG rilevati.
+    Se il chiamante ha già eseguito `find_and_analyze_tags`, può passare i TAG in `tags`.
+    """
     if not text:
         return []
 
@@ -166,7 +187,8 @@ def get_technical_suggestions(text: str) -> list[str]:
             suggestions.update(hints)
 
     # 2. Ricerca per tipo di strumento (dai TAG)
-    _, tags = find_and_analyze_tags(text)
+    if tags is None:
+        _, tags = find_and_analyze_tags(text)
     for tag in tags:
         type_hints = TROUBLESHOOTING_KB["types"].get(tag["type"], [])
         suggestions.update(type_hints)
@@ -182,12 +204,55 @@ DOMAIN_TERMINOLOGY_KB = {
 }
 
 
+def _build_terminology_pattern() -> re.Pattern[str]:
+    """Unica alternanza per tutti i termini: acronimi case-sensitive, il resto case-insensitive."""
+    # Termini più lunghi per primi, così "CTG" non viene provato come "CT"
+    terms = sorted(DOMAIN_TERMINOLOGY_KB, key=len, reverse=True)
+    alternatives = [re.escape(t) if t.isupper() else f"(?i:{re.escape(t)})" for t in terms]
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+
+_TERMINOLOGY_RE = _build_terminology_pattern()
+# Corrispondenza testo trovato -> termine della KB (minuscolo per i termini case-insensitive)
+_TERMINOLOGY_LOOKUP = {t if t.isupper() else t.lower(): t for t in DOMAIN_TERMINOLOGY_KB}
+
+
 def analyze_domain_terminology(text: str) -> dict[str, str]:
     """Analizza acronimi e terminologia specifica di impianto."""
-    found = {}
-    for term, definition in DOMAIN_TERMINOLOGY_KB.items():
-        # Case-sensitive per acronimi maiuscoli, case-insensitive per il resto
-        flags = 0 if term.isupper() else re.IGNORECASE
-        if re.search(r"\b" + re.escape(term) + r"\b", text, flags):
-            found[term] = definition
-    return found
+    matched = set()
+    for m in _TERMINOLOGY_RE.findall(text):
+        term = _TERMINOLOGY_LOOKUP.get(m) or _TERMINOLOGY_LOOKUP.get(m.lower())
+        if term:
+            matched.add(term)
+    # Ordine della KB, come nella ricerca termine per termine
+    return {t: d for t, d in DOMAIN_TERMINOLOGY_KB.items() if t in matched}
+
+
+def analyze_corpus(texts: Iterable[str]) -> dict[str, Any]:
+    """
+    Analisi in blocco di un insieme di testi (es. l'intero storico delle relazioni).
+
+    Restituisce l'analisi di ogni testo in `documents` (loop, TAG, terminologia e suggerimenti,
+    nello stesso ordine dei testi in ingresso) e i totali sull'intero corpus: occorrenze per
+    TAG in `tag_counts` e numero di testi in cui compare ciascun termine in `term_counts`.
+    """
+    documents: list[dict[str, Any]] = []
+    tag_counts: Counter[str] = Counter()
+    term_counts: Counter[str] = Counter()
+
+    for text in texts:
+        text = text or ""
+        loops, tags = find_and_analyze_tags(text)
+        terms = analyze_domain_terminology(text)
+        documents.append(
+            {
+                "loops": loops,
+                "tags": tags,
+                "terms": terms,
+                "suggestions": get_technical_suggestions(text, tags),
+            }
+        )
+        tag_counts.update(t["tag"] for t in tags)
+        term_counts.update(terms.keys())
+
+    return {"documents": documents, "tag_counts": tag_counts, "term_counts": term_counts}
@@ -0,0 +1,188 @@
+"""
+Formato su disco dell'indice TF-IDF della base di conoscenza, senza pickle.
+
+L'indice è una cartella con:
+- ``meta.json``: intestazione con versione del formato, dimensioni e parametri del vettorizzatore;
+- ``vocabulary.json`` / ``idf.npy``: termini (in ordine di colonna) e pesi IDF;
+- ``data.npy``, ``indices.npy``, ``indptr.npy``: array CSR della matrice, aperti con mmap;
+- ``sentences.txt`` / ``offsets.npy``: frasi UTF-8 concatenate e relativi offset in byte.
+
+Gli array vengono mappati in memoria in sola lettura: il caricamento è immediato e le pagine
+sono condivise tra i processi Streamlit tramite la page cache del sistema operativo.
+"""
+
+import json
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+INDEX_FORMAT = "report-attivita-knowledge-index"
+INDEX_FORMAT_VERSION = 1
+META_FILE = "meta.json"
+KNOWLEDGE_INDEX_PATH = Path("knowledge_base_index")
+
+DEFAULT_TOP_K = 5
+DEFAULT_MIN_SCORE = 0.15
+
+
+class KnowledgeIndexError(Exception):
+    """Indice mancante, incompleto o in un formato non supportato."""
+
+
+class SentenceStore:
+    """Frasi dell'indice, decodificate su richiesta dal file mappato in memoria."""
+
+    def __init__(self, text: np.ndarray, offsets: np.ndarray) -> None:
+        self._text = text
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._text[start:end].tobytes().decode("utf-8")
+
+
+@dataclass(frozen=True)
+class KnowledgeIndex:
+    """Indice TF-IDF in memoria: righe della matrice normalizzate L2 (coseno = prodotto scalare)."""
+
+    vectorizer: Any
+    matrix: Any
+    sentences: list[str] | SentenceStore
+
+    def search(
+        self, query: str, k: int = DEFAULT_TOP_K, min_score: float = DEFAULT_MIN_SCORE
+    ) -> list[tuple[str, float]]:
+        """Restituisce le k frasi più simili alla query con il relativo punteggio coseno."""
+        if not query.strip() or len(self.sentences) == 0:
+            return []
+        query_vec = self.vectorizer.transform([query])
+        scores = np.asarray((self.matrix @ query_vec.T).todense()).ravel()
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.sentences[i], float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def knowledge_index_version(path: Path = KNOWLEDGE_INDEX_PATH) -> str:
+    """
+    Identificativo della build corrente dell'indice (mtime di ``meta.json``, scritto per ultimo).
+    Stringa vuota se l'indice non è ancora stato costruito.
+    """
+    try:
+        return str((path / META_FILE).stat().st_mtime_ns)
+    except OSError:
+        return ""
+
+
+def write_knowledge_index(
+    path: Path, vectorizer: TfidfVectorizer, matrix: Any, sentences: list[str]
+) -> None:
+    """
+    Salva l'indice nel formato a cartella. La scrittura avviene in una cartella temporanea
+    poi sostituita a quella esistente, così i lettori non vedono mai un indice parziale.
+    """
+    matrix = csr_matrix(matrix)
+    matrix.sort_indices()
+    vocabulary = vectorizer.get_feature_names_out().tolist()
+    encoded = [s.encode("utf-8") for s in sentences]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    tmp_dir = path.with_name(f"{path.name}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / "data.npy", matrix.data.astype(np.float32))
+    # indices e indptr con lo stesso dtype scelto da scipy: nessuna copia all'apertura
+    np.save(tmp_dir / "indices.npy", matrix.indices)
+    np.save(tmp_dir / "indptr.npy", matrix.indptr)
+    np.save(tmp_dir / "idf.npy", vectorizer.idf_.astype(np.float64))
+    np.save(tmp_dir / "offsets.npy", offsets)
+    (tmp_dir / "sentences.txt").write_bytes(b"".join(encoded))
+    (tmp_dir / "vocabulary.json").write_text(
+        json.dumps(vocabulary, ensure_ascii=False), encoding="utf-8"
+    )
+    params = vectorizer.get_params()
+    meta = {
+        "format": INDEX_FORMAT,
+        "version": INDEX_FORMAT_VERSION,
+        "n_sentences": len(sentences),
+        "n_features": len(vocabulary),
+        "nnz": int(matrix.nnz),
+        "vectorizer": {
+            "lowercase": params["lowercase"],
+            "ngram_range": list(params["ngram_range"]),
+            "stop_words": list(params["stop_words"] or []),
+            "token_pattern": params["token_pattern"],
+            "norm": params["norm"],
+            "sublinear_tf": params["sublinear_tf"],
+        },
+    }
+    # meta.json per ultimo: la sua presenza segnala una cartella completa
+    (tmp_dir / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    old_dir = path.with_name(f"{path.name}.old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if path.exists():
+        path.rename(old_dir)
+    tmp_dir.rename(path)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def read_knowledge_index(path: Path) -> KnowledgeIndex:
+    """Apre un indice salvato con `write_knowledge_index`, mappando gli array in memoria."""
+    try:
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        raise KnowledgeIndexError(f"Intestazione dell'indice non leggibile: {e}") from e
+    if meta.get("format") != INDEX_FORMAT or meta.get("version") != INDEX_FORMAT_VERSION:
+        raise KnowledgeIndexError(
+            f"Formato indice non supportato: {meta.get('format')} v{meta.get('version')}"
+        )
+
+    try:
+        vocabulary = json.loads((path / "vocabulary.json").read_text(encoding="utf-8"))
+        params = meta["vectorizer"]
+        vectorizer = TfidfVectorizer(
+            lowercase=params["lowercase"],
+            ngram_range=tuple(params["ngram_range"]),
+            stop_words=params["stop_words"] or None,
+            token_pattern=params["token_pattern"],
+            norm=params["norm"],
+            sublinear_tf=params["sublinear_tf"],
+            vocabulary=vocabulary,
+        )
+        vectorizer.idf_ = np.load(path / "idf.npy")
+
+        matrix = csr_matrix(
+            (
+                np.load(path / "data.npy", mmap_mode="r"),
+                np.load(path / "indices.npy", mmap_mode="r"),
+                np.load(path / "indptr.npy", mmap_mode="r"),
+            ),
+            shape=(meta["n_sentences"], meta["n_features"]),
+            copy=False,
+        )
+        offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        text_path = path / "sentences.txt"
+        text = (
+            np.memmap(text_path, dtype=np.uint8, mode="r")
+            if text_path.stat().st_size
+            else np.empty(0, dtype=np.uint8)
+        )
+    except (OSError, KeyError, ValueError) as e:
+        raise KnowledgeIndexError(f"Indice incompleto o danneggiato: {e}") from e
+
+    return KnowledgeIndex(vectorizer, matrix, SentenceStore(text, offsets))
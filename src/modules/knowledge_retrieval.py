@@ -0,0 +1,62 @@
+"""
+Servizio di retrieval sulla base di conoscenza TF-IDF costruita da learning_module.
+Carica l'indice una sola volta per processo (ricaricandolo se il file viene ricostruito)
+e risponde alle query top-k con un unico prodotto matrice sparsa-vettore.
+"""
+
+import threading
+from pathlib import Path
+
+from core.logging import get_logger, measure_time
+from modules.knowledge_index import (
+    DEFAULT_MIN_SCORE,
+    DEFAULT_TOP_K,
+    KNOWLEDGE_INDEX_PATH,
+    META_FILE,
+    KnowledgeIndex,
+    KnowledgeIndexError,
+    read_knowledge_index,
+)
+
+logger = get_logger(__name__)
+
+_index: KnowledgeIndex | None = None
+_index_mtime: float | None = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex | None:
+    """
+    Restituisce l'indice condiviso dal processo, caricandolo al primo utilizzo
+    o quando l'indice su disco è stato ricostruito. None se l'indice non esiste.
+    """
+    global _index, _index_mtime
+    try:
+        mtime = (KNOWLEDGE_INDEX_PATH / META_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    with _index_lock:
+        if _index is None or mtime != _index_mtime:
+            _index = _load_index(KNOWLEDGE_INDEX_PATH)
+            _index_mtime = mtime if _index is not None else None
+        return _index
+
+
+@measure_time
+def _load_index(path: Path) -> KnowledgeIndex | None:
+    try:
+        return read_knowledge_index(path)
+    except KnowledgeIndexError as e:
+        logger.error(f"Impossibile caricare l'indice della knowledge base: {e}")
+        return None
+
+
+def cerca_frasi_simili(
+    testo: str, k: int = DEFAULT_TOP_K, min_score: float = DEFAULT_MIN_SCORE
+) -> list[str]:
+    """Frasi storiche più pertinenti al testo, da usare come contesto per l'IA."""
+    index = get_knowledge_index()
+    if index is None:
+        return []
+    return [sentence for sentence, _ in index.search(testo, k=k, min_score=min_score)]
@@ -0,0 +1,109 @@
+"""
+Metriche applicative esposte dall'exporter Prometheus (core.metrics_exporter).
+Registra i collector letti a ogni scrape (outbox email, sessioni attive, cache, job pianificati)
+e conserva su file l'esito dell'ultima esecuzione dei job che girano in processi separati.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+from core.logging import get_logger
+from core.metrics import (
+    CACHE_REQUESTS,
+    REGISTRY,
+    MetricsRegistry,
+    update_cache_hit_ratios,
+)
+from core.metrics_exporter import start_metrics_server
+
+logger = get_logger(__name__)
+
+# Esito dell'ultima esecuzione di ogni job (es. sync_data), scritto dal processo del job
+JOB_RUNS_FILE = Path("logs") / "job_runs.json"
+
+EMAIL_OUTBOX_DEPTH = "email_outbox_depth"
+ACTIVE_SESSIONS = "active_sessions"
+_OUTBOX_STATES = ("in_coda", "in_invio", "errore")
+
+
+def record_job_run(
+    job: str, duration_sec: float, rows_changed: int, success: bool, path: Path = JOB_RUNS_FILE
+) -> None:
+    """Registra l'esito di un'esecuzione (sostituzione atomica del file condiviso)."""
+    try:
+        runs = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        runs = {}
+    runs[job] = {
+        "timestamp": time.time(),
+        "duration_sec": round(duration_sec, 3),
+        "rows_changed": rows_changed,
+        "success": success,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(runs), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Impossibile registrare l'esecuzione del job {job}: {e}")
+
+
+def read_job_runs(path: Path = JOB_RUNS_FILE) -> dict[str, dict[str, Any]]:
+    """Esito dell'ultima esecuzione per job; vuoto se nessun job ha ancora registrato."""
+    try:
+        return dict(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return {}
+
+
+def collect_job_runs(registry: MetricsRegistry) -> None:
+    for job, run in read_job_runs(JOB_RUNS_FILE).items():
+        registry.gauge("job_last_run_timestamp_seconds", job=job).set(run["timestamp"])
+        registry.gauge("job_last_run_duration_seconds", job=job).set(run["duration_sec"])
+        registry.gauge("job_last_run_rows_changed", job=job).set(run["rows_changed"])
+        registry.gauge("job_last_run_success", job=job).set(1 if run["success"] else 0)
+
+
+def collect_email_outbox(registry: MetricsRegistry) -> None:
+    from modules.db_manager import get_outbox_status
+
+    status = get_outbox_status()
+    for stato in {*_OUTBOX_STATES, *status} - {"inviata"}:
+        registry.gauge(EMAIL_OUTBOX_DEPTH, stato=stato).set(status.get(stato, 0))
+
+
+def collect_active_sessions(registry: MetricsRegistry) -> None:
+    from streamlit import runtime
+
+    if runtime.exists():
+        # Il SessionManager non è esposto pubblicamente dal runtime di Streamlit: se una
+        # versione futura lo rinomina il gauge non viene aggiornato, senza errori
+        session_mgr = getattr(runtime.get_instance(), "_session_mgr", None)
+        if session_mgr is not None and hasattr(session_mgr, "num_active_sessions"):
+            registry.gauge(ACTIVE_SESSIONS).set(session_mgr.num_active_sessions())
+
+
+def collect_tag_cache(registry: MetricsRegistry) -> None:
+    from modules.instrumentation_logic import _parse_normalized_tag
+
+    info = _parse_normalized_tag.cache_info()
+    registry.counter(CACHE_REQUESTS, cache="instrument_tags", result="hit").set_total(info.hits)
+    registry.counter(CACHE_REQUESTS, cache="instrument_tags", result="miss").set_total(info.misses)
+
+
+def avvia_exporter_metriche(registry: MetricsRegistry = REGISTRY) -> None:
+    """Registra i collector applicativi e avvia (una sola volta) l'endpoint /metrics."""
+    for collector in (
+        collect_email_outbox,
+        collect_active_sessions,
+        collect_job_runs,
+        collect_tag_cache,
+        # Per ultimo: usa anche i contatori aggiornati dai collector precedenti
+        update_cache_hit_ratios,
+    ):
+        registry.register_collector(collector)
+    start_metrics_server()
@@ -7,15 +7,26 @@ import datetime
 import sqlite3
 
 import pandas as pd
+import streamlit as st
 
 from constants import ICONS
+from core.ids import genera_id
 from core.logging import get_logger
 from modules.db_manager import (
     add_notification,
+    archive_read_notifications,
+    count_unread_notifications,
+    fan_out_shift_notification,
     get_db_connection,
+    get_latest_notifications,
     get_notifications_for_user,
+    mark_notifications_read,
 )
 
+# Dimensione della pagina del centro notifiche e soglia di conservazione delle lette
+NOTIFICHE_PER_PAGINA = 15
+GIORNI_CONSERVAZIONE_LETTE = 30
+
 logger = get_logger(__name__)
 
 
@@ -35,9 +46,43 @@ def leggi_notifiche(utente: str) -> pd.DataFrame:
         return pd.DataFrame(columns=["ID_Notifica", "Timestamp", "Messaggio", "Stato"])
 
 
+@st.cache_data(ttl=30, show_spinner=False)
+def conta_notifiche_non_lette(matricola: str) -> int:
+    """Contatore delle notifiche non lette, memorizzato per evitare una query a ogni rerun."""
+    return count_unread_notifications(matricola)
+
+
+def leggi_ultime_notifiche(matricola: str, limit: int = NOTIFICHE_PER_PAGINA) -> pd.DataFrame:
+    """Legge solo le notifiche più recenti di un utente (paginazione lato database)."""
+    try:
+        return pd.DataFrame(
+            get_latest_notifications(matricola, limit=limit),
+            columns=["ID_Notifica", "Timestamp", "Messaggio", "Stato", "Link_Azione"],
+        )
+    except sqlite3.Error as e:
+        logger.error(f"Errore durante il caricamento notifiche per {matricola}: {e}")
+        return pd.DataFrame(columns=["ID_Notifica", "Timestamp", "Messaggio", "Stato"])
+
+
+def segna_notifiche_lette(matricola: str, id_notifiche: list[str]) -> int:
+    """Segna come lette più notifiche con un'unica istruzione e invalida il contatore."""
+    aggiornate = mark_notifications_read(matricola, id_notifiche)
+    if aggiornate:
+        conta_notifiche_non_lette.clear()
+    return aggiornate
+
+
+def archivia_notifiche_lette(giorni: int = GIORNI_CONSERVAZIONE_LETTE) -> int:
+    """Sposta in notifiche_archivio le notifiche lette più vecchie di `giorni` giorni."""
+    soglia = (datetime.datetime.now() - datetime.timedelta(days=giorni)).isoformat()
+    archiviate = archive_read_notifications(soglia)
+    logger.info(f"Archiviate {archiviate} notifiche lette precedenti al {soglia[:10]}.")
+    return archiviate
+
+
 def crea_notifica(destinatario: str, messaggio: str, link_azione: str = "") -> bool:
     """Crea una nuova notifica persistente per un utente."""
-    new_id = f"N_{int(datetime.datetime.now().timestamp())}"
+    new_id = genera_id("N")
     timestamp = datetime.datetime.now().isoformat()
 
     nuova_notifica = {
@@ -54,6 +99,39 @@ def crea_notifica(destinatario: str, messaggio: str, link_azione: str = "") -> b
     return res
 
 
+def notifica_turno_disponibile(
+    turno_id: str,
+    messaggio: str,
+    ruolo_richiesto: str | None = None,
+    escludi_matricola: str | None = None,
+    link_azione: str = "",
+) -> int:
+    """
+    Notifica un turno disponibile ai soli utenti che possono effettivamente prenderlo.
+    Usa una sola connessione e una sola transazione; restituisce il numero di destinatari.
+    """
+    event_id = genera_id("N")
+    conn = get_db_connection()
+    try:
+        with conn:
+            inviate = fan_out_shift_notification(
+                conn,
+                event_id,
+                turno_id,
+                messaggio,
+                ruolo_richiesto=ruolo_richiesto,
+                escludi_matricola=escludi_matricola,
+                link_azione=link_azione,
+            )
+        logger.info(f"Notifica turno {turno_id} inviata a {inviate} destinatari idonei.")
+        return inviate
+    except sqlite3.Error as e:
+        logger.error(f"Errore invio notifiche per il turno {turno_id}: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
 def segna_notifica_letta(id_notifica: str) -> bool:
     """Segna una notifica specifica come 'letta' nel database."""
     conn = get_db_connection()
@@ -63,6 +141,7 @@ def segna_notifica_letta(id_notifica: str) -> bool:
             cursor = conn.execute(sql, (id_notifica,))
             success = bool(cursor.rowcount > 0)
             if success:
+                conta_notifiche_non_lette.clear()
                 logger.debug(f"Notifica {id_notifica} segnata come letta.")
             return success
     except sqlite3.Error as e:
@@ -84,7 +163,8 @@ def segna_tutte_lette(matricola: str) -> bool:
             # Dallo schema in crea_database.py: Destinatario_Matricola
             sql = "UPDATE notifiche SET Stato = 'letta' WHERE Destinatario_Matricola = ?"
             conn.execute(sql, (matricola,))
-            return True
+        conta_notifiche_non_lette.clear()
+        return True
     except sqlite3.Error as e:
         logger.error(f"Errore aggiornamento notifiche per {matricola}: {e}")
         return False
@@ -5,10 +5,10 @@ Logica per l'invio e il salvataggio dei report tecnici.
 import datetime
 import re
 import sqlite3
-import uuid
 
 import streamlit as st
 
+from core.ids import genera_id
 from modules.db_manager import get_db_connection
 
 
@@ -36,7 +36,7 @@ def scrivi_o_aggiorna_risposta(
         pdl = pdl_match.group(1) if pdl_match else "N/D"
 
         report_data = {
-            "id_report": id_report if id_report else str(uuid.uuid4()),
+            "id_report": id_report if id_report else genera_id(),
             "pdl": pdl,
             "descrizione_attivita": dati_da_scrivere["descrizione"],
             "matricola_tecnico": matricola,
@@ -68,8 +68,8 @@ def scrivi_o_aggiorna_risposta(
 def _send_validation_email(
     nome: str, data_rif: datetime.date, ts: datetime.datetime, dati: dict[str, str]
 ) -> None:
-    """Sottoprocesso per l'invio dell'email di validazione."""
-    from modules.email_sender import invia_email_con_outlook_async
+    """Accoda l'email di notifica per il nuovo report da validare."""
+    from modules.email_sender import accoda_email
 
     titolo = f"Nuovo Report da Validare da: {nome}"
     html = f"""
@@ -84,4 +84,4 @@ def _send_validation_email(
     <hr><p>{dati["report"].replace(chr(10), "<br>")}</p>
     </body></html>
     """
-    invia_email_con_outlook_async(titolo, html)
+    accoda_email(titolo, html)
@@ -3,34 +3,34 @@ Logica di business per la prenotazione e cancellazione dei turni standard.
 Gestisce i vincoli di disponibilità posti e la registrazione dei cambiamenti.
 """
 
-import datetime
+import sqlite3
 
 import streamlit as st
 
-from modules.db_manager import (
-    add_booking,
-    check_user_oncall_conflict,
-    delete_booking,
-    get_bookings_for_shift,
-    get_shift_by_id,
-)
+from constants import ICONS
+from core.ids import genera_id
+from modules.db_manager import book_shift_atomically, delete_booking
 from modules.shifts.logic_utils import log_shift_change
 
 
 def prenota_turno_logic(matricola_utente: str, turno_id: str, ruolo_scelto: str) -> bool:
     """
     Esegue la logica di prenotazione per un turno, verificando la disponibilità residua
-    e l'assenza di conflitti con la reperibilità.
+    e l'assenza di conflitti con la reperibilità in un'unica transazione.
     """
-    turno_info = get_shift_by_id(turno_id)
-    if not turno_info:
-        st.error("Turno non trovato.")
+    booking_id = genera_id("P")
+    try:
+        result = book_shift_atomically(booking_id, turno_id, matricola_utente, ruolo_scelto)
+    except sqlite3.OperationalError:
+        # Database ancora bloccato dopo i tentativi di retry_on_lock
+        st.error("Il sistema è momentaneamente occupato: riprova tra qualche secondo.")
         return False
 
-    # 1. Controllo conflitto con Reperibilità
-    if check_user_oncall_conflict(matricola_utente, turno_info["Data"]):
-        from constants import ICONS
+    if result.status == "not_found":
+        st.error("Turno non trovato.")
+        return False
 
+    if result.status == "oncall_conflict":
         st.error(
             f"{ICONS['WARNING']} Conflitto rilevato: sei già impegnato in reperibilità per questa data. "
             "Non puoi prenotare turni aggiuntivi.",
@@ -38,34 +38,15 @@ def prenota_turno_logic(matricola_utente: str, turno_id: str, ruolo_scelto: str)
         )
         return False
 
-    # 2. Controllo disponibilità posti
-    prenotazioni_per_turno = get_bookings_for_shift(turno_id)
-    tecnici_prenotati = len(
-        prenotazioni_per_turno[prenotazioni_per_turno["RuoloOccupato"] == "Tecnico"]
-    )
-    aiutanti_prenotati = len(
-        prenotazioni_per_turno[prenotazioni_per_turno["RuoloOccupato"] == "Aiutante"]
-    )
-
-    can_book = False
-    if (ruolo_scelto == "Tecnico" and tecnici_prenotati < int(turno_info["PostiTecnico"])) or (
-        ruolo_scelto == "Aiutante" and aiutanti_prenotati < int(turno_info["PostiAiutante"])
-    ):
-        can_book = True
+    if result.status == "already_booked":
+        st.error("Sei già prenotato per questo turno.")
+        return False
 
-    if not can_book:
+    if result.status == "full":
         st.error("Tutti i posti per il ruolo selezionato sono esauriti!")
         return False
 
-    new_booking_data = {
-        "ID_Prenotazione": f"P_{int(datetime.datetime.now().timestamp())}",
-        "ID_Turno": turno_id,
-        "Matricola": matricola_utente,
-        "RuoloOccupato": ruolo_scelto,
-        "Timestamp": datetime.datetime.now().isoformat(),
-    }
-
-    if add_booking(new_booking_data):
+    if result.ok:
         st.success(f"Turno prenotato come {ruolo_scelto}!")
         log_shift_change(
             turno_id,
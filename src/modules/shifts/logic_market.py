@@ -9,13 +9,13 @@ import sqlite3
 import pandas as pd
 import streamlit as st
 
+from core.ids import genera_id
 from modules.auth import get_user_by_matricola
 from modules.db_manager import (
     add_bacheca_item,
     add_booking,
     add_substitution_request,
     delete_substitution_request,
-    get_all_users,
     get_bacheca_item_by_id,
     get_booking_by_user_and_shift,
     get_db_connection,
@@ -24,7 +24,7 @@ from modules.db_manager import (
     update_bacheca_item,
     update_booking_user,
 )
-from modules.notifications import crea_notifica
+from modules.notifications import crea_notifica, notifica_turno_disponibile
 from modules.shifts.logic_utils import log_shift_change
 
 
@@ -39,7 +39,7 @@ def richiedi_sostituzione_logic(
 
     nome_richiedente = richiedente_info["Nome Cognome"]
     new_request_data = {
-        "ID_Richiesta": f"S_{int(datetime.datetime.now().timestamp())}",
+        "ID_Richiesta": genera_id("S"),
         "ID_Turno": turno_id,
         "Richiedente_Matricola": matricola_richiedente,
         "Ricevente_Matricola": matricola_ricevente,
@@ -116,7 +116,7 @@ def pubblica_turno_in_bacheca_logic(matricola_richiedente: str, turno_id: str) -
             conn.execute(delete_sql, (booking_to_publish["ID_Prenotazione"],))
 
             new_bacheca_item = {
-                "ID_Bacheca": f"B_{int(datetime.datetime.now().timestamp())}",
+                "ID_Bacheca": genera_id("B"),
                 "ID_Turno": turno_id,
                 "Tecnico_Originale_Matricola": matricola_richiedente,
                 "Ruolo_Originale": booking_to_publish["RuoloOccupato"],
@@ -140,10 +140,12 @@ def pubblica_turno_in_bacheca_logic(matricola_richiedente: str, turno_id: str) -
 
             data_str = pd.to_datetime(turno_info["Data"]).strftime("%d/%m")
             msg = f"{ICONS['BULLETIN']} Turno libero: '{turno_info['Descrizione']}' del {data_str} ({booking_to_publish['RuoloOccupato']})."
-            all_users = get_all_users()
-            for _, user in all_users.iterrows():
-                if str(user["Matricola"]) != matricola_richiedente:
-                    crea_notifica(user["Matricola"], msg)
+            notifica_turno_disponibile(
+                turno_id,
+                msg,
+                ruolo_richiesto=booking_to_publish["RuoloOccupato"],
+                escludi_matricola=matricola_richiedente,
+            )
 
         st.success("Turno pubblicato in bacheca!")
         return True
@@ -173,7 +175,7 @@ def prendi_turno_da_bacheca_logic(
         "Timestamp_Assegnazione": datetime.datetime.now().isoformat(),
     }
     new_booking = {
-        "ID_Prenotazione": f"P_{int(datetime.datetime.now().timestamp())}",
+        "ID_Prenotazione": genera_id("P"),
         "ID_Turno": turno_id,
         "Matricola": matricola_subentrante,
         "RuoloOccupato": ruolo_richiesto,
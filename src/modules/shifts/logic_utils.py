@@ -6,6 +6,7 @@ import datetime
 
 import pandas as pd
 
+from core.ids import genera_id
 from modules.auth import get_user_by_matricola
 from modules.db_manager import add_shift_log
 
@@ -26,7 +27,7 @@ def log_shift_change(
         return user["Nome Cognome"] if user else str(matricola)
 
     log_data = {
-        "ID_Modifica": f"M_{int(datetime.datetime.now().timestamp())}",
+        "ID_Modifica": genera_id("M"),
         "Timestamp": datetime.datetime.now().isoformat(),
         "ID_Turno": turno_id,
         "Azione": azione,
@@ -35,7 +35,7 @@ def render_sistema_view() -> None:
 
     from .audit_view import render_audit_tab
     from .ia_view import render_ia_management_tab
-    from .logs_view import render_access_logs_tab
+    from .logs_view import render_access_logs_tab, render_app_logs_tab
     from .system_status_view import render_system_status_tab
     from .users_view import render_gestione_account
 
@@ -45,6 +45,7 @@ def render_sistema_view() -> None:
             "Gestione Account",
             "Audit Operazioni",
             "Cronologia Accessi",
+            "Log Applicativi",
             "Gestione Dati",
             "Gestione IA",
             "Stato Sistema",
@@ -58,10 +59,12 @@ def render_sistema_view() -> None:
     with tabs[2]:
         render_access_logs_tab()
     with tabs[3]:
-        render_gestione_dati_tab()
+        render_app_logs_tab()
     with tabs[4]:
-        render_ia_management_tab()
+        render_gestione_dati_tab()
     with tabs[5]:
+        render_ia_management_tab()
+    with tabs[6]:
         render_system_status_tab()
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -1,13 +1,19 @@
 """
 Interfaccia per la consultazione dei log di accesso al sistema.
-Include filtri per utente, data e esito del login.
+Include filtri per utente, data e esito del login, e la ricerca nei log applicativi
+importati dai file dei servizi (per intervallo di tempo, livello, modulo e trace id).
 """
 
+import datetime
+
 import pandas as pd
 import streamlit as st
 
 from constants import ICONS
-from modules.db_manager import get_access_logs
+from modules.database.db_logs import APP_LOGS_PAGE_SIZE
+from modules.db_manager import get_access_logs, get_app_log_loggers, get_app_logs
+
+APP_LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
 
 def render_access_logs_tab() -> None:
@@ -67,3 +73,98 @@ def render_access_logs_tab() -> None:
             display_df[["Data e Ora", "Nome Utente/Matricola", "Esito"]],
             width="stretch",
         )
+
+
+def render_app_logs_tab() -> None:
+    """Consulta i log applicativi importati nel database, con filtri e risultati paginati."""
+    st.subheader("Log Applicativi")
+    st.info(
+        "I log dell'applicazione vengono importati periodicamente dal job di importazione "
+        "(scripts/ingest_logs.py) e conservati per un numero limitato di giorni.",
+        icon=ICONS["INFO"],
+    )
+
+    oggi = datetime.date.today()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        start_date = st.date_input("Data Inizio", value=oggi, key="app_logs_start_date")
+    with col2:
+        start_time = st.time_input("Ora Inizio", value=datetime.time(0, 0), key="app_logs_start")
+    with col3:
+        end_date = st.date_input("Data Fine", value=oggi, key="app_logs_end_date")
+    with col4:
+        end_time = st.time_input("Ora Fine", value=datetime.time(23, 59), key="app_logs_end")
+
+    col5, col6, col7 = st.columns(3)
+    with col5:
+        livelli = st.multiselect("Livello:", APP_LOG_LEVELS, default=[], key="app_logs_levels")
+    with col6:
+        modulo = st.selectbox(
+            "Modulo:",
+            get_app_log_loggers(),
+            index=None,
+            accept_new_options=True,
+            placeholder="Tutti (anche un package, es. modules.database)",
+            key="app_logs_module",
+        )
+    with col7:
+        trace_id = st.text_input("Trace ID:", key="app_logs_trace_id").strip()
+
+    data_inizio = (
+        datetime.datetime.combine(start_date, start_time).isoformat() if start_date else None
+    )
+    # L'ora di fine è inclusa fino all'ultimo secondo del minuto selezionato
+    data_fine = (
+        (datetime.datetime.combine(end_date, end_time) + datetime.timedelta(minutes=1)).isoformat()
+        if end_date
+        else None
+    )
+
+    # Con filtri diversi si riparte dalla prima pagina
+    page_key = "app_logs_page"
+    filtri = (data_inizio, data_fine, tuple(livelli), modulo, trace_id)
+    if st.session_state.get("app_logs_filters") != filtri:
+        st.session_state["app_logs_filters"] = filtri
+        st.session_state[page_key] = 0
+    page = int(st.session_state.get(page_key, 0))
+
+    df, total = get_app_logs(
+        data_inizio=data_inizio,
+        data_fine=data_fine,
+        livelli=livelli,
+        modulo=modulo,
+        trace_id=trace_id or None,
+        limit=APP_LOGS_PAGE_SIZE,
+        offset=page * APP_LOGS_PAGE_SIZE,
+    )
+
+    st.divider()
+    if df.empty:
+        st.info("Nessun log trovato per i filtri selezionati.", icon=ICONS["INFO"])
+        return
+
+    st.caption(f"{total} righe trovate")
+    display_df = df.rename(
+        columns={
+            "timestamp": "Data e Ora",
+            "level": "Livello",
+            "logger": "Modulo",
+            "func": "Funzione",
+            "trace_id": "Trace ID",
+            "duration_sec": "Durata (s)",
+            "message": "Messaggio",
+            "extra": "Dettagli",
+        }
+    )
+    st.dataframe(display_df, width="stretch", hide_index=True)
+
+    total_pages = max(1, -(-total // APP_LOGS_PAGE_SIZE))
+    if total_pages > 1:
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        if col_prev.button("Precedente", key=f"{page_key}_prev", disabled=page == 0):
+            st.session_state[page_key] = page - 1
+            st.rerun()
+        col_info.caption(f"Pagina {page + 1} di {total_pages}")
+        if col_next.button("Successiva", key=f"{page_key}_next", disabled=page >= total_pages - 1):
+            st.session_state[page_key] = page + 1
+            st.rerun()
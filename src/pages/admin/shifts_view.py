@@ -7,8 +7,9 @@ import datetime
 
 import streamlit as st
 
-from modules.db_manager import create_shift, get_all_users
-from modules.notifications import crea_notifica
+from core.ids import genera_id
+from modules.db_manager import create_shift
+from modules.notifications import notifica_turno_disponibile
 
 
 def render_new_shift_form() -> None:
@@ -29,7 +30,7 @@ def render_new_shift_form() -> None:
             if not desc_turno:
                 st.error("La descrizione non può essere vuota.")
             else:
-                new_id = f"T_{int(datetime.datetime.now().timestamp())}"
+                new_id = genera_id("T")
                 new_shift_data = {
                     "ID_Turno": new_id,
                     "Descrizione": desc_turno,
@@ -44,18 +45,19 @@ def render_new_shift_form() -> None:
                     st.success(
                         f"Turno '{desc_turno}' creato con successo!", icon=":material/check_circle:"
                     )
-                    df_contatti = get_all_users()
-                    if not df_contatti.empty:
-                        from constants import ICONS
+                    from constants import ICONS
 
-                        utenti_da_notificare = df_contatti["Matricola"].tolist()
-                        data_str = data_turno.strftime("%d/%m/%Y")
-                        messaggio = (
-                            f"{ICONS['BULLETIN']} Nuovo turno disponibile: '{desc_turno}' "
-                            f"il {data_str}."
-                        )
-                        for matricola in utenti_da_notificare:
-                            crea_notifica(matricola, messaggio)
+                    data_str = data_turno.strftime("%d/%m/%Y")
+                    messaggio = (
+                        f"{ICONS['BULLETIN']} Nuovo turno disponibile: '{desc_turno}' "
+                        f"il {data_str}."
+                    )
+                    # Se non ci sono posti da aiutante, il turno interessa solo i tecnici
+                    notifica_turno_disponibile(
+                        new_id,
+                        messaggio,
+                        ruolo_richiesto="Tecnico" if not posti_aiut else None,
+                    )
                     st.rerun()
                 else:
                     st.error("Errore nel salvataggio del nuovo turno.")
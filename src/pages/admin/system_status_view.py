@@ -1,4 +1,5 @@
 import sys
+from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
@@ -11,6 +12,119 @@ from config import (
     PATH_STORICO_DB,
     check_data_connectivity,
 )
+from core.metrics import REGISTRY, function_timings
+from core.tracing import recent_traces, waterfall
+
+
+def _render_function_metrics() -> None:
+    """
+    Chiamate e latenze delle funzioni misurate, dall'avvio del processo o dall'ultimo
+    azzeramento della vista (uno snapshot nella sessione: il registro condiviso non cambia).
+    """
+    st.subheader("Prestazioni Funzioni")
+    baseline = st.session_state.get("metrics_baseline")
+    rows = function_timings(since=baseline["snapshot"] if baseline else None)
+    periodo = f"dalle {baseline['ora']}" if baseline else "dall'avvio dell'applicazione"
+    if not rows:
+        st.info(f"Nessuna chiamata misurata {periodo}.")
+    else:
+        df = pd.DataFrame(rows).rename(
+            columns={
+                "function": "Funzione",
+                "calls": "Chiamate",
+                "errors": "Errori",
+                "p50_ms": "p50 (ms)",
+                "p95_ms": "p95 (ms)",
+                "max_ms": "Max (ms)",
+            }
+        )
+        st.dataframe(df, hide_index=True, use_container_width=True)
+        st.caption(
+            f"Chiamate {periodo}. Latenze stimate dai bucket degli istogrammi; "
+            "valori relativi a questo processo."
+        )
+    if st.button("Azzera metriche"):
+        st.session_state["metrics_baseline"] = {
+            "snapshot": REGISTRY.snapshot(),
+            "ora": datetime.now().strftime("%H:%M:%S"),
+        }
+        st.rerun()
+
+
+def _render_rerun_traces() -> None:
+    """Vista a cascata degli span di un rerun recente, per capire dove si è speso il tempo."""
+    st.subheader("Tracce dei Rerun")
+    traces = recent_traces()
+    if not traces:
+        st.info("Nessun rerun tracciato dall'avvio dell'applicazione.")
+        return
+
+    if st.checkbox("Dal più lento", key="traces_by_duration"):
+        traces = sorted(traces, key=lambda t: t.duration, reverse=True)
+    by_id = {t.trace_id: t for t in traces}
+    trace_id = st.selectbox(
+        "Rerun",
+        list(by_id),
+        format_func=lambda tid: (
+            f"{by_id[tid].started_at} | {by_id[tid].root.attributes.get('tab', '')} | "
+            f"{by_id[tid].root.attributes.get('user', '')} | {by_id[tid].duration * 1000:.0f} ms"
+        ),
+        key="traces_selected",
+    )
+    trace = by_id[trace_id]
+
+    df = pd.DataFrame(waterfall(trace))
+    # Etichette univoche (le stesse query si ripetono) con il rientro della profondità
+    df["etichetta"] = [
+        f"{i + 1}. {'· ' * depth}{name}"
+        for i, (depth, name) in enumerate(zip(df["depth"], df["span"], strict=True))
+    ]
+    st.vega_lite_chart(
+        df[["etichetta", "depth", "start_ms", "end_ms", "duration_ms"]],
+        {
+            "mark": {"type": "bar", "tooltip": True},
+            "height": {"step": 18},
+            "encoding": {
+                "y": {
+                    "field": "etichetta",
+                    "type": "ordinal",
+                    "sort": None,
+                    "title": None,
+                    "axis": {"labelLimit": 400},
+                },
+                "x": {
+                    "field": "start_ms",
+                    "type": "quantitative",
+                    "title": "ms dall'inizio del rerun",
+                },
+                "x2": {"field": "end_ms"},
+                "color": {"field": "depth", "type": "ordinal", "legend": None},
+            },
+        },
+        use_container_width=True,
+    )
+    st.caption(
+        f"Trace ID `{trace.trace_id}`: filtrando i Log Applicativi per questo valore "
+        "si trovano le righe di log emesse durante il rerun."
+    )
+
+    details = df.assign(
+        attributes=df["attributes"].map(lambda a: ", ".join(f"{k}={v}" for k, v in a.items()))
+    ).rename(
+        columns={
+            "etichetta": "Span",
+            "start_ms": "Inizio (ms)",
+            "duration_ms": "Durata (ms)",
+            "error": "Errore",
+            "dropped_children": "Span omessi",
+            "attributes": "Attributi",
+        }
+    )
+    st.dataframe(
+        details[["Span", "Inizio (ms)", "Durata (ms)", "Errore", "Span omessi", "Attributi"]],
+        hide_index=True,
+        use_container_width=True,
+    )
 
 
 def render_system_status_tab() -> None:
@@ -26,6 +140,14 @@ def render_system_status_tab() -> None:
 
     st.divider()
 
+    _render_function_metrics()
+
+    st.divider()
+
+    _render_rerun_traces()
+
+    st.divider()
+
     st.subheader("Verifica Percorsi Dati")
     status = check_data_connectivity()
 
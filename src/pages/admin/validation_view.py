@@ -3,16 +3,20 @@ Interfaccia per la validazione finale dei report attività e delle relazioni di
 Gestisce il flusso di approvazione e il trasferimento dei dati nello storico definitivo.
 """
 
+import datetime
+
 import pandas as pd
 import streamlit as st
 
 from constants import ICONS, STATI_ATTIVITA
 from modules.db_manager import (
     delete_reports_by_ids,
+    get_ai_prereviews,
     get_reports_to_validate,
     get_unvalidated_relazioni,
     process_and_commit_validated_relazioni,
-    process_and_commit_validated_reports,
+    validate_relazioni_bulk,
+    validate_reports_batch,
 )
 
 
@@ -121,14 +125,23 @@ def render_report_validation_tab(user_matricola: str) -> None:
         ):
             reports_to_process = reports_to_validate_df.drop(columns=["delete", "valida"])
             with st.spinner("Salvataggio dei report validati in corso..."):
-                if process_and_commit_validated_reports(reports_to_process.to_dict("records")):  # type: ignore[arg-type]
-                    st.success("Report validati e salvati con successo!", icon=ICONS["CHECK"])
-                    st.rerun()
-                else:
-                    st.error(
-                        "Si è verificato un errore durante il salvataggio dei report.",
-                        icon=ICONS["ERROR"],
-                    )
+                esiti = validate_reports_batch(reports_to_process.to_dict("records"))  # type: ignore[arg-type]
+            validati = [rid for rid, esito in esiti.items() if esito == "validated"]
+            scartati = {rid: esito for rid, esito in esiti.items() if esito != "validated"}
+            if validati and not scartati:
+                st.success("Report validati e salvati con successo!", icon=ICONS["CHECK"])
+                st.rerun()
+            elif validati:
+                st.warning(
+                    f"{len(validati)} report validati, {len(scartati)} non elaborati: "
+                    + ", ".join(f"{rid} ({esito})" for rid, esito in scartati.items()),
+                    icon=ICONS["WARNING"],
+                )
+            else:
+                st.error(
+                    "Si è verificato un errore durante il salvataggio dei report.",
+                    icon=ICONS["ERROR"],
+                )
 
     with col2:
         reports_to_delete_df = edited_df[edited_df["delete"]]
@@ -166,20 +179,30 @@ def render_relazioni_validation_tab(matricola_utente: str) -> None:
             unvalidated_relazioni_df["timestamp_invio"] = pd.to_datetime(
                 unvalidated_relazioni_df["timestamp_invio"], errors="coerce"
             ).dt.strftime("%d/%m/%Y %H:%M")
+        _render_relazioni_bulk_validation(unvalidated_relazioni_df, matricola_utente)
+        _render_relazioni_prereviews(unvalidated_relazioni_df)
+
+        unvalidated_relazioni_df.insert(0, "valida", False)
         edited_relazioni_df = st.data_editor(
             unvalidated_relazioni_df,
-            num_rows="dynamic",
+            num_rows="fixed",
             key="relazioni_editor",
             width="stretch",
             column_config={
+                "valida": st.column_config.CheckboxColumn("Valida", default=False),
                 "corpo_relazione": st.column_config.TextColumn(width="large"),
                 "id_relazione": st.column_config.Column(disabled=True),
                 "timestamp_invio": st.column_config.Column(disabled=True),
             },
         )
-        if st.button("Salva Relazioni Validate", type="primary", icon=ICONS["CHECK"]):
+        n_selezionate = int(edited_relazioni_df["valida"].sum())
+        if n_selezionate and st.button(
+            f"Valida {n_selezionate} Relazioni Selezionate", type="primary", icon=ICONS["CHECK"]
+        ):
             with st.spinner("Salvataggio delle relazioni in corso..."):
-                if process_and_commit_validated_relazioni(edited_relazioni_df, matricola_utente):
+                if process_and_commit_validated_relazioni(
+                    edited_relazioni_df, matricola_utente, original_df=unvalidated_relazioni_df
+                ):
                     st.success("Relazioni validate e salvate con successo!", icon=ICONS["CHECK"])
                     st.rerun()
                 else:
@@ -187,3 +210,45 @@ def render_relazioni_validation_tab(matricola_utente: str) -> None:
                         "Si è verificato un errore durante il salvataggio delle relazioni.",
                         icon=ICONS["ERROR"],
                     )
+
+
+def _render_relazioni_prereviews(relazioni_df: pd.DataFrame) -> None:
+    """Mostra gli esiti della pre-revisione IA notturna delle relazioni in attesa."""
+    if "id_relazione" not in relazioni_df.columns:
+        return
+    prereviews = get_ai_prereviews(relazioni_df["id_relazione"].astype(str).tolist())
+    if not prereviews:
+        return
+    with st.expander(f"Pre-revisione IA ({len(prereviews)} relazioni)", icon=ICONS["IA"]):
+        for id_relazione, risultato in prereviews.items():
+            st.markdown(f"**{id_relazione}**")
+            st.markdown(risultato)
+
+
+def _render_relazioni_bulk_validation(relazioni_df: pd.DataFrame, matricola_utente: str) -> None:
+    """Validazione massiva per tecnico e settimana con un'unica istruzione."""
+    with st.expander("Validazione massiva"):
+        tecnici = sorted(
+            relazioni_df.get("tecnico_compilatore", pd.Series(dtype=str)).dropna().unique()
+        )
+        tecnico = st.selectbox("Tecnico", ["Tutti", *tecnici], key="bulk_relazioni_tecnico")
+        giorno = st.date_input(
+            "Settimana di riferimento", value=datetime.date.today(), key="bulk_relazioni_sett"
+        )
+        inizio = giorno - datetime.timedelta(days=giorno.weekday())
+        fine = inizio + datetime.timedelta(days=6)
+        st.caption(f"Dal {inizio:%d/%m/%Y} al {fine:%d/%m/%Y}")
+        if st.button("Valida tutte", key="bulk_relazioni_btn", icon=ICONS["CHECK"]):
+            validate_count = validate_relazioni_bulk(
+                matricola_utente,
+                tecnico=None if tecnico == "Tutti" else tecnico,
+                data_da=inizio.isoformat(),
+                data_a=fine.isoformat(),
+            )
+            if validate_count < 0:
+                st.error("Errore durante la validazione massiva.", icon=ICONS["ERROR"])
+            elif validate_count == 0:
+                st.info("Nessuna relazione da validare con i filtri scelti.", icon=ICONS["INFO"])
+            else:
+                st.success(f"{validate_count} relazioni validate.", icon=ICONS["CHECK"])
+                st.rerun()
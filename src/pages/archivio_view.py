@@ -4,12 +4,137 @@ Versione ottimizzata per mobile con design Horizon.
 """
 
 import datetime
+import hashlib
 import os
 from pathlib import Path
 
 import streamlit as st
 
-from modules.archive_manager import get_archive_stats, search_archive
+from constants import ICONS
+from modules.archive_manager import (
+    estrai_tag_archivio,
+    get_archive_stats,
+    search_archive,
+)
+from modules.db_manager import get_tag_timeline
+
+# Lunghezza dell'estratto del testo mostrato per ogni intervento
+TIMELINE_EXCERPT_CHARS = 300
+# Prefisso dei percorsi indicizzati e relativo punto di montaggio nel container Docker
+DEFAULT_ARCHIVE_PREFIX = r"D:\PC ALLEGRETTI COEMI\STORICO SCHEDE\Archivio Schede Elaborate"
+DOCKER_ARCHIVE_PREFIX = "/mnt/archivio_storico"
+# Durata della cache sull'esistenza dei file nella share di rete
+FILE_EXISTS_TTL_SEC = 60
+# Schede lette conservate in memoria per i rerun successivi all'apertura (per percorso)
+DOWNLOAD_CACHE_TTL_SEC = 120
+DOWNLOAD_CACHE_MAX_ENTRIES = 10
+_SOURCE_LABELS = {"report_interventi": "Report intervento", "relazioni": "Relazione reperibilità"}
+_SOURCE_ICONS = {"report_interventi": ICONS["REPORT"], "relazioni": ICONS["RELATION"]}
+
+
+def _format_date(value: str | None) -> str:
+    """Data ISO (anche con orario) in formato GG/MM/AAAA; il valore originale se non valida."""
+    try:
+        return datetime.datetime.strptime(str(value).split("T")[0], "%Y-%m-%d").strftime("%d/%m/%Y")
+    except ValueError:
+        return str(value or "N/D")
+
+
+def _render_tag_timeline(tag: str) -> None:
+    """Storico degli interventi (report e relazioni) che citano il TAG cercato."""
+    timeline = get_tag_timeline(tag)
+    if timeline.empty:
+        return
+
+    st.markdown(
+        f"<p style='color: #64748b; font-size: 0.9rem;'>Storico interventi: "
+        f"{len(timeline)} documenti citano il tag</p>",
+        unsafe_allow_html=True,
+    )
+    for _, row in timeline.iterrows():
+        fonte = _SOURCE_LABELS.get(row["tabella_origine"], row["tabella_origine"])
+        testo = str(row["testo"] or "")
+        if len(testo) > TIMELINE_EXCERPT_CHARS:
+            testo = testo[:TIMELINE_EXCERPT_CHARS].rstrip() + "…"
+        with st.expander(
+            f"{_format_date(row['data_riferimento'])} · {row['tag']} · {fonte}",
+            icon=_SOURCE_ICONS.get(row["tabella_origine"], ICONS["REPORT"]),
+        ):
+            st.caption(f"PdL {row['pdl'] or 'N/D'} · {row['tecnico'] or 'N/D'}")
+            st.write(testo)
+
+
+def _resolve_archive_path(full_path: str) -> str:
+    """Percorso indicizzato (Windows) tradotto nel punto di montaggio del container Docker."""
+    if os.environ.get("IS_DOCKER") != "true":
+        return full_path
+    # Tenta di leggere il prefisso dinamico dall'ambiente
+    windows_prefix = os.environ.get("ARCHIVE_PATH", DEFAULT_ARCHIVE_PREFIX)
+    if windows_prefix in full_path:
+        return full_path.replace(windows_prefix, DOCKER_ARCHIVE_PREFIX).replace("\\", "/")
+    return full_path
+
+
+@st.cache_data(ttl=FILE_EXISTS_TTL_SEC, show_spinner=False)
+def _archive_file_exists(file_path: str) -> bool:
+    """Verifica sulla share di rete, ripetuta al più una volta per intervallo di cache."""
+    return Path(file_path).is_file()
+
+
+@st.cache_resource(
+    ttl=DOWNLOAD_CACHE_TTL_SEC, max_entries=DOWNLOAD_CACHE_MAX_ENTRIES, show_spinner=False
+)
+def _read_archive_file(file_path: str) -> bytes:
+    """
+    Contenuto della scheda, letto dalla share al più una volta per intervallo di cache:
+    i rerun tra l'apertura e il download riusano gli stessi byte (immutabili, non copiati).
+    """
+    return Path(file_path).read_bytes()
+
+
+def _reset_downloads() -> None:
+    """Richiude le schede aperte: il download va richiesto di nuovo."""
+    for k in [k for k in st.session_state if str(k).startswith("dl_ready_")]:
+        del st.session_state[k]
+
+
+@st.fragment
+def _render_download(full_path: str, fname: str) -> None:
+    """
+    Download su richiesta: la scheda viene cercata e letta solo dopo il clic, e il
+    frammento si aggiorna senza rieseguire la ricerca né la pagina.
+    """
+    key = hashlib.sha256(full_path.encode()).hexdigest()[:16]
+    ready_key = f"dl_ready_{key}"
+    if not st.session_state.get(ready_key):
+        if not st.button("📥 Apri Scheda Excel", key=f"dl_open_{key}", use_container_width=True):
+            return
+        st.session_state[ready_key] = True
+
+    file_path = _resolve_archive_path(full_path)
+    if not _archive_file_exists(file_path):
+        st.error("⚠️ File momentaneamente non accessibile sul server.")
+        if st.checkbox("Mostra dettagli errore", key=f"err_{key}"):
+            st.code(f"Path: {file_path}")
+        return
+
+    try:
+        with st.spinner("Lettura della scheda dall'archivio..."):
+            data = _read_archive_file(file_path)
+    except OSError:
+        _archive_file_exists.clear()
+        st.error("⚠️ File momentaneamente non accessibile sul server.")
+        return
+    st.download_button(
+        label="💾 Scarica Scheda Excel",
+        data=data,
+        file_name=fname,
+        mime="application/vnd.ms-excel",
+        key=f"dl_{key}",
+        # Scaricata la scheda, il pulsante torna "Apri" e il file non viene più riletto
+        on_click=lambda: st.session_state.pop(ready_key, None),
+        use_container_width=True,
+    )
 
 
 def render_archivio_page() -> None:
@@ -74,9 +199,11 @@ def render_archivio_page() -> None:
         placeholder="Es: PT-101, 01F015...",
         help="Inserisci almeno 2 caratteri per iniziare la ricerca",
         key="archive_search_input",
+        on_change=_reset_downloads,
     )
 
     if len(search_query) >= 2:
+        _render_tag_timeline(search_query)
         results = search_archive(search_query)
 
         if not results.empty:
@@ -86,19 +213,9 @@ def render_archivio_page() -> None:
             )
 
             for _, row in results.iterrows():
-                # Formattazione data GG/MM/AAAA
-                try:
-                    raw_date = row["last_modified"].split("T")[0]
-                    dt = datetime.datetime.strptime(raw_date, "%Y-%m-%d")
-                    display_date = dt.strftime("%d/%m/%Y")
-                except Exception:
-                    display_date = row["last_modified"]
-
-                # Estrazione Tag
+                # Solo metadati dell'indice: il file viene letto quando l'utente lo richiede
                 fname = row["filename"]
-                tag_part = (
-                    fname.split(" ")[0].split("(")[0].replace(".xls", "").replace(".xlsm", "")
-                )
+                tag_part = row.get("tag") or estrai_tag_archivio(fname)
 
                 with st.expander(f"📄 {fname}"):
                     # Layout pulito
@@ -107,40 +224,12 @@ def render_archivio_page() -> None:
                         <div style='margin-bottom: 10px;'>
                             <div style='font-size: 0.9rem;'><b>Tag:</b> <span class='tag-highlight'>{tag_part}</span></div>
                             <div style='font-size: 0.85rem; color: #64748b;'><b>Periodo:</b> {row["month"]} {row["year"]}</div>
-                            <div style='font-size: 0.85rem; color: #64748b;'><b>Ultima Modifica:</b> {display_date}</div>
+                            <div style='font-size: 0.85rem; color: #64748b;'><b>Ultima Modifica:</b> {_format_date(row["last_modified"])}</div>
                         </div>
                     """,
                         unsafe_allow_html=True,
                     )
-
-                    # Gestione Path per Docker
-                    file_path = row["full_path"]
-                    if os.environ.get("IS_DOCKER") == "true":
-                        # Tenta di leggere il prefisso dinamico dall'ambiente
-                        windows_prefix = os.environ.get(
-                            "ARCHIVE_PATH",
-                            r"D:\PC ALLEGRETTI COEMI\STORICO SCHEDE\Archivio Schede Elaborate",
-                        )
-                        docker_prefix = "/mnt/archivio_storico"
-                        if windows_prefix in file_path:
-                            file_path = file_path.replace(windows_prefix, docker_prefix).replace(
-                                "\\", "/"
-                            )
-
-                    if Path(file_path).exists():
-                        with open(file_path, "rb") as f:
-                            st.download_button(
-                                label="📥 Apri Scheda Excel",
-                                data=f,
-                                file_name=fname,
-                                mime="application/vnd.ms-excel",
-                                key=f"dl_{fname}_{row['year']}_{display_date}",
-                                use_container_width=True,
-                            )
-                    else:
-                        st.error("⚠️ File momentaneamente non accessibile sul server.")
-                        if st.checkbox("Mostra dettagli errore", key=f"err_{fname}"):
-                            st.code(f"Path: {file_path}")
+                    _render_download(row["full_path"], fname)
         else:
             st.warning("Nessun file trovato. Prova con un altro tag.")
     elif search_query:
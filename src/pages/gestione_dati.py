@@ -11,13 +11,16 @@ from constants import ICONS
 from modules.data_manager import get_all_assigned_activities
 from modules.db_manager import (
     add_assignment_exclusion,
+    apply_table_changes,
     get_all_users,
-    get_table_data,
+    get_table_key_columns,
     get_table_names,
+    get_table_page,
     get_validated_intervention_reports,
-    save_table_data,
 )
 
+TABLE_PAGE_SIZE = 100
+
 
 def render_gestione_dati_tab() -> None:
     """Renderizza l'interfaccia per la gestione tabellare del database."""
@@ -36,20 +39,96 @@ def render_gestione_dati_tab() -> None:
     selected_table = st.selectbox("Seleziona una tabella", table_names)
 
     if selected_table:
-        df = get_table_data(selected_table)
-        st.write(f"Dati della tabella: **{selected_table}**")
-        edited_df = st.data_editor(df, num_rows="dynamic")
-
-        if st.button("Salva Modifiche", icon=ICONS["SAVE"], type="primary"):
-            if save_table_data(edited_df, selected_table):
-                st.success("Dati salvati con successo!", icon=ICONS["CHECK"])
-            else:
-                st.error("Errore durante il salvataggio dei dati.", icon=ICONS["ERROR"])
+        _render_table_editor(selected_table)
 
     st.divider()
     _render_esclusioni_sezione()
 
 
+def _render_table_editor(table_name: str) -> None:
+    """Editor paginato di una tabella: salva solo le righe modificate, aggiunte o eliminate."""
+    key_columns = get_table_key_columns(table_name)
+    page_key = f"gestione_dati_page_{table_name}"
+    page = int(st.session_state.get(page_key, 0))
+    df, total = get_table_page(table_name, TABLE_PAGE_SIZE, page * TABLE_PAGE_SIZE)
+    total_pages = max(1, -(-total // TABLE_PAGE_SIZE))
+
+    st.write(f"Dati della tabella: **{table_name}** ({total} righe)")
+    saved_message = st.session_state.pop(f"{page_key}_saved", None)
+    if saved_message:
+        st.success(saved_message, icon=ICONS["CHECK"])
+    editor_key = f"editor_{table_name}_{page}"
+    st.data_editor(
+        df,
+        num_rows="dynamic",
+        key=editor_key,
+        disabled=["rowid"] if key_columns == ["rowid"] else False,
+    )
+
+    if total_pages > 1:
+        _render_table_pagination(page_key, page, total_pages)
+
+    if st.button("Salva Modifiche", icon=ICONS["SAVE"], type="primary"):
+        updates, inserts, deletes = build_change_set(
+            df, st.session_state.get(editor_key, {}), key_columns
+        )
+        if not (updates or inserts or deletes):
+            st.info("Nessuna modifica da salvare.", icon=ICONS["INFO"])
+        elif apply_table_changes(table_name, updates, inserts, deletes):
+            # Le modifiche dell'editor sono per posizione: dopo il salvataggio vanno scartate,
+            # altrimenti verrebbero riapplicate sui dati ricaricati
+            del st.session_state[editor_key]
+            st.session_state[f"{page_key}_saved"] = (
+                f"Dati salvati con successo! ({len(updates)} modificate, "
+                f"{len(inserts)} aggiunte, {len(deletes)} eliminate)"
+            )
+            st.rerun()
+        else:
+            st.error("Errore durante il salvataggio dei dati.", icon=ICONS["ERROR"])
+
+
+def _render_table_pagination(page_key: str, page: int, total_pages: int) -> None:
+    """Controlli di navigazione tra le pagine della tabella."""
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    if col_prev.button("Precedente", key=f"{page_key}_prev", disabled=page == 0):
+        st.session_state[page_key] = page - 1
+        st.rerun()
+    col_info.caption(f"Pagina {page + 1} di {total_pages}")
+    if col_next.button("Successiva", key=f"{page_key}_next", disabled=page >= total_pages - 1):
+        st.session_state[page_key] = page + 1
+        st.rerun()
+
+
+def build_change_set(
+    df: pd.DataFrame, editor_state: dict[str, Any], key_columns: list[str]
+) -> tuple[list[tuple[dict[str, Any], dict[str, Any]]], list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Converte lo stato di st.data_editor (edited_rows, added_rows, deleted_rows)
+    in un change-set indicizzato per chiave primaria sulla pagina originale.
+    """
+
+    def _key(position: int) -> dict[str, Any]:
+        row = df.iloc[position]
+        return {k: _to_python(row[k]) for k in key_columns}
+
+    deleted = set(editor_state.get("deleted_rows", []))
+    updates = [
+        (_key(int(pos)), changes)
+        for pos, changes in editor_state.get("edited_rows", {}).items()
+        if int(pos) not in deleted and changes
+    ]
+    inserts = [row for row in editor_state.get("added_rows", []) if row]
+    deletes = [_key(int(pos)) for pos in sorted(deleted)]
+    return updates, inserts, deletes
+
+
+def _to_python(value: Any) -> Any:
+    """Converte i valori numpy/pandas in tipi nativi accettati da sqlite3."""
+    if pd.isna(value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+
 def _render_esclusioni_sezione() -> None:
     """Sotto-funzione per la gestione delle esclusioni degli assegnamenti."""
     st.subheader("Gestione Esclusioni Assegnamenti")
@@ -13,7 +13,6 @@ from modules.db_manager import (
     get_all_bookings,
     get_all_substitutions,
     get_all_users,
-    get_shifts_by_type,
 )
 from pages.shifts.market_view import render_bacheca_tab, render_sostituzioni_tab
 from pages.shifts.oncall_calendar_view import render_reperibilita_tab
@@ -47,8 +46,7 @@ def render_gestione_turni_tab(matricola_utente: str, ruolo: str) -> None:
         st1, st2, st3 = st.tabs(["Assistenza", "Straordinario", "Reperibilità"])
         with st1:
             render_turni_list(
-                get_shifts_by_type("Assistenza"),
-                df_p,
+                "Assistenza",
                 df_u,
                 matricola_utente,
                 ruolo,
@@ -56,8 +54,7 @@ def render_gestione_turni_tab(matricola_utente: str, ruolo: str) -> None:
             )
         with st2:
             render_turni_list(
-                get_shifts_by_type("Straordinario"),
-                df_p,
+                "Straordinario",
                 df_u,
                 matricola_utente,
                 ruolo,
@@ -7,7 +7,7 @@ import datetime
 import pandas as pd
 import streamlit as st
 
-from modules.db_manager import get_pdl_programmazione
+from modules.db_manager import get_pdl_programmazione, search_pdl_programmazione
 
 
 def render_programmazione_pdl_page() -> None:
@@ -21,25 +21,20 @@ def render_programmazione_pdl_page() -> None:
     start_of_week = today - datetime.timedelta(days=today.weekday())
     end_of_week = start_of_week + datetime.timedelta(days=6)
 
-    # Recupero dati
-    df_oggi = get_pdl_programmazione(today.isoformat(), today.isoformat())
-    df_settimana = get_pdl_programmazione(start_of_week.isoformat(), end_of_week.isoformat())
+    # Recupero dati (con ricerca full-text sull'indice FTS5 se c'è un testo da cercare)
+    def load(data_inizio: datetime.date, data_fine: datetime.date) -> pd.DataFrame:
+        if search:
+            return search_pdl_programmazione(search, data_inizio.isoformat(), data_fine.isoformat())
+        return get_pdl_programmazione(data_inizio.isoformat(), data_fine.isoformat())
+
+    df_oggi = load(today, today)
+    df_settimana = load(start_of_week, end_of_week)
 
     # Formattazione per la visualizzazione
     def format_df(df: pd.DataFrame) -> pd.DataFrame:
         if df.empty:
             return df
 
-        if search:
-            df = df[
-                df["pdl"].str.contains(search, case=False, na=False)
-                | df["team"].str.contains(search, case=False, na=False)
-                | df["descrizione"].str.contains(search, case=False, na=False)
-            ]
-
-        if df.empty:
-            return df
-
         display_df = df.copy()
         display_df.columns = [
             "PDL",
@@ -4,6 +4,7 @@ import pandas as pd
 import streamlit as st
 
 from constants import ICONS
+from core.ids import genera_id
 from modules.db_manager import (
     add_material_request,
     get_all_users,
@@ -23,7 +24,7 @@ def render_richieste_tab(matricola_utente: str, ruolo: str, nome_utente_autentic
             submitted = st.form_submit_button("Invia Richiesta Materiali", type="primary")
             if submitted and dettagli_richiesta.strip():
                 now_iso = datetime.datetime.now().isoformat()
-                new_id = f"MAT_{int(datetime.datetime.now().timestamp())}"
+                new_id = genera_id("MAT")
 
                 parts = nome_utente_autenticato.split(" ", 1)
                 nome = parts[0]
@@ -3,11 +3,14 @@ Vista tabellare per l'elenco dei turni di assistenza e straordinario.
 Permette il filtraggio, la ricerca e le operazioni di prenotazione/scambio.
 """
 
+import datetime
 from typing import Any
 
 import pandas as pd
 import streamlit as st
 
+from constants import ICONS
+from modules.db_manager import get_shifts_occupancy
 from modules.shift_management import (
     cancella_prenotazione_logic,
     prenota_turno_logic,
@@ -15,21 +18,45 @@ from modules.shift_management import (
     richiedi_sostituzione_logic,
 )
 
+SHIFTS_PAGE_SIZE = 20
+
 
 def render_turni_list(
-    df_turni: pd.DataFrame,
-    df_bookings: pd.DataFrame,
+    shift_type: str,
     df_users: pd.DataFrame,
     matricola_utente: str,
     ruolo: str,
     key_suffix: str,
 ) -> None:
-    """Visualizza l'elenco dei turni disponibili con filtri di ricerca."""
+    """Visualizza l'elenco paginato dei turni con filtri eseguiti direttamente in SQL."""
+    mostra_solo_disponibili = st.checkbox("Solo posti disponibili", key=f"filter_{key_suffix}")
+    mostra_passati = st.checkbox("Mostra turni passati", key=f"past_{key_suffix}")
+
+    search = None
+    if ruolo == "Amministratore":
+        search = st.text_input("Cerca descrizione...", key=f"search_{key_suffix}") or None
+
+    page_key = f"page_{key_suffix}"
+    page = int(st.session_state.get(page_key, 0))
+    from_date = None if mostra_passati else datetime.date.today().isoformat()
+    df_turni = get_shifts_occupancy(
+        shift_type,
+        matricola_utente,
+        only_available=mostra_solo_disponibili,
+        from_date=from_date,
+        search=search,
+        limit=SHIFTS_PAGE_SIZE,
+        offset=page * SHIFTS_PAGE_SIZE,
+    )
+
     if df_turni.empty:
+        if page > 0:
+            # La pagina corrente non esiste più (filtri cambiati): si riparte dalla prima
+            st.session_state[page_key] = 0
+            st.rerun()
         st.info("Nessun turno di questo tipo disponibile al momento.")
         return
 
-    mostra_solo_disponibili = st.checkbox("Solo posti disponibili", key=f"filter_{key_suffix}")
     m_to_n: dict[str, Any] = {
         str(k): v
         for k, v in pd.Series(
@@ -39,41 +66,39 @@ def render_turni_list(
         .items()
     }
 
-    if ruolo == "Amministratore":
-        search = st.text_input("Cerca descrizione...", key=f"search_{key_suffix}")
-        if search:
-            df_turni = df_turni[df_turni["Descrizione"].str.contains(search, case=False, na=False)]
-
     st.divider()
     for _, turno in df_turni.iterrows():
-        _render_turno_card(
-            turno,
-            df_bookings,
-            m_to_n,
-            matricola_utente,
-            key_suffix,
-            mostra_solo_disponibili,
-            df_users,
-        )
+        _render_turno_card(turno, m_to_n, matricola_utente, key_suffix, df_users)
+
+    total = int(df_turni["total_count"].iloc[0])
+    _render_pagination(page_key, page, total, key_suffix)
+
+
+def _render_pagination(page_key: str, page: int, total: int, key_suffix: str) -> None:
+    """Mostra i controlli di navigazione tra le pagine dell'elenco turni."""
+    n_pages = max(1, -(-total // SHIFTS_PAGE_SIZE))
+    if n_pages == 1:
+        return
+    c1, c2, c3 = st.columns([1, 2, 1])
+    if c1.button("Precedenti", key=f"prev_{key_suffix}", disabled=page == 0):
+        st.session_state[page_key] = page - 1
+        st.rerun()
+    c2.caption(f"Pagina {page + 1} di {n_pages} ({total} turni)")
+    if c3.button("Successivi", key=f"next_{key_suffix}", disabled=page >= n_pages - 1):
+        st.session_state[page_key] = page + 1
+        st.rerun()
 
 
 def _render_turno_card(
     turno: pd.Series,
-    df_bookings: pd.DataFrame,
     m_to_n: dict[str, Any],
     matricola_utente: str,
     key_suffix: str,
-    filter_active: bool,
     df_users: pd.DataFrame,
 ) -> None:
     """Sotto-funzione per il rendering della card del singolo turno."""
-    p_turno = df_bookings[df_bookings["ID_Turno"] == turno["ID_Turno"]]
     posti_t, posti_a = int(turno["PostiTecnico"]), int(turno["PostiAiutante"])
-    booked_t = len(p_turno[p_turno["RuoloOccupato"] == "Tecnico"])
-    booked_a = len(p_turno[p_turno["RuoloOccupato"] == "Aiutante"])
-
-    if filter_active and (booked_t >= posti_t and booked_a >= posti_a):
-        return
+    booked_t, booked_a = int(turno["booked_tecnico"]), int(turno["booked_aiutante"])
 
     with st.container(border=True):
         st.markdown(f"**{turno['Descrizione']}**")
@@ -82,16 +107,11 @@ def _render_turno_card(
 
         st.markdown(f"`Tecnici: {booked_t}/{posti_t}` | `Aiutanti: {booked_a}/{posti_a}`")
 
-        if not p_turno.empty:
-            names = [
-                f"{m_to_n.get(str(p['Matricola']), 'N/D')} ({p['RuoloOccupato']})"
-                for _, p in p_turno.iterrows()
-            ]
-            st.markdown(f"**Prenotati:** {', '.join(names)}")
+        if turno["booked_names"]:
+            st.markdown(f"**Prenotati:** {turno['booked_names']}")
 
         _render_turno_actions(
             turno,
-            p_turno,
             matricola_utente,
             key_suffix,
             booked_t,
@@ -103,12 +123,8 @@ def _render_turno_card(
         )
 
 
-from constants import ICONS
-
-
 def _render_turno_actions(
     turno: pd.Series,
-    p_turno: pd.DataFrame,
     matricola_utente: str,
     key_suffix: str,
     b_t: int,
@@ -119,10 +135,9 @@ def _render_turno_actions(
     m_to_n: dict[str, Any],
 ) -> None:
     """Gestisce i pulsanti di azione (Prenota, Cancella, Scambio) per un turno."""
-    p_utente = p_turno[p_turno["Matricola"] == matricola_utente]
     t_id = turno["ID_Turno"]
 
-    if not p_utente.empty:
+    if bool(turno["user_booked"]):
         st.success("Sei prenotato.", icon=ICONS["CHECK"])
         c1, c2, c3 = st.columns(3)
         if c1.button(
@@ -9,9 +9,72 @@ from modules.db_manager import (
     get_storico_richieste_materiali,
     get_validated_intervention_reports,
     get_validated_reports,
+    search_full_text,
+    search_pdl_programmazione,
 )
 from pages.archivio_view import render_archivio_page
 
+# Risultati per pagina nelle ricerche full-text dello storico
+SEARCH_PAGE_SIZE = 20
+
+
+def _format_search_date(value: object) -> str:
+    """Data del documento in formato GG/MM/AAAA per i titoli dei risultati."""
+    dt = pd.to_datetime(value, errors="coerce")
+    return dt.strftime("%d/%m/%Y") if pd.notna(dt) else "Data non disponibile"
+
+
+def _render_search_results(source: str, search_term: str, key: str) -> None:
+    """
+    Risultati della ricerca full-text nello storico, ordinati per rilevanza e paginati.
+    Ogni risultato mostra l'estratto con le parole trovate e il testo completo.
+    """
+    page_key = f"page_{key}_{search_term}"
+    page = st.session_state.get(page_key, 1)
+    solo_validati = source == "relazioni"
+    results, total = search_full_text(
+        source,
+        search_term,
+        limit=SEARCH_PAGE_SIZE,
+        offset=(page - 1) * SEARCH_PAGE_SIZE,
+        solo_validati=solo_validati,
+    )
+    if total == 0:
+        st.info("Nessun risultato per la ricerca.")
+        return
+
+    st.caption(f"{total} risultati, ordinati per rilevanza.")
+    is_report = source == "report_interventi"
+    for _, row in results.iterrows():
+        if is_report:
+            doc_id, data, tecnico, testo = (
+                row["id_report"],
+                row["data_riferimento_attivita"],
+                row["nome_tecnico"],
+                row["testo_report"],
+            )
+        else:
+            doc_id, data, tecnico, testo = (
+                row["id_relazione"],
+                row["data_intervento"],
+                row["tecnico_compilatore"],
+                row["corpo_relazione"],
+            )
+        title = f"**{_format_search_date(data)}** - PdL: **{row['pdl']}** - Tecnico: **{tecnico}**"
+        with st.expander(title):
+            st.markdown(row["snippet"])
+            st.text_area(
+                "Testo completo:",
+                value=testo or "",
+                height=200,
+                disabled=True,
+                key=f"search_{key}_{doc_id}",
+            )
+
+    pages = -(-total // SEARCH_PAGE_SIZE)
+    if pages > 1:
+        st.number_input("Pagina", min_value=1, max_value=pages, step=1, key=page_key)
+
 
 def render_storico_tab() -> None:
     """
@@ -32,22 +95,15 @@ def render_storico_tab() -> None:
 
     with tab1:
         st.subheader("Archivio Report di Intervento Validati")
-        df_attivita = get_validated_intervention_reports()
-
-        if not df_attivita.empty:
-            # Search functionality
-            search_term = st.text_input(
-                "Cerca per PdL, descrizione o tecnico...", key="search_attivita"
-            )
-            if search_term:
-                df_attivita = df_attivita[
-                    df_attivita["pdl"].str.contains(search_term, case=False, na=False)
-                    | df_attivita["descrizione_attivita"].str.contains(
-                        search_term, case=False, na=False
-                    )
-                    | df_attivita["nome_tecnico"].str.contains(search_term, case=False, na=False)
-                ]
+        # Ricerca full-text (FTS5): l'archivio completo si carica solo senza ricerca
+        search_term = st.text_input(
+            "Cerca per PdL, descrizione, tecnico o testo del report...", key="search_attivita"
+        )
+        df_attivita = pd.DataFrame() if search_term else get_validated_intervention_reports()
 
+        if search_term:
+            _render_search_results("report_interventi", search_term, "attivita")
+        elif not df_attivita.empty:
             # Group by PDL
             grouped_by_pdl = df_attivita.groupby("pdl")
 
@@ -101,23 +157,21 @@ def render_storico_tab() -> None:
         with c2:
             data_fine = st.date_input("Alla data", today, format="DD/MM/YYYY")
 
-        df_prog = get_pdl_programmazione(data_inizio.isoformat(), data_fine.isoformat())
+        with c3:
+            search_prog = st.text_input(
+                "Cerca (Team, PDL o Descrizione)", "", key="search_storico_prog"
+            )
+
+        if search_prog:
+            df_prog = search_pdl_programmazione(
+                search_prog, data_inizio.isoformat(), data_fine.isoformat()
+            )
+        else:
+            df_prog = get_pdl_programmazione(data_inizio.isoformat(), data_fine.isoformat())
 
         if df_prog.empty:
             st.warning("Nessun PDL trovato per il periodo selezionato.")
         else:
-            with c3:
-                search_prog = st.text_input(
-                    "Cerca (Team, PDL o Descrizione)", "", key="search_storico_prog"
-                )
-
-            if search_prog:
-                df_prog = df_prog[
-                    df_prog["pdl"].str.contains(search_prog, case=False, na=False)
-                    | df_prog["team"].str.contains(search_prog, case=False, na=False)
-                    | df_prog["descrizione"].str.contains(search_prog, case=False, na=False)
-                ]
-
             display_df = df_prog.copy()
             display_df.columns = [
                 "PDL",
@@ -173,8 +227,13 @@ def render_storico_tab() -> None:
 
     with tab3:
         st.subheader("Archivio Relazioni di Reperibilità Validate")
-        df_relazioni = get_validated_reports("relazioni")
-        if not df_relazioni.empty:
+        search_rel = st.text_input(
+            "Cerca per PdL, tecnico o testo della relazione...", key="search_relazioni"
+        )
+        df_relazioni = pd.DataFrame() if search_rel else get_validated_reports("relazioni")
+        if search_rel:
+            _render_search_results("relazioni", search_rel, "relazioni")
+        elif not df_relazioni.empty:
             # Ordina le relazioni per data di intervento
             if "data_intervento" in df_relazioni.columns:
                 df_relazioni["data_intervento"] = pd.to_datetime(df_relazioni["data_intervento"])
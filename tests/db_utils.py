@@ -62,4 +62,13 @@ CREATE TABLE report_da_validare (
     data_compilazione TEXT,
     data_riferimento_attivita TEXT
 );
+CREATE TABLE tag_occurrences (
+    tag TEXT NOT NULL,
+    loop TEXT NOT NULL,
+    tabella_origine TEXT NOT NULL,
+    id_origine TEXT NOT NULL,
+    data_riferimento TEXT,
+    occorrenze INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (tabella_origine, id_origine, tag)
+);
 """
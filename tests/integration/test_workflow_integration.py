@@ -127,7 +127,7 @@ class TestWorkflowIntegration(unittest.TestCase):
     @patch("pages.gestione_turni.get_all_users")
     @patch("pages.gestione_turni.get_all_bacheca_items")
     @patch("pages.gestione_turni.get_all_substitutions")
-    @patch("pages.gestione_turni.get_shifts_by_type")
+    @patch("pages.shifts.shifts_list_view.get_shifts_occupancy")
     @patch("pages.shifts.oncall_calendar_view.get_shifts_by_type")
     @patch("app.get_user_by_matricola")
     @patch("pages.gestione_turni.st")
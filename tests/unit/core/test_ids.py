@@ -0,0 +1,49 @@
+"""
+Test unitari per il generatore di identificativi ordinati nel tempo.
+"""
+
+import threading
+
+from core import ids
+from core.ids import genera_id, new_ulid
+
+
+def test_ulid_format():
+    """Un ULID è lungo 26 caratteri e usa l'alfabeto Crockford Base32."""
+    value = new_ulid()
+    assert len(value) == 26
+    assert set(value) <= set(ids._CROCKFORD)
+
+
+def test_genera_id_prefix():
+    """Il prefisso di dominio viene anteposto con underscore."""
+    assert genera_id("P").startswith("P_")
+    assert len(genera_id("MAT")) == len("MAT_") + 26
+    assert "_" not in genera_id()
+
+
+def test_ids_are_monotonic_within_same_millisecond(mocker):
+    """A parità di millisecondo gli ID restano unici e strettamente crescenti."""
+    mocker.patch("core.ids.time.time_ns", return_value=1_700_000_000_000_000_000)
+    generated = [genera_id("N") for _ in range(1000)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+
+
+def test_ids_are_unique_across_threads():
+    """Generazione concorrente senza collisioni."""
+    results: list[str] = []
+    lock = threading.Lock()
+
+    def worker():
+        local = [genera_id("B") for _ in range(500)]
+        with lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == 4000
@@ -5,8 +5,19 @@ Test unitari per il sistema di logging strutturato.
 import io
 import json
 import logging
+import queue
 
-from core.logging import JsonFormatter, get_logger, with_context
+import pytest
+
+from core import logging as app_logging
+from core.logging import (
+    ContextQueueHandler,
+    JsonFormatter,
+    get_logger,
+    measure_time,
+    set_logger_levels,
+    with_context,
+)
 
 
 def test_json_formatter_structure():
@@ -48,3 +59,81 @@ def test_logging_context_propagation():
 
     assert data["trace_id"] == test_trace
     assert data["message"] == "Message with context"
+
+
+def test_loggers_share_a_single_queue_handler():
+    """Nessun handler (e nessun file aperto) per modulo: un solo QueueHandler condiviso."""
+    first = get_logger("test_shared.a")
+    second = get_logger("test_shared.b")
+
+    assert first.handlers == second.handlers
+    assert isinstance(first.handlers[0], ContextQueueHandler)
+
+
+def test_queued_record_keeps_caller_context_and_exception():
+    """Il contesto thread-local viene fissato all'accodamento, non alla serializzazione."""
+    captured = []
+    handler = ContextQueueHandler(queue.SimpleQueue())
+    handler.enqueue = captured.append
+    logger = logging.getLogger("test_queue_context")
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    with with_context(trace_id="trace-coda", utente="M1"):
+        try:
+            raise ValueError("guasto")
+        except ValueError:
+            logger.exception("Valore %s", "errato")
+
+    data = json.loads(JsonFormatter().format(captured[0]))
+    assert data["message"] == "Valore errato"
+    assert data["trace_id"] == "trace-coda"
+    assert data["utente"] == "M1"
+    assert "ValueError: guasto" in data["exception"]
+
+
+@pytest.fixture
+def restore_levels(monkeypatch):
+    monkeypatch.setattr(app_logging, "_logger_levels", {})
+
+
+def test_per_logger_levels_apply_to_descendants(restore_levels):
+    db_logger = get_logger("test_levels.database.reports")
+    ui_logger = get_logger("test_levels.ui")
+
+    set_logger_levels({"test_levels": "warning", "test_levels.database": "DEBUG"})
+
+    assert db_logger.level == logging.DEBUG
+    assert ui_logger.level == logging.WARNING
+    assert get_logger("test_levels.ui.nuovo").level == logging.WARNING
+
+
+def test_parse_levels_ignores_malformed_entries():
+    assert app_logging._parse_levels("a.b=debug, c = WARNING,,x") == {
+        "a.b": "DEBUG",
+        "c": "WARNING",
+    }
+
+
+def test_invalid_levels_are_skipped_with_a_warning(restore_levels):
+    with pytest.warns(UserWarning, match="LOG_LEVELS"):
+        assert app_logging._parse_levels("a=VERBOSE,b=error") == {"b": "ERROR"}
+
+    ui_logger = get_logger("test_invalid_levels.ui")
+    before = ui_logger.level
+    with pytest.warns(UserWarning, match="test_invalid_levels"):
+        set_logger_levels({"test_invalid_levels": "TRACE"})
+    assert ui_logger.level == before
+
+
+def test_measure_time_success_is_not_logged_at_info(mocker):
+    @measure_time
+    def somma(a, b):
+        return a + b
+
+    logger = get_logger(__name__)
+    logger.setLevel(logging.INFO)
+    debug = mocker.patch.object(logger, "debug")
+
+    assert somma(1, 2) == 3
+    debug.assert_not_called()
@@ -0,0 +1,136 @@
+"""
+Test unitari per il registro delle metriche e la sua integrazione con measure_time.
+"""
+
+import pytest
+
+from core import logging as app_logging
+from core import metrics
+from core.logging import measure_time
+from core.metrics import Histogram, MetricsRegistry, function_timings
+
+
+def test_histogram_buckets_and_quantiles():
+    hist = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 5:
+        hist.observe(value)
+
+    assert hist.count == 100
+    assert hist.cumulative_buckets() == [(0.01, 50), (0.1, 95), (1.0, 100), (float("inf"), 100)]
+    # p50 al limite del primo bucket, p95 al limite del secondo; il massimo limita l'ultimo
+    assert hist.quantile(0.5) == pytest.approx(0.01)
+    assert hist.quantile(0.95) == pytest.approx(0.1)
+    assert hist.quantile(1.0) == pytest.approx(0.5)
+
+
+def test_histogram_overflow_returns_max():
+    hist = Histogram(buckets=(0.1,))
+    hist.observe(3.0)
+    assert hist.quantile(0.95) == 3.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_registry_identifies_metrics_by_name_and_labels():
+    registry = MetricsRegistry()
+    registry.counter("chiamate", function="a").inc()
+    registry.counter("chiamate", function="a").inc(2)
+    registry.counter("chiamate", function="b").inc()
+    registry.gauge("in_corso").set(3)
+
+    snapshot = registry.snapshot()
+
+    values = {c["labels"]["function"]: c["value"] for c in snapshot["counters"]}
+    assert values == {"a": 3, "b": 1}
+    assert snapshot["gauges"] == [{"name": "in_corso", "labels": {}, "value": 3}]
+
+
+def test_reset_keeps_metric_objects_alive():
+    registry = MetricsRegistry()
+    hist = registry.histogram("durata")
+    hist.observe(0.2)
+
+    registry.reset()
+    hist.observe(0.3)
+
+    assert registry.snapshot()["histograms"][0]["count"] == 1
+
+
+def test_function_timings_since_baseline_leaves_registry_untouched():
+    registry = MetricsRegistry()
+    lenta = registry.histogram(metrics.FUNCTION_DURATION, function="m.lenta")
+    ferma = registry.histogram(metrics.FUNCTION_DURATION, function="m.ferma")
+    errori = registry.counter(metrics.FUNCTION_ERRORS, function="m.lenta")
+    for _ in range(10):
+        lenta.observe(2.0)
+    ferma.observe(0.001)
+    errori.inc()
+
+    baseline = registry.snapshot()
+    for _ in range(4):
+        lenta.observe(0.003)
+    errori.inc(2)
+
+    rows = function_timings(registry, since=baseline)
+
+    # Solo le chiamate successive allo snapshot; le funzioni non chiamate non compaiono
+    assert [(r["function"], r["calls"], r["errors"]) for r in rows] == [("m.lenta", 4, 2)]
+    assert rows[0]["p95_ms"] <= 5.0
+    assert rows[0]["max_ms"] == 5.0
+    # Il registro condiviso resta monotono
+    assert lenta.count == 14
+    assert errori.value == 3
+    assert {r["function"]: r["calls"] for r in function_timings(registry)} == {
+        "m.lenta": 14,
+        "m.ferma": 1,
+    }
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_measure_time_updates_registry_without_logging(registry, mocker):
+    @measure_time
+    def veloce():
+        return "ok"
+
+    @measure_time
+    def guasta():
+        raise ValueError("errore")
+
+    logger = app_logging.get_logger(__name__)
+    info = mocker.patch.object(logger, "info")
+    mocker.patch.object(logger, "error")
+
+    for _ in range(3):
+        assert veloce() == "ok"
+    with pytest.raises(ValueError):
+        guasta()
+
+    rows = {r["function"].rsplit(".", 1)[-1]: r for r in function_timings(registry)}
+    assert rows["veloce"]["calls"] == 3
+    assert rows["veloce"]["errors"] == 0
+    assert rows["guasta"]["errors"] == 1
+    info.assert_not_called()
+    in_progress = [g["value"] for g in registry.snapshot()["gauges"]]
+    assert in_progress == [0, 0]
+
+
+def test_slow_calls_are_logged_by_sample(registry, mocker, monkeypatch):
+    monkeypatch.setattr(app_logging, "SLOW_CALL_THRESHOLD_SEC", 0.0)
+    monkeypatch.setattr(app_logging, "SLOW_CALL_LOG_EVERY", 5)
+
+    @measure_time
+    def lenta():
+        return None
+
+    warning = mocker.patch.object(app_logging.get_logger(__name__), "warning")
+    for _ in range(12):
+        lenta()
+
+    # Chiamate lente numero 1, 6 e 11
+    assert warning.call_count == 3
+    assert warning.call_args.kwargs["extra"]["extra_data"]["slow_calls"] == 11
@@ -0,0 +1,77 @@
+"""
+Test unitari per l'exporter Prometheus delle metriche.
+"""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from core import metrics_exporter
+from core.metrics import MetricsRegistry
+from core.metrics_exporter import (
+    render_prometheus,
+    start_metrics_server,
+    stop_metrics_server,
+)
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("function_errors_total", function='db.get "utenti"').inc(2)
+    registry.gauge("email_outbox_depth", stato="in_coda").set(4)
+    hist = registry.histogram("function_duration_seconds", function="db.get")
+    hist.observe(0.004)
+    hist.observe(0.2)
+
+    text = render_prometheus(registry)
+
+    assert "# TYPE report_attivita_function_errors_total counter" in text
+    assert 'report_attivita_function_errors_total{function="db.get \\"utenti\\""} 2' in text
+    assert 'report_attivita_email_outbox_depth{stato="in_coda"} 4' in text
+    assert "# TYPE report_attivita_function_duration_seconds histogram" in text
+    assert (
+        'report_attivita_function_duration_seconds_bucket{function="db.get",le="0.005"} 1' in text
+    )
+    assert 'report_attivita_function_duration_seconds_bucket{function="db.get",le="+Inf"} 2' in text
+    assert 'report_attivita_function_duration_seconds_count{function="db.get"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_failing_collector_does_not_break_export():
+    registry = MetricsRegistry()
+
+    def guasto(_registry):
+        raise RuntimeError("database non raggiungibile")
+
+    def sessioni(reg):
+        reg.gauge("active_sessions").set(3)
+
+    registry.register_collector(guasto)
+    registry.register_collector(sessioni)
+
+    text = render_prometheus(registry)
+
+    assert "report_attivita_active_sessions 3" in text
+    assert 'report_attivita_metrics_collector_errors_total{collector="guasto"} 1' in text
+
+
+@pytest.fixture
+def server():
+    server = start_metrics_server(port=0, host="127.0.0.1")
+    yield server
+    stop_metrics_server()
+
+
+def test_metrics_endpoint_serves_registry(server):
+    base = f"http://127.0.0.1:{server.server_port}"
+    with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:  # nosec B310
+        assert response.status == 200
+        assert response.headers["Content-Type"] == metrics_exporter.CONTENT_TYPE
+
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(f"{base}/altro", timeout=5)  # nosec B310
+    assert exc.value.code == 404
+
+    # Avvio idempotente: una sola istanza per processo
+    assert start_metrics_server(port=0, host="127.0.0.1") is server
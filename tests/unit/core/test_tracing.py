@@ -0,0 +1,102 @@
+"""
+Test per il tracciamento dei rerun (core.tracing) e gli span aperti da measure_time.
+"""
+
+import pytest
+
+from core import tracing
+from core.logging import _capture_context, measure_time, with_context
+
+
+@pytest.fixture(autouse=True)
+def _clear_traces():
+    tracing.clear_traces()
+    yield
+    tracing.clear_traces()
+
+
+@measure_time
+def _query():
+    return 42
+
+
+def test_span_without_active_trace_records_nothing():
+    with tracing.span("fuori") as s:
+        assert _query() == 42
+
+    assert s is None
+    assert tracing.recent_traces() == []
+
+
+def test_trace_builds_span_tree_from_sections_and_measured_calls():
+    with tracing.start_trace("main_app", user="M1", tab="Storico") as trace:
+        with tracing.span("sidebar"):
+            _query()
+        with tracing.span("pagina: Storico"):
+            _query()
+            _query()
+
+    assert tracing.recent_traces() == [trace]
+    root = trace.root
+    assert root.attributes == {"user": "M1", "tab": "Storico"}
+    assert [c.name for c in root.children] == ["sidebar", "pagina: Storico"]
+    assert [c.name for c in root.children[1].children] == [f"{__name__}._query"] * 2
+    assert all(c.end is not None for c in root.children)
+
+    rows = tracing.waterfall(trace)
+    assert [(r["span"], r["depth"]) for r in rows] == [
+        ("main_app", 0),
+        ("sidebar", 1),
+        (f"{__name__}._query", 2),
+        ("pagina: Storico", 1),
+        (f"{__name__}._query", 2),
+        (f"{__name__}._query", 2),
+    ]
+    assert rows[0]["start_ms"] == 0
+    assert all(r["start_ms"] <= r["end_ms"] <= rows[0]["end_ms"] for r in rows)
+
+
+def test_trace_is_stored_and_span_marked_on_error_and_control_flow():
+    class StopException(BaseException):
+        pass
+
+    with pytest.raises(StopException), tracing.start_trace("main_app") as trace:
+        with pytest.raises(ValueError), tracing.span("rotto"):
+            raise ValueError("boom")
+        # Come st.stop(): chiude gli span senza marcarli in errore
+        with tracing.span("pagina"):
+            raise StopException
+
+    rotto, pagina = trace.root.children
+    assert rotto.error == "ValueError: boom"
+    assert pagina.error is None and pagina.end is not None
+    assert tracing.recent_traces() == [trace]
+
+
+def test_history_keeps_only_last_traces_newest_first(mocker):
+    from collections import deque
+
+    mocker.patch.object(tracing, "_traces", deque(maxlen=2))
+    for name in ("uno", "due", "tre"):
+        with tracing.start_trace(name):
+            pass
+
+    assert [t.root.name for t in tracing.recent_traces()] == ["tre", "due"]
+
+
+def test_children_beyond_limit_are_counted_not_recorded(mocker):
+    mocker.patch.object(tracing, "MAX_CHILDREN", 2)
+    with tracing.start_trace("main_app") as trace:
+        for _ in range(5):
+            _query()
+
+    assert len(trace.root.children) == 2
+    assert trace.root.dropped_children == 3
+
+
+def test_log_context_carries_the_trace_id():
+    with (
+        tracing.start_trace("main_app") as trace,
+        with_context(trace_id=trace.trace_id, user="M1"),
+    ):
+        assert _capture_context() == (trace.trace_id, {"user": "M1"})
@@ -0,0 +1,159 @@
+"""
+Test per la cache delle risposte IA e il backend fittizio offline.
+"""
+
+import datetime
+import os
+import sqlite3
+
+import pytest
+
+import modules.ai_engine as ai
+from core.metrics import AI_CALL_DURATION, MetricsRegistry
+from modules.ai_engine import FakeAIBackend, chiave_cache_ia, revisiona_con_ia
+from modules.database.db_ai_cache import get_cached_ai_response, store_ai_response
+from modules.knowledge_index import META_FILE, knowledge_index_version
+
+TTL = 3600
+
+
+@pytest.fixture
+def cache_db(mocker, tmp_path):
+    db_path = tmp_path / "cache.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.execute(
+        """CREATE TABLE ai_cache (
+            chiave TEXT PRIMARY KEY NOT NULL, modello TEXT NOT NULL, risposta TEXT NOT NULL,
+            timestamp_creazione TEXT NOT NULL, ultimo_accesso TEXT NOT NULL,
+            utilizzi INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    conn.commit()
+    conn.close()
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    mocker.patch("modules.database.db_ai_cache.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("modules.ai_engine.cerca_frasi_simili", return_value=[])
+    return get_test_conn
+
+
+def test_cache_key_ignores_whitespace_but_not_model_or_version(mocker):
+    """La chiave dipende dal testo normalizzato, dal modello e dalla versione dei prompt."""
+    base = chiave_cache_ia("Valvola  FCV301\nbloccata", "m1")
+    assert base == chiave_cache_ia("  Valvola FCV301 bloccata ", "m1")
+    assert base != chiave_cache_ia("Valvola FCV301 bloccata", "m2")
+    mocker.patch("modules.ai_engine.PROMPT_TEMPLATE_VERSION", 999)
+    assert base != chiave_cache_ia("Valvola FCV301 bloccata", "m1")
+
+
+def test_cache_key_changes_when_knowledge_index_is_rebuilt(mocker, tmp_path):
+    """Ricostruire l'indice cambia gli estratti nel prompt, quindi anche la chiave."""
+    meta = tmp_path / META_FILE
+    meta.write_text("{}", encoding="utf-8")
+    mocker.patch(
+        "modules.ai_engine.knowledge_index_version",
+        side_effect=lambda: knowledge_index_version(tmp_path),
+    )
+    before = chiave_cache_ia("Valvola FCV301 bloccata", "m1")
+    assert before == chiave_cache_ia("Valvola FCV301 bloccata", "m1")
+
+    stat = meta.stat()
+    os.utime(meta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert before != chiave_cache_ia("Valvola FCV301 bloccata", "m1")
+
+
+def test_repeated_review_is_served_from_cache(cache_db):
+    """Lo stesso testo (a meno di spazi) non viene rigenerato dal modello."""
+    backend = FakeAIBackend(reply="Testo revisionato.")
+
+    first = revisiona_con_ia("La pompa non parte.", backend=backend)
+    second = revisiona_con_ia("La pompa  non parte. ", backend=backend)
+
+    assert first == {"success": True, "text": "Testo revisionato."}
+    assert second == {"success": True, "text": "Testo revisionato.", "cached": True}
+    assert len(backend.prompts) == 1
+
+    revisiona_con_ia("La pompa non parte.", backend=FakeAIBackend(model_name="altro"))
+    conn = cache_db()
+    assert conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0] == 2
+    conn.close()
+
+
+def test_failed_generation_is_not_cached(cache_db, mocker):
+    """Un errore del modello non viene memorizzato."""
+    backend = FakeAIBackend()
+    mocker.patch.object(backend, "generate", side_effect=RuntimeError("quota"))
+
+    res = revisiona_con_ia("Testo di prova.", backend=backend)
+
+    assert res["success"] is False
+    assert "quota" in res["error"]
+    conn = cache_db()
+    assert conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0] == 0
+    conn.close()
+
+
+def test_model_calls_are_timed_with_their_outcome(cache_db, mocker):
+    """La durata delle chiamate al modello viene registrata anche quando falliscono."""
+    registry = MetricsRegistry()
+    mocker.patch("modules.ai_engine.REGISTRY", registry)
+    backend = FakeAIBackend(model_name="m1")
+    revisiona_con_ia("Testo riuscito.", backend=backend)
+    mocker.patch.object(backend, "generate", side_effect=TimeoutError("timeout"))
+    revisiona_con_ia("Testo fallito.", backend=backend)
+
+    counts = {
+        h["labels"]["status"]: h["count"]
+        for h in registry.snapshot()["histograms"]
+        if h["name"] == AI_CALL_DURATION and h["labels"]["model"] == "m1"
+    }
+    assert counts == {"success": 1, "error": 1}
+
+
+def test_expired_entries_are_ignored_and_pruned(cache_db):
+    """Le voci oltre il TTL non vengono restituite e sono rimosse al salvataggio successivo."""
+    vecchio = (datetime.datetime.now() - datetime.timedelta(seconds=TTL + 60)).isoformat()
+    conn = cache_db()
+    conn.execute("INSERT INTO ai_cache VALUES ('old', 'm', 'vecchia', ?, ?, 0)", (vecchio, vecchio))
+    conn.commit()
+    conn.close()
+
+    assert get_cached_ai_response("old", TTL) is None
+    assert store_ai_response("new", "m", "nuova", TTL, 10)
+
+    conn = cache_db()
+    chiavi = [r[0] for r in conn.execute("SELECT chiave FROM ai_cache").fetchall()]
+    conn.close()
+    assert chiavi == ["new"]
+
+
+def test_size_limit_evicts_least_recently_used(cache_db):
+    """Oltre il limite vengono espulse le voci usate meno di recente."""
+    for chiave in ("a", "b", "c"):
+        store_ai_response(chiave, "m", chiave.upper(), TTL, 3)
+    assert get_cached_ai_response("a", TTL) == "A"  # "a" diventa la più recente
+
+    store_ai_response("d", "m", "D", TTL, 3)
+
+    conn = cache_db()
+    chiavi = sorted(r[0] for r in conn.execute("SELECT chiave FROM ai_cache").fetchall())
+    utilizzi = conn.execute("SELECT utilizzi FROM ai_cache WHERE chiave = 'a'").fetchone()[0]
+    conn.close()
+    assert chiavi == ["a", "c", "d"]
+    assert utilizzi == 1
+
+
+def test_fake_backend_selected_by_config(mocker):
+    """Con AI_BACKEND=fake il servizio funziona senza rete né chiave API."""
+    mocker.patch("modules.ai_engine.config.AI_BACKEND", "fake")
+    mocker.patch("streamlit.secrets", {})
+
+    backend = ai.get_ai_backend()
+
+    assert isinstance(backend, FakeAIBackend)
+    assert backend.generate(ai.generate_standard_prompt("Testo originale.")) == "Testo originale."
@@ -23,3 +23,11 @@ def test_generate_standard_prompt():
     prompt = generate_standard_prompt(text)
     assert text in prompt
     assert "revisore esperto" in prompt
+
+
+def test_generate_technical_prompt_with_context_sentences():
+    """Le frasi storiche recuperate vengono incluse come contesto."""
+    prompt = generate_technical_prompt("Testo.", "", ["Sostituito trasmettitore PT101."])
+
+    assert "RELAZIONI STORICHE SIMILI" in prompt
+    assert "- Sostituito trasmettitore PT101." in prompt
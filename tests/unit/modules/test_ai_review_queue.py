@@ -0,0 +1,251 @@
+"""
+Test per la coda in background delle revisioni IA.
+"""
+
+import datetime
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from modules import ai_review_queue
+from modules.ai_engine import FakeAIBackend
+from modules.ai_review_queue import (
+    AIReviewQueue,
+    RateLimiter,
+    accoda_prerevisione_relazioni,
+)
+from modules.database.db_ai_jobs import (
+    claim_ai_jobs,
+    complete_ai_job,
+    enqueue_ai_job,
+    get_ai_job,
+    get_ai_prereviews,
+    release_stale_ai_jobs,
+    touch_ai_jobs,
+)
+
+
+@pytest.fixture
+def jobs_db(mocker, tmp_path):
+    db_path = tmp_path / "jobs.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path), timeout=20)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.executescript(
+        """
+        CREATE TABLE ai_review_jobs (
+            id TEXT PRIMARY KEY NOT NULL, testo TEXT NOT NULL, richiedente TEXT,
+            riferimento TEXT, stato TEXT NOT NULL DEFAULT 'in_coda', parziale TEXT,
+            risultato TEXT, errore TEXT, da_cache INTEGER NOT NULL DEFAULT 0,
+            timestamp_creazione TEXT NOT NULL, timestamp_inizio TEXT, timestamp_fine TEXT,
+            proprietario TEXT, heartbeat TEXT
+        );
+        CREATE TABLE ai_cache (
+            chiave TEXT PRIMARY KEY NOT NULL, modello TEXT NOT NULL, risposta TEXT NOT NULL,
+            timestamp_creazione TEXT NOT NULL, ultimo_accesso TEXT NOT NULL,
+            utilizzi INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE relazioni (
+            id_relazione TEXT PRIMARY KEY NOT NULL, corpo_relazione TEXT, stato TEXT
+        );
+        """
+    )
+    conn.close()
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    mocker.patch("modules.database.db_ai_jobs.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("modules.database.db_ai_cache.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("modules.ai_engine.cerca_frasi_simili", return_value=[])
+    return get_test_conn
+
+
+def _owner(jobs_db, job_id):
+    conn = jobs_db()
+    row = conn.execute("SELECT proprietario FROM ai_review_jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    return row[0]
+
+
+class _CountingBackend(FakeAIBackend):
+    """Backend lento che registra il numero massimo di generazioni contemporanee."""
+
+    def __init__(self) -> None:
+        super().__init__(reply="Revisione completata.")
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def stream(self, prompt):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.05)
+            yield from super().stream(prompt)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_rate_limiter_spaces_requests(mocker):
+    """Gli avvii successivi vengono distanziati di 60/limite secondi."""
+    mocker.patch("modules.ai_review_queue.time.monotonic", return_value=100.0)
+    sleep = mocker.patch("modules.ai_review_queue.time.sleep")
+    limiter = RateLimiter(per_minute=30)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert [c.args[0] for c in sleep.call_args_list] == [2.0, 4.0]
+
+
+def test_claim_is_ordered_and_exclusive(jobs_db):
+    """I lavori vengono prelevati in ordine di arrivo e mai due volte."""
+    for i in range(3):
+        enqueue_ai_job(f"J{i}", f"Testo {i}")
+
+    first = claim_ai_jobs(2, "A")
+    second = claim_ai_jobs(2, "B")
+
+    assert [j["id"] for j in first] == ["J0", "J1"]
+    assert [j["id"] for j in second] == ["J2"]
+    assert claim_ai_jobs(2) == []
+    assert get_ai_job("J0")["stato"] == "in_corso"
+    assert _owner(jobs_db, "J2") == "B"
+
+
+def test_release_requeues_only_jobs_without_recent_heartbeat(jobs_db):
+    """All'avvio di un dispatcher i lavori degli altri processi attivi restano in corso."""
+    for i in range(2):
+        enqueue_ai_job(f"J{i}", f"Testo {i}")
+    claim_ai_jobs(1, "A")
+    claim_ai_jobs(1, "B")
+
+    assert release_stale_ai_jobs(120) == 0
+
+    vecchio = (datetime.datetime.now() - datetime.timedelta(minutes=5)).isoformat()
+    conn = jobs_db()
+    conn.execute("UPDATE ai_review_jobs SET heartbeat = ?", (vecchio,))
+    conn.commit()
+    conn.close()
+    # Il dispatcher B è ancora attivo e conferma il proprio lavoro
+    assert touch_ai_jobs("B") == 1
+
+    assert release_stale_ai_jobs(120) == 1
+    assert get_ai_job("J0")["stato"] == "in_coda"
+    assert _owner(jobs_db, "J0") is None
+    assert get_ai_job("J1")["stato"] == "in_corso"
+
+
+def test_claim_limits_are_shared_across_processes(jobs_db):
+    """Concorrenza e avvii al minuto tengono conto dei lavori prelevati da altri dispatcher."""
+    for i in range(5):
+        enqueue_ai_job(f"J{i}", f"Testo {i}")
+
+    assert len(claim_ai_jobs(2, "A", max_in_corso=3)) == 2
+    assert [j["id"] for j in claim_ai_jobs(2, "B", max_in_corso=3)] == ["J2"]
+    assert claim_ai_jobs(1, "B", max_in_corso=3) == []
+
+    complete_ai_job("J0", "ok", False)
+    # Tre avvii nell'ultimo minuto: il limite al minuto blocca anche con posti liberi
+    assert claim_ai_jobs(1, "B", max_in_corso=3, max_per_minuto=3) == []
+    assert len(claim_ai_jobs(1, "B", max_in_corso=3, max_per_minuto=0)) == 1
+
+
+def test_prereviews_return_latest_completed_result_per_reference(jobs_db):
+    """Per ogni relazione viene restituito l'esito completato più recente."""
+    enqueue_ai_job("J1", "Testo", riferimento="R1")
+    enqueue_ai_job("J2", "Testo rivisto", riferimento="R1")
+    enqueue_ai_job("J3", "Altro", riferimento="R2")
+    claim_ai_jobs(3)
+    complete_ai_job("J1", "prima", False)
+    complete_ai_job("J2", "seconda", False)
+
+    assert get_ai_prereviews(["R1", "R2", "R3"]) == {"R1": "seconda"}
+    assert get_ai_prereviews([]) == {}
+
+
+def test_process_job_streams_partial_text_and_caches(jobs_db, mocker):
+    """Il testo parziale viene pubblicato durante lo streaming; il risultato finale salvato."""
+    mocker.patch("modules.ai_review_queue.PARTIAL_FLUSH_INTERVAL_SEC", 0)
+    partial = mocker.spy(ai_review_queue, "update_ai_job_partial")
+    backend = FakeAIBackend(reply="La valvola è stata sostituita.")
+    queue = AIReviewQueue(backend_factory=lambda: backend, max_concurrency=1, rate_per_minute=0)
+    enqueue_ai_job("J1", "valvola sostituita")
+    enqueue_ai_job("J2", "valvola  sostituita")
+
+    assert queue.drain() == 2
+
+    streamed = [c.args[1] for c in partial.call_args_list if c.args[0] == "J1"]
+    assert streamed[0] == "La "
+    assert streamed[-1] == "La valvola è stata sostituita."
+    job = get_ai_job("J1")
+    assert job["stato"] == "completato"
+    assert job["risultato"] == "La valvola è stata sostituita."
+    assert job["parziale"] is None
+    # Il secondo testo differisce solo per gli spazi: servito dalla cache
+    assert get_ai_job("J2")["da_cache"] == 1
+    assert len(backend.prompts) == 1
+
+
+def test_failed_review_marks_job_error(jobs_db, mocker):
+    """Un errore del modello porta il lavoro in stato 'errore' con il messaggio."""
+    backend = FakeAIBackend()
+    mocker.patch.object(backend, "stream", side_effect=RuntimeError("quota esaurita"))
+    enqueue_ai_job("J1", "Testo")
+
+    AIReviewQueue(backend_factory=lambda: backend, rate_per_minute=0).drain()
+
+    job = get_ai_job("J1")
+    assert job["stato"] == "errore"
+    assert "quota esaurita" in job["errore"]
+
+
+def test_dispatcher_respects_concurrency_limit(jobs_db):
+    """Il dispatcher non supera mai il numero massimo di revisioni contemporanee."""
+    backend = _CountingBackend()
+    for i in range(6):
+        enqueue_ai_job(f"J{i}", f"Testo diverso numero {i}")
+    queue = AIReviewQueue(
+        backend_factory=lambda: backend, max_concurrency=2, rate_per_minute=0, poll_interval=0.02
+    )
+
+    queue.start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if all(get_ai_job(f"J{i}")["stato"] == "completato" for i in range(6)):
+            break
+        time.sleep(0.02)
+    queue.stop()
+    queue.join(timeout=5)
+
+    assert all(get_ai_job(f"J{i}")["stato"] == "completato" for i in range(6))
+    assert backend.max_active == 2
+
+
+def test_prereview_enqueues_each_pending_relazione_once(jobs_db):
+    """La pre-revisione accoda solo relazioni in attesa, senza duplicati tra esecuzioni."""
+    conn = jobs_db()
+    conn.executemany(
+        "INSERT INTO relazioni VALUES (?, ?, ?)",
+        [
+            ("R1", "Sostituito PT101.", "Inviata"),
+            ("R2", "Tarato TT205.", "Validata"),
+            ("R3", "   ", "Inviata"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    assert accoda_prerevisione_relazioni() == 1
+    assert accoda_prerevisione_relazioni() == 0
+
+    conn = jobs_db()
+    rows = conn.execute("SELECT riferimento, testo FROM ai_review_jobs").fetchall()
+    conn.close()
+    assert [tuple(r) for r in rows] == [("R1", "Sostituito PT101.")]
@@ -0,0 +1,112 @@
+"""
+Test per la ricerca nell'archivio storico delle schede (indice FTS5 a trigrammi).
+"""
+
+import sqlite3
+
+import pytest
+
+from modules.archive_manager import estrai_tag_archivio, search_archive
+from scripts import crea_database
+
+
+@pytest.fixture
+def archive_db(mocker, tmp_path):
+    db_path = tmp_path / "archivio.db"
+    mocker.patch.object(crea_database, "DB_NAME", db_path)
+    mocker.patch("modules.archive_manager.DB_PATH", db_path)
+    return db_path
+
+
+def _insert_files(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO maintenance_archive (filename, full_path, year, month, tag) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (name, f"/archivio/{year}/{name}", year, month, estrai_tag_archivio(name))
+            for name, year, month in rows
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_estrai_tag_archivio():
+    assert estrai_tag_archivio("01F015 (2).xls") == "01F015"
+    assert estrai_tag_archivio("pt-101 taratura.XLSM") == "PT101"
+    assert estrai_tag_archivio("FCV301(bis).xlsx") == "FCV301"
+
+
+def test_exact_tag_first_then_most_recent(archive_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    _insert_files(
+        archive_db,
+        [
+            ("01F0150 verifica.xls", "2024", "05 - MAGGIO"),
+            ("01F015 (2).xls", "2022", "01 - GENNAIO"),
+            ("01F015.xls", "2023", "03 - MARZO"),
+        ],
+    )
+
+    results = search_archive("01f015")
+
+    assert list(results["filename"]) == ["01F015.xls", "01F015 (2).xls", "01F0150 verifica.xls"]
+
+
+def test_substring_and_separator_insensitive_search(archive_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    _insert_files(
+        archive_db,
+        [("PT101 taratura.xls", "2024", ""), ("TT200 controllo.xls", "2024", "")],
+    )
+
+    assert list(search_archive("aratur")["filename"]) == ["PT101 taratura.xls"]
+    assert list(search_archive("pt-101")["filename"]) == ["PT101 taratura.xls"]
+    assert search_archive("valvola").empty
+
+
+def test_short_query_uses_tag_prefix(archive_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    _insert_files(
+        archive_db,
+        [("PT101.xls", "2024", ""), ("TT200.xls", "2024", ""), ("XPT9.xls", "2024", "")],
+    )
+
+    assert list(search_archive("pt")["filename"]) == ["PT101.xls"]
+    assert search_archive("-").empty
+
+
+def test_existing_archive_is_migrated_and_indexed(archive_db):
+    """Le schede indicizzate prima della colonna tag ricevono tag e indice FTS."""
+    conn = sqlite3.connect(archive_db)
+    conn.execute(
+        "CREATE TABLE maintenance_archive (filename TEXT NOT NULL, full_path TEXT NOT NULL, "
+        "year TEXT, month TEXT, last_modified TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO maintenance_archive (filename, full_path, year) "
+        "VALUES ('LT300 (1).xls', '/archivio/LT300 (1).xls', '2021')"
+    )
+    conn.commit()
+    conn.close()
+
+    crea_database.crea_tabelle_se_non_esistono()
+
+    results = search_archive("lt300")
+    assert list(results["tag"]) == ["LT300"]
+
+
+def test_falls_back_to_like_without_index(archive_db):
+    conn = sqlite3.connect(archive_db)
+    conn.execute(
+        "CREATE TABLE maintenance_archive (filename TEXT NOT NULL, full_path TEXT NOT NULL, "
+        "year TEXT, month TEXT, last_modified TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO maintenance_archive (filename, full_path) VALUES ('PT101.xls', '/a/PT101.xls')"
+    )
+    conn.commit()
+    conn.close()
+
+    assert list(search_archive("pt101")["filename"]) == ["PT101.xls"]
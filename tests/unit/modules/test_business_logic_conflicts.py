@@ -2,27 +2,18 @@
 Test per logica di business complessa e conflitti di disponibilità.
 """
 
-import pandas as pd
-
+from modules.db_manager import BookingResult
 from modules.shifts.logic_bookings import prenota_turno_logic
 
 
 def test_booking_conflict_with_oncall(mocker):
     """Verifica che un utente non possa prenotare un turno se è già in reperibilità in quel giorno."""
-    # 1. Mock turno standard che si vuole prenotare
+    # Il controllo di conflitto avviene nella transazione di prenotazione
     mocker.patch(
-        "modules.shifts.logic_bookings.get_shift_by_id",
-        return_value={
-            "ID_Turno": "T1",
-            "Data": "2025-01-01",
-            "PostiTecnico": 1,
-            "PostiAiutante": 1,
-        },
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        return_value=BookingResult("oncall_conflict", data_turno="2025-01-01"),
     )
 
-    # 2. Mock segnalazione conflitto (l'utente è già in reperibilità)
-    mocker.patch("modules.shifts.logic_bookings.check_user_oncall_conflict", return_value=True)
-
     # Mockiamo st per evitare errori UI
     mock_st = mocker.patch("modules.shifts.logic_bookings.st")
 
@@ -38,26 +29,9 @@ def test_booking_conflict_with_oncall(mocker):
 def test_booking_no_conflict_success(mocker):
     """Verifica che la prenotazione proceda se non ci sono conflitti."""
     mocker.patch(
-        "modules.shifts.logic_bookings.get_shift_by_id",
-        return_value={
-            "ID_Turno": "T1",
-            "Data": "2025-01-01",
-            "PostiTecnico": 1,
-            "PostiAiutante": 1,
-        },
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        return_value=BookingResult("booked", booking_id="P_1", data_turno="2025-01-01"),
     )
-
-    # Nessun conflitto
-    mocker.patch("modules.shifts.logic_bookings.check_user_oncall_conflict", return_value=False)
-
-    # Nessuna prenotazione esistente (posti liberi), ma DataFrame con colonne corrette
-    mock_empty_bookings = pd.DataFrame(columns=["Matricola", "RuoloOccupato"])
-    mocker.patch(
-        "modules.shifts.logic_bookings.get_bookings_for_shift", return_value=mock_empty_bookings
-    )
-
-    # Successo salvataggio DB
-    mocker.patch("modules.shifts.logic_bookings.add_booking", return_value=True)
     mocker.patch("modules.shifts.logic_bookings.log_shift_change")
     mocker.patch("modules.shifts.logic_bookings.st")
 
@@ -2,13 +2,30 @@
 Test di integrità e idempotenza per importazione dati storici.
 """
 
+import sqlite3
+
 from modules.database.db_reports import salva_report_intervento
 
 
-def test_excel_import_idempotency(mocker):
+def test_excel_import_idempotency(mocker, tmp_path):
     """Verifica che l'inserimento dello stesso report più volte non crei duplicati."""
-    # Patchiamo DatabaseEngine.execute che è il metodo centralizzato
-    mock_exec = mocker.patch("modules.database.db_reports.DatabaseEngine.execute")
+    db_path = tmp_path / "idempotenza.db"
+
+    def get_test_conn():
+        return sqlite3.connect(str(db_path))
+
+    conn = get_test_conn()
+    conn.execute(
+        "CREATE TABLE report_interventi (id_report TEXT PRIMARY KEY NOT NULL, descrizione TEXT, "
+        "data TEXT, testo_report TEXT, data_riferimento_attivita TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE tag_occurrences (tag TEXT, loop TEXT, tabella_origine TEXT, "
+        "id_origine TEXT, data_riferimento TEXT, occorrenze INTEGER)"
+    )
+    conn.commit()
+    conn.close()
+    mocker.patch("modules.database.db_reports.get_db_connection", side_effect=get_test_conn)
 
     report_data = {
         "id_report": "ST_2025_001",
@@ -17,13 +34,13 @@ def test_excel_import_idempotency(mocker):
     }
 
     # 1. Primo inserimento (successo)
-    mock_exec.return_value = True
     success1 = salva_report_intervento(report_data)
     assert success1 is True
-    assert mock_exec.called
 
-    # 2. Secondo inserimento (fallimento per duplicato)
-    # Simuliamo che DatabaseEngine restituisca False in caso di IntegrityError
-    mock_exec.return_value = False
+    # 2. Secondo inserimento (fallimento per duplicato: IntegrityError gestito)
     success2 = salva_report_intervento(report_data)
     assert success2 is False
+
+    conn = get_test_conn()
+    assert conn.execute("SELECT COUNT(*) FROM report_interventi").fetchone()[0] == 1
+    conn.close()
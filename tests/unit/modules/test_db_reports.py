@@ -23,6 +23,7 @@ from modules.database.db_reports import (
     process_and_commit_validated_reports,
     salva_relazione,
     salva_report_intervento,
+    validate_relazioni_bulk,
 )
 
 
@@ -49,17 +50,124 @@ def test_delete_reports_by_ids_success(mocker):
     assert delete_reports_by_ids(["R1", "R2"]) is True
 
 
-def test_process_and_commit_validated_reports_success(mock_db):
-    reports = [{"id_report": "R1", "val": "data"}]
+@pytest.fixture
+def validation_db(mocker, tmp_path):
+    from tests.db_utils import SCHEMA_SQL
+
+    db_path = tmp_path / "validazione.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.executescript(
+        """
+        CREATE TABLE report_interventi (
+            id_report TEXT PRIMARY KEY NOT NULL, pdl TEXT, descrizione_attivita TEXT,
+            matricola_tecnico TEXT, nome_tecnico TEXT, team TEXT, stato_attivita TEXT,
+            testo_report TEXT, data_compilazione TEXT, data_riferimento_attivita TEXT,
+            timestamp_validazione TEXT
+        );
+        CREATE TABLE "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot" (
+            pdl TEXT NOT NULL, data_intervento TEXT NOT NULL, tecnico_assegnato TEXT,
+            stato TEXT DEFAULT 'PIANIFICATO', timestamp_validazione TEXT,
+            PRIMARY KEY (pdl, data_intervento, tecnico_assegnato)
+        );
+        """
+    )
+    conn.execute("INSERT INTO contatti (Matricola, \"Nome Cognome\") VALUES ('M1', 'Tecnico')")
+    conn.executemany(
+        "INSERT INTO report_da_validare (id_report, pdl, matricola_tecnico, testo_report, "
+        "data_riferimento_attivita) VALUES (?, ?, 'M1', 'originale', ?)",
+        [(f"R{i}", f"PDL{i}", "2025-03-10") for i in range(200)],
+    )
+    conn.executemany(
+        'INSERT INTO "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot" '
+        "(pdl, data_intervento, tecnico_assegnato) VALUES (?, '2025-03-10', 'M1')",
+        [(f"PDL{i}",) for i in range(200)],
+    )
+    conn.execute("INSERT INTO report_interventi (id_report, pdl) VALUES ('R0', 'PDL0')")
+    conn.commit()
+    conn.close()
+
+    mocker.patch("modules.database.db_reports.get_db_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def test_validate_reports_batch_set_based(validation_db):
+    """La validazione sposta i report, notifica i tecnici e aggiorna la programmazione."""
+    from modules.database.db_reports import validate_reports_batch
+
+    reports = [
+        {
+            "id_report": f"R{i}",
+            "pdl": f"PDL{i}",
+            "matricola_tecnico": "M1",
+            "testo_report": "modificato",
+            "data_riferimento_attivita": "2025-03-10",
+            "nome": "colonna solo UI",
+        }
+        for i in range(200)
+    ]
+    reports.append({**reports[1], "id_report": "R_MISSING"})
+
+    esiti = validate_reports_batch(reports)
+
+    assert esiti["R0"] == "already_validated"
+    assert esiti["R_MISSING"] == "not_found"
+    assert sum(1 for e in esiti.values() if e == "validated") == 199
+
+    conn = validation_db()
+    assert conn.execute("SELECT COUNT(*) FROM report_da_validare").fetchone()[0] == 1
+    row = conn.execute(
+        "SELECT testo_report, timestamp_validazione FROM report_interventi WHERE id_report='R5'"
+    ).fetchone()
+    assert row["testo_report"] == "modificato"
+    assert row["timestamp_validazione"] is not None
+    messaggi = [r[0] for r in conn.execute("SELECT Messaggio FROM notifiche").fetchall()]
+    assert len(messaggi) == 199
+    assert "PdL PDL5 del 10/03/2025" in " ".join(messaggi)
+    validati = conn.execute(
+        'SELECT COUNT(*) FROM "pdl_programmazione_syncrojob.SafeWorkProgrammazioneBot" '
+        "WHERE stato = 'VALIDATO'"
+    ).fetchone()[0]
+    assert validati == 199
+    conn.close()
+
+
+def test_process_and_commit_validated_reports_success(validation_db):
+    reports = [{"id_report": "R1", "pdl": "PDL1", "data_riferimento_attivita": "2025-03-10"}]
     assert process_and_commit_validated_reports(reports) is True
-    assert mock_db.execute.called
 
 
-def test_process_and_commit_validated_reports_error(mock_db):
-    mock_db.execute.side_effect = sqlite3.Error("DB Error")
-    reports = [{"id_report": "R1"}]
+def test_validate_reports_batch_keeps_queued_values_for_missing_columns(validation_db):
+    """Le colonne assenti dai dati modificati mantengono i valori del report in coda."""
+    from modules.database.db_reports import validate_reports_batch
+
+    assert validate_reports_batch([{"id_report": "R3", "pdl": "PDL3-BIS"}]) == {"R3": "validated"}
+
+    conn = validation_db()
+    row = conn.execute(
+        "SELECT pdl, matricola_tecnico, testo_report, data_riferimento_attivita "
+        "FROM report_interventi WHERE id_report = 'R3'"
+    ).fetchone()
+    assert tuple(row) == ("PDL3-BIS", "M1", "originale", "2025-03-10")
+    conn.close()
+
+
+def test_process_and_commit_validated_reports_error(validation_db):
+    """Un errore a metà pipeline annulla l'intera transazione."""
+    reports = [{"id_report": "R1"}, {"id_report": "R1"}]
     assert process_and_commit_validated_reports(reports) is False
 
+    conn = validation_db()
+    assert conn.execute("SELECT COUNT(*) FROM report_da_validare").fetchone()[0] == 200
+    assert conn.execute("SELECT COUNT(*) FROM notifiche").fetchone()[0] == 0
+    conn.close()
+
 
 def test_get_unvalidated_relazioni(mocker, mock_db):
     mocker.patch("pandas.read_sql_query", return_value=pd.DataFrame([{"id": 1}]))
@@ -70,16 +178,125 @@ def test_get_unvalidated_relazioni(mocker, mock_db):
 def test_process_and_commit_validated_relazioni_success(mock_db):
     df = pd.DataFrame([{"id_relazione": "REL1"}])
     assert process_and_commit_validated_relazioni(df, "ADMIN1") is True
+    assert mock_db.executemany.call_count == 1
 
 
-def test_salva_report_intervento(mocker):
-    mocker.patch("core.database.DatabaseEngine.execute", return_value=True)
+@pytest.fixture
+def relazioni_db(mocker, tmp_path):
+    from tests.db_utils import SCHEMA_SQL
+
+    db_path = tmp_path / "relazioni.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.execute(
+        """CREATE TABLE relazioni (
+            id_relazione TEXT PRIMARY KEY NOT NULL, pdl TEXT, data_intervento TEXT,
+            tecnico_compilatore TEXT, partner TEXT, team TEXT, ora_inizio TEXT, ora_fine TEXT,
+            corpo_relazione TEXT, stato TEXT, timestamp_invio TEXT, id_validatore TEXT,
+            timestamp_validazione TEXT
+        )"""
+    )
+    conn.executemany(
+        "INSERT INTO relazioni (id_relazione, pdl, data_intervento, tecnico_compilatore, "
+        "corpo_relazione, stato) VALUES (?, 'P1', ?, ?, 'testo', 'Inviata')",
+        [
+            ("REL1", "2025-01-06", "M1"),
+            ("REL2", "2025-01-12", "M1"),
+            ("REL3", "2025-01-13", "M1"),
+            ("REL4", "2025-01-07", "M2"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    mocker.patch("modules.database.db_reports.get_db_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def test_validated_relazioni_only_selected_and_changed_fields(relazioni_db):
+    """Solo le righe spuntate vengono validate e solo i campi corretti vengono riscritti."""
+    original = pd.DataFrame(
+        [{"id_relazione": f"REL{i}", "pdl": "P1", "corpo_relazione": "testo"} for i in range(1, 5)]
+    )
+    edited = original.copy()
+    edited["valida"] = [True, False, False, True]
+    edited.loc[0, "corpo_relazione"] = "testo corretto"
+    edited.loc[1, "corpo_relazione"] = "modifica non validata"
+
+    assert process_and_commit_validated_relazioni(edited, "ADMIN1", original_df=original)
+
+    conn = relazioni_db()
+    rows = {
+        r["id_relazione"]: r
+        for r in conn.execute("SELECT * FROM relazioni ORDER BY id_relazione").fetchall()
+    }
+    conn.close()
+    assert rows["REL1"]["stato"] == "Validata"
+    assert rows["REL1"]["corpo_relazione"] == "testo corretto"
+    assert rows["REL1"]["id_validatore"] == "ADMIN1"
+    assert rows["REL2"]["stato"] == "Inviata"
+    assert rows["REL2"]["corpo_relazione"] == "testo"
+    assert rows["REL4"]["stato"] == "Validata"
+    assert rows["REL4"]["pdl"] == "P1"
+
+
+def test_validated_relazioni_writes_deliberately_cleared_cells(relazioni_db):
+    """Una cella svuotata dal validatore viene salvata come NULL, non ignorata."""
+    original = pd.DataFrame(
+        [
+            {"id_relazione": "REL1", "partner": "Rossi", "corpo_relazione": "testo"},
+            {"id_relazione": "REL4", "partner": None, "corpo_relazione": "testo"},
+        ]
+    )
+    edited = original.copy()
+    edited.loc[0, "partner"] = None
+    edited.loc[1, "corpo_relazione"] = "testo corretto"
+
+    conn = relazioni_db()
+    conn.execute("UPDATE relazioni SET partner = 'Rossi' WHERE id_relazione = 'REL1'")
+    conn.commit()
+    conn.close()
+
+    assert process_and_commit_validated_relazioni(edited, "ADMIN1", original_df=original)
+
+    conn = relazioni_db()
+    rows = {r["id_relazione"]: r for r in conn.execute("SELECT * FROM relazioni").fetchall()}
+    conn.close()
+    assert rows["REL1"]["stato"] == "Validata"
+    assert rows["REL1"]["partner"] is None
+    assert rows["REL1"]["corpo_relazione"] == "testo"
+    assert rows["REL4"]["corpo_relazione"] == "testo corretto"
+
+
+def test_validate_relazioni_bulk_by_technician_and_week(relazioni_db):
+    assert validate_relazioni_bulk("ADMIN1", "M1", "2025-01-06", "2025-01-12") == 2
+
+    conn = relazioni_db()
+    validate = [
+        r[0]
+        for r in conn.execute(
+            "SELECT id_relazione FROM relazioni WHERE stato = 'Validata' ORDER BY 1"
+        ).fetchall()
+    ]
+    conn.close()
+    assert validate == ["REL1", "REL2"]
+    # Una seconda esecuzione non trova più nulla da validare
+    assert validate_relazioni_bulk("ADMIN1", "M1", "2025-01-06", "2025-01-12") == 0
+
+
+def test_salva_report_intervento(mock_db):
     assert salva_report_intervento({"pdl": "P1"}) is True
+    assert mock_db.execute.called
 
 
-def test_salva_relazione(mocker):
-    mocker.patch("core.database.DatabaseEngine.execute", return_value=True)
+def test_salva_relazione(mock_db):
     assert salva_relazione({"id": "R1"}) is True
+    assert mock_db.execute.called
 
 
 def test_get_validated_reports_invalid():
@@ -27,7 +27,12 @@ def setup_db(mocker, tmp_path):
     conn = get_test_conn()
     conn.execute("CREATE TABLE report_da_validare (id_report TEXT PRIMARY KEY, val TEXT)")
     conn.execute(
-        "CREATE TABLE report_interventi (id_report TEXT PRIMARY KEY, val TEXT, timestamp_validazione TEXT)"
+        "CREATE TABLE report_interventi (id_report TEXT PRIMARY KEY, val TEXT, "
+        "testo_report TEXT, data_riferimento_attivita TEXT, timestamp_validazione TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE tag_occurrences (tag TEXT, loop TEXT, tabella_origine TEXT, "
+        "id_origine TEXT, data_riferimento TEXT, occorrenze INTEGER)"
     )
     conn.commit()
     conn.close()
@@ -0,0 +1,182 @@
+"""
+Test per la ricerca full-text FTS5 su report, relazioni e programmazione PdL.
+Lo schema (tabelle, indici FTS e trigger) è quello reale creato da crea_database.py.
+"""
+
+import sqlite3
+
+import pytest
+
+from constants import PROGRAMMAZIONE_TABLE
+from modules.database.db_search import (
+    build_match_query,
+    search_full_text,
+    search_pdl_programmazione,
+)
+from modules.database.db_system import get_table_names
+from scripts import crea_database
+
+
+@pytest.fixture
+def search_db(mocker, tmp_path):
+    db_path = tmp_path / "ricerca.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    mocker.patch.object(crea_database, "DB_NAME", db_path)
+    mocker.patch("modules.database.db_search.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def _insert_reports(conn, rows):
+    conn.executemany(
+        "INSERT INTO report_interventi (id_report, pdl, descrizione_attivita, nome_tecnico, "
+        "testo_report, data_riferimento_attivita, timestamp_validazione) "
+        "VALUES (?, ?, ?, ?, ?, ?, '2025-01-01T10:00:00')",
+        rows,
+    )
+    conn.commit()
+
+
+def test_build_match_query_neutralizes_fts_syntax():
+    assert build_match_query('valv "bloc" OR NEAR(') == '"valv"* "bloc"* "OR"* "NEAR"*'
+    assert build_match_query(" -*- ") is None
+
+
+def test_existing_rows_are_indexed_when_index_is_created(search_db):
+    """Sui database esistenti l'indice viene popolato alla creazione."""
+    conn = search_db()
+    conn.execute(
+        "CREATE TABLE report_interventi (id_report TEXT PRIMARY KEY NOT NULL, pdl TEXT, "
+        "descrizione_attivita TEXT, matricola_tecnico TEXT, nome_tecnico TEXT, team TEXT, "
+        "stato_attivita TEXT, testo_report TEXT, data_compilazione TEXT, "
+        "data_riferimento_attivita TEXT, timestamp_validazione TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO report_interventi (id_report, pdl, testo_report) "
+        "VALUES ('R1', 'P1', 'Sostituita guarnizione')"
+    )
+    conn.commit()
+    conn.close()
+
+    crea_database.crea_tabelle_se_non_esistono()
+
+    results, total = search_full_text("report_interventi", "guarniz")
+    assert total == 1
+    assert results.iloc[0]["id_report"] == "R1"
+
+
+def test_prefix_accents_ranking_and_snippet(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = search_db()
+    _insert_reports(
+        conn,
+        [
+            ("R1", "P100", "Manutenzione", "Rossi", "Controllo generale impianto", "2025-01-02"),
+            ("R2", "P200", "Attività su valvola", "Bianchi", "Valvola bloccata", "2025-01-03"),
+            ("R3", "P300", "Verifica", "Verdi", "Nessuna anomalia sulla valvola", "2025-01-04"),
+        ],
+    )
+    conn.close()
+
+    results, total = search_full_text("report_interventi", "VALV")
+    assert total == 2
+    # Descrizione e testo contengono entrambi il termine: R2 è più rilevante
+    assert list(results["id_report"]) == ["R2", "R3"]
+    assert "**valvola**" in results.iloc[0]["snippet"].lower()
+
+    # "attivita" senza accento trova "Attività"; tutte le parole devono comparire
+    assert search_full_text("report_interventi", "attivita valv")[1] == 1
+    assert search_full_text("report_interventi", "attivita impianto")[1] == 0
+
+
+def test_triggers_keep_index_in_sync(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = search_db()
+    _insert_reports(conn, [("R1", "P1", "D", "Rossi", "Pompa in avaria", "2025-01-02")])
+    conn.execute("UPDATE report_interventi SET testo_report = 'Pompa riparata'")
+    conn.commit()
+    assert search_full_text("report_interventi", "avaria")[1] == 0
+    assert search_full_text("report_interventi", "riparata")[1] == 1
+
+    conn.execute("DELETE FROM report_interventi")
+    conn.commit()
+    conn.close()
+    assert search_full_text("report_interventi", "pompa")[1] == 0
+
+
+def test_pagination_and_date_filter(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = search_db()
+    _insert_reports(
+        conn,
+        [
+            (f"R{i:02d}", f"P{i}", "D", "Rossi", "Taratura trasmettitore", f"2025-02-{i:02d}")
+            for i in range(1, 26)
+        ],
+    )
+    conn.close()
+
+    first, total = search_full_text("report_interventi", "taratura", limit=10, ordina_per_data=True)
+    last, _ = search_full_text(
+        "report_interventi", "taratura", limit=10, offset=20, ordina_per_data=True
+    )
+    assert total == 25
+    assert first.iloc[0]["id_report"] == "R25"
+    assert list(last["id_report"]) == ["R05", "R04", "R03", "R02", "R01"]
+
+    _, in_range = search_full_text(
+        "report_interventi", "taratura", data_inizio="2025-02-10", data_fine="2025-02-12"
+    )
+    assert in_range == 3
+
+
+def test_relazioni_validated_filter(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = search_db()
+    conn.executemany(
+        "INSERT INTO relazioni (id_relazione, pdl, corpo_relazione, stato) VALUES (?, ?, ?, ?)",
+        [("REL1", "P1", "Chiamata per allarme", "Validata"), ("REL2", "P2", "Allarme", "Inviata")],
+    )
+    conn.commit()
+    conn.close()
+
+    assert search_full_text("relazioni", "allarme")[1] == 2
+    results, total = search_full_text("relazioni", "allarme", solo_validati=True)
+    assert total == 1
+    assert results.iloc[0]["id_relazione"] == "REL1"
+
+
+def test_search_pdl_programmazione_returns_view_columns(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = search_db()
+    conn.executemany(
+        f'INSERT INTO "{PROGRAMMAZIONE_TABLE}" '
+        "(pdl, data_intervento, tecnico_assegnato, descrizione, team) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("PdL 1", "2025-03-01", "M1", "Sostituzione filtri", "Team A"),
+            ("PdL 2", "2025-03-02", "M2", "Pulizia filtri", "Team B"),
+            ("PdL 3", "2025-04-01", "M1", "Sostituzione filtri", "Team A"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+    df = search_pdl_programmazione("filtri", "2025-03-01", "2025-03-31")
+    assert list(df["pdl"]) == ["PdL 2", "PdL 1"]
+    assert list(df.columns)[:3] == ["pdl", "data_intervento", "tecnico_assegnato"]
+    assert "snippet" not in df.columns
+    assert search_pdl_programmazione("team b", "2025-03-01", "2025-03-31")["pdl"].tolist() == [
+        "PdL 2"
+    ]
+
+
+def test_fts_tables_are_hidden_from_table_editor(search_db):
+    crea_database.crea_tabelle_se_non_esistono()
+    names = get_table_names()
+    assert "report_interventi" in names
+    assert not any("_fts" in n for n in names)
@@ -0,0 +1,80 @@
+"""
+Test per l'occupazione pre-aggregata dei turni.
+Copre get_shifts_occupancy in src/modules/database/db_shifts.py.
+"""
+
+import sqlite3
+
+import pytest
+
+from modules.database.db_shifts import get_shifts_occupancy
+from tests.db_utils import SCHEMA_SQL
+
+
+@pytest.fixture
+def occupancy_db(mocker, tmp_path):
+    """Database reale con due turni di assistenza e alcune prenotazioni."""
+    db_path = tmp_path / "occupancy.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    mocker.patch("modules.database.db_shifts.get_db_connection", side_effect=get_test_conn)
+
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.executemany(
+        'INSERT INTO contatti (Matricola, "Nome Cognome") VALUES (?, ?)',
+        [("M1", "Mario Rossi"), ("M2", "Luca Bianchi")],
+    )
+    conn.executemany(
+        "INSERT INTO turni VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("T1", "Fermata impianto", "2030-01-10", "08:00", "17:00", 1, 1, "Assistenza"),
+            ("T2", "Manutenzione", "2030-01-11", "08:00", "17:00", 2, 1, "Assistenza"),
+            ("T3", "Vecchio turno", "2020-01-01", "08:00", "17:00", 1, 1, "Assistenza"),
+            ("T4", "Extra", "2030-01-12", "08:00", "17:00", 1, 0, "Straordinario"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO prenotazioni VALUES (?, ?, ?, ?, ?)",
+        [
+            ("P1", "T1", "M1", "Tecnico", ""),
+            ("P2", "T1", "M2", "Aiutante", ""),
+            ("P3", "T2", "M2", "Tecnico", ""),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_occupancy_counts_and_names(occupancy_db):
+    df = get_shifts_occupancy("Assistenza", "M2").set_index("ID_Turno")
+
+    assert set(df.index) == {"T1", "T2", "T3"}
+    assert df.loc["T1", "booked_tecnico"] == 1
+    assert df.loc["T1", "booked_aiutante"] == 1
+    assert "Mario Rossi (Tecnico)" in df.loc["T1", "booked_names"]
+    assert df.loc["T2", "user_booked"] == 1
+    assert df.loc["T3", "booked_tecnico"] == 0
+    assert df.loc["T3", "booked_names"] == ""
+    assert (df["total_count"] == 3).all()
+
+
+def test_occupancy_only_available_and_future(occupancy_db):
+    df = get_shifts_occupancy("Assistenza", "M1", only_available=True, from_date="2025-01-01")
+
+    # T1 è completo, T3 è nel passato
+    assert df["ID_Turno"].tolist() == ["T2"]
+    assert df["total_count"].iloc[0] == 1
+
+
+def test_occupancy_pagination(occupancy_db):
+    first = get_shifts_occupancy("Assistenza", "M1", limit=2, offset=0)
+    second = get_shifts_occupancy("Assistenza", "M1", limit=2, offset=2)
+
+    assert first["ID_Turno"].tolist() == ["T2", "T1"]
+    assert second["ID_Turno"].tolist() == ["T3"]
+    assert second["total_count"].iloc[0] == 3
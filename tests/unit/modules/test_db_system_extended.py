@@ -11,12 +11,13 @@ import pytest
 from modules.database.db_system import (
     add_assignment_exclusion,
     add_notification,
+    apply_table_changes,
     count_unread_notifications,
     get_globally_excluded_activities,
     get_notifications_for_user,
     get_table_data,
     get_table_names,
-    save_table_data,
+    get_table_page,
 )
 
 
@@ -60,16 +61,101 @@ def test_count_unread_notifications_none(mocker):
     assert count_unread_notifications("M123") == 0
 
 
-def test_save_table_data_success(mock_db):
-    df = pd.DataFrame([{"col": 1}])
-    assert save_table_data(df, "test_table") is True
+@pytest.fixture
+def editable_db(mocker, tmp_path):
+    db_path = tmp_path / "gestione.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.executescript(
+        """
+        CREATE TABLE report_interventi (id_report TEXT PRIMARY KEY, pdl TEXT, testo TEXT);
+        CREATE INDEX idx_report_pdl ON report_interventi(pdl);
+        CREATE TABLE access_logs (timestamp TEXT, username TEXT, status TEXT);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO report_interventi VALUES (?, ?, ?)",
+        [(f"R{i:03d}", f"P{i}", "testo") for i in range(250)],
+    )
+    conn.execute("INSERT INTO access_logs VALUES ('t1', 'u1', 'ok')")
+    conn.commit()
+    conn.close()
+
+    mocker.patch("modules.database.db_system.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def test_get_table_page(editable_db):
+    df, total = get_table_page("report_interventi", limit=100, offset=200)
+    assert total == 250
+    assert len(df) == 50
+    assert df.iloc[0]["id_report"] == "R200"
+
+    df_logs, _ = get_table_page("access_logs", limit=10)
+    assert df_logs.columns[0] == "rowid"
+
+
+def test_apply_table_changes_preserves_schema(editable_db):
+    """Il change-set tocca solo le righe interessate e non ricrea la tabella."""
+    ok = apply_table_changes(
+        "report_interventi",
+        updates=[({"id_report": "R001"}, {"testo": "corretto"})],
+        inserts=[{"id_report": "R999", "pdl": "P999", "testo": None}],
+        deletes=[{"id_report": "R002"}],
+    )
+    assert ok is True
+
+    conn = editable_db()
+    assert conn.execute("SELECT COUNT(*) FROM report_interventi").fetchone()[0] == 250
+    assert (
+        conn.execute("SELECT testo FROM report_interventi WHERE id_report='R001'").fetchone()[0]
+        == "corretto"
+    )
+    assert conn.execute("SELECT 1 FROM report_interventi WHERE id_report='R002'").fetchone() is None
+    indexes = [r[1] for r in conn.execute("PRAGMA index_list(report_interventi)").fetchall()]
+    assert "idx_report_pdl" in indexes
+    conn.close()
 
 
-def test_save_table_data_error(mocker, mock_db):
-    df = pd.DataFrame([{"col": 1}])
-    # Mockiamo to_sql per lanciare un errore
-    mocker.patch.object(pd.DataFrame, "to_sql", side_effect=sqlite3.Error("SQL Error"))
-    assert save_table_data(df, "test_table") is False
+def test_apply_table_changes_rowid_table(editable_db):
+    assert apply_table_changes(
+        "access_logs", updates=[({"rowid": 1}, {"status": "ko"})], inserts=[], deletes=[]
+    )
+    conn = editable_db()
+    assert conn.execute("SELECT status FROM access_logs").fetchone()[0] == "ko"
+    conn.close()
+
+
+def test_apply_table_changes_rejects_unknown_names(editable_db):
+    assert apply_table_changes("tabella_inesistente", [], [], []) is False
+    assert (
+        apply_table_changes(
+            "report_interventi", [({"id_report": "R001"}, {"colonna_x": 1})], [], []
+        )
+        is False
+    )
+
+
+def test_apply_table_changes_rolls_back_on_error(editable_db):
+    ok = apply_table_changes(
+        "report_interventi",
+        updates=[({"id_report": "R001"}, {"testo": "non salvato"})],
+        inserts=[{"id_report": "R003"}],  # Chiave duplicata
+        deletes=[],
+    )
+    assert ok is False
+    conn = editable_db()
+    assert (
+        conn.execute("SELECT testo FROM report_interventi WHERE id_report='R001'").fetchone()[0]
+        == "testo"
+    )
+    conn.close()
 
 
 def test_get_table_data(mocker, mock_db):
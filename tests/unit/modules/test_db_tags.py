@@ -0,0 +1,125 @@
+"""
+Test per l'indice inverso dei TAG di strumentazione (tag_occurrences).
+"""
+
+import sqlite3
+
+import pytest
+
+from modules.database.db_reports import salva_relazione, salva_report_intervento
+from modules.database.db_tags import (
+    get_tag_timeline,
+    index_document_tags,
+    reindex_all_tags,
+)
+
+
+@pytest.fixture
+def tags_db(mocker, tmp_path):
+    from tests.db_utils import SCHEMA_SQL
+
+    db_path = tmp_path / "tags.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.executescript(
+        """
+        CREATE TABLE report_interventi (
+            id_report TEXT PRIMARY KEY NOT NULL, pdl TEXT, nome_tecnico TEXT,
+            testo_report TEXT, data_riferimento_attivita TEXT, timestamp_validazione TEXT
+        );
+        CREATE TABLE relazioni (
+            id_relazione TEXT PRIMARY KEY NOT NULL, pdl TEXT, data_intervento TEXT,
+            tecnico_compilatore TEXT, corpo_relazione TEXT, stato TEXT
+        );
+        """
+    )
+    conn.commit()
+    conn.close()
+    mocker.patch("modules.database.db_reports.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("modules.database.db_tags.get_db_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def test_saved_documents_are_indexed_and_timeline_is_ordered(tags_db):
+    """I documenti salvati sono indicizzati subito; lo storico parte dal più recente."""
+    assert salva_report_intervento(
+        {
+            "id_report": "R1",
+            "pdl": "P1",
+            "nome_tecnico": "Rossi",
+            "testo_report": "Tarata FCV301, poi di nuovo FCV301 e PT102.",
+            "data_riferimento_attivita": "2025-01-10",
+        }
+    )
+    assert salva_relazione(
+        {
+            "id_relazione": "REL1",
+            "pdl": "P2",
+            "tecnico_compilatore": "Bianchi",
+            "corpo_relazione": "Chiamata per blocco valvola fcv301.",
+            "data_intervento": "2025-02-03",
+        }
+    )
+
+    timeline = get_tag_timeline("fcv-301")
+
+    assert list(timeline["id_origine"]) == ["REL1", "R1"]
+    assert list(timeline["tabella_origine"]) == ["relazioni", "report_interventi"]
+    assert list(timeline["tecnico"]) == ["Bianchi", "Rossi"]
+    assert timeline.iloc[1]["occorrenze"] == 2
+    assert timeline.iloc[1]["loop"] == "301"
+    assert list(get_tag_timeline("PT102")["id_origine"]) == ["R1"]
+
+
+def test_reindex_after_edit_replaces_previous_tags(tags_db):
+    conn = tags_db()
+    conn.execute(
+        "INSERT INTO relazioni (id_relazione, corpo_relazione, data_intervento) "
+        "VALUES ('REL1', 'Controllato TT200', '2025-01-01')"
+    )
+    index_document_tags(conn, "relazioni", ["REL1"])
+    conn.execute("UPDATE relazioni SET corpo_relazione = 'Controllato LT200'")
+    index_document_tags(conn, "relazioni", ["REL1"])
+    conn.commit()
+    conn.close()
+
+    assert get_tag_timeline("TT200").empty
+    assert list(get_tag_timeline("LT200")["id_origine"]) == ["REL1"]
+
+
+def test_reindex_all_tags_rebuilds_from_history(tags_db):
+    """La ricostruzione completa indicizza lo storico e ignora i documenti senza TAG."""
+    conn = tags_db()
+    conn.executemany(
+        "INSERT INTO report_interventi (id_report, testo_report, data_riferimento_attivita) "
+        "VALUES (?, ?, ?)",
+        [(f"R{i}", f"Verifica PT{100 + i % 3}", f"2025-01-{i + 1:02d}") for i in range(7)]
+        + [("R_VUOTO", None, "2025-01-20")],
+    )
+    conn.execute(
+        "INSERT INTO tag_occurrences (tag, loop, tabella_origine, id_origine) "
+        "VALUES ('XX999', '999', 'relazioni', 'OBSOLETA')"
+    )
+    conn.commit()
+    conn.close()
+
+    assert reindex_all_tags(batch_size=3) == 7
+
+    assert len(get_tag_timeline("PT100")) == 3
+    assert get_tag_timeline("XX999").empty
+
+
+def test_deleted_documents_do_not_appear_in_timeline(tags_db):
+    assert salva_relazione({"id_relazione": "REL1", "corpo_relazione": "Sostituito PSV100"})
+    conn = tags_db()
+    conn.execute("DELETE FROM relazioni")
+    conn.commit()
+    conn.close()
+
+    assert get_tag_timeline("PSV100").empty
@@ -1,23 +1,153 @@
 """
-Test di concorrenza per l'invio asincrono di email.
+Test di concorrenza per la consegna delle email tramite outbox e worker unico.
 """
 
-import time
+import socketserver
+import sqlite3
+import threading
 
-from modules.email_sender import invia_email_con_outlook_async
+import pytest
 
+from modules import email_sender
+from modules.email_sender import EmailOutboxWorker, SmtpBackend
 
-def test_email_rapid_fire_threading(mocker):
-    """Verifica che l'invio di molteplici email in parallelo non causi crash."""
-    # Mock del subprocesso per non eseguire realmente Outlook
-    mock_sub = mocker.patch("modules.email_sender._send_email_subprocess")
 
-    # Lanciamo 10 email quasi simultaneamente
-    for i in range(10):
-        invia_email_con_outlook_async(f"Subject {i}", f"Body {i}")
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Server SMTP minimale di debug: registra connessioni e messaggi ricevuti."""
 
-    # Attendiamo un tempo sufficiente per l'avvio dei thread
-    time.sleep(0.5)
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.wfile.write(b"220 localhost ESMTP test\r\n")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            cmd = line.split(" ", 1)[0].upper()
+            if cmd in ("EHLO", "HELO"):
+                self.wfile.write(b"250 localhost\r\n")
+            elif cmd == "DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = []
+                while (chunk := self.rfile.readline()) not in (b".\r\n", b""):
+                    data.append(chunk.decode())
+                server.messages.append("".join(data))
+                if server.fail_next:
+                    server.fail_next -= 1
+                    self.wfile.write(b"451 Temporary failure\r\n")
+                else:
+                    self.wfile.write(b"250 OK\r\n")
+            elif cmd == "QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
 
-    # Verifichiamo che siano state fatte 10 chiamate al subprocesso
-    assert mock_sub.call_count == 10
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    server.fail_next = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox_db(mocker, tmp_path):
+    db_path = tmp_path / "outbox.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path), timeout=20)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    conn = get_test_conn()
+    conn.execute(
+        """CREATE TABLE email_outbox (
+            id TEXT PRIMARY KEY NOT NULL, oggetto TEXT NOT NULL, corpo_html TEXT NOT NULL,
+            destinatari TEXT, stato TEXT NOT NULL DEFAULT 'in_coda',
+            tentativi INTEGER NOT NULL DEFAULT 0, prossimo_tentativo TEXT, ultimo_errore TEXT,
+            timestamp_creazione TEXT, timestamp_invio TEXT
+        )"""
+    )
+    conn.commit()
+    conn.close()
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    mocker.patch("modules.database.db_email.get_db_connection", side_effect=get_test_conn)
+    return get_test_conn
+
+
+def test_email_rapid_fire_single_connection(mocker, outbox_db, smtp_server):
+    """Molte email accodate in rapida successione vengono consegnate su un'unica connessione."""
+    host, port = smtp_server.server_address
+    worker = EmailOutboxWorker(
+        backend_factory=lambda: SmtpBackend(host, port), batch_size=50, poll_interval=0.05
+    )
+    mocker.patch("modules.email_sender.avvia_worker_email", return_value=worker)
+
+    threads = [
+        threading.Thread(
+            target=email_sender.accoda_email, args=(f"Subject {i}", f"<p>Body {i}</p>", ["a@b.it"])
+        )
+        for i in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert worker.drain_once() == 10
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 10
+
+    conn = outbox_db()
+    stati = conn.execute("SELECT stato, COUNT(*) FROM email_outbox GROUP BY stato").fetchall()
+    conn.close()
+    assert [tuple(r) for r in stati] == [("inviata", 10)]
+
+
+def test_email_failures_are_retried_with_backoff(outbox_db, smtp_server):
+    """Un rifiuto temporaneo ripianifica l'email senza bloccare il resto del blocco."""
+    host, port = smtp_server.server_address
+    smtp_server.fail_next = 1
+    email_sender.enqueue_email("E1", "Primo", "<p>1</p>", "a@b.it")
+    email_sender.enqueue_email("E2", "Secondo", "<p>2</p>", "a@b.it")
+
+    worker = EmailOutboxWorker(backend_factory=lambda: SmtpBackend(host, port))
+    assert worker.drain_once() == 2
+
+    conn = outbox_db()
+    rows = {
+        r["id"]: r
+        for r in conn.execute(
+            "SELECT id, stato, tentativi, prossimo_tentativo, timestamp_creazione, ultimo_errore "
+            "FROM email_outbox"
+        ).fetchall()
+    }
+    conn.close()
+    assert rows["E2"]["stato"] == "inviata"
+    assert rows["E1"]["stato"] == "in_coda"
+    assert rows["E1"]["tentativi"] == 1
+    assert rows["E1"]["prossimo_tentativo"] > rows["E1"]["timestamp_creazione"]
+    assert "451" in rows["E1"]["ultimo_errore"]
+    # Il tentativo successivo non è ancora scaduto
+    assert worker.drain_once() == 0
+
+
+def test_email_backend_unavailable_reschedules_batch(outbox_db):
+    """Se il server SMTP non risponde l'intero blocco torna in coda."""
+    email_sender.enqueue_email("E1", "Oggetto", "<p>x</p>", "a@b.it")
+    worker = EmailOutboxWorker(backend_factory=lambda: SmtpBackend("127.0.0.1", 1))
+
+    assert worker.drain_once() == 1
+
+    conn = outbox_db()
+    row = conn.execute("SELECT stato, tentativi FROM email_outbox").fetchone()
+    conn.close()
+    assert tuple(row) == ("in_coda", 1)
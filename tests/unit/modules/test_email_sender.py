@@ -3,8 +3,8 @@ Test unitari per il modulo Email Sender.
 """
 
 
-def test_invia_email_con_outlook_async(mocker):
-    """Verifica che il modulo avvii un thread e lanci il subprocesso corretto."""
+def test_outlook_backend_subprocess_command(mocker):
+    """Verifica che il backend Outlook lanci il subprocesso con i parametri attesi."""
     # Mock di subprocess.run
     mock_run = mocker.patch("modules.email_sender.subprocess.run")
     mock_run.return_value.returncode = 0
@@ -12,11 +12,10 @@ def test_invia_email_con_outlook_async(mocker):
     # Mock di Path.exists per far credere che lo script esista
     mocker.patch("modules.email_sender.Path.exists", return_value=True)
 
-    # Eseguiamo la funzione. Poiché è asincrona, dobbiamo aspettare che il thread finisca
-    # o testare la logica del subprocesso direttamente.
-    from modules.email_sender import _send_email_subprocess
+    from modules.email_sender import OutlookBackend
 
-    _send_email_subprocess("Oggetto Test", "Corpo Test")
+    with OutlookBackend() as backend:
+        backend.send("Oggetto Test", "Corpo Test", [])
 
     # Verifica che subprocess.run sia stato chiamato con i parametri attesi
     args, _ = mock_run.call_args
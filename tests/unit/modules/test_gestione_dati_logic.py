@@ -17,23 +17,24 @@ class TestGestioneDatiLogic(unittest.TestCase):
     @patch("streamlit.selectbox")
     @patch("streamlit.button")
     @patch("streamlit.success")
-    @patch("pages.gestione_dati.get_table_data")
+    @patch("streamlit.session_state", {"editor_table1_0": {"edited_rows": {0: {"col1": 2}}}})
+    @patch("pages.gestione_dati.get_table_key_columns", return_value=["rowid"])
+    @patch("pages.gestione_dati.get_table_page")
     @patch("pages.gestione_dati.get_table_names")
-    @patch("pages.gestione_dati.save_table_data")
+    @patch("pages.gestione_dati.apply_table_changes")
     def test_render_gestione_dati_save(
-        self, mock_save, mock_names, mock_data, mock_succ, mock_btn, mock_sel, mock_edit
+        self, mock_save, mock_names, mock_data, _mock_keys, mock_succ, mock_btn, mock_sel, mock_edit
     ):
         mock_names.return_value = ["table1"]
         mock_sel.return_value = "table1"
-        mock_data.return_value = pd.DataFrame({"col1": [1]})
-        mock_edit.return_value = pd.DataFrame({"col1": [2]})
+        mock_data.return_value = (pd.DataFrame({"rowid": [1], "col1": [1]}), 1)
         mock_btn.return_value = True
         mock_save.return_value = True
 
         gd.render_gestione_dati_tab()
 
-        mock_save.assert_called()
-        mock_succ.assert_called_with("Dati salvati con successo!", icon=unittest.mock.ANY)
+        mock_save.assert_called_with("table1", [({"rowid": 1}, {"col1": 2})], [], [])
+        mock_succ.assert_called()
 
     @patch("streamlit.session_state", {"authenticated_user": "ADM01"})
     @patch("streamlit.rerun")
@@ -3,7 +3,11 @@ Test unitari per la logica di analisi strumentazione ISA S5.1.
 """
 
 from modules.instrumentation_logic import (
+    _parse_normalized_tag,
+    analyze_corpus,
+    analyze_domain_terminology,
     find_and_analyze_tags,
+    get_technical_suggestions,
     parse_instrument_tag,
 )
 
@@ -48,3 +52,51 @@ def test_parse_invalid_tag():
     """Verifica che tag non validi restituiscano None."""
     assert parse_instrument_tag("INVALID_TAG") is None
     assert parse_instrument_tag("12345") is None
+
+
+def test_parse_instrument_tag_cache_returns_independent_copies():
+    """Il TAG è analizzato una sola volta, ma ogni chiamante riceve un dizionario proprio."""
+    _parse_normalized_tag.cache_clear()
+    first = parse_instrument_tag(" fcv301 ")
+    first["description"] = "modificato"
+    second = parse_instrument_tag("FCV301")
+
+    assert second["description"] == "Valvola di Controllo di portata"
+    info = _parse_normalized_tag.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+
+
+def test_analyze_domain_terminology_combined_pattern():
+    """Acronimi solo in maiuscolo, termini comuni senza distinzione di maiuscole."""
+    found = analyze_domain_terminology("Il CTG ha ricevuto la Chiamata dal CR, non dal ct.")
+    assert list(found) == ["CTG", "CR", "chiamata"]
+    assert analyze_domain_terminology("Intervento CTGX senza acronimi") == {}
+
+
+def test_get_technical_suggestions_reuses_given_tags(mocker):
+    """Con i TAG già analizzati non viene ripetuta l'estrazione."""
+    text = "Valvola FCV301 bloccata"
+    _, tags = find_and_analyze_tags(text)
+    spy = mocker.patch("modules.instrumentation_logic.find_and_analyze_tags")
+
+    suggestions = get_technical_suggestions(text, tags)
+
+    spy.assert_not_called()
+    assert any("Attuatore" in s for s in suggestions)
+
+
+def test_analyze_corpus_aggregates_tags_and_terms():
+    texts = [
+        "FCV301 in blocco, avvisato il CT.",
+        "Sostituito PT102 e verificata FCV301; termocoppia ok.",
+        "",
+    ]
+    result = analyze_corpus(texts)
+
+    assert len(result["documents"]) == 3
+    assert set(result["documents"][1]["loops"]) == {"102", "301"}
+    assert result["documents"][2]["tags"] == []
+    assert any("TC" in s for s in result["documents"][1]["suggestions"])
+    assert result["tag_counts"] == {"FCV301": 2, "PT102": 1}
+    assert result["term_counts"] == {"CT": 1}
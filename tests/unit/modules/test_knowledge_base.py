@@ -5,7 +5,11 @@ from unittest.mock import patch
 
 
 # Mock streamlit cache_data before importing the module
-def mock_cache(func):
+def mock_cache(func=None, **kwargs):
+    # Supporta anche la forma con parametri, es. @st.cache_data(ttl=60)
+    if func is None:
+        return mock_cache
+
     def clear():
         pass
 
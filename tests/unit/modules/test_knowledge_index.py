@@ -0,0 +1,92 @@
+"""
+Test per il formato su disco dell'indice della knowledge base (mmap, senza pickle).
+"""
+
+import json
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from modules.knowledge_index import (
+    KnowledgeIndexError,
+    read_knowledge_index,
+    write_knowledge_index,
+)
+
+SENTENCES = [
+    "Sostituita valvola FCV301 bloccata in chiusura.",
+    "Calibrato trasmettitore di pressione PT101 — verifica è positiva.",
+    "Verificato loop di temperatura TT205 sul forno.",
+]
+
+
+@pytest.fixture
+def fitted():
+    vectorizer = TfidfVectorizer(stop_words=["di", "in"], ngram_range=(1, 2))
+    return vectorizer, vectorizer.fit_transform(SENTENCES)
+
+
+def test_roundtrip_preserves_scores_and_sentences(tmp_path, fitted):
+    """L'indice riaperto produce gli stessi punteggi del vettorizzatore originale."""
+    vectorizer, matrix = fitted
+    path = tmp_path / "index"
+    write_knowledge_index(path, vectorizer, matrix, SENTENCES)
+
+    index = read_knowledge_index(path)
+
+    assert len(index.sentences) == 3
+    assert [index.sentences[i] for i in range(3)] == SENTENCES
+    assert index.sentences[-1] == SENTENCES[-1]
+    query = "valvola bloccata"
+    expected = (matrix @ vectorizer.transform([query]).T).toarray().ravel()
+    actual = (index.matrix @ index.vectorizer.transform([query]).T).toarray().ravel()
+    np.testing.assert_allclose(actual, expected, rtol=1e-6)
+    assert index.search(query, k=1, min_score=0.0)[0][0] == SENTENCES[0]
+
+
+def test_arrays_are_memory_mapped_read_only(tmp_path, fitted):
+    """Gli array CSR restano viste in sola lettura sui file, senza copie in memoria."""
+    path = tmp_path / "index"
+    write_knowledge_index(path, *fitted, SENTENCES)
+
+    matrix = read_knowledge_index(path).matrix
+
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        assert not array.flags.writeable
+        assert not array.flags.owndata
+
+
+def test_rewrite_replaces_existing_index(tmp_path, fitted):
+    """Una ricostruzione sostituisce la cartella senza lasciare residui temporanei."""
+    path = tmp_path / "index"
+    write_knowledge_index(path, *fitted, SENTENCES)
+    vectorizer = TfidfVectorizer()
+    write_knowledge_index(path, vectorizer, vectorizer.fit_transform(SENTENCES[:1]), SENTENCES[:1])
+
+    assert len(read_knowledge_index(path).sentences) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["index"]
+
+
+def test_unsupported_version_is_rejected(tmp_path, fitted):
+    """Un'intestazione con versione diversa non viene caricata."""
+    path = tmp_path / "index"
+    write_knowledge_index(path, *fitted, SENTENCES)
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    meta["version"] = 99
+    (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    with pytest.raises(KnowledgeIndexError, match="non supportato"):
+        read_knowledge_index(path)
+
+
+def test_missing_or_incomplete_index(tmp_path, fitted):
+    """Cartella assente o file mancanti producono KnowledgeIndexError."""
+    with pytest.raises(KnowledgeIndexError):
+        read_knowledge_index(tmp_path / "assente")
+
+    path = tmp_path / "index"
+    write_knowledge_index(path, *fitted, SENTENCES)
+    (path / "data.npy").unlink()
+    with pytest.raises(KnowledgeIndexError, match="danneggiato"):
+        read_knowledge_index(path)
@@ -0,0 +1,76 @@
+"""
+Test per il servizio di retrieval sulla knowledge base TF-IDF.
+"""
+
+import os
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from modules import knowledge_retrieval
+from modules.knowledge_index import write_knowledge_index
+from modules.knowledge_retrieval import cerca_frasi_simili, get_knowledge_index
+
+SENTENCES = [
+    "Sostituita valvola FCV301 bloccata in chiusura.",
+    "Calibrato trasmettitore di pressione PT101.",
+    "Verificato loop di temperatura TT205 sul forno.",
+    "Pulizia filtro aria strumenti in sala controllo.",
+]
+
+
+def _write_index(path, sentences):
+    vectorizer = TfidfVectorizer()
+    write_knowledge_index(path, vectorizer, vectorizer.fit_transform(sentences), sentences)
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    path = tmp_path / "index"
+    monkeypatch.setattr(knowledge_retrieval, "KNOWLEDGE_INDEX_PATH", path)
+    monkeypatch.setattr(knowledge_retrieval, "_index", None)
+    monkeypatch.setattr(knowledge_retrieval, "_index_mtime", None)
+    return path
+
+
+def test_search_returns_top_k_ordered_by_similarity(index_path):
+    """Le frasi più pertinenti compaiono per prime e il limite k è rispettato."""
+    _write_index(index_path, SENTENCES)
+
+    results = get_knowledge_index().search("valvola FCV301 bloccata", k=2, min_score=0.0)
+
+    assert len(results) == 2
+    assert results[0][0] == SENTENCES[0]
+    assert results[0][1] >= results[1][1]
+
+
+def test_search_filters_by_min_score(index_path):
+    """Una query senza termini in comune non restituisce risultati."""
+    _write_index(index_path, SENTENCES)
+
+    assert cerca_frasi_simili("nessuna parola nota") == []
+    assert cerca_frasi_simili("   ") == []
+
+
+def test_index_loaded_once_and_reloaded_on_change(index_path, mocker):
+    """L'indice è condiviso dal processo e ricaricato solo se il file cambia."""
+    _write_index(index_path, SENTENCES)
+    load_spy = mocker.spy(knowledge_retrieval, "_load_index")
+
+    first = get_knowledge_index()
+    assert get_knowledge_index() is first
+    assert load_spy.call_count == 1
+
+    _write_index(index_path, ["Nuova frase sul compressore K100."])
+    meta = index_path / "meta.json"
+    stat = meta.stat()
+    os.utime(meta, (stat.st_atime, stat.st_mtime + 10))
+
+    assert cerca_frasi_simili("compressore K100") == ["Nuova frase sul compressore K100."]
+    assert load_spy.call_count == 2
+
+
+def test_missing_index_returns_empty(index_path):
+    """Senza indice su disco il retrieval degrada a nessun contesto."""
+    assert get_knowledge_index() is None
+    assert cerca_frasi_simili("valvola") == []
@@ -2,31 +2,114 @@
 Test per il modulo di apprendimento e indicizzazione IA.
 """
 
-from learning_module import build_knowledge_base
+import json
+import os
 
+import nltk
+import pytest
+from docx import Document
 
-def test_build_knowledge_base_no_docs(mocker):
+import learning_module
+from learning_module import build_knowledge_base, load_knowledge_sentences
+from modules.knowledge_index import read_knowledge_index
+
+FRASE_VALVOLA = "Il tecnico ha provveduto alla sostituzione della valvola di regolazione."
+FRASE_POMPA = "La pompa di alimentazione è stata revisionata e rimessa in servizio oggi."
+
+
+@pytest.fixture
+def kb_dir(mocker, tmp_path, monkeypatch):
+    """Cartella di lavoro isolata con tokenizzazione NLTK deterministica (una frase per riga)."""
+    monkeypatch.chdir(tmp_path)
+    mocker.patch("nltk.sent_tokenize", side_effect=lambda text, language: text.splitlines())
+    # monkeypatch evita che mock ispezioni (e quindi carichi) il corpus lazy di NLTK
+    stopwords = mocker.MagicMock(words=mocker.MagicMock(return_value=["di", "la", "il"]))
+    monkeypatch.setattr(nltk.corpus, "stopwords", stopwords)
+    mocker.patch("nltk.data.find")
+    return tmp_path
+
+
+def _write_docx(path, paragraphs):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(str(path))
+
+
+def test_build_knowledge_base_no_docs(kb_dir):
     """Verifica il comportamento se non ci sono documenti da indicizzare."""
-    mocker.patch("learning_module.load_report_knowledge_base", return_value="")
     result = build_knowledge_base()
     assert result["success"] is False
     assert "Nessun documento" in result["message"]
 
 
-def test_build_knowledge_base_success(mocker, tmp_path, monkeypatch):
+def test_build_knowledge_base_success(kb_dir):
     """Verifica la creazione corretta dell'indice tramite dati reali serializzabili."""
-    monkeypatch.chdir(tmp_path)
-    text = "Il tecnico ha provveduto alla sostituzione della valvola di regolazione."
-    mocker.patch("learning_module.load_report_knowledge_base", return_value=text)
-
-    mocker.patch("nltk.sent_tokenize", return_value=[text])
-    mocker.patch("nltk.corpus.stopwords.words", return_value=["di", "la", "il"])
-    mocker.patch("nltk.data.find")
+    (kb_dir / "relazioni_inviate").mkdir()
+    (kb_dir / "relazioni_inviate" / "r1.txt").write_text(FRASE_VALVOLA, encoding="utf-8")
 
     # Non patchiamo TfidfVectorizer, lasciamo che sklearn lavori su un testo piccolo
-    # È veloce e garantisce che il pickle funzioni su oggetti reali.
+    # È veloce e garantisce che l'indice salvato sia realmente riapribile.
 
-    result = build_knowledge_base()
+    result = build_knowledge_base(max_workers=1)
 
     assert result["success"] is True
-    assert (tmp_path / "knowledge_base_index.pkl").exists()
+    index = read_knowledge_index(kb_dir / "knowledge_base_index")
+    assert list(index.sentences) == [FRASE_VALVOLA]
+
+
+def test_rebuild_only_reextracts_changed_documents(kb_dir, mocker):
+    """La seconda ricostruzione usa la cache; solo i file modificati vengono riletti."""
+    _write_docx(kb_dir / "knowledge_base_docs" / "2024" / "a.docx", [FRASE_VALVOLA])
+    txt = kb_dir / "relazioni_inviate" / "r1.txt"
+    txt.parent.mkdir()
+    txt.write_text(FRASE_POMPA, encoding="utf-8")
+
+    sentences, rielaborati = load_knowledge_sentences(max_workers=1)
+    assert sorted(sentences) == sorted([FRASE_VALVOLA, FRASE_POMPA])
+    assert rielaborati == 2
+
+    extract_spy = mocker.spy(learning_module, "_extract_sentences")
+    assert load_knowledge_sentences(max_workers=1) == (sentences, 0)
+    assert extract_spy.call_count == 0
+
+    txt.write_text(f"{FRASE_POMPA}\n{FRASE_VALVOLA}", encoding="utf-8")
+    stat = txt.stat()
+    os.utime(txt, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    sentences, rielaborati = load_knowledge_sentences(max_workers=1)
+    assert rielaborati == 1
+    assert extract_spy.call_count == 1
+    assert sentences.count(FRASE_VALVOLA) == 2
+
+
+def test_removed_documents_are_dropped_from_cache(kb_dir):
+    """I documenti eliminati escono dalla cache e dall'indice."""
+    doc = kb_dir / "knowledge_base_docs" / "a.docx"
+    _write_docx(doc, [FRASE_VALVOLA])
+    load_knowledge_sentences(max_workers=1)
+
+    doc.unlink()
+    _write_docx(kb_dir / "knowledge_base_docs" / "b.docx", [FRASE_POMPA])
+
+    sentences, rielaborati = load_knowledge_sentences(max_workers=1)
+    assert sentences == [FRASE_POMPA]
+    assert rielaborati == 1
+    cache = json.loads((kb_dir / "knowledge_base_cache.json").read_text(encoding="utf-8"))
+    assert list(cache) == [str(learning_module.KNOWLEDGE_DOCS_PATH / "b.docx")]
+
+
+def test_parallel_extraction_matches_sequential(kb_dir):
+    """L'estrazione nel pool di processi produce lo stesso risultato di quella sequenziale."""
+    for i in range(4):
+        _write_docx(kb_dir / "knowledge_base_docs" / f"doc{i}.docx", [f"{FRASE_VALVOLA} {i}"])
+    (kb_dir / "knowledge_base_docs" / "corrotto.docx").write_text("non è un docx")
+
+    parallel, rielaborati = load_knowledge_sentences(max_workers=2)
+    (kb_dir / "knowledge_base_cache.json").unlink()
+    sequential, _ = load_knowledge_sentences(max_workers=1)
+
+    assert rielaborati == 5
+    assert parallel == sequential
+    assert len(parallel) == 4
@@ -8,23 +8,22 @@ root_dir = Path(__file__).parent.parent.parent.parent
 sys.path.append(str(root_dir / "src"))
 
 import modules.shifts.logic_bookings as booking_logic
+from modules.database.db_shifts import BookingResult
 
 
 class TestLogicBookingsDeepDive(unittest.TestCase):
-    @patch("modules.shifts.logic_bookings.get_shift_by_id")
+    @patch("modules.shifts.logic_bookings.book_shift_atomically")
     @patch("streamlit.error")
-    def test_prenota_turno_shift_not_found(self, mock_error, mock_get_shift):
-        mock_get_shift.return_value = None
+    def test_prenota_turno_shift_not_found(self, mock_error, mock_book):
+        mock_book.return_value = BookingResult("not_found")
         result = booking_logic.prenota_turno_logic("M1", "S1", "Tecnico")
         self.assertFalse(result)
         mock_error.assert_called_with("Turno non trovato.")
 
-    @patch("modules.shifts.logic_bookings.get_shift_by_id")
-    @patch("modules.shifts.logic_bookings.check_user_oncall_conflict")
+    @patch("modules.shifts.logic_bookings.book_shift_atomically")
     @patch("streamlit.error")
-    def test_prenota_turno_oncall_conflict(self, mock_error, mock_conflict, mock_get_shift):
-        mock_get_shift.return_value = {"Data": "2023-01-01"}
-        mock_conflict.return_value = True
+    def test_prenota_turno_oncall_conflict(self, mock_error, mock_book):
+        mock_book.return_value = BookingResult("oncall_conflict", data_turno="2023-01-01")
 
         result = booking_logic.prenota_turno_logic("M1", "S1", "Tecnico")
         self.assertFalse(result)
@@ -33,67 +32,33 @@ class TestLogicBookingsDeepDive(unittest.TestCase):
         args, _ = mock_error.call_args
         self.assertIn("Conflitto rilevato", args[0])
 
-    @patch("modules.shifts.logic_bookings.get_shift_by_id")
-    @patch("modules.shifts.logic_bookings.check_user_oncall_conflict")
-    @patch("modules.shifts.logic_bookings.get_bookings_for_shift")
+    @patch("modules.shifts.logic_bookings.book_shift_atomically")
     @patch("streamlit.error")
-    def test_prenota_turno_full_capacity(
-        self, mock_error, mock_bookings, mock_conflict, mock_get_shift
-    ):
-        mock_get_shift.return_value = {"Data": "2023-01-01", "PostiTecnico": 1, "PostiAiutante": 1}
-        mock_conflict.return_value = False
-
-        # Simulate full shift
-        import pandas as pd
-
-        mock_bookings.return_value = pd.DataFrame(
-            [{"RuoloOccupato": "Tecnico"}, {"RuoloOccupato": "Aiutante"}]
-        )
+    def test_prenota_turno_full_capacity(self, mock_error, mock_book):
+        mock_book.return_value = BookingResult("full", data_turno="2023-01-01")
 
         # Try to book as Tecnico
         result = booking_logic.prenota_turno_logic("M1", "S1", "Tecnico")
         self.assertFalse(result)
         mock_error.assert_called_with("Tutti i posti per il ruolo selezionato sono esauriti!")
 
-    @patch("modules.shifts.logic_bookings.get_shift_by_id")
-    @patch("modules.shifts.logic_bookings.check_user_oncall_conflict")
-    @patch("modules.shifts.logic_bookings.get_bookings_for_shift")
-    @patch("modules.shifts.logic_bookings.add_booking")
+    @patch("modules.shifts.logic_bookings.book_shift_atomically")
     @patch("modules.shifts.logic_bookings.log_shift_change")
     @patch("streamlit.success")
-    def test_prenota_turno_success(
-        self, mock_success, mock_log, mock_add, mock_bookings, mock_conflict, mock_get_shift
-    ):
-        mock_get_shift.return_value = {"Data": "2023-01-01", "PostiTecnico": 2, "PostiAiutante": 0}
-        mock_conflict.return_value = False
-        import pandas as pd
-
-        mock_bookings.return_value = pd.DataFrame(
-            columns=["RuoloOccupato"]
-        )  # Empty bookings with columns
-
-        mock_add.return_value = True
+    def test_prenota_turno_success(self, mock_success, mock_log, mock_book):
+        mock_book.return_value = BookingResult("booked", booking_id="P_1", data_turno="2023-01-01")
 
         result = booking_logic.prenota_turno_logic("M1", "S1", "Tecnico")
         self.assertTrue(result)
-        mock_add.assert_called()
+        mock_book.assert_called()
+        self.assertEqual(mock_book.call_args.args[1:], ("S1", "M1", "Tecnico"))
         mock_log.assert_called()
         mock_success.assert_called()
 
-    @patch("modules.shifts.logic_bookings.get_shift_by_id")
-    @patch("modules.shifts.logic_bookings.check_user_oncall_conflict")
-    @patch("modules.shifts.logic_bookings.get_bookings_for_shift")
-    @patch("modules.shifts.logic_bookings.add_booking")
+    @patch("modules.shifts.logic_bookings.book_shift_atomically")
     @patch("streamlit.error")
-    def test_prenota_turno_db_error(
-        self, mock_error, mock_add, mock_bookings, mock_conflict, mock_get_shift
-    ):
-        mock_get_shift.return_value = {"Data": "2023-01-01", "PostiTecnico": 2}
-        mock_conflict.return_value = False
-        import pandas as pd
-
-        mock_bookings.return_value = pd.DataFrame(columns=["RuoloOccupato"])
-        mock_add.return_value = False  # DB failure
+    def test_prenota_turno_db_error(self, mock_error, mock_book):
+        mock_book.return_value = BookingResult("error")  # DB failure
 
         result = booking_logic.prenota_turno_logic("M1", "S1", "Tecnico")
         self.assertFalse(result)
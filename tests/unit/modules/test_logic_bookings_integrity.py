@@ -3,32 +3,86 @@ Test di integrità per la logica di prenotazione turni.
 Verifica la gestione di duplicati e vincoli di database.
 """
 
-import datetime
+import sqlite3
+import threading
 
-import pandas as pd
+import pytest
 
+from modules.database.db_shifts import BookingResult, book_shift_atomically
 from modules.shifts.logic_bookings import prenota_turno_logic
+from tests.db_utils import SCHEMA_SQL
+
+
+@pytest.fixture
+def booking_db(mocker, tmp_path):
+    """Database reale con un turno da un posto tecnico e una reperibilità."""
+    db_path = tmp_path / "bookings.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path), timeout=20)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    mocker.patch("modules.database.db_shifts.get_db_connection", side_effect=get_test_conn)
+
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.executemany(
+        "INSERT INTO turni VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            ("T1", "Straordinario", "2030-01-10", "08:00", "17:00", 1, 0, "Straordinario"),
+            ("REP1", "Reperibilità", "2030-01-11", "00:00", "23:59", 1, 1, "Reperibilità"),
+            ("T2", "Assistenza", "2030-01-11", "08:00", "17:00", 1, 1, "Assistenza"),
+        ],
+    )
+    conn.execute("INSERT INTO prenotazioni VALUES ('PR', 'REP1', 'M9', 'Tecnico', '')")
+    conn.commit()
+    conn.close()
+    return get_test_conn
 
 
 def test_double_booking_prevention(mocker):
     """Verifica che un utente non possa prenotarsi due volte per lo stesso turno."""
-    # 1. Mock turno valido con posti liberi
     mocker.patch(
-        "modules.shifts.logic_bookings.get_shift_by_id",
-        return_value={
-            "ID_Turno": "T1",
-            "PostiTecnico": 2,
-            "PostiAiutante": 2,
-            "Data": datetime.date.today().isoformat(),
-        },
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        return_value=BookingResult("already_booked"),
     )
-
-    # 2. Mock DB
-    mock_existing = pd.DataFrame([{"Matricola": "12345", "RuoloOccupato": "Tecnico"}])
-    mocker.patch("modules.shifts.logic_bookings.get_bookings_for_shift", return_value=mock_existing)
-    mocker.patch("modules.shifts.logic_bookings.check_user_oncall_conflict", return_value=False)
-    mocker.patch("modules.shifts.logic_bookings.st")
-    mocker.patch("modules.shifts.logic_bookings.add_booking", return_value=False)
+    mock_st = mocker.patch("modules.shifts.logic_bookings.st")
 
     success = prenota_turno_logic("12345", "T1", "Tecnico")
     assert success is False
+    assert mock_st.error.called
+
+
+def test_atomic_booking_statuses(booking_db):
+    assert book_shift_atomically("P1", "NOPE", "M1", "Tecnico").status == "not_found"
+    assert book_shift_atomically("P2", "T2", "M9", "Tecnico").status == "oncall_conflict"
+    assert book_shift_atomically("P3", "T1", "M1", "Aiutante").status == "full"
+
+    result = book_shift_atomically("P4", "T1", "M1", "Tecnico")
+    assert result.ok
+    assert result.data_turno == "2030-01-10"
+    assert book_shift_atomically("P5", "T1", "M1", "Tecnico").status == "already_booked"
+    assert book_shift_atomically("P6", "T1", "M2", "Tecnico").status == "full"
+
+
+def test_atomic_booking_last_seat_race(booking_db):
+    """Più tecnici che competono per l'ultimo posto: uno solo deve ottenerlo."""
+    results: list[BookingResult] = []
+    barrier = threading.Barrier(6)
+
+    def worker(i: int) -> None:
+        barrier.wait()
+        results.append(book_shift_atomically(f"P{i}", "T1", f"M{i}", "Tecnico"))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(r.ok for r in results) == 1
+    conn = booking_db()
+    count = conn.execute("SELECT COUNT(*) FROM prenotazioni WHERE ID_Turno = 'T1'").fetchone()[0]
+    conn.close()
+    assert count == 1
@@ -3,8 +3,6 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-import pandas as pd
-
 # Add src to path
 root_dir = Path(__file__).parent.parent.parent.parent
 sys.path.append(str(root_dir / "src"))
@@ -75,7 +73,7 @@ class TestLogicMarketDeepDive(unittest.TestCase):
         mock_add.assert_called_with(req)  # Verify retry add
 
     @patch("streamlit.success")
-    @patch("modules.shifts.logic_market.get_all_users")
+    @patch("modules.shifts.logic_market.notifica_turno_disponibile")
     @patch("modules.shifts.logic_market.get_shift_by_id")
     @patch("modules.shifts.logic_market.add_bacheca_item")
     @patch("modules.shifts.logic_market.get_db_connection")
@@ -85,12 +83,13 @@ class TestLogicMarketDeepDive(unittest.TestCase):
     ):
         mock_book.return_value = {"ID_Prenotazione": "P1", "RuoloOccupato": "Tecnico"}
         mock_shift.return_value = {"Data": "2023-01-01", "Descrizione": "Turno X"}
-        mock_all.return_value = pd.DataFrame([{"Matricola": "M2"}, {"Matricola": "M1"}])
-
         result = market.pubblica_turno_in_bacheca_logic("M1", "T1")
 
         self.assertTrue(result)
         mock_succ.assert_called()
+        mock_all.assert_called_once()
+        self.assertEqual(mock_all.call_args.kwargs["escludi_matricola"], "M1")
+        self.assertEqual(mock_all.call_args.kwargs["ruolo_richiesto"], "Tecnico")
 
     @patch("streamlit.error")
     @patch("modules.shifts.logic_market.get_bacheca_item_by_id")
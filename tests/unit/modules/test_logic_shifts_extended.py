@@ -4,9 +4,9 @@ Copre limiti di prenotazione e permessi bacheca.
 """
 
 import datetime
+import sqlite3
 
-import pandas as pd
-
+from modules.database.db_shifts import BookingResult
 from modules.shifts.logic_bookings import prenota_turno_logic
 from modules.shifts.logic_market import (
     prendi_turno_da_bacheca_logic,
@@ -16,21 +16,10 @@ from modules.shifts.logic_market import (
 
 def test_prenota_turno_limit_reached(mocker):
     """Verifica che la prenotazione fallisca se il limite di posti è raggiunto."""
-    # Mock turno con 1 posto Tecnico
     mocker.patch(
-        "modules.shifts.logic_bookings.get_shift_by_id",
-        return_value={
-            "ID_Turno": "T1",
-            "PostiTecnico": 1,
-            "PostiAiutante": 0,
-            "Data": datetime.date.today().isoformat(),
-        },
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        return_value=BookingResult("full", data_turno=datetime.date.today().isoformat()),
     )
-
-    # Mock 1 prenotazione già esistente come Tecnico
-    mock_bookings = pd.DataFrame([{"Matricola": "999", "RuoloOccupato": "Tecnico"}])
-    mocker.patch("modules.shifts.logic_bookings.get_bookings_for_shift", return_value=mock_bookings)
-    mocker.patch("modules.shifts.logic_bookings.check_user_oncall_conflict", return_value=False)
     mocker.patch("modules.shifts.logic_bookings.st")
 
     # Tentativo di prenotazione (dovrebbe fallire)
@@ -38,6 +27,18 @@ def test_prenota_turno_limit_reached(mocker):
     assert success is False
 
 
+def test_prenota_turno_database_locked_shows_error(mocker):
+    """Un database ancora bloccato dopo i retry produce un messaggio, non un traceback."""
+    mocker.patch(
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        side_effect=sqlite3.OperationalError("database is locked"),
+    )
+    mock_st = mocker.patch("modules.shifts.logic_bookings.st")
+
+    assert prenota_turno_logic("123", "T1", "Tecnico") is False
+    assert mock_st.error.called
+
+
 def test_pubblica_in_bacheca_success(mocker):
     """Verifica la pubblicazione di un turno in bacheca."""
     # Mock prenotazione esistente
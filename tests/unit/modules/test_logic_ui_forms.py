@@ -58,9 +58,7 @@ def test_relazione_submission_full_flow(mocker):
     mock_db = mocker.patch(
         "components.forms.relazione_oncall_form.salva_relazione", return_value=True
     )
-    mock_email = mocker.patch(
-        "components.forms.relazione_oncall_form.invia_email_con_outlook_async"
-    )
+    mock_email = mocker.patch("components.forms.relazione_oncall_form.accoda_email")
 
     dt = datetime.date(2025, 1, 1)
     _handle_submission(dt, "Testo relazione", "Tecnico", "Partner", "08:00", "16:00")
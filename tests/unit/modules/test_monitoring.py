@@ -0,0 +1,87 @@
+"""
+Test per i collector delle metriche applicative (modules/monitoring.py).
+"""
+
+from core.metrics import MetricsRegistry, record_cache_access, update_cache_hit_ratios
+from modules import monitoring
+
+
+def _gauges(registry):
+    return {
+        (g["name"], tuple(g["labels"].values())): g["value"] for g in registry.snapshot()["gauges"]
+    }
+
+
+def test_job_runs_are_shared_through_file(tmp_path, monkeypatch):
+    path = tmp_path / "logs" / "job_runs.json"
+    monkeypatch.setattr(monitoring, "JOB_RUNS_FILE", path)
+
+    monitoring.record_job_run("sync_data", 12.5, 7, True, path=path)
+    monitoring.record_job_run("indicizza_tag", 1.0, 0, False, path=path)
+    registry = MetricsRegistry()
+    monitoring.collect_job_runs(registry)
+
+    gauges = _gauges(registry)
+    assert gauges[("job_last_run_duration_seconds", ("sync_data",))] == 12.5
+    assert gauges[("job_last_run_rows_changed", ("sync_data",))] == 7
+    assert gauges[("job_last_run_success", ("indicizza_tag",))] == 0
+
+
+def test_collect_email_outbox_reports_pending_states(mocker):
+    mocker.patch(
+        "modules.db_manager.get_outbox_status", return_value={"in_coda": 3, "inviata": 120}
+    )
+    registry = MetricsRegistry()
+
+    monitoring.collect_email_outbox(registry)
+
+    gauges = _gauges(registry)
+    assert gauges[(monitoring.EMAIL_OUTBOX_DEPTH, ("in_coda",))] == 3
+    assert gauges[(monitoring.EMAIL_OUTBOX_DEPTH, ("errore",))] == 0
+    assert (monitoring.EMAIL_OUTBOX_DEPTH, ("inviata",)) not in gauges
+
+
+def test_cache_hit_ratios():
+    registry = MetricsRegistry()
+    for hit in (True, True, True, False):
+        record_cache_access("ai_review", hit, registry)
+
+    update_cache_hit_ratios(registry)
+
+    assert _gauges(registry)[("cache_hit_ratio", ("ai_review",))] == 0.75
+
+
+def test_collect_tag_cache_mirrors_lru_statistics():
+    from modules.instrumentation_logic import parse_instrument_tag
+
+    registry = MetricsRegistry()
+    parse_instrument_tag("PT-101")
+    parse_instrument_tag("PT-101")
+
+    monitoring.collect_tag_cache(registry)
+
+    counters = {
+        c["labels"]["result"]: c["value"]
+        for c in registry.snapshot()["counters"]
+        if c["labels"]["cache"] == "instrument_tags"
+    }
+    assert counters["hit"] >= 1
+    assert counters["miss"] >= 1
+
+
+def test_collect_active_sessions_skips_missing_session_manager(mocker):
+    from streamlit import runtime
+
+    registry = MetricsRegistry()
+    mocker.patch.object(runtime, "exists", return_value=True)
+    instance = mocker.patch.object(runtime, "get_instance")
+    instance.return_value._session_mgr.num_active_sessions.return_value = 4
+
+    monitoring.collect_active_sessions(registry)
+    assert _gauges(registry)[(monitoring.ACTIVE_SESSIONS, ())] == 4
+
+    # Attributo privato assente (es. in una nuova versione di Streamlit): nessun errore
+    instance.return_value = object()
+    registry = MetricsRegistry()
+    monitoring.collect_active_sessions(registry)
+    assert registry.snapshot()["gauges"] == []
@@ -24,3 +24,108 @@ def test_segna_tutte_lette_single_query(mocker):
     assert "UPDATE notifiche" in query
     assert "WHERE Destinatario_Matricola = ?" in query
     assert params == (matricola,)
+
+
+def test_notifica_turno_disponibile_targets_eligible_users(mocker, tmp_path):
+    """Il fan-out notifica solo gli utenti idonei, con un'unica istruzione e ID univoci."""
+    import sqlite3
+
+    from modules.notifications import notifica_turno_disponibile
+    from tests.db_utils import SCHEMA_SQL
+
+    db_path = tmp_path / "fanout.db"
+    statements: list[str] = []
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def get_traced_conn():
+        conn = get_test_conn()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    mocker.patch("modules.notifications.get_db_connection", side_effect=get_traced_conn)
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.execute("ALTER TABLE contatti ADD COLUMN Stato TEXT")
+    conn.executemany(
+        'INSERT INTO contatti (Matricola, "Nome Cognome", Ruolo, Stato) VALUES (?, ?, ?, ?)',
+        [
+            ("M1", "Publisher", "Tecnico", "Attivo"),
+            ("M2", "Tecnico Libero", "Tecnico", None),
+            ("M3", "Aiutante", "Aiutante", "Attivo"),
+            ("M4", "Disabilitato", "Tecnico", "Disabilitato"),
+            ("M5", "In Reperibilità", "Tecnico", "Attivo"),
+            ("M6", "Altro Tecnico", "Tecnico", "Attivo"),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO turni (ID_Turno, Data, PostiTecnico, PostiAiutante, Tipo) VALUES (?, ?, ?, ?, ?)",
+        [("T1", "2030-01-10", 1, 0, "Assistenza"), ("R1", "2030-01-10", 1, 1, "Reperibilità")],
+    )
+    conn.execute("INSERT INTO prenotazioni VALUES ('P1', 'R1', 'M5', 'Tecnico', '')")
+    conn.commit()
+
+    inviate = notifica_turno_disponibile(
+        "T1", "Turno libero", ruolo_richiesto="Tecnico", escludi_matricola="M1"
+    )
+
+    assert inviate == 2
+    assert sum("INSERT INTO notifiche" in q for q in statements) == 1
+    rows = conn.execute("SELECT ID_Notifica, Destinatario_Matricola FROM notifiche").fetchall()
+    conn.close()
+    assert sorted(r["Destinatario_Matricola"] for r in rows) == ["M2", "M6"]
+    assert len({r["ID_Notifica"] for r in rows}) == 2
+
+
+def test_inbox_pagination_bulk_read_and_retention(mocker, tmp_path):
+    """Paginazione, lettura massiva per ID e archiviazione delle notifiche lette."""
+    import sqlite3
+
+    from modules.notifications import (
+        archivia_notifiche_lette,
+        leggi_ultime_notifiche,
+        segna_notifiche_lette,
+    )
+    from tests.db_utils import SCHEMA_SQL
+
+    db_path = tmp_path / "inbox.db"
+
+    def get_test_conn():
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    mocker.patch("modules.database.db_system.get_db_connection", side_effect=get_test_conn)
+    mocker.patch("core.database.DatabaseEngine.get_connection", side_effect=get_test_conn)
+    conn = get_test_conn()
+    conn.executescript(SCHEMA_SQL)
+    conn.execute(
+        "CREATE TABLE notifiche_archivio (ID_Notifica TEXT PRIMARY KEY, Timestamp TEXT, "
+        "Destinatario_Matricola TEXT, Messaggio TEXT, Stato TEXT, Link_Azione TEXT, "
+        "Timestamp_Archiviazione TEXT)"
+    )
+    conn.execute("INSERT INTO contatti (Matricola, \"Nome Cognome\") VALUES ('M1', 'U1')")
+    conn.executemany(
+        "INSERT INTO notifiche VALUES (?, ?, 'M1', ?, ?, '')",
+        [
+            ("N1", "2020-01-01T10:00:00", "vecchia letta", "letta"),
+            ("N2", "2020-01-02T10:00:00", "vecchia non letta", "non letta"),
+            ("N3", "2099-01-01T10:00:00", "recente", "non letta"),
+        ],
+    )
+    conn.commit()
+
+    page = leggi_ultime_notifiche("M1", limit=2)
+    assert page["ID_Notifica"].tolist() == ["N3", "N2"]
+
+    assert segna_notifiche_lette("M1", ["N3", "N1"]) == 1
+    assert archivia_notifiche_lette(giorni=30) == 1
+
+    remaining = [r[0] for r in conn.execute("SELECT ID_Notifica FROM notifiche ORDER BY 1")]
+    archived = [r[0] for r in conn.execute("SELECT ID_Notifica FROM notifiche_archivio")]
+    conn.close()
+    assert remaining == ["N2", "N3"]
+    assert archived == ["N1"]
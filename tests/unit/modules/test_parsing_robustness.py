@@ -31,7 +31,7 @@ def test_pdl_regex_extraction(mocker):
     mocker.patch("modules.reports_manager.get_db_connection", return_value=mock_conn)
 
     # Patchiamo l'invio email (importato localmente come modules.email_sender)
-    mocker.patch("modules.email_sender.invia_email_con_outlook_async")
+    mocker.patch("modules.email_sender.accoda_email")
 
     # Dati di test
     data_rif = datetime.date(2025, 1, 1)
@@ -6,29 +6,21 @@ import datetime
 
 import pandas as pd
 
+from modules.db_manager import BookingResult
 from modules.shifts.logic_bookings import prenota_turno_logic
 from modules.shifts.logic_utils import find_matricola_by_surname, log_shift_change
 
 
 def test_prenota_turno_logic_success(mocker):
-    # Patchiamo le dipendenze nel modulo dove risiede la logica
+    # La verifica posti/conflitti avviene nella transazione di prenotazione
     mocker.patch(
-        "modules.shifts.logic_bookings.get_shift_by_id",
-        return_value={
-            "ID_Turno": "T1",
-            "PostiTecnico": 2,
-            "PostiAiutante": 1,
-            "Data": datetime.date.today().isoformat(),
-        },
+        "modules.shifts.logic_bookings.book_shift_atomically",
+        return_value=BookingResult(
+            "booked", booking_id="P_1", data_turno=datetime.date.today().isoformat()
+        ),
     )
-    mocker.patch(
-        "modules.shifts.logic_bookings.get_bookings_for_shift",
-        return_value=pd.DataFrame(columns=["RuoloOccupato"]),
-    )
-    mocker.patch("modules.shifts.logic_bookings.add_booking", return_value=True)
     mocker.patch("modules.shifts.logic_bookings.log_shift_change")
     mocker.patch("modules.shifts.logic_bookings.st")
-    mocker.patch("modules.shifts.logic_bookings.check_user_oncall_conflict", return_value=False)
 
     assert prenota_turno_logic("123", "T1", "Tecnico") is True
 
@@ -5,7 +5,7 @@ Copre src/pages/gestione_dati.py.
 
 import pandas as pd
 
-from pages.gestione_dati import render_gestione_dati_tab
+from pages.gestione_dati import build_change_set, render_gestione_dati_tab
 
 
 def test_render_gestione_dati_tab_success(mocker):
@@ -25,13 +25,25 @@ def test_render_gestione_dati_tab_success(mocker):
     )
     mocker.patch("streamlit.data_editor", side_effect=lambda df, **kwargs: df)
     mocker.patch("streamlit.button", return_value=True)
-    mocker.patch("streamlit.rerun")
-    mocker.patch("streamlit.session_state", {"authenticated_user": "M1"})
+    mock_rerun = mocker.patch("streamlit.rerun")
+    session_state = {
+        "authenticated_user": "M1",
+        "editor_table2_0": {
+            "edited_rows": {0: {"nome": "nuovo"}},
+            "added_rows": [{"id": 2, "nome": "aggiunto"}],
+            "deleted_rows": [],
+        },
+    }
+    mocker.patch("streamlit.session_state", session_state)
 
     # Patching module imports within gestione_dati
     mocker.patch("pages.gestione_dati.get_table_names", return_value=["table1", "table2"])
-    mocker.patch("pages.gestione_dati.get_table_data", return_value=pd.DataFrame([{"id": 1}]))
-    mocker.patch("pages.gestione_dati.save_table_data", return_value=True)
+    mocker.patch("pages.gestione_dati.get_table_key_columns", return_value=["id"])
+    mocker.patch(
+        "pages.gestione_dati.get_table_page",
+        return_value=(pd.DataFrame([{"id": 1, "nome": "vecchio"}]), 1),
+    )
+    mock_apply = mocker.patch("pages.gestione_dati.apply_table_changes", return_value=True)
     mocker.patch(
         "pages.gestione_dati.get_all_users",
         return_value=pd.DataFrame([{"Matricola": "M1", "Nome Cognome": "T1", "Ruolo": "Tecnico"}]),
@@ -42,7 +54,35 @@ def test_render_gestione_dati_tab_success(mocker):
     )
 
     render_gestione_dati_tab()
-    assert mock_success.called
+    mock_apply.assert_called_once_with(
+        "table2", [({"id": 1}, {"nome": "nuovo"})], [{"id": 2, "nome": "aggiunto"}], []
+    )
+    # Lo stato dell'editor viene scartato e il messaggio mostrato dopo il rerun
+    assert "editor_table2_0" not in session_state
+    assert mock_rerun.called
+    assert not mock_success.called
+
+    mocker.patch("streamlit.button", return_value=False)
+    render_gestione_dati_tab()
+    assert "1 modificate, 1 aggiunte" in mock_success.call_args[0][0]
+    assert "gestione_dati_page_table2_saved" not in session_state
+
+
+def test_build_change_set_uses_primary_keys():
+    """Le posizioni dell'editor vengono tradotte nelle chiavi primarie della pagina."""
+    df = pd.DataFrame([{"id": 10, "v": "a"}, {"id": 11, "v": "b"}, {"id": 12, "v": "c"}])
+    state = {
+        "edited_rows": {0: {"v": "x"}, 2: {"v": "z"}},
+        "added_rows": [{"id": 13, "v": "d"}, {}],
+        "deleted_rows": [2],
+    }
+
+    updates, inserts, deletes = build_change_set(df, state, ["id"])
+
+    assert updates == [({"id": 10}, {"v": "x"})]
+    assert inserts == [{"id": 13, "v": "d"}]
+    assert deletes == [{"id": 12}]
+    assert type(deletes[0]["id"]) is int
 
 
 def test_render_gestione_dati_tab_no_tables(mocker):
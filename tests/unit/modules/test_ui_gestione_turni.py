@@ -25,7 +25,6 @@ def test_render_gestione_turni_tab(mocker):
     )
     mocker.patch("pages.gestione_turni.get_all_bacheca_items", return_value=pd.DataFrame())
     mocker.patch("pages.gestione_turni.get_all_substitutions", return_value=pd.DataFrame())
-    mocker.patch("pages.gestione_turni.get_shifts_by_type", return_value=pd.DataFrame())
 
     # Mocking sub-renders
     mocker.patch("pages.gestione_turni.render_turni_list")
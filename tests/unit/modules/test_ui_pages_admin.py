@@ -3,10 +3,12 @@ Test unitari per le pagine amministrative (IA e Log).
 Copre src/pages/admin/ia_view.py e src/pages/admin/logs_view.py.
 """
 
+import datetime
+
 import pandas as pd
 
 from pages.admin.ia_view import render_ia_management_tab
-from pages.admin.logs_view import render_access_logs_tab
+from pages.admin.logs_view import render_access_logs_tab, render_app_logs_tab
 
 
 def test_render_ia_management_tab(mocker):
@@ -68,3 +70,39 @@ def test_render_access_logs_tab_with_data(mocker):
 
     render_access_logs_tab()
     assert mock_df_st.called
+
+
+def test_render_app_logs_tab_queries_filters_and_resets_page(mocker):
+    mocker.patch("streamlit.subheader")
+    mocker.patch("streamlit.info")
+    mocker.patch("streamlit.divider")
+    mocker.patch("streamlit.caption")
+    mocker.patch(
+        "streamlit.columns",
+        side_effect=lambda n: [
+            mocker.MagicMock() for _ in range(n if isinstance(n, int) else len(n))
+        ],
+    )
+    mocker.patch("streamlit.date_input", return_value=datetime.date(2026, 1, 1))
+    mocker.patch("streamlit.time_input", side_effect=[datetime.time(8, 0), datetime.time(9, 30)])
+    mocker.patch("streamlit.multiselect", return_value=["ERROR"])
+    mocker.patch("streamlit.selectbox", return_value="modules.database")
+    mocker.patch("streamlit.text_input", return_value=" t1 ")
+    mock_df_st = mocker.patch("streamlit.dataframe")
+    mocker.patch("streamlit.session_state", {"app_logs_page": 3})
+    mocker.patch("pages.admin.logs_view.get_app_log_loggers", return_value=["modules.database"])
+    df = pd.DataFrame([{"timestamp": "2026-01-01T08:10:00", "level": "ERROR", "message": "x"}])
+    mock_get = mocker.patch("pages.admin.logs_view.get_app_logs", return_value=(df, 1))
+
+    render_app_logs_tab()
+
+    mock_get.assert_called_once_with(
+        data_inizio="2026-01-01T08:00:00",
+        data_fine="2026-01-01T09:31:00",
+        livelli=["ERROR"],
+        modulo="modules.database",
+        trace_id="t1",
+        limit=100,
+        offset=0,
+    )
+    assert mock_df_st.called
@@ -61,23 +61,66 @@ def test_render_relazione_reperibilita_ui_success(mocker):
     df_users = pd.DataFrame([{"Matricola": "M2", "Nome Cognome": "Partner"}])
     mocker.patch("components.forms.relazione_oncall_form.get_all_users", return_value=df_users)
     mocker.patch("components.forms.relazione_oncall_form.salva_relazione", return_value=True)
-    mocker.patch("components.forms.relazione_oncall_form.invia_email_con_outlook_async")
+    mocker.patch("components.forms.relazione_oncall_form.accoda_email")
 
     render_relazione_reperibilita_ui("M1", "User")
     assert st.success.called
 
 
 def test_handle_ai_correction(mocker):
+    """Il click su IA accoda un lavoro e ne memorizza l'id per il polling."""
     from components.forms.relazione_oncall_form import _handle_ai_correction
 
-    mocker.patch("streamlit.spinner", return_value=mocker.MagicMock())
-    session = MockSessionState({})
+    session = MockSessionState({"relazione_revisionata": "Vecchia"})
+    mocker.patch("streamlit.session_state", session)
+    submit = mocker.patch(
+        "components.forms.relazione_oncall_form.invia_revisione_ia", return_value="IAJ_1"
+    )
+
+    _handle_ai_correction("Original", "M1")
+
+    submit.assert_called_once_with("Original", "M1")
+    assert session.ai_job_id == "IAJ_1"
+    assert session.relazione_revisionata == ""
+
+
+def test_ai_job_progress_shows_partial_text(mocker):
+    """Durante l'elaborazione viene mostrato il testo parziale senza ricaricare la pagina."""
+    from components.forms.relazione_oncall_form import _render_ai_job_progress
+
+    session = MockSessionState({"ai_job_id": "IAJ_1"})
     mocker.patch("streamlit.session_state", session)
     mocker.patch(
-        "components.forms.relazione_oncall_form.revisiona_con_ia",
-        return_value={"success": True, "text": "Revised"},
+        "components.forms.relazione_oncall_form.stato_revisione_ia",
+        return_value={"stato": "in_corso", "parziale": "La valvola", "risultato": None},
     )
-    mocker.patch("streamlit.success")
+    info = mocker.patch("streamlit.info")
+    mocker.patch("streamlit.caption")
+    rerun = mocker.patch("streamlit.rerun")
+
+    # Fuori dal runtime Streamlit il fragment non viene eseguito: si chiama la funzione originale
+    _render_ai_job_progress.__wrapped__()
+
+    info.assert_called_once_with("La valvola")
+    rerun.assert_not_called()
+    assert session.ai_job_id == "IAJ_1"
+
+
+def test_ai_job_progress_completed(mocker):
+    """A lavoro completato il risultato passa in sessione e il polling termina."""
+    from components.forms.relazione_oncall_form import _render_ai_job_progress
+
+    session = MockSessionState({"ai_job_id": "IAJ_1"})
+    mocker.patch("streamlit.session_state", session)
+    mocker.patch(
+        "components.forms.relazione_oncall_form.stato_revisione_ia",
+        return_value={"stato": "completato", "parziale": None, "risultato": "Revised"},
+    )
+    rerun = mocker.patch("streamlit.rerun")
+
+    # Fuori dal runtime Streamlit il fragment non viene eseguito: si chiama la funzione originale
+    _render_ai_job_progress.__wrapped__()
 
-    _handle_ai_correction("Original")
     assert session.relazione_revisionata == "Revised"
+    assert session.ai_job_id is None
+    rerun.assert_called_once()
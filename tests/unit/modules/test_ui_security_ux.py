@@ -3,7 +3,6 @@ Test per la sicurezza e stabilità della UX Streamlit.
 Verifica la persistenza dello stato della sessione durante la navigazione.
 """
 
-import pandas as pd
 import streamlit as st
 
 from components.ui.navigation_ui import render_sidebar
@@ -20,9 +19,7 @@ def test_navigation_tab_persistence(mocker):
     mock_rerun = mocker.patch("streamlit.rerun")
 
     # Mock moduli esterni
-    mocker.patch(
-        "components.ui.navigation_ui.leggi_notifiche", return_value=pd.DataFrame(columns=["Stato"])
-    )
+    mocker.patch("components.ui.navigation_ui.render_notification_center")
     mocker.patch("components.ui.navigation_ui.get_last_login", return_value="2025-01-01 10:00")
     mocker.patch("components.ui.navigation_ui.get_next_on_call_week", return_value=None)
 
@@ -39,9 +36,7 @@ def test_session_clear_on_logout(mocker):
 
     mocker.patch("streamlit.button", side_effect=lambda label, **kwargs: label == "Disconnetti")
     mocker.patch("components.ui.navigation_ui.delete_session")
-    mocker.patch(
-        "components.ui.navigation_ui.leggi_notifiche", return_value=pd.DataFrame(columns=["Stato"])
-    )
+    mocker.patch("components.ui.navigation_ui.render_notification_center")
     mocker.patch("components.ui.navigation_ui.get_last_login", return_value=None)
     mocker.patch("components.ui.navigation_ui.get_next_on_call_week", return_value=None)
     mock_rerun = mocker.patch("streamlit.rerun")
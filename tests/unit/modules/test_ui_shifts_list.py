@@ -7,78 +7,89 @@ import pandas as pd
 
 from pages.shifts.shifts_list_view import render_turni_list
 
+DF_USERS = pd.DataFrame([{"Matricola": "M1", "Nome Cognome": "User 1"}])
 
-def test_render_turni_list_empty(mocker):
-    mock_info = mocker.patch("streamlit.info")
-    render_turni_list(pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), "M1", "Tecnico", "test")
-    assert mock_info.called
 
+def _occupancy_row(**overrides):
+    row = {
+        "ID_Turno": "T1",
+        "Descrizione": "Turno 1",
+        "Data": "2025-01-01",
+        "OrarioInizio": "08:00",
+        "OrarioFine": "17:00",
+        "PostiTecnico": 2,
+        "PostiAiutante": 1,
+        "booked_tecnico": 0,
+        "booked_aiutante": 0,
+        "user_booked": 0,
+        "booked_names": "",
+        "total_count": 1,
+    }
+    row.update(overrides)
+    return pd.DataFrame([row])
 
-def test_render_turni_list_with_data(mocker):
-    df_turni = pd.DataFrame(
-        [
-            {
-                "ID_Turno": "T1",
-                "Descrizione": "Turno 1",
-                "Data": "2025-01-01",
-                "OrarioInizio": "08:00",
-                "OrarioFine": "17:00",
-                "PostiTecnico": 2,
-                "PostiAiutante": 1,
-            }
-        ]
-    )
-    df_bookings = pd.DataFrame(columns=["ID_Turno", "Matricola", "RuoloOccupato"])
-    df_users = pd.DataFrame([{"Matricola": "M1", "Nome Cognome": "User 1"}])
 
+def _mock_streamlit(mocker):
     mocker.patch("streamlit.checkbox", return_value=False)
+    mocker.patch("streamlit.columns", return_value=[mocker.MagicMock() for _ in range(3)])
     mocker.patch("streamlit.divider")
     mocker.patch("streamlit.container", return_value=mocker.MagicMock())
     mocker.patch("streamlit.markdown")
     mocker.patch("streamlit.caption")
-    mocker.patch("streamlit.success")
-    mocker.patch("streamlit.selectbox", return_value="Tecnico")
-    mock_button = mocker.patch("streamlit.button", return_value=True)
     mocker.patch("streamlit.rerun")
     mocker.patch("streamlit.session_state", {})
 
-    # Mocking logic
+
+def test_render_turni_list_empty(mocker):
+    _mock_streamlit(mocker)
+    mocker.patch("pages.shifts.shifts_list_view.get_shifts_occupancy", return_value=pd.DataFrame())
+    mock_info = mocker.patch("streamlit.info")
+    render_turni_list("Assistenza", DF_USERS, "M1", "Tecnico", "test")
+    assert mock_info.called
+
+
+def test_render_turni_list_with_data(mocker):
+    _mock_streamlit(mocker)
+    mocker.patch("streamlit.success")
+    mocker.patch("streamlit.selectbox", return_value="Tecnico")
+    mock_button = mocker.patch("streamlit.button", return_value=True)
+    mocker.patch(
+        "pages.shifts.shifts_list_view.get_shifts_occupancy", return_value=_occupancy_row()
+    )
     mocker.patch("pages.shifts.shifts_list_view.prenota_turno_logic", return_value=True)
 
-    render_turni_list(df_turni, df_bookings, df_users, "M1", "Tecnico", "test")
+    render_turni_list("Assistenza", DF_USERS, "M1", "Tecnico", "test")
     assert mock_button.called
 
 
 def test_render_turni_list_already_booked(mocker):
-    df_turni = pd.DataFrame(
-        [
-            {
-                "ID_Turno": "T1",
-                "Descrizione": "Turno 1",
-                "Data": "2025-01-01",
-                "OrarioInizio": "08:00",
-                "OrarioFine": "17:00",
-                "PostiTecnico": 2,
-                "PostiAiutante": 1,
-            }
-        ]
-    )
-    df_bookings = pd.DataFrame([{"ID_Turno": "T1", "Matricola": "M1", "RuoloOccupato": "Tecnico"}])
-    df_users = pd.DataFrame([{"Matricola": "M1", "Nome Cognome": "User 1"}])
-
-    mocker.patch("streamlit.checkbox", return_value=False)
-    mocker.patch("streamlit.divider")
-    mocker.patch("streamlit.container", return_value=mocker.MagicMock())
-    mocker.patch("streamlit.markdown")
-    mocker.patch("streamlit.caption")
+    _mock_streamlit(mocker)
     mock_success = mocker.patch("streamlit.success")
-    mocker.patch("streamlit.columns", return_value=[mocker.MagicMock() for _ in range(3)])
     mocker.patch("streamlit.button", return_value=True)
-    mocker.patch("streamlit.rerun")
-    mocker.patch("streamlit.session_state", {})
-
-    # Mocking logic
+    mocker.patch(
+        "pages.shifts.shifts_list_view.get_shifts_occupancy",
+        return_value=_occupancy_row(
+            booked_tecnico=1, user_booked=1, booked_names="User 1 (Tecnico)"
+        ),
+    )
     mocker.patch("pages.shifts.shifts_list_view.cancella_prenotazione_logic", return_value=True)
 
-    render_turni_list(df_turni, df_bookings, df_users, "M1", "Tecnico", "test")
+    render_turni_list("Assistenza", DF_USERS, "M1", "Tecnico", "test")
     assert mock_success.called
+
+
+def test_render_turni_list_filters_passed_to_sql(mocker):
+    _mock_streamlit(mocker)
+    mocker.patch("streamlit.checkbox", side_effect=[True, False])
+    mocker.patch("streamlit.info")
+    mock_query = mocker.patch(
+        "pages.shifts.shifts_list_view.get_shifts_occupancy", return_value=pd.DataFrame()
+    )
+
+    render_turni_list("Straordinario", DF_USERS, "M1", "Tecnico", "test")
+
+    kwargs = mock_query.call_args.kwargs
+    assert mock_query.call_args.args == ("Straordinario", "M1")
+    assert kwargs["only_available"] is True
+    assert kwargs["from_date"] is not None
+    assert kwargs["offset"] == 0
@@ -5,8 +5,6 @@ Copre src/pages/admin/shifts_view.py.
 
 import datetime
 
-import pandas as pd
-
 from pages.admin.shifts_view import render_new_shift_form
 
 
@@ -27,13 +25,12 @@ def test_render_new_shift_form_success(mocker):
 
     # Patch local references
     mocker.patch("pages.admin.shifts_view.create_shift", return_value=True)
-    mocker.patch(
-        "pages.admin.shifts_view.get_all_users", return_value=pd.DataFrame([{"Matricola": "123"}])
-    )
-    mocker.patch("pages.admin.shifts_view.crea_notifica", return_value=True)
+    mock_notify = mocker.patch("pages.admin.shifts_view.notifica_turno_disponibile", return_value=1)
 
     render_new_shift_form()
     assert mock_success.called
+    # Con posti aiutante disponibili il turno è notificato a tutti i ruoli
+    assert mock_notify.call_args.kwargs["ruolo_richiesto"] is None
 
 
 def test_render_new_shift_form_missing_desc(mocker):
@@ -3,6 +3,8 @@ Test unitari per la validazione dei report.
 Copre src/pages/admin/validation_view.py.
 """
 
+import datetime
+
 import pandas as pd
 
 from pages.admin.validation_view import (
@@ -37,7 +39,7 @@ def test_render_report_validation_tab_process(mocker):
     )
     mocker.patch("pages.admin.validation_view.get_reports_to_validate", return_value=df)
     mocker.patch(
-        "pages.admin.validation_view.process_and_commit_validated_reports", return_value=True
+        "pages.admin.validation_view.validate_reports_batch", return_value={"R1": "validated"}
     )
 
     render_report_validation_tab("M123")
@@ -47,17 +49,87 @@ def test_render_report_validation_tab_process(mocker):
 def test_render_relazioni_validation_tab_success(mocker):
     mocker.patch("streamlit.subheader")
     mocker.patch("streamlit.info")
-    mocker.patch("streamlit.data_editor", side_effect=lambda df, **kwargs: df)
-    mocker.patch("streamlit.button", return_value=True)
+    mocker.patch("streamlit.expander")
+    mocker.patch("streamlit.selectbox", return_value="Tutti")
+    mocker.patch("streamlit.date_input", return_value=datetime.date(2025, 1, 1))
+    mocker.patch("streamlit.caption")
+
+    def _edit(df, **kwargs):
+        edited = df.copy()
+        edited["valida"] = True
+        edited["corpo_relazione"] = "testo corretto"
+        return edited
+
+    mocker.patch("streamlit.data_editor", side_effect=_edit)
+    mocker.patch("streamlit.button", side_effect=lambda label, **kwargs: "key" not in kwargs)
     mocker.patch("streamlit.spinner", return_value=mocker.MagicMock())
     mock_success = mocker.patch("streamlit.success")
     mocker.patch("streamlit.rerun")
 
-    df = pd.DataFrame([{"id_relazione": "REL1", "data_intervento": "2025-01-01"}])
+    df = pd.DataFrame(
+        [{"id_relazione": "REL1", "data_intervento": "2025-01-01", "corpo_relazione": "testo"}]
+    )
     mocker.patch("pages.admin.validation_view.get_unvalidated_relazioni", return_value=df)
-    mocker.patch(
+    mocker.patch("pages.admin.validation_view.get_ai_prereviews", return_value={})
+    mock_bulk = mocker.patch("pages.admin.validation_view.validate_relazioni_bulk")
+    mock_commit = mocker.patch(
         "pages.admin.validation_view.process_and_commit_validated_relazioni", return_value=True
     )
 
     render_relazioni_validation_tab("M123")
     assert mock_success.called
+    assert not mock_bulk.called
+    _edited, admin = mock_commit.call_args.args
+    assert admin == "M123"
+    assert mock_commit.call_args.kwargs["original_df"]["corpo_relazione"].iloc[0] == "testo"
+
+
+def test_render_relazioni_bulk_validation(mocker):
+    mocker.patch("streamlit.subheader")
+    mocker.patch("streamlit.info")
+    mocker.patch("streamlit.expander")
+    mocker.patch("streamlit.selectbox", return_value="M1")
+    mocker.patch("streamlit.date_input", return_value=datetime.date(2025, 1, 8))
+    mocker.patch("streamlit.caption")
+    mocker.patch("streamlit.data_editor", side_effect=lambda df, **kwargs: df)
+    mocker.patch("streamlit.button", side_effect=lambda label, **kwargs: "key" in kwargs)
+    mock_success = mocker.patch("streamlit.success")
+    mocker.patch("streamlit.rerun")
+
+    df = pd.DataFrame([{"id_relazione": "REL1", "tecnico_compilatore": "M1"}])
+    mocker.patch("pages.admin.validation_view.get_unvalidated_relazioni", return_value=df)
+    mocker.patch("pages.admin.validation_view.get_ai_prereviews", return_value={})
+    mock_bulk = mocker.patch("pages.admin.validation_view.validate_relazioni_bulk", return_value=4)
+
+    render_relazioni_validation_tab("ADM")
+
+    mock_bulk.assert_called_once_with(
+        "ADM", tecnico="M1", data_da="2025-01-06", data_a="2025-01-12"
+    )
+    assert mock_success.called
+
+
+def test_render_relazioni_validation_tab_shows_ai_prereviews(mocker):
+    mocker.patch("streamlit.subheader")
+    mocker.patch("streamlit.info")
+    mock_expander = mocker.patch("streamlit.expander")
+    mocker.patch("streamlit.selectbox", return_value="Tutti")
+    mocker.patch("streamlit.date_input", return_value=datetime.date(2025, 1, 1))
+    mocker.patch("streamlit.caption")
+    mocker.patch("streamlit.data_editor", side_effect=lambda df, **kwargs: df)
+    mocker.patch("streamlit.button", return_value=False)
+    mock_markdown = mocker.patch("streamlit.markdown")
+
+    df = pd.DataFrame([{"id_relazione": "REL1"}, {"id_relazione": "REL2"}])
+    mocker.patch("pages.admin.validation_view.get_unvalidated_relazioni", return_value=df)
+    mock_prereviews = mocker.patch(
+        "pages.admin.validation_view.get_ai_prereviews",
+        return_value={"REL2": "Manca il TAG dello strumento."},
+    )
+
+    render_relazioni_validation_tab("ADM")
+
+    mock_prereviews.assert_called_once_with(["REL1", "REL2"])
+    assert mock_expander.call_args_list[-1].args[0] == "Pre-revisione IA (1 relazioni)"
+    shown = [c.args[0] for c in mock_markdown.call_args_list]
+    assert shown == ["**REL2**", "Manca il TAG dello strumento."]
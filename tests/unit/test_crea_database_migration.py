@@ -0,0 +1,24 @@
+import sqlite3
+
+from scripts import crea_database
+
+
+def test_aggiunge_colonna_stato_a_contatti_esistente(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE contatti (Matricola TEXT PRIMARY KEY NOT NULL, "Nome Cognome" TEXT)')
+    conn.execute("INSERT INTO contatti VALUES ('M1', 'Mario Rossi')")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(crea_database, "DB_NAME", db_path)
+
+    crea_database.crea_tabelle_se_non_esistono()
+    # La seconda esecuzione non deve tentare di aggiungere di nuovo la colonna
+    crea_database.crea_tabelle_se_non_esistono()
+
+    conn = sqlite3.connect(db_path)
+    colonne = {row[1] for row in conn.execute("PRAGMA table_info(contatti)")}
+    stato = conn.execute("SELECT Stato FROM contatti WHERE Matricola = 'M1'").fetchone()[0]
+    conn.close()
+    assert "Stato" in colonne
+    assert stato == "Attivo"
@@ -96,7 +96,7 @@ class TestDataIntegrity(unittest.TestCase):
             self.assertFalse(result)
             mock_error.assert_called_with("Utente U1 non trovato.")
 
-    @patch("modules.email_sender.invia_email_con_outlook_async")
+    @patch("modules.email_sender.accoda_email")
     def test_send_validation_email(self, mock_send):
         reports_manager._send_validation_email(
             "Mario",
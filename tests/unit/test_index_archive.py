@@ -0,0 +1,122 @@
+"""
+Test per l'indicizzazione incrementale dell'archivio schede (scripts/index_archive.py).
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from modules.archive_manager import get_archive_stats, search_archive
+from scripts import crea_database, index_archive
+
+
+@pytest.fixture
+def archive(mocker, tmp_path):
+    db_path = tmp_path / "archivio.db"
+    mocker.patch.object(crea_database, "DB_NAME", db_path)
+    mocker.patch("modules.archive_manager.DB_PATH", db_path)
+    crea_database.crea_tabelle_se_non_esistono()
+
+    root = tmp_path / "Archivio"
+    for rel in (
+        "2023/03 - MARZO/PT101 taratura.xls",
+        "2024/01 - GENNAIO/FCV301 (2).xlsx",
+        "2024/01 - GENNAIO/~$FCV301 (2).xlsx",
+        "2024/01 - GENNAIO/note.txt",
+        "LT300.xlsm",
+    ):
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x")
+    return root, db_path
+
+
+def _rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT filename, year, month, tag, size, deleted_at FROM maintenance_archive "
+            "ORDER BY filename"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_first_run_indexes_archive_files_with_year_and_month(archive):
+    root, db_path = archive
+
+    stats = index_archive.index_archive(str(root), db_path, workers=2)
+
+    assert stats == {"nuovi": 3, "aggiornati": 0, "invariati": 0, "rimossi": 0}
+    assert _rows(db_path) == [
+        ("FCV301 (2).xlsx", "2024", "01 - GENNAIO", "FCV301", 1, None),
+        ("LT300.xlsm", "", "", "LT300", 1, None),
+        ("PT101 taratura.xls", "2023", "03 - MARZO", "PT101", 1, None),
+    ]
+
+
+def test_rerun_only_writes_changes_and_tombstones_removed_files(archive):
+    root, db_path = archive
+    index_archive.index_archive(str(root), db_path)
+
+    assert index_archive.index_archive(str(root), db_path)["invariati"] == 3
+
+    (root / "2023/03 - MARZO/PT101 taratura.xls").write_text("modificata")
+    (root / "LT300.xlsm").unlink()
+    stats = index_archive.index_archive(str(root), db_path)
+
+    assert stats == {"nuovi": 0, "aggiornati": 1, "invariati": 1, "rimossi": 1}
+    assert len(_rows(db_path)) == 3
+    assert search_archive("LT300").empty
+    assert get_archive_stats()["total_files"] == 2
+
+    # Un file ricomparso torna visibile
+    (root / "LT300.xlsm").write_text("x")
+    assert index_archive.index_archive(str(root), db_path)["aggiornati"] == 1
+    assert list(search_archive("LT300")["filename"]) == ["LT300.xlsm"]
+
+
+def test_unreadable_folder_does_not_tombstone_its_files(archive, mocker):
+    root, db_path = archive
+    index_archive.index_archive(str(root), db_path)
+    unreadable = str(root / "2024")
+    real_scandir = os.scandir
+
+    def flaky_scandir(path):
+        if str(path) == unreadable:
+            raise PermissionError(path)
+        return real_scandir(path)
+
+    mocker.patch("scripts.index_archive.os.scandir", side_effect=flaky_scandir)
+
+    stats = index_archive.index_archive(str(root), db_path)
+
+    assert stats["rimossi"] == 0
+    assert all(row[-1] is None for row in _rows(db_path))
+
+
+def test_migration_removes_duplicates_from_full_reindexing(mocker, tmp_path):
+    db_path = tmp_path / "archivio.db"
+    mocker.patch.object(crea_database, "DB_NAME", db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE maintenance_archive (filename TEXT NOT NULL, full_path TEXT NOT NULL, "
+        "year TEXT, month TEXT, last_modified TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO maintenance_archive (filename, full_path) VALUES ('A.xls', '/a/A.xls')",
+        [(), ()],
+    )
+    conn.commit()
+    conn.close()
+
+    crea_database.crea_tabelle_se_non_esistono()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM maintenance_archive").fetchone()[0] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute(
+            "INSERT INTO maintenance_archive (filename, full_path) VALUES ('A.xls', '/a/A.xls')"
+        )
+    conn.close()
@@ -0,0 +1,146 @@
+"""
+Test per l'importazione dei log applicativi (scripts/ingest_logs.py)
+e la loro consultazione (modules.database.db_logs).
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.database.db_logs import get_app_logs
+from scripts import crea_database, ingest_logs
+
+
+def _line(message, level="INFO", logger="modules.test", **extra):
+    record = {
+        "timestamp": extra.pop("timestamp", datetime.now().isoformat()),
+        "level": level,
+        "logger": logger,
+        "message": message,
+        "module": "test",
+        "func": "fn",
+        "line": 1,
+        **extra,
+    }
+    return json.dumps(record) + "\n"
+
+
+@pytest.fixture
+def log_db(mocker, tmp_path):
+    db_path = tmp_path / "logs.db"
+    mocker.patch.object(crea_database, "DB_NAME", db_path)
+    mocker.patch("core.database.DB_NAME", str(db_path))
+    crea_database.crea_tabelle_se_non_esistono()
+    conn = sqlite3.connect(db_path)
+    yield conn, tmp_path / "app.json"
+    conn.close()
+
+
+def _messages(conn):
+    return [r[0] for r in conn.execute("SELECT message FROM app_logs ORDER BY id")]
+
+
+def test_parse_log_line_maps_columns_and_keeps_other_fields_as_extra():
+    row = ingest_logs.parse_log_line(
+        _line("lenta", trace_id="t1", duration_sec=1.5, function="m.f", timestamp="2026-01-01")
+    )
+
+    assert row[:7] == ("2026-01-01", "INFO", "modules.test", "fn", "t1", 1.5, "lenta")
+    assert json.loads(row[7]) == {"module": "test", "line": 1, "function": "m.f"}
+    assert ingest_logs.parse_log_line("non json") is None
+    assert ingest_logs.parse_log_line('{"message": "senza timestamp"}') is None
+
+
+def test_ingest_is_incremental_and_waits_for_complete_lines(log_db):
+    conn, log_file = log_db
+    log_file.write_text(_line("uno") + _line("due") + '{"timestamp": "parz')
+
+    assert ingest_logs.ingest_app_logs(conn, log_file) == 2
+    assert ingest_logs.ingest_app_logs(conn, log_file) == 0
+
+    with open(log_file, "a") as f:
+        f.write('iale", "message": "tre"}\n' + _line("quattro"))
+
+    assert ingest_logs.ingest_app_logs(conn, log_file) == 2
+    assert _messages(conn) == ["uno", "due", "tre", "quattro"]
+
+
+def test_ingest_finishes_rotated_file_before_reading_the_new_one(log_db):
+    conn, log_file = log_db
+    log_file.write_text(_line("uno"))
+    ingest_logs.ingest_app_logs(conn, log_file)
+
+    # Due rotazioni tra un'esecuzione e l'altra, come fa il RotatingFileHandler
+    with open(log_file, "a") as f:
+        f.write(_line("due"))
+    os.replace(log_file, log_file.with_name("app.json.1"))
+    log_file.write_text(_line("tre"))
+    os.replace(log_file.with_name("app.json.1"), log_file.with_name("app.json.2"))
+    os.replace(log_file, log_file.with_name("app.json.1"))
+    log_file.write_text(_line("quattro"))
+
+    assert ingest_logs.ingest_app_logs(conn, log_file) == 3
+    assert _messages(conn) == ["uno", "due", "tre", "quattro"]
+
+
+def test_ingest_restarts_truncated_file_from_the_beginning(log_db):
+    conn, log_file = log_db
+    log_file.write_text(_line("uno") + _line("due"))
+    ingest_logs.ingest_app_logs(conn, log_file)
+
+    with open(log_file, "w") as f:
+        f.write(_line("tre"))
+
+    assert ingest_logs.ingest_app_logs(conn, log_file) == 1
+    assert _messages(conn) == ["uno", "due", "tre"]
+
+
+def test_each_service_log_file_is_ingested_with_its_own_position(log_db):
+    conn, log_file = log_db
+    log_file.write_text(_line("app"))
+    log_file.with_name("app.json.1").write_text(_line("app ruotato"))
+    log_file.with_name("app.prerevisione.json").write_text(_line("prerevisione"))
+
+    assert ingest_logs.log_files(log_file.parent) == [
+        log_file,
+        log_file.with_name("app.prerevisione.json"),
+    ]
+    assert ingest_logs.esegui_importazione(log_file.parent) == 3
+    assert ingest_logs.esegui_importazione(log_file.parent) == 0
+    assert sorted(_messages(conn)) == ["app", "app ruotato", "prerevisione"]
+
+
+def test_purge_removes_only_logs_older_than_retention(log_db):
+    conn, log_file = log_db
+    vecchio = (datetime.now() - timedelta(days=40)).isoformat()
+    log_file.write_text(_line("vecchio", timestamp=vecchio) + _line("recente"))
+    ingest_logs.ingest_app_logs(conn, log_file)
+
+    assert ingest_logs.purge_app_logs(conn, giorni=30) == 1
+    assert _messages(conn) == ["recente"]
+
+
+def test_get_app_logs_filters_and_paginates(log_db):
+    conn, log_file = log_db
+    log_file.write_text(
+        _line("a", timestamp="2026-01-01T10:00:00", logger="modules.database.db_users")
+        + _line("b", timestamp="2026-01-01T11:00:00", level="ERROR", trace_id="t1")
+        + _line("c", timestamp="2026-01-02T09:00:00", logger="modules.database_x")
+        + _line("d", timestamp="2026-01-02T10:00:00", level="WARNING", trace_id="t1")
+    )
+    ingest_logs.ingest_app_logs(conn, log_file)
+
+    df, total = get_app_logs(limit=2)
+    assert total == 4
+    assert df["message"].tolist() == ["d", "c"]
+    assert get_app_logs(limit=2, offset=2)[0]["message"].tolist() == ["b", "a"]
+
+    df, total = get_app_logs(data_inizio="2026-01-01T10:30:00", data_fine="2026-01-02")
+    assert df["message"].tolist() == ["b"]
+    assert get_app_logs(livelli=["ERROR", "WARNING"])[0]["message"].tolist() == ["d", "b"]
+    assert get_app_logs(modulo="modules.database")[0]["message"].tolist() == ["a"]
+    df, total = get_app_logs(trace_id="t1")
+    assert (df["message"].tolist(), total) == (["d", "b"], 2)
@@ -99,31 +99,52 @@ class TestUIComponentsMock(unittest.TestCase):
             self.mocks["expander"].assert_called()  # render_attivita_card calls expander
             self.mocks["button"].assert_called()  # Compile button
 
-    def test_notification_center_empty(self):
-        notifications_ui.render_notification_center([], "U1")
+    @patch("components.ui.notifications_ui.leggi_ultime_notifiche")
+    @patch("components.ui.notifications_ui.conta_notifiche_non_lette", return_value=0)
+    def test_notification_center_empty(self, mock_count, mock_read):
+        import pandas as pd
+
+        mock_read.return_value = pd.DataFrame(
+            columns=["ID_Notifica", "Timestamp", "Messaggio", "Stato"]
+        )
+        notifications_ui.render_notification_center("U1")
 
         self.mocks["popover"].assert_called()
         self.mocks["write"].assert_called_with("Nessuna notifica.")
 
-    def test_notification_center_with_data(self):
-        notifs = [
-            {
-                "ID_Notifica": 1,
-                "Timestamp": "2025-01-01 10:00",
-                "Messaggio": "Msg 1",
-                "Stato": "non letta",
-            }
-        ]
+    @patch("components.ui.notifications_ui.leggi_ultime_notifiche")
+    @patch("components.ui.notifications_ui.conta_notifiche_non_lette", return_value=1)
+    def test_notification_center_with_data(self, mock_count, mock_read):
+        import pandas as pd
+
+        mock_read.return_value = pd.DataFrame(
+            [
+                {
+                    "ID_Notifica": 1,
+                    "Timestamp": "2025-01-01 10:00",
+                    "Messaggio": "Msg 1",
+                    "Stato": "non letta",
+                }
+            ]
+        )
 
-        with patch("components.ui.notifications_ui.segna_notifica_letta") as mock_mark:
-            self.mocks["button"].return_value = True  # Click 'letto'
+        with (
+            patch("components.ui.notifications_ui.segna_notifiche_lette") as mock_mark,
+            patch("components.ui.notifications_ui.segna_tutte_lette") as mock_mark_all,
+        ):
+            self.mocks["button"].return_value = True  # Click 'Segna tutte' e 'letto'
 
-            notifications_ui.render_notification_center(notifs, "U1")
+            notifications_ui.render_notification_center("U1")
 
             self.mocks["popover"].assert_called()
-            self.mocks["markdown"].assert_called()
-            mock_mark.assert_called_with(1)
+            mock_mark_all.assert_called_once_with("U1")
+            mock_mark.assert_called_with("U1", [1])
             self.mocks["rerun"].assert_called()
+            # Il badge mostra il contatore in cache, l'elenco è limitato alla prima pagina
+            self.assertEqual(self.mocks["popover"].call_args.args[0], " 1")
+            self.assertEqual(
+                mock_read.call_args.kwargs["limit"], notifications_ui.NOTIFICHE_PER_PAGINA
+            )
 
 
 if __name__ == "__main__":